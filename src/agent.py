@@ -8,14 +8,27 @@ import subprocess as sp
 import shlex
 import uuid
 import threading
+import copy
+import json
+import socketserver
+import signal
 from datetime import datetime, timedelta
 from time import sleep
 import queue
 
+## fcntl is used to lock daemon's lock file, it is available only on Unix,
+#  where daemon mode is supported.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 from lib.common import bootstrap
+from lib.common import job_queue
 from lib.common.errors import *
 from lib.common.config import *
 from lib.utils import *
+from lib.utils import reaper
 
 
 AGENT_TEST_MODE = False
@@ -30,6 +43,21 @@ ROLLBACK = "enable"
 DICTIONARY_PATH = os.path.join(sys.path[0], "..", "..", "configs",
                                "dictionary.yaml")
 COMPOSITE_RUNNER_NAME = "composite_runner.py"
+## Parsed configurations (path -> (mtime, data)), kept by daemon between jobs.
+#  None means, that configurations are read on every use.
+CONFIG_CACHE = None
+CONFIG_CACHE_LOCK = threading.Lock()
+## Name of daemon's socket (relative to PID_PATH).
+DAEMON_SOCKET_NAME = "agent.sock"
+## Name of daemon's lock file (relative to PID_PATH). It is locked, while
+#  daemon is running, so only one daemon uses job queue and socket.
+DAEMON_LOCK_NAME = "agent.lock"
+## Folder (relative to PID_PATH), where daemon stores logs of jobs.
+JOB_LOGS_FOLDER = "job_logs"
+## Maximum number of jobs, executed by daemon concurrently.
+DAEMON_MAX_JOBS = 4
+## Maximum number of jobs, executed by daemon concurrently on one host.
+DAEMON_HOST_LIMIT = 1
 
 
 ## Decorator, which capture AutomationLibraryErrors, log them and return
@@ -54,6 +82,23 @@ def handle_automation_library_errors(func):
     return wrapper
 
 
+## Read scenario configuration. If daemon enabled CONFIG_CACHE, parsed data
+#  is cached and re-read only if file modified.
+# @param path Path to YAML file.
+# @return Parsed data. Caller can modify it.
+def load_config(path):
+    if CONFIG_CACHE is None:
+        return read_yaml(path)
+    mtime = os.stat(path).st_mtime_ns
+    with CONFIG_CACHE_LOCK:
+        cached = CONFIG_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, read_yaml(path))
+        with CONFIG_CACHE_LOCK:
+            CONFIG_CACHE[path] = cached
+    return copy.deepcopy(cached[1])
+
+
 class DictionaryEntry:
     def __init__(self, script, config, first_version=None, last_version=None,
                  exclude_versions=[], script_prefix="",
@@ -129,7 +174,7 @@ class CommandDictionary:
         return self.data[key]
 
 
-def step_from_scenario_entry(entry, dictionary):
+def step_from_scenario_entry(entry, dictionary, output=None):
     if "command" in entry:
         command = entry["command"]
         rollback = entry["rollback"] if "rollback" in entry else False
@@ -143,10 +188,10 @@ def step_from_scenario_entry(entry, dictionary):
         name = entry["name"] if "name" in entry else None
     # detect Step type
     config_path = dictionary[command].config
-    config = ScenarioConfiguration(read_yaml(config_path))
+    config = ScenarioConfiguration(load_config(config_path))
     StepCls = CompositeStep if config.composite else SimpleStep
     # building step
-    return StepCls(command, dictionary, cmd_args, rollback, name)
+    return StepCls(command, dictionary, cmd_args, rollback, name, output)
 
 
 
@@ -174,9 +219,10 @@ class FakeStep:
 
 class SimpleStep:
     def __init__(self, command, dictionary, cmd_script_args, rollback,
-                 name=None):
+                 name=None, output=None):
         # thread variables
         self.proc = None
+        self.time_exceeded = False
         self.queue = queue.Queue()
         self.quit_event = threading.Event()
         self.result = None
@@ -187,8 +233,10 @@ class SimpleStep:
         self.name = name
         self.cmd_script_args = cmd_script_args
         self.dictionary = dictionary
+        # file, to which output of scenario is written (None - inherited)
+        self.output = output
         # load configuration
-        self.config = ScenarioConfiguration(read_yaml(self.config_path))
+        self.config = ScenarioConfiguration(load_config(self.config_path))
         self.config.add_cmd_args(cmd_script_args)
         # trying to find time_limit
         # TODO: also try to find it in cmd args
@@ -223,7 +271,7 @@ class SimpleStep:
         # ie we do not want to rollback step load it rollback step
         entry["name"] = "(rollback)"
         entry["rollback"] = False
-        return step_from_scenario_entry(entry, self.dictionary)
+        return step_from_scenario_entry(entry, self.dictionary, self.output)
 
     def start_execution(self):
         def thread_main(self):
@@ -232,27 +280,29 @@ class SimpleStep:
                 args = [sys.executable, self.script_path, self.config_path] \
                        + ["--{}={}".format(key, value) for key, value \
                           in self.cmd_script_args.items()]
-                self.proc = sp.Popen(args)
-                time_exceeded = False
-                # set end time
-                end = datetime.now() + timedelta(seconds=self.time_limit)
-                while self.proc.returncode is None:
-                    sleep(1)
-                    self.proc.poll()
-                    # if time-limit set and current time above it or if
-                    # quite event set, raise an exception
-                    if (isinstance(self.time_limit, int) \
-                       and datetime.now() >= end) or self.quit_event.is_set():
-                        time_exceeded = True
-                        break
-                # clean all processes, which was started
+                # on Linux start script in its own session and cgroup, so
+                # its tree can be killed at once
+                output = {} if self.output is None \
+                         else {"stdout": self.output, "stderr": sp.STDOUT}
                 if detect_actual_os_type() == "Windows":
-                    from lib.win_utils import kill_process_tree
+                    self.proc = sp.Popen(args, **output)
                 else:
-                    from lib.linux_utils import kill_process_tree
-                kill_process_tree(self.proc.pid)
-                # if time exceeded, raise an exception
-                if time_exceeded:
+                    from lib.linux_utils.process_group import popen_step
+                    self.proc = popen_step(args, **output)
+                self.time_exceeded = False
+                # process' exit and time-limit are handled by reaper thread,
+                # kill() stops process itself, so thread just sleeps until
+                # process finishes or killed
+                future = reaper.get_reaper().watch(self.proc, self.time_limit,
+                                                   self._on_timeout)
+                # kill() could be called before process was started
+                if self.quit_event.is_set():
+                    self._kill_process_tree()
+                future.result()
+                # clean all processes, which was started
+                self._kill_process_tree()
+                # if time exceeded or step killed, raise an exception
+                if self.time_exceeded or self.quit_event.is_set():
                     raise AutomationLibraryError("TIMEOUT_ERROR")
                 else:
                 # return return code if external command finished successful
@@ -278,6 +328,20 @@ class SimpleStep:
 
     def kill(self):
         self.quit_event.set()
+        if self.proc is not None and self.proc.poll() is None:
+            self._kill_process_tree()
+
+    ## Handler of time-limit expiration, called by reaper thread.
+    def _on_timeout(self, proc):
+        self.time_exceeded = True
+        self._kill_process_tree()
+
+    def _kill_process_tree(self):
+        if detect_actual_os_type() == "Windows":
+            from lib.win_utils import kill_process_tree
+        else:
+            from lib.linux_utils import kill_process_tree
+        kill_process_tree(self.proc.pid)
 
     @property
     def rollback_result(self):
@@ -286,7 +350,7 @@ class SimpleStep:
 
 class CompositeStep:
     def __init__(self, command, dictionary, cmd_script_args, rollback,
-                 name=None):
+                 name=None, output=None):
         # thread variables
         self.queue = queue.Queue()
         self.quit_event = threading.Event()
@@ -302,8 +366,10 @@ class CompositeStep:
         self.name = name if name else command
         self.dictionary = dictionary
         self.cmd_script_args = cmd_script_args
+        # file, to which output of scenarios is written (None - inherited)
+        self.output = output
         # load configuration
-        self.config = ScenarioConfiguration(read_yaml(self.config_path))
+        self.config = ScenarioConfiguration(load_config(self.config_path))
         self.config.add_cmd_args(cmd_script_args)
         # set steps
         self.steps = []
@@ -328,7 +394,8 @@ class CompositeStep:
             # dependencies during loading rollbacks
             entry["rollback"] = self.rollback if "rollback" not in entry \
                                 else (self.rollback and entry["rollback"])
-            self.steps.append(step_from_scenario_entry(entry, self.dictionary))
+            self.steps.append(step_from_scenario_entry(entry, self.dictionary,
+                                                       self.output))
 
     def start_execution(self):
         def thread_main(self):
@@ -473,20 +540,28 @@ class CompositeStep:
 
 
 
-def agent_main():
-    global_logger.info(message="******Starting agent******")
-    dictionary = CommandDictionary(DICTIONARY_PATH)
-    cmd_args = bootstrap.parse_cmd_args(sys.argv[1:])
-    bootstrap.set_debug_values(cmd_args[1])
+## Build main step of scenario.
+# @param command Command name.
+# @param dictionary CommandDictionary object.
+# @param cmd_args Dictionary with command line named arguments.
+# @param output File, to which output of scenarios is written, or None.
+# @return SimpleStep or CompositeStep object.
+def build_main_step(command, dictionary, cmd_args, output=None):
     main_config = ScenarioConfiguration(
-        read_yaml(dictionary[cmd_args[0][0]].config)
+        load_config(dictionary[command].config)
     )
-    main_config.add_cmd_args(cmd_args[1])
-    #
+    main_config.add_cmd_args(cmd_args)
     if main_config.composite:
-        main_step = CompositeStep(cmd_args[0][0], dictionary, cmd_args[1], True)
+        return CompositeStep(command, dictionary, cmd_args, True,
+                             output=output)
     else:
-        main_step = SimpleStep(cmd_args[0][0], dictionary, cmd_args[1], True)
+        return SimpleStep(command, dictionary, cmd_args, True, output=output)
+
+
+## Execute main step and, if it fails, its rollback.
+# @param main_step SimpleStep or CompositeStep object.
+# @return Result of step, or result of rollback, if step failed.
+def run_main_step(main_step):
     main_step.start_execution()
     main_step.thread.join()
     if main_step.result != 0:
@@ -498,6 +573,380 @@ def agent_main():
         return main_step.result
 
 
+def agent_main():
+    global_logger.info(message="******Starting agent******")
+    # create reaper in main thread, so it can handle SIGCHLD, if needed
+    reaper.get_reaper()
+    cmd_args = bootstrap.parse_cmd_args(sys.argv[1:])
+    bootstrap.set_debug_values(cmd_args[1])
+    if "daemon" in cmd_args[1] and cmd_args[1]["daemon"]:
+        return agent_daemon_main(cmd_args[1])
+    dictionary = CommandDictionary(DICTIONARY_PATH)
+    main_step = build_main_step(cmd_args[0][0], dictionary, cmd_args[1])
+    return run_main_step(main_step)
+
+
+## Class, which executes jobs, submitted via local job API (see
+#  JobRequestHandler), keeping command dictionary and parsed configurations
+#  in memory between jobs. Jobs are stored in persistent queue
+#  (lib.common.job_queue.JobQueue), number of concurrently running jobs is
+#  limited globally and per host.
+class AgentDaemon:
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param dictionary_path Path to command dictionary.
+    # @param max_jobs Maximum number of concurrently running jobs.
+    # @param host_limit Maximum number of concurrently running jobs per host.
+    # @param queue JobQueue object. If None, default queue is opened.
+    # @param lock_path Path to lock file. If None, DAEMON_LOCK_NAME in
+    #  PID_PATH used.
+    def __init__(self, dictionary_path, max_jobs=DAEMON_MAX_JOBS,
+                 host_limit=DAEMON_HOST_LIMIT, queue=None, lock_path=None):
+        self.dictionary_path = dictionary_path
+        self.lock_path = os.path.join(gv.PID_PATH, DAEMON_LOCK_NAME) \
+                         if lock_path is None else lock_path
+        self._lock_file = None
+        self.max_jobs = max_jobs
+        self.host_limit = host_limit
+        self.queue = job_queue.JobQueue() if queue is None else queue
+        self.logs_path = os.path.join(gv.PID_PATH, JOB_LOGS_FOLDER)
+        os.makedirs(self.logs_path, exist_ok=True)
+        self._dictionary = None
+        self._dictionary_mtime = None
+        self._dictionary_lock = threading.Lock()
+        # guards fields below and is notified, when job submitted or finished
+        self._cond = threading.Condition()
+        # running jobs: id -> main step (None, while step is being built)
+        self._running = {}
+        self._cancelled = set()
+        self._stopped = False
+        self._dispatcher = None
+
+    ## Get command dictionary. Dictionary is re-read, if its file modified.
+    # @param self Pointer to object.
+    # @return CommandDictionary object.
+    def get_dictionary(self):
+        mtime = os.stat(self.dictionary_path).st_mtime_ns
+        with self._dictionary_lock:
+            if self._dictionary is None or self._dictionary_mtime != mtime:
+                self._dictionary = CommandDictionary(self.dictionary_path)
+                self._dictionary_mtime = mtime
+                global_logger.info(message="Command dictionary loaded",
+                                   path=self.dictionary_path)
+            return self._dictionary
+
+    ## Lock daemon's lock file. Lock is released by OS, when process exits.
+    # @param self Pointer to object.
+    # @exception AutomationLibraryError("SERVICE_ERROR") Lock file is locked
+    #  by another daemon.
+    def _lock(self):
+        if fcntl is None:
+            return
+        self._lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise AutomationLibraryError(
+                "SERVICE_ERROR", "agent daemon is already running",
+                lock=self.lock_path
+            )
+
+    ## Start dispatching jobs. Jobs, which were running, when previous daemon
+    #  stopped, are marked as interrupted.
+    # @param self Pointer to object.
+    # @exception AutomationLibraryError("SERVICE_ERROR") Another daemon is
+    #  running.
+    def start(self):
+        self._lock()
+        interrupted = self.queue.interrupt_running()
+        if interrupted:
+            global_logger.warning(message="Jobs of previous daemon marked as "
+                                  "interrupted", count=interrupted)
+        self._dispatcher = threading.Thread(target=self._dispatch_main,
+                                            daemon=True)
+        self._dispatcher.start()
+
+    ## Stop dispatching jobs, kill running jobs and wait until they finish.
+    # @param self Pointer to object.
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            steps = [step for step in self._running.values()
+                     if step is not None]
+            self._cond.notify_all()
+        for step in steps:
+            step.kill()
+        with self._cond:
+            while self._running:
+                self._cond.wait()
+        self.queue.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    ## Add job to queue.
+    # @param self Pointer to object.
+    # @param command Command name.
+    # @param args Dictionary with command line named arguments.
+    # @param host Host, on which job operates. If None, "host" argument or
+    #  "localhost" used.
+    # @return Id of job.
+    # @exception AutomationLibraryError("ARGS_ERROR") Unknown command.
+    def submit(self, command, args, host=None):
+        if not isinstance(args, dict):
+            raise AutomationLibraryError("ARGS_ERROR",
+                                         "args should be a dictionary")
+        if command not in self.get_dictionary().data:
+            raise AutomationLibraryError("ARGS_ERROR", "Unknown command",
+                                         command=command)
+        if host is None:
+            host = str(args.get("host", "localhost"))
+        job_id = self.queue.submit(command, args, host)
+        global_logger.info(message="Job submitted", job=job_id,
+                           command=command, host=host)
+        with self._cond:
+            self._cond.notify_all()
+        return job_id
+
+    ## Cancel job. Queued job is removed from queue, running job is killed.
+    # @param self Pointer to object.
+    # @param job_id Id of job.
+    # @return True, if job cancelled, False, if it is already finished.
+    def cancel(self, job_id):
+        if self.queue.cancel_queued(job_id):
+            global_logger.info(message="Queued job cancelled", job=job_id)
+            return True
+        with self._cond:
+            if job_id not in self._running:
+                return False
+            self._cancelled.add(job_id)
+            step = self._running[job_id]
+        global_logger.info(message="Running job cancelled", job=job_id)
+        if step is not None:
+            step.kill()
+        return True
+
+    ## Wait until job's state changes or timeout expires.
+    # @param self Pointer to object.
+    # @param timeout Timeout in seconds.
+    def wait_for_change(self, timeout):
+        with self._cond:
+            self._cond.wait(timeout)
+
+    ## Main function of dispatcher thread: start queued jobs, while limits
+    #  allow it.
+    # @param self Pointer to object.
+    def _dispatch_main(self):
+        with self._cond:
+            while not self._stopped:
+                jobs = self.queue.claim(self.max_jobs - len(self._running),
+                                        self.host_limit)
+                for job in jobs:
+                    self._running[job["id"]] = None
+                    threading.Thread(target=self._run_job, args=(job, ),
+                                     daemon=True).start()
+                if not jobs:
+                    self._cond.wait()
+
+    ## Execute job. Output of job's scenarios is written to job's log.
+    # @param self Pointer to object.
+    # @param job Dictionary with job's fields.
+    def _run_job(self, job):
+        job_id = job["id"]
+        log_path = os.path.join(self.logs_path, "{}.log".format(job_id))
+        self.queue.set_log_path(job_id, log_path)
+        global_logger.info(message="Job started", job=job_id,
+                           command=job["command"], log=log_path)
+        result = None
+        try:
+            with open(log_path, "ab", buffering=0) as output:
+                try:
+                    main_step = build_main_step(job["command"],
+                                                self.get_dictionary(),
+                                                job["args"], output)
+                    with self._cond:
+                        self._running[job_id] = main_step
+                        cancelled = job_id in self._cancelled \
+                                    or self._stopped
+                    if not cancelled:
+                        result = run_main_step(main_step)
+                except Exception as err:
+                    if not isinstance(err, AutomationLibraryError):
+                        err = AutomationLibraryError("UNKNOWN", err)
+                    global_logger.error(str(err), job=job_id, state="error")
+                    output.write((str(err) + "\n").encode("utf-8"))
+                    result = err.num_code
+        finally:
+            with self._cond:
+                if job_id in self._cancelled:
+                    state = job_queue.CANCELLED
+                elif self._stopped:
+                    state = job_queue.INTERRUPTED
+                else:
+                    state = job_queue.DONE if result == 0 \
+                            else job_queue.FAILED
+                self.queue.finish(job_id, state, result)
+                del self._running[job_id]
+                self._cancelled.discard(job_id)
+                self._cond.notify_all()
+            global_logger.info(message="Job finished", job=job_id,
+                               state=state, result=result)
+
+    ## Handle request of job API.
+    # @param self Pointer to object.
+    # @param request Dictionary with request.
+    # @param send Callable, which sends dictionary to client.
+    # @exception AutomationLibraryError("ARGS_ERROR") Invalid request.
+    def handle_request(self, request, send):
+        if not isinstance(request, dict) or "op" not in request:
+            raise AutomationLibraryError("ARGS_ERROR",
+                                         "request should contain 'op'")
+        op = request["op"]
+        if op == "submit":
+            send({"ok": True, "job": self.submit(
+                request.get("command"), request.get("args", {}),
+                request.get("host")
+            )})
+        elif op == "status":
+            job = self.queue.get(request.get("job"))
+            if job is None:
+                raise AutomationLibraryError("ARGS_ERROR", "Job not found",
+                                             job=request.get("job"))
+            send({"ok": True, "job": job})
+        elif op == "list":
+            send({"ok": True, "jobs": self.queue.list(
+                request.get("state"), request.get("limit", 100)
+            )})
+        elif op == "cancel":
+            send({"ok": True, "cancelled": self.cancel(request.get("job"))})
+        elif op == "logs":
+            self.stream_log(request.get("job"), request.get("offset", 0),
+                            request.get("follow", False), send)
+        else:
+            raise AutomationLibraryError("ARGS_ERROR", "Unknown operation",
+                                         op=op)
+
+    ## Send log of job to client. Each chunk is sent as {"data": ...,
+    #  "offset": ...} message, stream ends with {"end": true, ...} message.
+    # @param self Pointer to object.
+    # @param job_id Id of job.
+    # @param offset Offset in log, from which sending starts.
+    # @param follow If True, log is sent until job finished.
+    # @param send Callable, which sends dictionary to client.
+    def stream_log(self, job_id, offset, follow, send):
+        job = self.queue.get(job_id)
+        if job is None:
+            raise AutomationLibraryError("ARGS_ERROR", "Job not found",
+                                         job=job_id)
+        while True:
+            job = self.queue.get(job_id)
+            finished = job["state"] in job_queue.FINISHED_STATES
+            if job["log_path"] is not None \
+               and os.path.exists(job["log_path"]):
+                with open(job["log_path"], "rb") as f:
+                    f.seek(offset)
+                    while True:
+                        data = f.read(65536)
+                        if not data:
+                            break
+                        offset += len(data)
+                        send({"ok": True, "data": data.decode(
+                            "utf-8", errors="replace"
+                        ), "offset": offset})
+            if finished or not follow:
+                break
+            self.wait_for_change(0.5)
+        send({"ok": True, "end": True, "state": job["state"],
+              "offset": offset})
+
+
+## Handler of local job API connection. Protocol: client sends JSON objects,
+#  one per line, daemon answers with JSON objects, one per line. Errors are
+#  reported as {"ok": false, "error": "..."}.
+class JobRequestHandler(socketserver.StreamRequestHandler):
+
+    ## Send message to client.
+    # @param self Pointer to object.
+    # @param message Dictionary.
+    def send(self, message):
+        self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    ## Handle connection.
+    # @param self Pointer to object.
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                self.server.agent_daemon.handle_request(
+                    json.loads(line.decode("utf-8")), self.send
+                )
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as err:
+                self.send({"ok": False, "error": str(err)})
+
+
+## Run agent as daemon, which accepts jobs via Unix socket.
+# @param args Dictionary with command line named arguments:
+#  socket - path to socket (default: PID_PATH/agent.sock);
+#  max-jobs - maximum number of concurrently running jobs;
+#  host-limit - maximum number of concurrently running jobs per host.
+# @return 0.
+def agent_daemon_main(args):
+    if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        raise AutomationLibraryError("UNKNOWN",
+                                     "Daemon mode requires Unix sockets")
+    global CONFIG_CACHE
+    CONFIG_CACHE = {}
+    socket_path = str(args["socket"]) if "socket" in args \
+                  else os.path.join(gv.PID_PATH, DAEMON_SOCKET_NAME)
+    daemon = AgentDaemon(DICTIONARY_PATH,
+                         int(args.get("max-jobs", DAEMON_MAX_JOBS)),
+                         int(args.get("host-limit", DAEMON_HOST_LIMIT)))
+    # check dictionary before accepting jobs
+    daemon.get_dictionary()
+    # socket of running daemon shouldn't be removed, so lock is taken first
+    daemon.start()
+    try:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = socketserver.ThreadingUnixStreamServer(socket_path,
+                                                        JobRequestHandler)
+    except BaseException:
+        daemon.stop()
+        raise
+    server.daemon_threads = True
+    server.agent_daemon = daemon
+    os.chmod(socket_path, 0o600)
+
+    def on_signal(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, on_signal)
+    global_logger.info(message="******Agent daemon started******",
+                       socket=socket_path, max_jobs=daemon.max_jobs,
+                       host_limit=daemon.host_limit)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        global_logger.info(message="******Stopping agent daemon******")
+        server.server_close()
+        daemon.stop()
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+    return 0
+
+
 ## Main function.
 def main():
     # creating pid file
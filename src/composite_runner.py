@@ -11,20 +11,56 @@ import threading
 from datetime import datetime, timedelta
 import time
 import queue
+import hashlib
+import importlib.util
+import concurrent.futures
+import contextvars
+import asyncio
 
 
 from lib.common import bootstrap
+from lib.common import plan_cache
+from lib.common import tracing
+from lib.common.duration_history import DurationHistory, scenario_digest, \
+    order_longest_first
+from lib.common.journal import Journal, new_run_id, get_journal_path, \
+    remove_old_journals
 from lib.common.errors import *
 from lib.common.config import *
 from lib.utils import *
+from lib.utils import zygote
+from lib.utils import reaper
 
 
-SLEEP_DELAY = 0.005
+## How long StepExecutor.kill() waits for the cancelled stage to finish.
+KILL_TIMEOUT = 0.5
 DICTIONARY_PATH = os.path.join(sys.path[0], "..", "..", "configs",
                                "dictionary.yaml")
 COMPOSITE_RUNNER_NAME = "composite_runner.py"
 TOP_LEVEL_SCENARIO_NAME = None
 DICTIONARY = None
+## Should scenarios be executed in-process (in thread pool of composite_runner)
+#  instead of child processes. Dictionary entries with "isolated: true" are
+#  always executed in child processes.
+IN_PROCESS = False
+## Size of thread pool for in-process execution.
+IN_PROCESS_WORKERS = 8
+## Thread pool for in-process execution. Created on first use.
+IN_PROCESS_POOL = None
+## Cache of scenarios' in-process entry points (script path -> function or
+#  None, if script doesn't support in-process execution).
+SCENARIO_ENTRIES = {}
+SCENARIO_ENTRIES_LOCK = threading.Lock()
+## Command line arguments, which are handled by composite_runner itself. They
+#  are not passed to scenarios and don't affect execution plan.
+PLAN_ARGS = ["explain-plan", "disable-plan-cache", "resume",
+             "disable-journal", "estimate", "disable-duration-history"]
+## Journal of current run (lib.common.journal.Journal) or None.
+JOURNAL = None
+## History of step durations (lib.common.duration_history.DurationHistory)
+#  or None. It is used to start longest branches first, when number of
+#  concurrent branches is limited.
+HISTORY = None
 
 
 ## Decorator, which capture AutomationLibraryErrors, log them and return
@@ -49,13 +85,49 @@ def handle_automation_library_errors(func):
     return wrapper
 
 
+## Asynchronous version of handle_automation_library_errors() for stage
+#  coroutines. Cancellation of stage is treated as interruption, so killed
+#  stage finishes with INTERRUPTED code, as if it was stopped by quit event.
+#  SystemExit (raised by in-process scenario) is converted to its code, only
+#  KeyboardInterrupt stops runner.
+def handle_automation_library_errors_async(func):
+    async def wrapper(*args, **kwargs):
+        res = 1
+        try:
+            res = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            err = AutomationLibraryError("INTERRUPTED")
+            global_logger.error(
+                str(err), state="error",
+            )
+            res = err.num_code
+        except KeyboardInterrupt:
+            raise
+        except SystemExit as err:
+            res = bootstrap.get_exit_code(err)
+        except AutomationLibraryError as err:
+            global_logger.error(
+                str(err), state="error",
+            )
+            res = err.num_code
+        except BaseException as err:
+            err = AutomationLibraryError("UNKNOWN", err)
+            global_logger.error(
+                str(err), state="error",
+            )
+            res = err.num_code
+        return res
+    return wrapper
+
+
 ## Add debug values from global_vars to destination dictionary copy.
 # @param dst Destination dictionary.
 # @return Copy of `dst` with debug values.
 def add_debug_values(dst):
     dst = dst.copy()
     for key in ["debug", "collapse-traceback", "print-begin",
-                "print-uuid", "print-function", "escape-strings"]:
+                "print-uuid", "print-function", "escape-strings",
+                "log-value-limit", "log-format"]:
         dst[key] = getattr(gv, key.upper().replace("-", "_"))
     return dst
 
@@ -82,6 +154,41 @@ def build_stage(data, classes, dictionary):
     )
 
 
+## Build stage from plan, made by AbstractStage.to_plan().
+# @param plan Dictionary with plan.
+# @return Stage object.
+def stage_from_plan(plan):
+    classes = {
+        "primitive": PrimitiveStage,
+        "step": StepStage,
+        "sequence": SequenceStage,
+        "parallel": ParallelStage,
+        "dag": DagStage,
+    }
+    if plan["type"] not in classes:
+        raise AutomationLibraryError(
+            "CONFIG_ERROR", "Unknown stage type in plan", type=plan["type"]
+        )
+    return classes[plan["type"]].from_plan(plan)
+
+
+## Get list of resource names from stage data.
+# @param data Dictionary with stage data.
+# @return List of resource names.
+# @exception AutomationLibraryError("CONFIG_ERROR") Invalid value.
+def get_stage_resources(data):
+    resources = data["resources"] if "resources" in data else []
+    if isinstance(resources, str):
+        resources = [resources, ]
+    if not isinstance(resources, list) \
+       or not all(isinstance(name, str) for name in resources):
+        raise AutomationLibraryError(
+            "CONFIG_ERROR", "resources should be a list of names",
+            resources=resources
+        )
+    return list(dict.fromkeys(resources))
+
+
 ## Cross-platform version of killing processes tree. This function encapsulate
 #  detection of OS and setting proper kill_process_tree function.
 # @param pid PID of root process.
@@ -96,6 +203,57 @@ def kill_process_tree(pid):
     return kill_process_tree.__static_vars__.kill_func(pid)
 
 
+## Get in-process entry point of scenario script. Script supports in-process
+#  execution, if it defines module-level `scenario_main` function, which
+#  accepts list of command line arguments (like sys.argv) and returns integer
+#  code. Script is imported only if it mentions `scenario_main`, so scripts
+#  without `if __name__ == "__main__"` guard are not executed on import.
+# @param script_path Path to script.
+# @return Function or None, if script doesn't support in-process execution.
+def load_scenario_entry(script_path):
+    with SCENARIO_ENTRIES_LOCK:
+        if script_path in SCENARIO_ENTRIES:
+            return SCENARIO_ENTRIES[script_path]
+        entry = None
+        try:
+            with open(script_path, encoding="utf-8") as f:
+                supported = re.search("^scenario_main\\s*=", f.read(),
+                                      re.M) is not None
+            if supported:
+                # scripts import lib.* relative to their folder
+                script_folder = os.path.dirname(os.path.realpath(script_path))
+                if script_folder not in sys.path:
+                    sys.path.append(script_folder)
+                module_name = "scenario_" + hashlib.md5(
+                    os.path.realpath(script_path).encode("utf-8")
+                ).hexdigest()
+                spec = importlib.util.spec_from_file_location(module_name,
+                                                              script_path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                entry = module.scenario_main
+        except BaseException as err:
+            global_logger.warning(
+                message="Cannot load scenario for in-process execution",
+                script=script_path, error=str(err)
+            )
+            entry = None
+        SCENARIO_ENTRIES[script_path] = entry
+        return entry
+
+
+## Get thread pool for in-process execution.
+# @return concurrent.futures.ThreadPoolExecutor object.
+def get_in_process_pool():
+    global IN_PROCESS_POOL
+    with SCENARIO_ENTRIES_LOCK:
+        if IN_PROCESS_POOL is None:
+            IN_PROCESS_POOL = concurrent.futures.ThreadPoolExecutor(
+                IN_PROCESS_WORKERS
+            )
+        return IN_PROCESS_POOL
+
+
 ## Class, which represent command dictionary entry.
 class DictionaryEntry:
     ## Constructor.
@@ -109,11 +267,14 @@ class DictionaryEntry:
     # @param config_prefix Prefix to configuration file name.
     # @param test_files Check, is files, specified in config-name and
     #  script-name, exists.
+    # @param isolated If True, scenario always executed in child process, even
+    #  if in-process execution enabled.
     def __init__(self, script, config, first_version=None, last_version=None,
                  exclude_versions=[], script_prefix="",
-                 config_prefix="", test_files=False):
+                 config_prefix="", test_files=False, isolated=False):
         self.script = os.path.join(script_prefix, StrPathExpanded(script))
         self.config = os.path.join(config_prefix, StrPathExpanded(config))
+        self.isolated = isolated
         if test_files:
             self.check_files()
         self.first_version = PlatformVersion(first_version)
@@ -136,7 +297,8 @@ class DictionaryEntry:
         return DictionaryEntry(
             data["script-name"], data["config-name"], data["first-version"],
             data["last-version"], data["exclude-versions"],
-            script_prefix, config_prefix
+            script_prefix, config_prefix,
+            isolated="isolated" in data and data["isolated"]
         )
 
     ## String representation of object.
@@ -220,73 +382,213 @@ class CommandDictionary:
         return key in self.data
 
 
-## Class, which encapsulate step execution.
-class StepExecutor:
+## Wait until one of futures finishes or event is set.
+# @param futures Iterable of futures (tasks).
+# @param event asyncio.Event or None.
+async def wait_first(futures, event=None):
+    waiters = set(futures)
+    event_waiter = None
+    if event is not None:
+        if event.is_set():
+            return
+        event_waiter = asyncio.ensure_future(event.wait())
+        waiters.add(event_waiter)
+    if not waiters:
+        return
+    try:
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if event_waiter is not None:
+            event_waiter.cancel()
+
+
+## Resource names, which tokens are held by enclosing stages of current task.
+#  Tasks of child stages inherit it, because context is copied, when task is
+#  created.
+HELD_RESOURCES = contextvars.ContextVar("held_resources",
+                                        default=frozenset())
+
+
+## Get resources, which tokens stage should acquire: tokens, which are held by
+#  enclosing stages, are already owned by stage.
+# @param names List of resource names.
+# @return List of unique names, which are not held by enclosing stages.
+def get_missing_resources(names):
+    held = HELD_RESOURCES.get()
+    return [name for name in dict.fromkeys(names) if name not in held]
+
+
+## Class, which manages named resource tokens (counting semaphores), for
+#  example "dpkg" or "disk-io". Stage acquires all its tokens at once, so
+#  stages cannot deadlock by acquiring tokens in different order. Tokens,
+#  which are held by enclosing stage, are not requested again (see
+#  get_missing_resources()).
+class ResourcePool:
+
     ## Constructor.
     # @param self Pointer to object.
-    # @param step *Step object.
-    # @param func_name String with name of function, which will be invoked.
-    # @param args Positional arguments to function.
-    # @param kwargs Named arguments for functions.
-    # @param pass_quit_event If True, threading.Event() object will be passed
-    #  as last positional argument. This event object initial set to False.
-    #  If it switched to True, then function should terminate. Note that
-    #  function can ignore this event, even if function accept it.
-    def __init__(self, step, func_name, args=(), kwargs={},
-                 pass_quit_event=True):
-        self._quit_event = threading.Event()
+    # @param limits Dictionary, which maps resource name to number of tokens.
+    #  Resources, which are not in dictionary, have one token.
+    def __init__(self, limits=None):
+        self._lock = threading.Lock()
+        self._limits = dict(limits) if limits else {}
+        self._used = {}
+        self._callbacks = []
+
+    ## Set numbers of tokens.
+    # @param self Pointer to object.
+    # @param limits Dictionary, which maps resource name to number of tokens.
+    def set_limits(self, limits):
+        with self._lock:
+            self._limits = dict(limits) if limits else {}
+        self._notify()
+
+    ## Subscribe callback, which will be called without arguments, when tokens
+    #  are released.
+    # @param self Pointer to object.
+    # @param callback Callable.
+    def add_callback(self, callback):
+        with self._lock:
+            self._callbacks.append(callback)
+
+    ## Unsubscribe callback.
+    # @param self Pointer to object.
+    # @param callback Callable.
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    ## Call subscribed callbacks.
+    # @param self Pointer to object.
+    def _notify(self):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    ## Acquire one token of each resource, if all of them are available.
+    # @param self Pointer to object.
+    # @param names List of resource names.
+    # @return True, if tokens acquired, False otherwise.
+    def try_acquire(self, names):
+        names = list(dict.fromkeys(names))
+        with self._lock:
+            for name in names:
+                if self._used.get(name, 0) >= self._limits.get(name, 1):
+                    return False
+            for name in names:
+                self._used[name] = self._used.get(name, 0) + 1
+            return True
+
+    ## Get future, which is completed, when tokens are released next time.
+    #  Should be called from event loop's thread.
+    # @param self Pointer to object.
+    # @return asyncio.Future object.
+    def wait_released(self):
+        future = asyncio.get_running_loop().create_future()
+
+        def callback():
+            if not future.done():
+                future.set_result(None)
+
+        self.add_callback(callback)
+        future.add_done_callback(lambda future: self.remove_callback(callback))
+        return future
+
+    ## Wait until tokens of each resource are available and acquire them.
+    #  Waiting is interrupted by cancellation.
+    # @param self Pointer to object.
+    # @param names List of resource names.
+    async def acquire(self, names):
+        while not self.try_acquire(names):
+            await self.wait_released()
+
+    ## Release tokens, acquired by try_acquire() or acquire().
+    # @param self Pointer to object.
+    # @param names List of resource names.
+    def release(self, names):
+        if not names:
+            return
+        with self._lock:
+            for name in dict.fromkeys(names):
+                self._used[name] -= 1
+        self._notify()
+
+
+## Resource tokens, shared by all stages of scenario.
+RESOURCES = ResourcePool()
+
+
+## Class, which encapsulate step execution. Stage's coroutine is executed as
+#  asyncio task in event loop of runner, so all stages of scenario run in one
+#  thread.
+class StepExecutor:
+    ## Constructor. Should be called from event loop's thread.
+    # @param self Pointer to object.
+    # @param step *Stage object.
+    # @param coro Coroutine, which executes stage and returns its result.
+    #  Killing executor cancels it, so coroutine should handle
+    #  asyncio.CancelledError (see handle_automation_library_errors_async()).
+    def __init__(self, step, coro):
         self._step = step
-        self._target_func = getattr(self._step, func_name)
-        if pass_quit_event:
-            args += (self._quit_event, )
-        self._result = None
-        self._thread = threading.Thread(target=self._thread_main, args=args,
-                                        kwargs=kwargs)
-        self._thread.start()
-
-    ## Function, which will be actually main in thread.
-    def _thread_main(self, *args, **kwargs):
-        self._quit_event.clear()
-        # self._step passed automatically
-        self._result = self._target_func(*args, **kwargs)
+        self._start = time.monotonic()
+        self.task = asyncio.ensure_future(coro)
+        self.task.add_done_callback(self._log_result)
+
+    ## Log result of finished stage.
+    # @param self Pointer to object.
+    # @param task Finished task.
+    def _log_result(self, task):
+        # duration of step is used by duration analytics
+        duration = int((time.monotonic() - self._start) * 1000)
         if hasattr(self._step, "name"):
             global_logger.info(message="Step result", step=self._step.name,
-                               result=self.result)
+                               result=self.result, duration=duration)
         else:
-            global_logger.info(message="Step result", result=self.result)
+            global_logger.info(message="Step result", result=self.result,
+                               duration=duration)
 
-    ## Join to inner thread object.
+    ## Get stage, executed by this executor.
     # @param self Pointer to object.
-    # @param timeout Timeout. Works the same as in threading.Thread.join().
-    def join(self, timeout=None):
-        self._thread.join(timeout)
+    @property
+    def step(self):
+        return self._step
 
-    ## Ask to kill step. Note that if step's function doesn't accept quit_event
-    #  or ignore it, this function will do nothing and return True. This
-    #  can be called on already finished step, and will return True.
+    ## Wait until step finishes.
     # @param self Pointer to object.
-    # @return True, if thread finished, False otherwise.
-    def kill(self):
-        self._quit_event.set()
-        self._thread.join(SLEEP_DELAY*100)
-        return not self.is_alive()
-        # TODO: decide what to do if kill fails
+    # @param timeout Timeout in seconds. None means wait forever.
+    async def join(self, timeout=None):
+        await asyncio.wait({self.task}, timeout=timeout)
 
-    ## Get result value.
+    ## Kill step: cancel its task and wait until it finishes, but no longer
+    #  than KILL_TIMEOUT. This can be called on already finished step.
+    # @param self Pointer to object.
+    # @return True, if task finished, False otherwise.
+    async def kill(self):
+        if not self.task.done():
+            self.task.cancel()
+            await asyncio.wait({self.task}, timeout=KILL_TIMEOUT)
+        return self.task.done()
+
+    ## Get result value. Cancelled task, which didn't handle cancellation,
+    #  has INTERRUPTED result, and task, which failed unexpectedly, has no
+    #  result.
     # @param self Pointer to object.
     @property
     def result(self):
-        return self._result
-
-    ## Check, is executor finished.
+        if not self.task.done():
+            return None
+        if self.task.cancelled():
+            return AutomationLibraryError("INTERRUPTED").num_code
+        if self.task.exception() is not None:
+            return None
+        return self.task.result()
+
+    ## Check, is target function finished (result is available).
     # @param self Pointer to object.
-    def is_alive(self):
-        if self._result is not None and self._thread.is_alive():
-            global_logger.warning(
-                message="StepExecutor: result is set, but thread still alive.",
-                target_func=self._target_func.__name__
-            )
-        return self._thread.is_alive()
+    def done(self):
+        return self.task.done()
 
 
 ## Class, which define abstract stage. All stage classes should be inherited
@@ -297,6 +599,7 @@ class AbstractStage:
     # @param self Pointer to object.
     def __init__(self):
         self._time_limit = 0
+        self.stage_id = None
 
     ## Build stage from data and dictionary.
     # @param cls Class.
@@ -306,6 +609,26 @@ class AbstractStage:
     def from_data(cls, data, dictionary):
         pass
 
+    ## Convert stage to plan (see compile_plan()).
+    # @param self Pointer to object.
+    # @return Dictionary, which contains only JSON-serializable values.
+    def to_plan(self):
+        pass
+
+    ## Set id of stage and its children. Id is path of stage in scenario, it
+    #  identifies stage in run journal.
+    # @param self Pointer to object.
+    # @param stage_id String.
+    def set_stage_id(self, stage_id):
+        self.stage_id = stage_id
+
+    ## Build stage from plan, made by to_plan().
+    # @param cls Class.
+    # @param plan Dictionary with plan.
+    @classmethod
+    def from_plan(cls, plan):
+        pass
+
     ## Execute stage. Should return StepExecutor.
     # @param self Pointer to object.
     def execute(self):
@@ -344,9 +667,13 @@ class PrimitiveStage(AbstractStage):
     # @param self Pointer to object.
     def __init__(self):
         self.name = None
+        self.command = None
+        self.stage_id = None
         self.scenario_data = None
         self.script_path = None
         self.config_path = None
+        self.isolated = False
+        self.resources = []
         self._time_limit = 0
         self._try_count = 1
         self._timeout = 0
@@ -416,8 +743,10 @@ class PrimitiveStage(AbstractStage):
     @classmethod
     def from_data(cls, data, dictionary):
         obj = PrimitiveStage()
+        obj.command = data["command"]
         obj.script_path = dictionary[data["command"]].script
         obj.config_path = dictionary[data["command"]].config
+        obj.isolated = dictionary[data["command"]].isolated
         obj.config = ScenarioConfiguration(read_yaml(obj.config_path))
         # this allow absence of scenario-data key in config
         obj.cmd_args = data["scenario-data"] if "scenario-data" in data else {}
@@ -432,68 +761,199 @@ class PrimitiveStage(AbstractStage):
             )
         # if name presented, set it, otherwise command used as name
         obj.name = data["name"] if "name" in data else data["command"]
+        obj.resources = get_stage_resources(data)
         obj.set_time_variables()
         return obj
 
+    ## Convert stage to plan (see compile_plan()).
+    # @param self Pointer to object.
+    # @return Dictionary, which contains only JSON-serializable values.
+    def to_plan(self):
+        return {
+            "type": "primitive",
+            "name": self.name,
+            "command": self.command,
+            "script": self.script_path,
+            "config": self.config_path,
+            "isolated": self.isolated,
+            "resources": self.resources,
+            # values are passed to script as strings anyway
+            "cmd-args": {key: value if isinstance(
+                             value, (bool, int, float, str, type(None))
+                         ) else str(value)
+                         for key, value in self.cmd_args.items()},
+            "time-limit": self.time_limit,
+            "timeout": self.timeout,
+            "try-count": self.try_count,
+        }
+
+    ## Build stage from plan, made by to_plan(). Configuration file is not
+    #  read, because plan already contains resolved values.
+    # @param cls Class.
+    # @param plan Dictionary with plan.
+    @classmethod
+    def from_plan(cls, plan):
+        obj = PrimitiveStage()
+        obj.name = plan["name"]
+        # plans in journals of older runs doesn't contain command
+        obj.command = plan.get("command", plan["name"])
+        obj.script_path = plan["script"]
+        obj.config_path = plan["config"]
+        obj.isolated = plan["isolated"]
+        obj.resources = list(plan["resources"])
+        obj.config = None
+        obj.cmd_args = plan["cmd-args"]
+        obj.time_limit = plan["time-limit"]
+        obj.timeout = plan["timeout"]
+        obj.try_count = plan["try-count"]
+        return obj
+
+    ## Wrapper around _attempts() method, which records start and finish of
+    #  stage in run journal.
+    # @param self Pointer to object.
+    # @param cmd_args args, which will be passed to main().
+    async def _retry_main(self, cmd_args):
+        if JOURNAL is None:
+            return await self._attempts(cmd_args)
+        mode = "test" if cmd_args["test-mode"] else "real"
+        JOURNAL.record("start", stage=self.stage_id, mode=mode,
+                       name=self.name)
+        res = 1
+        try:
+            res = await self._attempts(cmd_args)
+        finally:
+            JOURNAL.record("finish", stage=self.stage_id, mode=mode,
+                           name=self.name, result=res)
+        return res
+
     ## Wrapper around main() method, which handle retrying main()
     #  on fail, if try-count more than one.
     # @param self Pointer to object.
     # @param cmd_args args, which will be passed to main().
-    # @param _quit_event Quit event (details in StepExecutor documentation).
-    def _retry_main(self, cmd_args, _quit_event):
+    async def _attempts(self, cmd_args):
         # if try_count is less or equal to one,
         if self.try_count <= 1:
-            return self._main(cmd_args, _quit_event)
+            return await self._main(cmd_args)
         global_logger.info(message="Step will be retried on fail",
                            name=self.name,
                            try_count=self.try_count,
                            timeout=self.timeout)
         res = 1
         for i in range(1, self.try_count+1):
-            res = self._main(cmd_args, _quit_event)
+            res = await self._main(cmd_args)
             global_logger.info(message="Attempt result",
                                attempt=i, result=res)
             if res == 0:
                 return res
+            # sleep between attempts, killing step cancels sleeping
             if self.timeout > 0:
-                time.sleep(self.timeout)
+                await asyncio.sleep(self.timeout)
         return res
 
     ## Main function (ie which should be executed to perform step).
     # @param self Pointer to object.
     # @param cmd_args args, which will be passed to main().
-    # @param _quit_event Quit event (details in StepExecutor documentation).
-    @handle_automation_library_errors
-    def _main(self, cmd_args, _quit_event):
+    @handle_automation_library_errors_async
+    async def _main(self, cmd_args):
+        with tracing.TraceSpan(self.name, stage=self.stage_id):
+            return await self._execute(cmd_args)
+
+    ## Execute step once.
+    # @param self Pointer to object.
+    # @param cmd_args args, which will be passed to main().
+    # @return Result code of scenario.
+    async def _execute(self, cmd_args):
         global_logger.info(message="****** Starting primitive stage ******")
         global_logger.info(message="Info",
                            script=self.script_path, config=self.config_path,
                            cmd_args=cmd_args, name=self.name)
+        # spans of scenario are children of step's span
+        traceparent = tracing.get_traceparent()
+        if traceparent is not None:
+            cmd_args = dict(cmd_args, traceparent=traceparent)
         # convert self.cmd_args to command-line format
         args = [sys.executable, self.script_path, self.config_path] \
                + ["--{}={}".format(key, value) for key, value \
                   in cmd_args.items()]
-        proc = sp.Popen(args)
-        time_exceeded = False
-        interrupted = False
-        # set end time
-        end = datetime.now() + timedelta(seconds=self.time_limit)
-        while proc.returncode is None:
-            time.sleep(SLEEP_DELAY)
-            proc.poll()
-            # if time-limit set and current time above it or if
-            # quite event set, raise an exception
-            if (isinstance(self.time_limit, int) \
-                and datetime.now() >= end):
-                kill_process_tree(proc.pid)
-                raise AutomationLibraryError("TIMEOUT_ERROR")
-            if _quit_event.is_set():
-                kill_process_tree(proc.pid)
-                raise AutomationLibraryError("INTERRUPTED")
+        resources = get_missing_resources(self.resources)
+        if resources:
+            start = time.monotonic()
+            with tracing.TraceSpan("resources wait", resources=resources):
+                await RESOURCES.acquire(resources)
+            global_logger.info(
+                message="Resources acquired", name=self.name,
+                resources=resources,
+                queue_wait=timedelta(seconds=time.monotonic() - start)
+            )
+        try:
+            entry = None
+            if IN_PROCESS and not self.isolated:
+                entry = load_scenario_entry(self.script_path)
+            start = time.monotonic()
+            if entry is not None:
+                res = await self._run_in_process(entry, args[1:])
+            else:
+                res = await self._run_process(args)
+            if res == 0 and HISTORY is not None:
+                HISTORY.record(self.command, scenario_digest(self.cmd_args),
+                               get_history_mode(cmd_args["test-mode"]),
+                               time.monotonic() - start)
+            return res
+        finally:
+            RESOURCES.release(resources)
+
+    ## Execute scenario in child process.
+    # @param self Pointer to object.
+    # @param args Command line of child process.
+    # @return Result code of child process.
+    async def _run_process(self, args):
+        proc = zygote.popen_script(args)
+        # process' exit is detected by reaper thread, so event loop just
+        # waits for future. Future is shielded, because reaper completes it
+        # even if step is killed
+        exited = asyncio.wrap_future(reaper.get_reaper().watch(proc))
+        try:
+            await asyncio.wait_for(asyncio.shield(exited), self.time_limit)
+        except asyncio.TimeoutError:
+            kill_process_tree(proc.pid)
+            raise AutomationLibraryError("TIMEOUT_ERROR")
+        except asyncio.CancelledError:
+            kill_process_tree(proc.pid)
+            raise
         # clean all processes, which was started
         kill_process_tree(proc.pid)
         return proc.returncode
 
+    ## Execute scenario in thread pool of current process. Python threads
+    #  cannot be killed, so if time-limit expires or step interrupted, scenario
+    #  is abandoned and continues in background.
+    # @param self Pointer to object.
+    # @param entry Scenario's entry point (see load_scenario_entry()).
+    # @param argv Command line arguments for scenario.
+    # @return Result code of scenario.
+    async def _run_in_process(self, entry, argv):
+        global_logger.info(message="Executing scenario in-process",
+                           name=self.name)
+        # scenario's spans are children of step's span
+        future = get_in_process_pool().submit(
+            contextvars.copy_context().run,
+            bootstrap.execute_in_process, entry,
+            os.path.basename(self.script_path)[0:-3], argv
+        )
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), self.time_limit
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as err:
+            if not future.cancel():
+                global_logger.warning(
+                    message="In-process scenario cannot be killed and "
+                    "will continue in background", name=self.name
+                )
+            if isinstance(err, asyncio.TimeoutError):
+                raise AutomationLibraryError("TIMEOUT_ERROR")
+            raise
+
     ## Execute stage.
     # @param self Pointer to object.
     # @param test_mode Indicates whether stage should be executed in test mode
@@ -510,7 +970,7 @@ class PrimitiveStage(AbstractStage):
         cmd_args["standalone"] = standalone
         if not standalone:
             cmd_args["composite-scenario-name"] = TOP_LEVEL_SCENARIO_NAME
-        return StepExecutor(self, "_retry_main", (cmd_args, ))
+        return StepExecutor(self, self._retry_main(cmd_args))
 
 
 class StepStage(AbstractStage):
@@ -518,6 +978,7 @@ class StepStage(AbstractStage):
     ## Constructor.
     # @param self Pointer to object.
     def __init__(self):
+        self.stage_id = None
         self.forward_step = None
         self.rollback_step = None
         self._interruptable = False
@@ -550,21 +1011,95 @@ class StepStage(AbstractStage):
             obj.rollback_step = None
         return obj
 
-    ## Execute stage.
+    ## Convert stage to plan (see compile_plan()).
+    # @param self Pointer to object.
+    # @return Dictionary, which contains only JSON-serializable values.
+    def to_plan(self):
+        return {
+            "type": "step",
+            "forward": self.forward_step.to_plan(),
+            "rollback": self.rollback_step.to_plan() \
+                        if self.rollback_step is not None else None,
+        }
+
+    ## Build stage from plan, made by to_plan().
+    # @param cls Class.
+    # @param plan Dictionary with plan.
+    @classmethod
+    def from_plan(cls, plan):
+        obj = StepStage()
+        obj.forward_step = PrimitiveStage.from_plan(plan["forward"])
+        obj.rollback_step = PrimitiveStage.from_plan(plan["rollback"]) \
+                            if plan["rollback"] is not None else None
+        return obj
+
+    ## Set id of stage and its children.
+    # @param self Pointer to object.
+    # @param stage_id String.
+    def set_stage_id(self, stage_id):
+        self.stage_id = stage_id
+        self.forward_step.set_stage_id(stage_id)
+        if self.rollback_step is not None:
+            self.rollback_step.set_stage_id(stage_id + "/rollback")
+
+    ## Check in run journal, is forward step completed successfully and not
+    #  rolled back after that.
+    # @param self Pointer to object.
+    # @return True or False.
+    def is_completed(self):
+        if JOURNAL is None:
+            return False
+        completed = JOURNAL.last_index("finish",
+                                       stage=self.forward_step.stage_id,
+                                       mode="real", result=0)
+        if completed is None:
+            return False
+        if self.rollback_step is None:
+            return True
+        rolled_back = JOURNAL.last_index("start",
+                                         stage=self.rollback_step.stage_id)
+        return rolled_back is None or rolled_back < completed
+
+    ## Main function of executor, which replaces already completed step.
+    # @param self Pointer to object.
+    # @return 0.
+    async def _skip(self):
+        global_logger.info(message="Step already completed, skipped",
+                           name=self.forward_step.name)
+        return 0
+
+    ## Execute stage. In real run, steps, which are completed according to run
+    #  journal, are skipped.
     # @param self Pointer to object.
     # @param test_mode Indicates whether stage should be executed in test mode
     #  or not.
     # @return StepExecutor object, which executes _main() method.
     def execute(self, test_mode):
+        if not test_mode and self.is_completed():
+            return StepExecutor(self, self._skip())
         return self.forward_step.execute(test_mode, False)
 
-    ## Execute rollback.
+    ## Execute rollback. If run journal used, rollback is executed only if
+    #  forward step was started in real run and not rolled back yet.
     # @param self Pointer to object.
     # @return StepExecutor object, which executes _main() method, if rollback
     #  enabled, None otherwise.
     def rollback(self):
-        return self.rollback_step.execute(False, False) \
-            if self.rollback_step is not None else None
+        if self.rollback_step is None:
+            return None
+        if JOURNAL is not None:
+            started = JOURNAL.last_index("start",
+                                         stage=self.forward_step.stage_id,
+                                         mode="real")
+            rolled_back = JOURNAL.last_index(
+                "finish", stage=self.rollback_step.stage_id, result=0
+            )
+            if started is None \
+               or (rolled_back is not None and rolled_back > started):
+                global_logger.info(message="Nothing to roll back, skipped",
+                                   name=self.forward_step.name)
+                return None
+        return self.rollback_step.execute(False, False)
 
 
 class SequenceStage(AbstractStage):
@@ -572,10 +1107,12 @@ class SequenceStage(AbstractStage):
     ## Constructor.
     # @param self Pointer to object.
     def __init__(self):
+        self.stage_id = None
         self.steps = []
         self.interruptable_flags = []
         self.progress = -1
-        self._gentle_quit_event = threading.Event()
+        # created by execute(), because event should be created in event loop
+        self._gentle_quit_event = None
 
     ## Build stage from data and dictionary. New objects of this class should be
     #  created only via this method, not directly.
@@ -598,28 +1135,56 @@ class SequenceStage(AbstractStage):
             )
             obj.steps.append(build_stage(entry,
                                          [StepStage, SequenceStage,
-                                          ParallelStage],
+                                          ParallelStage, DagStage],
                                          dictionary))
         return obj
 
+    ## Convert stage to plan (see compile_plan()).
+    # @param self Pointer to object.
+    # @return Dictionary, which contains only JSON-serializable values.
+    def to_plan(self):
+        return {
+            "type": "sequence",
+            "steps": [step.to_plan() for step in self.steps],
+            "interruptable": self.interruptable_flags,
+        }
+
+    ## Build stage from plan, made by to_plan().
+    # @param cls Class.
+    # @param plan Dictionary with plan.
+    @classmethod
+    def from_plan(cls, plan):
+        obj = SequenceStage()
+        obj.steps = [stage_from_plan(step) for step in plan["steps"]]
+        obj.interruptable_flags = list(plan["interruptable"])
+        return obj
+
+    ## Set id of stage and its children.
+    # @param self Pointer to object.
+    # @param stage_id String.
+    def set_stage_id(self, stage_id):
+        self.stage_id = stage_id
+        for index, step in enumerate(self.steps):
+            step.set_stage_id("{}/{}".format(stage_id, index))
+
     ## Main function (ie which should be executed to perform step).
     # @param self Pointer to object.
     # @param test_mode Step should run only test mode.
     # @param debug Enable debug variables.
     # @param rollback Should function perform rollback or not.
-    # @param _quit_event Quit event (details in StepExecutor documentation).
     # @return Result of last step (successful or not).
-    @handle_automation_library_errors
-    def _main(self, test_mode, rollback, _quit_event):
+    @handle_automation_library_errors_async
+    async def _main(self, test_mode, rollback):
         global_logger.info(message="****** Starting sequence stage ******")
         last_result = 0
         current_executor = None
         if rollback:
             self.progress += 1
-        while True:
-            if current_executor is None:
-                if self._gentle_quit_event.is_set():
-                        raise AutomationLibraryError("INTERRUPTED")
+        try:
+            while True:
+                # gentle kill affects only execute(), not rollback
+                if self._gentle_quit_event.is_set() and not rollback:
+                    raise AutomationLibraryError("INTERRUPTED")
                 if not rollback:
                     if self.progress >= len(self.steps) - 1:
                         break
@@ -632,32 +1197,29 @@ class SequenceStage(AbstractStage):
                         break
                     current_executor = self.steps[self.progress]\
                                            .rollback()
-            else:
-                if _quit_event.is_set():
-                    current_executor.kill()
-                    raise AutomationLibraryError("INTERRUPTED")
-                # if asked gentle kill and not rollback and current step is
-                # interrputable
-                if self._gentle_quit_event.is_set() and not rollback \
-                   and self.interruptable_flags[self.progress]:
-                    current_executor.kill()
-                    raise AutomationLibraryError("INTERRUPTED")
-                if current_executor.is_alive():
-                    time.sleep(SLEEP_DELAY)
+                if current_executor is None:
                     continue
-                # if result became an int value, utilize current executor
-                # and start next step
-                if isinstance(current_executor.result, int):
-                    # kill step, just for sure
-                    current_executor.kill()
-                    last_result = current_executor.result
-                    # if step finished successful, start new step
-                    if last_result == 0:
-                        current_executor = None
-                    else:
-                        break
-        if current_executor:
-            current_executor.kill()
+                # if not rollback and current step is interruptable, gentle
+                # kill interrupts it, otherwise step is waited for
+                if not rollback and self.interruptable_flags[self.progress]:
+                    await wait_first([current_executor.task],
+                                     self._gentle_quit_event)
+                    if not current_executor.done():
+                        raise AutomationLibraryError("INTERRUPTED")
+                else:
+                    await wait_first([current_executor.task])
+                # utilize current executor and start next step. If executor
+                # finished without int result, it failed unexpectedly
+                last_result = current_executor.result \
+                    if isinstance(current_executor.result, int) else 1
+                current_executor = None
+                # if step finished successful, start new step
+                if last_result != 0:
+                    break
+        finally:
+            # kill current step, if sequence is interrupted or killed
+            if current_executor is not None:
+                await current_executor.kill()
         return last_result
 
     ## Execute stage.
@@ -667,21 +1229,24 @@ class SequenceStage(AbstractStage):
     # @return StepExecutor object, which executes _main() method.
     def execute(self, test_mode):
         self.progress = -1
-        self._gentle_quit_event.clear()
-        return StepExecutor(self, "_main", (test_mode, False))
+        self._gentle_quit_event = asyncio.Event()
+        return StepExecutor(self, self._main(test_mode, False))
 
     ## Execute rollback.
     # @param self Pointer to object.
     # @return StepExecutor object, which executes _main() method, if rollback
     #  enabled, None otherwise.
     def rollback(self):
-        return StepExecutor(self, "_main", (False, True))
+        if self._gentle_quit_event is None:
+            self._gentle_quit_event = asyncio.Event()
+        return StepExecutor(self, self._main(False, True))
 
     ## Kill sequence gently (ie doesn't interrupt non-interruptable steps).
     #  This method have effect only on execute().
     # @param self Pointer to object.
     def gentle_kill(self):
-        self._gentle_quit_event.set()
+        if self._gentle_quit_event is not None:
+            self._gentle_quit_event.set()
 
 
 class ParallelStage(AbstractStage):
@@ -689,7 +1254,10 @@ class ParallelStage(AbstractStage):
     ## Constructor.
     # @param self Pointer to object.
     def __init__(self):
+        self.stage_id = None
         self.branches = []
+        self.max_workers = 0
+        self.resources = []
 
     ## Build stage from data and dictionary. New objects of this class should be
     #  created only via this method, not directly.
@@ -702,13 +1270,13 @@ class ParallelStage(AbstractStage):
         obj = ParallelStage()
         try:
             # extract data
-            data = data["parallel"].copy()
+            branches_data = data["parallel"].copy()
         except:
             raise AutomationLibraryError(
                 "CONFIG_ERROR", "'parallel' keyword not found in entry",
                 entry=data
             )
-        for entry in data:
+        for entry in branches_data:
             # the only allowed type in each entry is sequence, even if it only
             # one element, so if entry is not list, convert it to list and pass
             # to SequenceStage constructor
@@ -716,58 +1284,115 @@ class ParallelStage(AbstractStage):
                 entry = [entry, ]
             obj.branches.append(build_stage(entry, [SequenceStage, ],
                                             dictionary))
+        obj.max_workers = data["max-workers"] if "max-workers" in data else 0
+        if not isinstance(obj.max_workers, int) or obj.max_workers < 0:
+            raise AutomationLibraryError(
+                "CONFIG_ERROR", "max-workers should be zero or positive "
+                "integer", max_workers=obj.max_workers
+            )
+        obj.resources = get_stage_resources(data)
         return obj
 
+    ## Convert stage to plan (see compile_plan()).
+    # @param self Pointer to object.
+    # @return Dictionary, which contains only JSON-serializable values.
+    def to_plan(self):
+        return {
+            "type": "parallel",
+            "branches": [branch.to_plan() for branch in self.branches],
+            "max-workers": self.max_workers,
+            "resources": self.resources,
+        }
+
+    ## Build stage from plan, made by to_plan().
+    # @param cls Class.
+    # @param plan Dictionary with plan.
+    @classmethod
+    def from_plan(cls, plan):
+        obj = ParallelStage()
+        obj.branches = [stage_from_plan(branch)
+                        for branch in plan["branches"]]
+        obj.max_workers = plan["max-workers"]
+        obj.resources = list(plan["resources"])
+        return obj
+
+    ## Set id of stage and its children.
+    # @param self Pointer to object.
+    # @param stage_id String.
+    def set_stage_id(self, stage_id):
+        self.stage_id = stage_id
+        for index, branch in enumerate(self.branches):
+            branch.set_stage_id("{}/{}".format(stage_id, index))
+
     ## Main function (ie which should be executed to perform step).
     # @param self Pointer to object.
     # @param test_mode Step should run only test mode.
     # @param rollback Should function perform rollback or not.
-    # @param _quit_event Quit event (details in StepExecutor documentation).
     # @return Result of last step (successful or not).
-    @handle_automation_library_errors
-    def _main(self, test_mode, rollback, _quit_event):
+    @handle_automation_library_errors_async
+    async def _main(self, test_mode, rollback):
         global_logger.info(message="****** Starting parallel stage ******")
         executors = []
-        # this flag indicates that tasks should be interrupted, if possible
-        interrupt = False
+        # branches, which are waiting for free worker and resource tokens
+        queued = list(enumerate(self.branches))
+        if (self.max_workers and len(queued) > self.max_workers
+                or self.resources) and not rollback:
+            queued = order_longest_first(queued, lambda item: estimate_stage(
+                item[1], get_history_mode(test_mode)
+            ))
+        queued_time = time.monotonic()
+        # tokens, which every branch holds, except tokens of enclosing stages
+        resources = get_missing_resources(self.resources)
+        # executors, which hold resource tokens of stage
+        holders = set()
         first_failed_executor = None
-        # start each step
-        for branch in self.branches:
-            if not rollback:
-                executors.append(branch.execute(test_mode))
-            else:
-                # this needs for allow scenario dont have rollback
-                executor = branch.rollback()
-                if executor is not None:
-                    executors.append(executor)
-        # main loop, which will be executed until all executor finish or event is set
-        while not _quit_event.is_set():
-            time.sleep(SLEEP_DELAY)
-            not_finished_found = False
-            # check each executor
-            for executor in executors:
-                # if result of executor is 0, then it finished and no actions
-                # required, just go check other
-                if executor.result == 0:
-                    continue
-                # if result is None, then
-                elif executor.result is None:
-                    not_finished_found = True
-                    if interrupt:
-                        executor._step.gentle_kill()
-                    continue
-                # if result not None nor 0, execution finished with error
-                elif isinstance(executor.result, int) and executor.result != 0:
-                    if not interrupt:
-                        interrupt = True
+        # main loop, which will be executed until all executor finish or
+        # stage is killed
+        try:
+            while True:
+                # check each finished executor
+                for executor in executors:
+                    if not executor.done():
+                        continue
+                    if executor in holders:
+                        holders.remove(executor)
+                        RESOURCES.release(resources)
+                    # if result not 0, execution finished with error
+                    if executor.result != 0 \
+                       and first_failed_executor is None:
                         first_failed_executor = executor
-            if not not_finished_found:
-                break
-        # if quit_event set, raise an exception
-        if _quit_event.is_set():
-            for executor, _ in executors:
-                executor.kill()
-            raise AutomationLibraryError("INTERRUPTED")
+                        # ask other branches to stop immediately
+                        for other in executors:
+                            if not other.done():
+                                other.step.gentle_kill()
+                # start queued branches, while workers and tokens available.
+                # After failure queued branches are not started at all
+                if first_failed_executor is None:
+                    self._start_queued_branches(queued, queued_time,
+                                                executors, holders, resources,
+                                                test_mode, rollback)
+                else:
+                    queued.clear()
+                running = [executor.task for executor in executors
+                           if not executor.done()]
+                if not running and not queued:
+                    break
+                # sleep until one of branches finishes or resource tokens
+                # released
+                released = RESOURCES.wait_released() if queued else None
+                try:
+                    await wait_first(running + ([released] if released
+                                                else []))
+                finally:
+                    if released is not None:
+                        released.cancel()
+        except asyncio.CancelledError:
+            for executor in executors:
+                await executor.kill()
+            raise
+        finally:
+            for executor in holders:
+                RESOURCES.release(resources)
         # if found failed executor, return it result
         if first_failed_executor is not None:
             global_logger.info(
@@ -782,48 +1407,691 @@ class ParallelStage(AbstractStage):
             )
             return 0
 
+    ## Start queued branches, while number of running branches less than
+    #  max-workers and resource tokens are available.
+    # @param self Pointer to object.
+    # @param queued List of tuples (index, branch), which are not started yet.
+    # @param queued_time Time (time.monotonic()), when branches were queued.
+    # @param executors List of executors of started branches.
+    # @param holders Set of executors, which hold resource tokens.
+    # @param resources Resource names, which tokens each branch acquires.
+    # @param test_mode Step should run only test mode.
+    # @param rollback Should branches be rolled back.
+    def _start_queued_branches(self, queued, queued_time, executors, holders,
+                               resources, test_mode, rollback):
+        while queued:
+            running = len([i for i in executors if not i.done()])
+            if self.max_workers and running >= self.max_workers:
+                return
+            if not RESOURCES.try_acquire(resources):
+                return
+            index, branch = queued.pop(0)
+            # steps of branch don't request tokens, held for it by stage
+            token = HELD_RESOURCES.set(HELD_RESOURCES.get()
+                                       | frozenset(self.resources))
+            try:
+                if not rollback:
+                    executor = branch.execute(test_mode)
+                else:
+                    # this needs for allow scenario dont have rollback
+                    executor = branch.rollback()
+            finally:
+                HELD_RESOURCES.reset(token)
+            if executor is None:
+                RESOURCES.release(resources)
+                continue
+            if self.max_workers or self.resources:
+                global_logger.info(
+                    message="Parallel branch started", branch=index,
+                    queue_wait=timedelta(
+                        seconds=time.monotonic() - queued_time
+                    )
+                )
+            holders.add(executor)
+            executors.append(executor)
+
+    ## Execute stage.
+    # @param self Pointer to object.
+    # @param test_mode Indicates whether stage should be executed in test mode
+    #  or not.
+    # @return StepExecutor object, which executes _main() method.
+    def execute(self, test_mode):
+        return StepExecutor(self, self._main(test_mode, False))
+
+    ## Execute rollback.
+    # @param self Pointer to object.
+    # @return StepExecutor object, which executes _main() method, if rollback
+    #  enabled, None otherwise.
+    def rollback(self):
+        return StepExecutor(self, self._main(False, True))
+
+
+class DagStage(AbstractStage):
+
+    ## Constructor.
+    # @param self Pointer to object.
+    def __init__(self):
+        self.stage_id = None
+        # names of nodes in topological order
+        self.order = []
+        self.stages = {}
+        self.needs = {}
+        self.interruptable_flags = {}
+        self.max_parallel = 0
+        # names of nodes, which were started by last execute()
+        self.started = []
+        # created by execute(), because event should be created in event loop
+        self._gentle_quit_event = None
+
+    ## Build stage from data and dictionary. New objects of this class should be
+    #  created only via this method, not directly.
+    # @param cls Class.
+    # @param data Data, which is define stage.
+    # @param dictionary CommandDictionary object.
+    # @exception KeyError If returned, then no command in data, try different type.
+    @classmethod
+    def from_data(cls, data, dictionary):
+        obj = DagStage()
+        try:
+            # extract data
+            nodes = data["dag"]
+        except:
+            raise AutomationLibraryError(
+                "CONFIG_ERROR", "'dag' keyword not found in entry",
+                entry=data
+            )
+        if not isinstance(nodes, list):
+            raise AutomationLibraryError(
+                "CONFIG_ERROR", "DAG stage should contain a list", entry=data
+            )
+        obj.max_parallel = data["max-parallel"] \
+                           if "max-parallel" in data else 0
+        if not isinstance(obj.max_parallel, int) or obj.max_parallel < 0:
+            raise AutomationLibraryError(
+                "CONFIG_ERROR", "max-parallel should be zero or positive "
+                "integer", max_parallel=obj.max_parallel
+            )
+        names = []
+        for entry in nodes:
+            if not isinstance(entry, dict) or "name" not in entry:
+                raise AutomationLibraryError(
+                    "CONFIG_ERROR", "Each entry of DAG stage should have name",
+                    entry=entry
+                )
+            entry = entry.copy()
+            name = entry["name"]
+            if name in obj.stages:
+                raise AutomationLibraryError(
+                    "CONFIG_ERROR", "Duplicate name in DAG stage", name=name
+                )
+            needs = entry.pop("needs", [])
+            if not isinstance(needs, list):
+                needs = [needs, ]
+            obj.needs[name] = list(needs)
+            obj.interruptable_flags[name] = bool(
+                entry.pop("interruptable", False)
+            )
+            obj.stages[name] = build_stage(entry,
+                                           [StepStage, ParallelStage,
+                                            DagStage],
+                                           dictionary)
+            names.append(name)
+        obj.order = obj.sort_nodes(names, obj.needs)
+        return obj
+
+    ## Sort nodes topologically, keeping order of independent nodes.
+    # @param names Names of nodes in declaration order.
+    # @param needs Dictionary, which maps name of node to list of names of
+    #  nodes, which should be finished before it.
+    # @return List of names.
+    # @exception AutomationLibraryError("CONFIG_ERROR") Unknown dependency or
+    #  cycle found.
+    @staticmethod
+    def sort_nodes(names, needs):
+        for name in names:
+            for dependency in needs[name]:
+                if dependency not in needs:
+                    raise AutomationLibraryError(
+                        "CONFIG_ERROR", "Unknown dependency in DAG stage",
+                        name=name, needs=dependency
+                    )
+        order = []
+        sorted_names = set()
+        left = list(names)
+        while left:
+            ready = [name for name in left
+                     if all(dep in sorted_names for dep in needs[name])]
+            if not ready:
+                raise AutomationLibraryError(
+                    "CONFIG_ERROR", "Dependency cycle in DAG stage",
+                    nodes=left
+                )
+            for name in ready:
+                order.append(name)
+                sorted_names.add(name)
+                left.remove(name)
+        return order
+
+    ## Convert stage to plan (see compile_plan()).
+    # @param self Pointer to object.
+    # @return Dictionary, which contains only JSON-serializable values.
+    def to_plan(self):
+        return {
+            "type": "dag",
+            "max-parallel": self.max_parallel,
+            "nodes": [{
+                "name": name,
+                "needs": self.needs[name],
+                "interruptable": self.interruptable_flags[name],
+                "stage": self.stages[name].to_plan(),
+            } for name in self.order],
+        }
+
+    ## Build stage from plan, made by to_plan().
+    # @param cls Class.
+    # @param plan Dictionary with plan.
+    @classmethod
+    def from_plan(cls, plan):
+        obj = DagStage()
+        obj.max_parallel = plan["max-parallel"]
+        for node in plan["nodes"]:
+            obj.order.append(node["name"])
+            obj.needs[node["name"]] = list(node["needs"])
+            obj.interruptable_flags[node["name"]] = node["interruptable"]
+            obj.stages[node["name"]] = stage_from_plan(node["stage"])
+        return obj
+
+    ## Set id of stage and its children.
+    # @param self Pointer to object.
+    # @param stage_id String.
+    def set_stage_id(self, stage_id):
+        self.stage_id = stage_id
+        for name, stage in self.stages.items():
+            stage.set_stage_id("{}/{}".format(stage_id, name))
+
+    ## Main function (ie which should be executed to perform step). Each node
+    #  started as soon as all its dependencies finished successfully. On
+    #  rollback, nodes, which were started by execute(), are rolled back in
+    #  reverse topological order: node's rollback started after rollbacks of
+    #  all nodes, which depend on it.
+    # @param self Pointer to object.
+    # @param test_mode Step should run only test mode.
+    # @param rollback Should function perform rollback or not.
+    # @return Result of first failed node or 0.
+    @handle_automation_library_errors_async
+    async def _main(self, test_mode, rollback):
+        global_logger.info(message="****** Starting DAG stage ******",
+                           rollback=rollback)
+        if not rollback:
+            pending = list(self.order)
+            needs = self.needs
+            if self.max_parallel and len(pending) > self.max_parallel:
+                pending = self.order_nodes(get_history_mode(test_mode))
+        else:
+            pending = [name for name in reversed(self.order)
+                       if name in self.started]
+            needs = {name: [other for other in pending
+                            if name in self.needs[other]]
+                     for name in pending}
+        finished = set()
+        running = {}
+        killed = set()
+        failed_result = None
+        try:
+            while True:
+                # utilize finished nodes. If executor finished without int
+                # result, it failed unexpectedly
+                for name, executor in list(running.items()):
+                    if not executor.done():
+                        continue
+                    del running[name]
+                    result = executor.result \
+                             if isinstance(executor.result, int) else 1
+                    global_logger.info(message="DAG node finished",
+                                       name=name, result=result)
+                    if result == 0:
+                        finished.add(name)
+                    elif failed_result is None:
+                        failed_result = result
+                # gentle kill affects only execute(), not rollback
+                stopping = failed_result is not None \
+                           or (self._gentle_quit_event.is_set()
+                               and not rollback)
+                if stopping:
+                    # don't start new nodes, interrupt interruptable ones and
+                    # wait for others
+                    for name, executor in running.items():
+                        if self.interruptable_flags[name] \
+                           and name not in killed:
+                            killed.add(name)
+                            await executor.kill()
+                else:
+                    self._start_ready_nodes(pending, needs, finished, running,
+                                            test_mode, rollback)
+                if not running:
+                    break
+                # sleep until one of nodes finishes or gentle kill asked
+                await wait_first(
+                    [executor.task for executor in running.values()],
+                    self._gentle_quit_event if not (stopping or rollback)
+                    else None
+                )
+        except asyncio.CancelledError:
+            for executor in running.values():
+                await executor.kill()
+            raise
+        if failed_result is not None:
+            global_logger.info(message="One of the nodes of DAG stage failed",
+                               result=failed_result)
+            return failed_result
+        if pending:
+            raise AutomationLibraryError("INTERRUPTED")
+        global_logger.info(
+            message="All nodes of DAG stage completed successful", result=0
+        )
+        return 0
+
+    ## Order nodes by expected duration of longest chain of nodes, which
+    #  starts from them, so nodes on critical path are started first, when
+    #  max-parallel limits number of running nodes.
+    # @param self Pointer to object.
+    # @param mode Mode of execution ("test" or "real").
+    # @return List of names of nodes.
+    def order_nodes(self, mode):
+        rank = {}
+        # nodes, which depend on node, are ranked before it
+        for name in reversed(self.order):
+            chains = [rank[other] for other in self.order
+                      if name in self.needs[other]]
+            duration = estimate_stage(self.stages[name], mode)
+            if duration is None or None in chains:
+                rank[name] = None
+            else:
+                rank[name] = duration + max(chains or [0])
+        return order_longest_first(list(self.order), rank.get)
+
+    ## Start nodes, which dependencies are finished, until max-parallel limit
+    #  reached.
+    # @param self Pointer to object.
+    # @param pending List of names of nodes, which are not started yet.
+    # @param needs Dependencies of nodes.
+    # @param finished Set of names of successfully finished nodes.
+    # @param running Dictionary, which maps names of running nodes to
+    #  executors.
+    # @param test_mode Step should run only test mode.
+    # @param rollback Should nodes be rolled back.
+    def _start_ready_nodes(self, pending, needs, finished, running, test_mode,
+                           rollback):
+        started = True
+        # node without rollback finishes immediately and can make other nodes
+        # ready, so repeat until nothing started
+        while started:
+            started = False
+            for name in list(pending):
+                if self.max_parallel and len(running) >= self.max_parallel:
+                    return
+                if not all(dep in finished for dep in needs[name]):
+                    continue
+                pending.remove(name)
+                started = True
+                if not rollback:
+                    self.started.append(name)
+                    executor = self.stages[name].execute(test_mode)
+                else:
+                    executor = self.stages[name].rollback()
+                if executor is None:
+                    finished.add(name)
+                    continue
+                global_logger.info(message="DAG node started", name=name)
+                running[name] = executor
+
     ## Execute stage.
     # @param self Pointer to object.
     # @param test_mode Indicates whether stage should be executed in test mode
     #  or not.
     # @return StepExecutor object, which executes _main() method.
     def execute(self, test_mode):
-        return StepExecutor(self, "_main", (test_mode, False))
+        self.started = []
+        self._gentle_quit_event = asyncio.Event()
+        return StepExecutor(self, self._main(test_mode, False))
 
     ## Execute rollback.
     # @param self Pointer to object.
     # @return StepExecutor object, which executes _main() method, if rollback
     #  enabled, None otherwise.
     def rollback(self):
-        return StepExecutor(self, "_main", (False, True))
+        if self._gentle_quit_event is None:
+            self._gentle_quit_event = asyncio.Event()
+        return StepExecutor(self, self._main(False, True))
+
+    ## Kill stage gently: don't start new nodes and interrupt only
+    #  interruptable ones. This method have effect only on execute().
+    # @param self Pointer to object.
+    def gentle_kill(self):
+        if self._gentle_quit_event is not None:
+            self._gentle_quit_event.set()
+
+
+## Read dictionary and configurations and build execution plan of scenario.
+#  Plan contains stages tree with resolved configurations, so it can be cached
+#  and executed without reading YAML files.
+# @param command Command name.
+# @param cmd_args Dictionary with command line named arguments.
+# @return Tuple (plan, list of files, which were read during compilation).
+def compile_plan(command, cmd_args):
+    # building dictionary
+    global DICTIONARY
+    DICTIONARY = CommandDictionary(DICTIONARY_PATH)
+    # reading main config
+    main_config = ScenarioConfiguration(
+        read_yaml(DICTIONARY[command].config)
+    )
+    main_config.add_cmd_args(cmd_args)
+    if not main_config.is_complete():
+        raise AutomationLibraryError(
+            "CONFIG_ERROR", "Placeholders left in configuration",
+            config=DICTIONARY[command].config, cmd_args=cmd_args
+        )
+    if main_config.composite:
+        plan = {
+            "composite": True,
+            "time-limit": main_config["time-limit"],
+            "main": SequenceStage.from_data(
+                main_config.composite_scenario_data, DICTIONARY
+            ).to_plan(),
+        }
+    else:
+        forward_data = {
+            "command": command,
+            "scenario-data" : cmd_args
+        }
+        rollback_data = main_config.rollback_scenario
+        plan = {
+            "composite": False,
+            "test-mode": main_config["test-mode"],
+            "forward": PrimitiveStage.from_data(forward_data, DICTIONARY)
+                       .to_plan(),
+            "rollback": PrimitiveStage.from_data(rollback_data, DICTIONARY)
+                        .to_plan() if rollback_data is not None else None,
+        }
+    # numbers of tokens of named resources (see ResourcePool)
+    plan["resource-limits"] = main_config["resource-limits"] \
+                              if "resource-limits" in main_config else {}
+    if not isinstance(plan["resource-limits"], dict):
+        raise AutomationLibraryError(
+            "CONFIG_ERROR", "resource-limits should be a dictionary",
+            resource_limits=plan["resource-limits"]
+        )
+    files = [DICTIONARY_PATH, DICTIONARY[command].config] \
+            + list(get_plan_files(plan))
+    return plan, files
+
+
+## Get configuration files of all primitive stages in plan.
+# @param plan Plan or its part.
+# @return Generator of paths.
+def get_plan_files(plan):
+    if isinstance(plan, dict):
+        if plan.get("type") == "primitive":
+            yield plan["config"]
+        for value in plan.values():
+            yield from get_plan_files(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from get_plan_files(value)
+
+
+## Get execution plan from cache or compile it.
+# @param command Command name.
+# @param cmd_args Tuple of positional and named command line arguments (see
+#  bootstrap.parse_cmd_args()).
+# @param use_cache Should plan be read from and stored to cache.
+# @return Tuple (plan, is plan loaded from cache, compilation time in
+#  seconds).
+def get_plan(command, cmd_args, use_cache):
+    start = time.perf_counter()
+    cache = plan_cache.PlanCache()
+    key = plan_cache.plan_key(DICTIONARY_PATH, cmd_args)
+    plan = cache.load(key) if use_cache else None
+    if plan is not None:
+        return plan, True, time.perf_counter() - start
+    plan, files = compile_plan(command, cmd_args[1])
+    if use_cache:
+        cache.store(key, plan, files)
+    return plan, False, time.perf_counter() - start
+
+
+## Format plan as human-readable tree.
+# @param plan Plan or its part.
+# @param indent Indentation level.
+# @return List of strings.
+def format_plan(plan, indent=0):
+    prefix = "  " * indent
+    if "composite" in plan:
+        lines = ["{}resource-limits: {}".format(prefix, ", ".join(
+            "{}={}".format(key, value)
+            for key, value in sorted(plan["resource-limits"].items())
+        ))] if plan["resource-limits"] else []
+        if plan["composite"]:
+            return lines + ["{}composite time-limit={}".format(
+                prefix, plan["time-limit"]
+            )] + format_plan(plan["main"], indent + 1)
+        lines += ["{}simple test-mode={}".format(prefix, plan["test-mode"])] \
+                 + format_plan(plan["forward"], indent + 1)
+        if plan["rollback"] is not None:
+            lines += ["{}  rollback:".format(prefix)] \
+                     + format_plan(plan["rollback"], indent + 2)
+        return lines
+    if plan["type"] == "primitive":
+        line = "{}{} [{}] time-limit={} try-count={} timeout={}".format(
+            prefix, plan["name"], os.path.basename(plan["script"]),
+            plan["time-limit"], plan["try-count"], plan["timeout"]
+        )
+        if plan["isolated"]:
+            line += " isolated"
+        if plan["resources"]:
+            line += " resources={}".format(",".join(plan["resources"]))
+        for key, value in sorted(plan["cmd-args"].items()):
+            line += " --{}={}".format(key, value)
+        return [line]
+    if plan["type"] == "step":
+        lines = format_plan(plan["forward"], indent)
+        if plan["rollback"] is not None:
+            lines += ["{}  rollback:".format(prefix)] \
+                     + format_plan(plan["rollback"], indent + 2)
+        return lines
+    if plan["type"] == "sequence":
+        lines = ["{}sequence".format(prefix)]
+        for step, interruptable in zip(plan["steps"], plan["interruptable"]):
+            step_lines = format_plan(step, indent + 1)
+            if interruptable:
+                step_lines[0] += " (interruptable)"
+            lines += step_lines
+        return lines
+    if plan["type"] == "parallel":
+        lines = ["{}parallel max-workers={}{}".format(
+            prefix, plan["max-workers"],
+            " resources={}".format(",".join(plan["resources"])) \
+            if plan["resources"] else ""
+        )]
+        for branch in plan["branches"]:
+            lines += format_plan(branch, indent + 1)
+        return lines
+    if plan["type"] == "dag":
+        lines = ["{}dag max-parallel={}".format(prefix, plan["max-parallel"])]
+        for node in plan["nodes"]:
+            node_lines = format_plan(node["stage"], indent + 1)
+            if node["stage"]["type"] != "step":
+                node_lines[0] += " " + node["name"]
+            if node["needs"]:
+                node_lines[0] += " needs={}".format(",".join(node["needs"]))
+            if node["interruptable"]:
+                node_lines[0] += " (interruptable)"
+            lines += node_lines
+        return lines
+    return ["{}{}".format(prefix, plan)]
+
+
+## Get mode of execution, under which durations of steps are recorded.
+# @param test_mode Is step executed in test mode.
+# @return "test" or "real".
+def get_history_mode(test_mode):
+    return "test" if test_mode else "real"
+
+
+## Estimate duration of plan (or its part) from history of step durations.
+#  Branches of parallel stage with max-workers are placed on workers in the
+#  same order, as they are started. Limit of DAG stage (max-parallel) and
+#  resource tokens are not taken into account, so for such stages estimate is
+#  lower bound.
+# @param plan Plan or its part.
+# @param mode Mode of execution ("test" or "real").
+# @return Tuple (duration in seconds, critical path: list of tuples (name of
+#  primitive stage, expected duration or None), number of primitive stages
+#  without history). Stages without history are counted as zero.
+def estimate_plan(plan, mode):
+    if "composite" in plan:
+        return estimate_plan(plan["main"] if plan["composite"]
+                             else plan["forward"], mode)
+    if plan["type"] == "primitive":
+        duration = HISTORY.estimate(plan.get("command", plan["name"]),
+                                    scenario_digest(plan["cmd-args"]), mode) \
+                   if HISTORY is not None else None
+        return duration or 0, [(plan["name"], duration)], \
+               int(duration is None)
+    if plan["type"] == "step":
+        return estimate_plan(plan["forward"], mode)
+    if plan["type"] == "sequence":
+        estimates = [estimate_plan(step, mode) for step in plan["steps"]]
+        return sum(item[0] for item in estimates), \
+               [step for item in estimates for step in item[1]], \
+               sum(item[2] for item in estimates)
+    if plan["type"] == "parallel":
+        estimates = [estimate_plan(branch, mode)
+                     for branch in plan["branches"]]
+        if not estimates:
+            return 0, [], 0
+        unknown = sum(item[2] for item in estimates)
+        workers = plan["max-workers"]
+        if not workers or len(estimates) <= workers:
+            duration, path, _ = max(estimates, key=lambda item: item[0])
+            return duration, path, unknown
+        # branch starts on first free worker, so path of worker is chain of
+        # its branches
+        finish = [(0, [])] * workers
+        for duration, path, _ in order_longest_first(
+                estimates, lambda item: None if item[2] else item[0]):
+            worker = min(range(workers), key=lambda i: finish[i][0])
+            finish[worker] = (finish[worker][0] + duration,
+                              finish[worker][1] + path)
+        duration, path = max(finish, key=lambda item: item[0])
+        return duration, path, unknown
+    if plan["type"] == "dag":
+        finish = {}
+        unknown = 0
+        for node in plan["nodes"]:
+            duration, path, node_unknown = estimate_plan(node["stage"], mode)
+            unknown += node_unknown
+            start, start_path = max([finish[dep] for dep in node["needs"]]
+                                    or [(0, [])], key=lambda item: item[0])
+            finish[node["name"]] = (start + duration, start_path + path)
+        if not finish:
+            return 0, [], 0
+        duration, path = max(finish.values(), key=lambda item: item[0])
+        return duration, path, unknown
+    return 0, [], 0
+
+
+## Estimate duration of stage from history of step durations.
+# @param stage Stage object.
+# @param mode Mode of execution ("test" or "real").
+# @return Duration in seconds or None, if some of its steps were never
+#  executed.
+def estimate_stage(stage, mode):
+    duration, _, unknown = estimate_plan(stage.to_plan(), mode)
+    return duration if not unknown else None
+
+
+## Format estimate of run: expected duration of test run and real run and
+#  critical path of real run.
+# @param plan Plan (see compile_plan()).
+# @param test_run Is test run executed before real run.
+# @return List of strings.
+def format_estimate(plan, test_run):
+    def format_duration(seconds):
+        if seconds is None:
+            return "unknown"
+        return str(timedelta(seconds=round(seconds)))
+
+    phases = []
+    if plan["composite"]:
+        if test_run:
+            phases.append(("test run", estimate_plan(plan, "test")))
+        phases.append(("real run", estimate_plan(plan, "real")))
+    else:
+        phases.append(("run", estimate_plan(
+            plan, get_history_mode(plan["test-mode"])
+        )))
+    lines = ["Estimated duration: {} ({})".format(
+        format_duration(sum(item[0] for _, item in phases)),
+        ", ".join("{} {}".format(name, format_duration(item[0]))
+                  for name, item in phases)
+    ), "Critical path of {}:".format(phases[-1][0])]
+    for name, duration in phases[-1][1][1]:
+        lines.append("  {} {}".format(name, format_duration(duration)))
+    unknown = sum(item[2] for _, item in phases)
+    if unknown:
+        lines.append("Steps without history (counted as zero): {}".format(
+            unknown
+        ))
+    return lines
+
+
+## Record start or finish of run phase in run journal, if it is used.
+# @param event "start" or "finish".
+# @param phase Name of phase ("test-run", "real-run" or "rollback").
+# @param kwargs Additional fields of record.
+def record_phase(event, phase, **kwargs):
+    if JOURNAL is not None:
+        JOURNAL.record(event, stage=phase, **kwargs)
+        # phases are rare, so make their records durable immediately
+        JOURNAL.sync()
 
 
 ## Function, which is sort of "main" for composite scenarios execution.
-# @param config ScenarioConfiguration object.
+# @param main_step SequenceStage object.
+# @param time_limit Time limit of scenario.
 # @param disable_test_run Flag, which indicate that tests shouldn't be run.
 # @param disable_rollback Flag, which indicate that rollback shouldn't be run.
 # @return Integer representation of result.
-def execute_composite_scenario(config, disable_test_run, disable_rollback):
-    main_step = SequenceStage.from_data(config.composite_scenario_data,
-                                        DICTIONARY)
-    if not disable_test_run:
+async def execute_composite_scenario(main_step, time_limit,
+                                     disable_test_run, disable_rollback):
+    if disable_test_run:
+        global_logger.warning(message="Test run disabled")
+    elif JOURNAL is not None and JOURNAL.last_index(
+            "finish", stage="test-run", result=0
+    ) is not None:
+        global_logger.info(message="Test run already completed, skipped")
+    else:
         global_logger.info(message="****** Starting test run ******")
+        record_phase("start", "test-run")
         main_executor = main_step.execute(True)
-        main_executor.join(config["time-limit"])
-        main_executor.kill()
+        await main_executor.join(time_limit)
+        await main_executor.kill()
+        record_phase("finish", "test-run", result=main_executor.result)
         global_logger.info(message="Test run result",
                            returncode=main_executor.result)
         if main_executor.result != 0:
             global_logger.info(message="****** Test run failed! ******",
                                returncode=main_executor.result)
             return main_executor.result
-    else:
-        global_logger.warning(message="Test run disabled")
     gv.TEST_MODE = False
     global_logger.info(message="****** Starting real run ******")
+    record_phase("start", "real-run")
     main_executor = main_step.execute(False)
-    main_executor.join(config["time-limit"])
-    main_executor.kill()
+    await main_executor.join(time_limit)
+    await main_executor.kill()
+    record_phase("finish", "real-run", result=main_executor.result)
     global_logger.info(message="Real run result",
                        returncode=main_executor.result)
     real_run_result = main_executor.result
@@ -831,12 +2099,14 @@ def execute_composite_scenario(config, disable_test_run, disable_rollback):
     if main_executor.result != 0:
         if not disable_rollback:
             global_logger.info(message="****** Starting rollback ******")
+            record_phase("start", "rollback")
             main_executor = main_step.rollback()
             if main_executor is None:
                 global_logger.info(message="No rollback specified")
                 return real_run_result
-            main_executor.join()
-            main_executor.kill()
+            await main_executor.join()
+            await main_executor.kill()
+            record_phase("finish", "rollback", result=main_executor.result)
             global_logger.info(message="Rollback result",
                                returncode=main_executor.result)
         else:
@@ -848,34 +2118,27 @@ def execute_composite_scenario(config, disable_test_run, disable_rollback):
         raise AutomationLibraryError("ROLLBACK_ERROR")
 
 
-## Function, which is sort of "main" for composite scenarios execution.
-# @param command Command name.
-# @param cmd_args Dictionary with command line named arguments.
-# @param config ScenarioConfiguration object.
+## Function, which is sort of "main" for simple scenarios execution.
+# @param forward_step PrimitiveStage object.
+# @param rollback_step PrimitiveStage object or None.
+# @param test_mode Should scenario be executed in test mode.
 # @return Integer representation of result.
-def execute_simple_scenario(command, cmd_args, config):
-    forward_data = {
-        "command": command,
-        "scenario-data" : cmd_args
-    }
-    rollback_data = config.rollback_scenario
-    forward_step = PrimitiveStage.from_data(forward_data, DICTIONARY)
+async def execute_simple_scenario(forward_step, rollback_step, test_mode):
     global_logger.info(message="****** Starting real run ******")
-    main_executor = forward_step.execute(config["test-mode"], True)
-    main_executor.join(forward_step.time_limit)
-    main_executor.kill()
+    main_executor = forward_step.execute(test_mode, True)
+    await main_executor.join(forward_step.time_limit)
+    await main_executor.kill()
     global_logger.info(message="Real run result",
                        returncode=main_executor.result)
     real_run_result = main_executor.result
     if main_executor.result != 0:
-        if rollback_data is None:
+        if rollback_step is None:
             global_logger.info(message="No rollback specified")
             return real_run_result
-        rollback_step = PrimitiveStage.from_data(rollback_data, DICTIONARY)
         global_logger.info(message="****** Starting rollback ******")
         main_executor = rollback_step.execute(False, True)
-        main_executor.join()
-        main_executor.kill()
+        await main_executor.join()
+        await main_executor.kill()
         global_logger.info(message="Rollback result",
                            returncode=main_executor.result)
     if main_executor.result == 0:
@@ -894,6 +2157,16 @@ def composite_runner_main():
     cmd_args = bootstrap.parse_cmd_args(sys.argv[1:])
     # setting debug values from cmd args
     bootstrap.set_debug_values(cmd_args[1])
+    if gv.TRACE:
+        trace_id = tracing.start_trace()
+        global_logger.info(message="Writing trace", trace_id=trace_id,
+                           folder=tracing.get_trace_folder(trace_id))
+    # start zygote for child scripts, while dictionary and configs are read
+    zygote.USE_ZYGOTE = not ("disable-zygote" in cmd_args[1]
+                             and cmd_args[1]["disable-zygote"])
+    zygote.warm_up_zygote()
+    # create reaper in main thread, so it can handle SIGCHLD, if needed
+    reaper.get_reaper()
     # replace dictionary path, if second positional argument provided
     if len(cmd_args[0]) > 1:
         global DICTIONARY_PATH
@@ -905,35 +2178,131 @@ def composite_runner_main():
                 "ARGS_ERROR", "Cannot find or access dictionary file",
                 path=StrPathExpanded(DICTIONARY_PATH)
             )
-    # building dictionary
-    global DICTIONARY
-    DICTIONARY = CommandDictionary(DICTIONARY_PATH)
-    # reading main config
-    main_config = ScenarioConfiguration(
-        read_yaml(DICTIONARY[cmd_args[0][0]].config)
-    )
-    main_config.add_cmd_args(cmd_args[1])
-    if not main_config.is_complete():
-        raise AutomationLibraryError(
-            "CONFIG_ERROR", "Placeholders left in configuration",
-            config=DICTIONARY[cmd_args[0][0]].config, cmd_args=cmd_args[1]
-        )
+    global JOURNAL, HISTORY
+    if "resume" in cmd_args[1]:
+        # resumed run uses plan from journal, so stage ids are the same
+        run_id = str(cmd_args[1]["resume"])
+        if not os.path.isfile(get_journal_path(run_id)):
+            raise AutomationLibraryError(
+                "ARGS_ERROR", "Journal of run not found", run_id=run_id,
+                path=get_journal_path(run_id)
+            )
+        JOURNAL = Journal(run_id)
+        header = JOURNAL.find("run")
+        if header is None:
+            raise AutomationLibraryError(
+                "ARGS_ERROR", "Journal of run is corrupted", run_id=run_id,
+                path=JOURNAL.path
+            )
+        command, plan = header["command"], header["plan"]
+        if cmd_args[0] and cmd_args[0][0] != command:
+            JOURNAL.close()
+            raise AutomationLibraryError(
+                "ARGS_ERROR", "Command differs from command of resumed run",
+                command=cmd_args[0][0], run_command=command, run_id=run_id
+            )
+        JOURNAL.record("resume", pid=os.getpid())
+        global_logger.info(message="Resuming run", run_id=run_id,
+                           journal=JOURNAL.path)
+        return execute_journaled_plan(command, cmd_args, plan)
+    # get compiled plan of scenario
+    explain_plan = "explain-plan" in cmd_args[1] \
+                   and cmd_args[1]["explain-plan"]
+    use_cache = not ("disable-plan-cache" in cmd_args[1]
+                     and cmd_args[1]["disable-plan-cache"])
+    plan_cmd_args = (cmd_args[0], {key: value for key, value
+                                   in cmd_args[1].items()
+                                   if key not in PLAN_ARGS})
+    plan, cached, compile_time = get_plan(cmd_args[0][0], plan_cmd_args,
+                                          use_cache)
+    global_logger.info(message="Execution plan ready", cached=cached,
+                       compile_time=timedelta(seconds=compile_time))
+    if "estimate" in cmd_args[1] and cmd_args[1]["estimate"]:
+        HISTORY = DurationHistory()
+        print("\n".join(format_estimate(
+            plan, not ("disable-test-run" in cmd_args[1]
+                       and cmd_args[1]["disable-test-run"])
+        )))
+        return 0
+    if explain_plan:
+        print("\n".join(format_plan(plan)))
+        print("Plan {} in {:.3f} ms".format(
+            "loaded from cache" if cached else "compiled",
+            compile_time * 1000
+        ))
+        return 0
+    if "disable-journal" in cmd_args[1] and cmd_args[1]["disable-journal"]:
+        return execute_plan(cmd_args[0][0], cmd_args, plan)
+    removed = remove_old_journals()
+    if removed:
+        global_logger.info(message="Old run journals removed", count=removed)
+    JOURNAL = Journal(new_run_id())
+    JOURNAL.record("run", command=cmd_args[0][0], pid=os.getpid(), plan=plan)
+    global_logger.info(message="Run journal created", run_id=JOURNAL.run_id,
+                       journal=JOURNAL.path)
+    return execute_journaled_plan(cmd_args[0][0], cmd_args, plan)
+
+
+## Execute compiled plan with run journal (JOURNAL). Journal of successful run
+#  is removed, journal of failed run is kept for resuming (see
+#  lib.common.journal.JOURNAL_MAX_AGE).
+# @param command Command name.
+# @param cmd_args Tuple of positional and named command line arguments (see
+#  bootstrap.parse_cmd_args()).
+# @param plan Plan (see compile_plan()).
+# @return Integer representation of result.
+def execute_journaled_plan(command, cmd_args, plan):
+    try:
+        res = execute_plan(command, cmd_args, plan)
+    finally:
+        JOURNAL.close()
+    if res == 0:
+        JOURNAL.remove()
+    return res
+
+
+## Execute compiled plan.
+# @param command Command name.
+# @param cmd_args Tuple of positional and named command line arguments (see
+#  bootstrap.parse_cmd_args()).
+# @param plan Plan (see compile_plan()).
+# @return Integer representation of result.
+def execute_plan(command, cmd_args, plan):
+    # durations of steps are recorded, unless disabled
+    global HISTORY
+    if not ("disable-duration-history" in cmd_args[1]
+            and cmd_args[1]["disable-duration-history"]):
+        HISTORY = DurationHistory()
+    # set in-process execution mode
+    global IN_PROCESS, IN_PROCESS_WORKERS
+    IN_PROCESS = "in-process" in cmd_args[1] and cmd_args[1]["in-process"]
+    if "in-process-workers" in cmd_args[1]:
+        IN_PROCESS_WORKERS = int(cmd_args[1]["in-process-workers"])
     # set global top-level scenario name
     global TOP_LEVEL_SCENARIO_NAME
-    TOP_LEVEL_SCENARIO_NAME = cmd_args[0][0]
+    TOP_LEVEL_SCENARIO_NAME = command
+    RESOURCES.set_limits(plan["resource-limits"])
     # building main step
-    if main_config.composite:
-        return execute_composite_scenario(
-            main_config,
+    if plan["composite"]:
+        main_step = stage_from_plan(plan["main"])
+        main_step.set_stage_id("scenario")
+        return asyncio.run(execute_composite_scenario(
+            main_step, plan["time-limit"],
             "disable-test-run" in cmd_args[1] \
             and cmd_args[1]["disable-test-run"],
             "disable-rollback" in cmd_args[1] \
             and cmd_args[1]["disable-rollback"]
-        )
+        ))
     else:
-        return execute_simple_scenario(
-            cmd_args[0][0], cmd_args[1], main_config
-        )
+        forward_step = stage_from_plan(plan["forward"])
+        forward_step.set_stage_id("scenario")
+        rollback_step = None
+        if plan["rollback"] is not None:
+            rollback_step = stage_from_plan(plan["rollback"])
+            rollback_step.set_stage_id("scenario/rollback")
+        return asyncio.run(execute_simple_scenario(
+            forward_step, rollback_step, plan["test-mode"]
+        ))
 
 
 ## Main function.
@@ -956,7 +2325,8 @@ def main():
     ))
     global_logger.add_stream_handler(sys.stdout)
     # execute agent main function
-    result = composite_runner_main()
+    with tracing.TraceSpan("composite_runner"):
+        result = composite_runner_main()
     # remove pid file
     try:
         os.remove(pid_filename)
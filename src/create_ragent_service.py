@@ -12,7 +12,47 @@ from lib.common.config import *
 from lib.common.base_scenario import *
 
 
+def dyn_range_parser(str_range):
+    ports = []
+    try:
+        subranges = str_range.split(",")
+        for subrange in subranges:
+            parts = subrange.split(":")
+            if len(parts) < 2:
+                ports.append(int(parts[0]))
+            else:
+                ports += list(range(int(parts[0]), int(parts[1])+1))
+    except:
+        raise ValueError("Incorrect dynamic range")
+    return ports
+
+
+def dyn_range_checker(str_range):
+    try:
+        dyn_range_parser(str_range)
+        return True
+    except:
+        return False
+
+
 class CreateRagentServiceScenario(BaseScenario):
+    ## Schema of specific parameters.
+    SCHEMA = ConfigSchema([
+        # specific paramenters
+        ["name", str],
+        ["description", str],
+        ["port", int],
+        ["regport", int],
+        ["range", str, str, dyn_range_checker],
+        ["username", str],
+        ["cluster-folder", StrPathExpanded],
+        ["setup-folder", StrPathExpanded],
+        ["cluster-debug", bool]
+    ])
+    ## Schema of parameters, specific for Windows.
+    WINDOWS_SCHEMA = ConfigSchema([
+        ["password", str],
+    ])
 
     def _after_init(self):
         if self.config["os-type"] == "Windows":
@@ -22,25 +62,12 @@ class CreateRagentServiceScenario(BaseScenario):
         self.service_module = service
 
     def _validate_specific_data(self):
-        # first piece of data
-        validate_data = [
-            # specific paramenters
-            ["name", str],
-            ["description", str],
-            ["port", int],
-            ["regport", int],
-            ["range", str, str, dyn_range_checker],
-            ["username", str],
-            ["cluster-folder", StrPathExpanded],
-            ["setup-folder", StrPathExpanded],
-            ["cluster-debug", bool]
-        ]
-        self.config.validate(validate_data)
+        schema = self.SCHEMA
         if self.config["os-type"] == "Windows":
-            validate_data = [["password", str], ]
+            schema += self.WINDOWS_SCHEMA
         else: # WORKAROUND
             self.config["password"] = ""
-        self.config.validate(validate_data)
+        self.config.validate(schema)
 
     def _check_setup_folder(self):
         # only check that ragent is there
@@ -95,27 +122,8 @@ class CreateRagentServiceScenario(BaseScenario):
                      self.config["cluster-folder"]])
 
 
-def dyn_range_parser(str_range):
-    ports = []
-    try:
-        subranges = str_range.split(",")
-        for subrange in subranges:
-            parts = subrange.split(":")
-            if len(parts) < 2:
-                ports.append(int(parts[0]))
-            else:
-                ports += list(range(int(parts[0]), int(parts[1])+1))
-    except:
-        raise ValueError("Incorrect dynamic range")
-    return ports
-
-
-def dyn_range_checker(str_range):
-    try:
-        dyn_range_parser(str_range)
-        return True
-    except:
-        return False
+## Entry point for in-process execution (see composite_runner).
+scenario_main = CreateRagentServiceScenario.execute_wrapper
 
 
 if __name__ == "__main__":
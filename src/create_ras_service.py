@@ -13,6 +13,21 @@ from lib.common.base_scenario import *
 
 
 class CreateRasServiceScenario(BaseScenario):
+    ## Schema of specific parameters.
+    SCHEMA = ConfigSchema([
+        # specific parameters
+        ["name", str],
+        ["description", str],
+        ["port", int],
+        ["username", str],
+        ["agent-host", str],
+        ["agent-port", int],
+        ["setup-folder", StrPathExpanded]
+    ])
+    ## Schema of parameters, specific for Windows.
+    WINDOWS_SCHEMA = ConfigSchema([
+        ["password", str],
+    ])
 
     def _after_init(self):
         if self.config["os-type"] == "Windows":
@@ -22,23 +37,12 @@ class CreateRasServiceScenario(BaseScenario):
         self.service_module = service
 
     def _validate_specific_data(self):
-        # first piece of data
-        validate_data = [
-            # specific parameters
-            ["name", str],
-            ["description", str],
-            ["port", int],
-            ["username", str],
-            ["agent-host", str],
-            ["agent-port", int],
-            ["setup-folder", StrPathExpanded]
-        ]
-        self.config.validate(validate_data)
+        schema = self.SCHEMA
         if self.config["os-type"] == "Windows":
-            validate_data = [["password", str], ]
+            schema += self.WINDOWS_SCHEMA
         else: # WORKAROUND
             self.config["password"] = ""
-        self.config.validate(validate_data)
+        self.config.validate(schema)
 
     def _check_setup_folder(self):
         # only check that ragent is there
@@ -102,6 +106,10 @@ def dyn_range_checker(str_range):
         return False
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = CreateRasServiceScenario.execute_wrapper
+
+
 if __name__ == "__main__":
     bootstrap.main(CreateRasServiceScenario.execute_wrapper,
                    os.path.basename(__file__)[0:-3])
@@ -13,6 +13,10 @@ from lib.common.base_scenario import BaseScenario
 
 
 class DeleteServiceScenario(BaseScenario):
+    ## Schema of specific parameters.
+    SCHEMA = ConfigSchema([
+        ["name", str],
+    ])
 
     def _after_init(self):
         if self.config["os-type"] == "Windows":
@@ -36,15 +40,16 @@ class DeleteServiceScenario(BaseScenario):
         ]
 
     def _validate_specific_data(self):
-        validate_data = [
-            ["name", str],
-        ]
-        self.config.validate(validate_data)
+        self.config.validate(self.SCHEMA)
 
     def _real(self):
         self.service_module.delete_service(self.config["name"])
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = DeleteServiceScenario.execute_wrapper
+
+
 if __name__ == "__main__":
     bootstrap.main(DeleteServiceScenario.execute_wrapper,
                    os.path.basename(__file__)[0:-3])
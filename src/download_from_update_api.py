@@ -216,6 +216,22 @@ def download_and_extract_update(configuration_update_entry, store_location,
 
 
 class DownloadFromUpdateApiScenario:
+    ## Schema of parameters.
+    SCHEMA = ConfigSchema([
+        ["test-mode", bool],
+        # ["try-count", int],
+        # ["timeout", int],
+        ["time-limit", int],
+        ["configuration-name", str],
+        ["current-version", str],
+        ["download-folder", StrPathExpanded],
+        ["tmp-folder", StrPathExpanded],
+        ["username", str],
+        ["password", str],
+        ["additional-parameters", dict],
+        ["standalone", bool],
+    ])
+
     ## Constructor.
     # @param self Pointer to object.
     # @param config lib::common::config::Configuration object.
@@ -239,21 +255,7 @@ class DownloadFromUpdateApiScenario:
     # @exception AutomationLibraryError("OPTION_NOT_FOUND")
     # @exception AutomationLibraryError("ARGS_ERROR")
     def validate_config(self):
-        validate_data = [
-            ["test-mode", bool],
-            # ["try-count", int],
-            # ["timeout", int],
-            ["time-limit", int],
-            ["configuration-name", str],
-            ["current-version", str],
-            ["download-folder", StrPathExpanded],
-            ["tmp-folder", StrPathExpanded],
-            ["username", str],
-            ["password", str],
-            ["additional-parameters", dict],
-            ["standalone", bool],
-        ]
-        self.config.validate(validate_data)
+        self.config.validate(self.SCHEMA)
 
     def set_upgrade_sequence(self):
         # Info request, which should return list of updates (at least one),
@@ -332,14 +334,16 @@ class DownloadFromUpdateApiScenario:
 
 
 ## Wrapper for scenario execution.
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
 # @return Last error code (0 if no errors occurred).
-def download_from_update_api_scenario():
+def download_from_update_api_scenario(argv=None):
+    argv = sys.argv if argv is None else argv
     res = 1
     # execute scenario
     try:
-        data = read_yaml(sys.argv[1])
+        data = read_yaml(argv[1])
         config = ScenarioConfiguration(data)
-        cmd_args = bootstrap.parse_cmd_args(sys.argv[2:])
+        cmd_args = bootstrap.parse_cmd_args(argv[2:])
         config.add_cmd_args(cmd_args[1], True)
         bootstrap.set_debug_values(cmd_args[1])
         if "composite-scenario-name" in config:
@@ -373,6 +377,10 @@ def download_from_update_api_scenario():
     return res
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = download_from_update_api_scenario
+
+
 if __name__ == "__main__":
     bootstrap.main(download_from_update_api_scenario,
                    os.path.basename(__file__)[0:-3])
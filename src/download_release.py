@@ -19,6 +19,51 @@ from lib.common.config import *
 
 
 class DownloadReleaseScenario:
+    ## Schema of common parameters.
+    SCHEMA = ConfigSchema([
+        ["test-mode", bool],
+        # ["try-count", int],
+        # ["timeout", int],
+        ["time-limit", int],
+        ["download-folder", StrPathExpanded],
+        ["tmp-folder", StrPathExpanded],
+        ["download-type", str, str, ["data", "url"]],
+        ["username", str],
+        ["password", str],
+        ["additional-data", dict],
+        ["standalone", bool],
+    ])
+    ## Schema of parameters of downloading by url.
+    URL_SCHEMA = ConfigSchema([
+        ["additional-data/url", str],
+    ])
+    ## Schema of parameters of downloading by release data.
+    DATA_SCHEMA = ConfigSchema([
+        ["release-type", str, str, ["platform", "postgres", "configuration"]],
+    ])
+    ## Schemas of additional data for each release type.
+    RELEASE_SCHEMAS = {
+        "platform": ConfigSchema([
+            ["additional-data/version", PlatformVersion],
+            ["additional-data/arch", int, int, [64, 32]],
+            ["additional-data/os-type", str, str,
+             ["Windows", "Linux-deb", "Linux-rpm"]],
+            ["additional-data/distr-type", str, str,
+             ["client", "server", "full"]]
+        ]),
+        "postgres": ConfigSchema([
+            ["additional-data/version", str],
+            ["additional-data/arch", int, int, [64, 32]],
+            ["additional-data/os-type", str, str,
+             ["Windows", "Linux-deb", "Linux-rpm"]],
+        ]),
+        "configuration": ConfigSchema([
+            ["additional-data/name", str],
+            ["additional-data/distr-type", str, str, ["full", "update"]],
+            ["additional-data/version", str],
+        ]),
+    }
+
     ## Constructor.
     # @param self Pointer to object.
     # @param config lib::common::config::Configuration object.
@@ -66,53 +111,14 @@ class DownloadReleaseScenario:
     # @exception AutomationLibraryError("OPTION_NOT_FOUND")
     # @exception AutomationLibraryError("ARGS_ERROR")
     def validate_config(self):
-        validate_data = [
-            ["test-mode", bool],
-            # ["try-count", int],
-            # ["timeout", int],
-            ["time-limit", int],
-            ["download-folder", StrPathExpanded],
-            ["tmp-folder", StrPathExpanded],
-            ["download-type", str, str, ["data", "url"]],
-            ["username", str],
-            ["password", str],
-            ["additional-data", dict],
-            ["standalone", bool],
-        ]
-        self.config.validate(validate_data)
+        self.config.validate(self.SCHEMA)
         if self.config["download-type"] == "url":
-            validate_data += [
-                ["additional-data/url", str],
-            ]
+            self.config.validate(self.URL_SCHEMA)
         else:
-            validate_data += [
-                ["release-type", str, str, ["platform", "postgres",
-                                            "configuration"]],
-            ]
-            if self.config["release-type"] == "platform":
-                validate_data += [
-                    ["additional-data/version", PlatformVersion],
-                    ["additional-data/arch", int, int, [64, 32]],
-                    ["additional-data/os-type", str, str,
-                     ["Windows", "Linux-deb", "Linux-rpm"]],
-                    ["additional-data/distr-type", str, str,
-                     ["client", "server", "full"]]
-                ]
-            elif self.config["release-type"] == "postgres":
-                validate_data += [
-                    ["additional-data/version", str],
-                    ["additional-data/arch", int, int, [64, 32]],
-                    ["additional-data/os-type", str, str,
-                     ["Windows", "Linux-deb", "Linux-rpm"]],
-                ]
-            else:
-                validate_data += [
-                    ["additional-data/name", str],
-                    ["additional-data/distr-type", str, str,
-                     ["full", "update"]],
-                    ["additional-data/version", str],
-                ]
-        self.config.validate(validate_data)
+            self.config.validate(self.DATA_SCHEMA)
+            self.config.validate(
+                self.RELEASE_SCHEMAS[self.config["release-type"]]
+            )
 
     ## Log into releases.1c.ru portal.
     # @param self Pointer to object.
@@ -632,14 +638,16 @@ def get_filename_from_response(response):
 
 
 ## Wrapper for scenario execution.
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
 # @return Last error code (0 if no errors occurred).
-def download_release_scenario():
+def download_release_scenario(argv=None):
+    argv = sys.argv if argv is None else argv
     res = 1
     # execute scenario
     try:
-        data = read_yaml(sys.argv[1])
+        data = read_yaml(argv[1])
         config = ScenarioConfiguration(data)
-        cmd_args = bootstrap.parse_cmd_args(sys.argv[2:])
+        cmd_args = bootstrap.parse_cmd_args(argv[2:])
         config.add_cmd_args(cmd_args[1], True)
         bootstrap.set_debug_values(cmd_args[1])
         if "composite-scenario-name" in config:
@@ -673,6 +681,10 @@ def download_release_scenario():
     return res
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = download_release_scenario
+
+
 if __name__ == "__main__":
     bootstrap.main(download_release_scenario,
                    os.path.basename(__file__)[0:-3])
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# coding: utf-8
+import sys
+import json
+
+
+from lib.common import bootstrap
+from lib.common import duration_analytics
+from lib.common import log_index
+from lib.common.errors import *
+from lib.common.logger import *
+
+
+## Default folder of logs (see bootstrap.main()).
+DEFAULT_LOG_FOLDER = "script_logs"
+
+
+## Print duration statistics (percentiles, trend and regressions) of
+#  scenarios and steps, collected from log files.
+#  Usage: duration_report.py [folder...] [--since=30d|2016-10-17]
+#  [--until=...] [--scenario=name] [--step=name] [--window=N]
+#  [--threshold=1.2] [--regressions] [--format=table|json]
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
+# @return Result code.
+def duration_report_main(argv=None):
+    argv = sys.argv if argv is None else argv
+    try:
+        cmd_args = bootstrap.parse_cmd_args(argv[1:])
+        folders = [str(folder) for folder in cmd_args[0]] \
+            or [DEFAULT_LOG_FOLDER]
+        named_args = cmd_args[1]
+        output_format = named_args.get("format", "table")
+        if output_format not in ["table", "json"]:
+            raise AutomationLibraryError("ARGS_ERROR", "unknown format",
+                                         format=output_format,
+                                         valid_values=["table", "json"])
+        try:
+            since, until = [
+                log_index.parse_time(named_args[key])
+                if key in named_args else None
+                for key in ["since", "until"]
+            ]
+            window = int(named_args.get("window",
+                                        duration_analytics.DEFAULT_WINDOW))
+            threshold = float(named_args.get(
+                "threshold", duration_analytics.DEFAULT_THRESHOLD
+            ))
+        except ValueError as err:
+            raise AutomationLibraryError("ARGS_ERROR", str(err))
+        table = duration_analytics.DurationTable()
+        for folder in folders:
+            if not os.path.isdir(folder):
+                raise AutomationLibraryError("ARGS_ERROR", "folder not found",
+                                             folder=folder)
+            table.load_logs(folder, since, until)
+        stats = [
+            item for item in table.stats(window, threshold)
+            if ("scenario" not in named_args
+                or item["scenario"] == str(named_args["scenario"]))
+            and ("step" not in named_args
+                 or item["step"] == str(named_args["step"]))
+            and (not named_args.get("regressions", False)
+                 or item["regression"])
+        ]
+        if output_format == "json":
+            print(json.dumps(stats, indent=2))
+        else:
+            print(duration_analytics.format_table(stats))
+    except AutomationLibraryError as err:
+        global_logger.error(str(err), state="error")
+        return err.num_code
+    except Exception as err:
+        err = AutomationLibraryError("UNKNOWN", err)
+        global_logger.error(str(err), state="error")
+        return err.num_code
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(duration_report_main())
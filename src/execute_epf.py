@@ -12,6 +12,21 @@ from lib.utils.cmd import *
 
 
 class ExecuteEpfScenario:
+    ## Schema of parameters.
+    SCHEMA = ConfigSchema([
+        ["test-mode", bool],
+        ["try-count", int],
+        # ["timeout", int],
+        # ["time-limit", int],
+        ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
+        ["lang", str, str, gv.LANGS],
+        ["epf-path", StrPathExpanded],
+        ["client-path", StrPathExpanded],
+        ["srvr", str],
+        ["ib", str],
+        ["command", str],
+    ])
+
     ## Constructor.
     # @param self Pointer to object.
     # @param config lib::common::config::Configuration object.
@@ -40,20 +55,7 @@ class ExecuteEpfScenario:
     # @exception AutomationLibraryError("OLD_VERSION_DOESNT_MATCH")
     # @exception AutomationLibraryError("OPTION_NOT_FOUND")
     def validate_config(self):
-        validate_data = [
-            ["test-mode", bool],
-            ["try-count", int],
-            # ["timeout", int],
-            # ["time-limit", int],
-            ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
-            ["lang", str, str, gv.LANGS],
-            ["epf-path", StrPathExpanded],
-            ["client-path", StrPathExpanded],
-            ["srvr", str],
-            ["ib", str],
-            ["command", str],
-        ]
-        self.config.validate(validate_data)
+        self.config.validate(self.SCHEMA)
         # check, is .epf exists and we allowed to read it
         try_open_file(self.config["epf-path"])
         # check, is 1cv8c exists
@@ -94,14 +96,16 @@ class ExecuteEpfScenario:
 
 
 ## Wrapper for scenario execution.
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
 # @return Last error code (0 if no errors occurred).
-def execute_epf_scenario():
+def execute_epf_scenario(argv=None):
+    argv = sys.argv if argv is None else argv
     res = 1
     # execute scenario
     try:
-        data = read_yaml(sys.argv[1])
+        data = read_yaml(argv[1])
         config = ScenarioConfiguration(data)
-        cmd_args = bootstrap.parse_cmd_args(sys.argv[2:])
+        cmd_args = bootstrap.parse_cmd_args(argv[2:])
         config.add_cmd_args(cmd_args[1], True)
         bootstrap.set_debug_values(cmd_args[1])
         if "composite-scenario-name" in config:
@@ -164,6 +168,10 @@ def execute_epf_scenario():
     return res
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = execute_epf_scenario
+
+
 if __name__ == "__main__":
     bootstrap.main(execute_epf_scenario,
                    os.path.basename(__file__)[0:-3])
@@ -1,19 +1,36 @@
-import yaml
+import csv
+import functools
+import json
 import subprocess as sp
 import sys
 import os
 import time
-from functools import reduce
+import itertools
+import queue
+import selectors
+import socket
+from datetime import datetime
 
 
 from lib.common import bootstrap
+from lib.common.duration_history import DurationHistory, scenario_digest, \
+    order_longest_first
 from lib.common.errors import *
 from lib.common.logger import *
 from lib.utils import *
 from lib.utils.cmd import run_cmd
+from lib.utils import zygote
+from lib.utils import reaper
 from lib.common import global_vars as gv
 
 
+## Number of data sets, which are read ahead and started
+#  longest-expected-first, when number of concurrent agents is limited.
+SCHEDULE_WINDOW = 1000
+## Mode, under which durations of agents are recorded in duration history.
+HISTORY_MODE = "agent"
+
+
 class GroupRunConfiguration:
     ## Constructor
     # @param self Pointer to object.
@@ -31,92 +48,540 @@ class GroupRunConfiguration:
         self.try_count = data["try-count"]
         self.timeout = data["timeout"]
         self.time_limit = data["time-limit"]
+        # maximum number of concurrently running agents, 0 means unlimited
+        self.max_parallel = data["max-parallel"] \
+                            if "max-parallel" in data else 0
+        # rolling waves: size of wave (0 means single wave with all data
+        # sets) and size of canary wave, executed before other ones (0 means
+        # no canary wave)
+        self.batch_size = data["batch-size"] if "batch-size" in data else 0
+        self.canary = data["canary"] if "canary" in data else 0
+        # failure budget: launching of new agents stops, when number of
+        # failed data sets exceeds max-failures or max-failure-percent of all
+        # data sets. None means unlimited.
+        self.max_failures = data["max-failures"] \
+                            if "max-failures" in data else None
+        self.max_failure_percent = data["max-failure-percent"] \
+                                   if "max-failure-percent" in data else None
         # parse and set metadata
         self.defaults = data["scenario-meta-data"]["defaults"]
-        # set data sets
+        # set source of data sets: list, matrix or inventory file. Data sets
+        # are generated lazily by iter_data_sets()
         self.data_sets = data["scenario-data-sets"]
+        self.config_folder = os.path.dirname(os.path.abspath(config_path))
+        self._check_data_sets_source()
         # if parsed_args passed, extract necessary values from there, if they
         # supplied
-        for arg in parsed_args:
-            if arg[0][0] == "test-mode":
-                self.test_mode = arg[1]
-            if arg[0][0] == "timeout":
-                self.timeout = arg[1]
-            if arg[0][0] == "try-count":
-                self.try_count = arg[1]
-            if arg[0][0] == "time-limit":
-                self.time_limit = arg[1]
+        named_args = parsed_args[1] if parsed_args is not None else {}
+        if "test-mode" in named_args:
+            self.test_mode = named_args["test-mode"]
+        if "timeout" in named_args:
+            self.timeout = named_args["timeout"]
+        if "try-count" in named_args:
+            self.try_count = named_args["try-count"]
+        if "time-limit" in named_args:
+            self.time_limit = named_args["time-limit"]
+        for key in ("max-parallel", "batch-size", "canary", "max-failures",
+                    "max-failure-percent"):
+            attr = key.replace("-", "_")
+            if key in named_args:
+                setattr(self, attr, named_args[key])
+            value = getattr(self, attr)
+            if key.startswith("max-failure") and value is None:
+                continue
+            types = (int, float) if key == "max-failure-percent" else int
+            if isinstance(value, bool) or not isinstance(value, types) \
+               or value < 0:
+                raise AutomationLibraryError(
+                    "CONFIG_ERROR", "{} should be zero or positive "
+                    "number".format(key), **{attr: value}
+                )
+        if self.max_failure_percent is not None \
+           and self.max_failure_percent > 100:
+            raise AutomationLibraryError(
+                "CONFIG_ERROR", "max-failure-percent should be not greater "
+                "than 100", max_failure_percent=self.max_failure_percent
+            )
         # set also global_vars
         gv.CONFIG["timeout"] = self.timeout
         gv.CONFIG["time-limit"] = self.time_limit
         gv.CONFIG["try-count"] = self.try_count
         gv.TEST_MODE = self.test_mode
-        # set debug and time limit constants
-        for data_set in self.data_sets:
-            data_set["timeout"] = self.timeout
-            data_set["time-limit"] = self.time_limit
-            data_set["try-count"] = self.try_count
-            data_set["print-begin"] = gv.PRINT_BEGIN
-            data_set["print-uuid"] = gv.PRINT_UUID
-            data_set["print-function"] = gv.PRINT_FUNCTION
-            data_set["debug"] = gv.DEBUG
-            data_set["collapse-traceback"] = gv.COLLAPSE_TRACEBACK
-        # set defaults in data_sets
-        for key, value in self.defaults.items():
-            for data_set in self.data_sets:
-                if key not in data_set:
-                    data_set[key] = value
-        global_logger.debug(message="Data sets",data_sets=self.data_sets)
-
-    ## Get list of generated lists of args for agent.py
-    # @param self Pointer to object.
-    # @return List of lists with args (each list is same format as for
+        # debug and time limit constants, which override values of data sets
+        self.constants = {
+            "timeout": self.timeout,
+            "time-limit": self.time_limit,
+            "try-count": self.try_count,
+            "print-begin": gv.PRINT_BEGIN,
+            "print-uuid": gv.PRINT_UUID,
+            "print-function": gv.PRINT_FUNCTION,
+            "debug": gv.DEBUG,
+            "collapse-traceback": gv.COLLAPSE_TRACEBACK,
+        }
+
+    ## Check, that scenario-data-sets is list of data sets, matrix (dictionary
+    #  with "matrix" key, which maps names of parameters to lists of values)
+    #  or inventory (dictionary with "inventory" key, which contains path to
+    #  CSV or JSONL file, relative to configuration file).
+    # @param self Pointer to object.
+    # @exception AutomationLibraryError("CONFIG_ERROR") Source is invalid.
+    def _check_data_sets_source(self):
+        source = self.data_sets
+        if isinstance(source, list):
+            return
+        if isinstance(source, dict) and "matrix" in source \
+           and isinstance(source["matrix"], dict) \
+           and all(isinstance(values, list)
+                   for values in source["matrix"].values()):
+            return
+        if isinstance(source, dict) and "inventory" in source:
+            if self._get_inventory_format() in ("csv", "jsonl"):
+                return
+            raise AutomationLibraryError(
+                "CONFIG_ERROR", "inventory should be CSV or JSONL file",
+                inventory=source["inventory"]
+            )
+        raise AutomationLibraryError(
+            "CONFIG_ERROR", "scenario-data-sets should be list, matrix or "
+            "inventory"
+        )
+
+    ## Get path to inventory file.
+    # @param self Pointer to object.
+    # @return Path.
+    def _get_inventory_path(self):
+        return os.path.join(self.config_folder, self.data_sets["inventory"])
+
+    ## Get format of inventory file: value of "format" key or extension of
+    #  file.
+    # @param self Pointer to object.
+    # @return "csv", "jsonl" or other string, if format is not supported.
+    def _get_inventory_format(self):
+        if "format" in self.data_sets:
+            return str(self.data_sets["format"]).lower()
+        return os.path.splitext(self.data_sets["inventory"])[1][1:].lower()
+
+    ## Read inventory file incrementally.
+    # @param self Pointer to object.
+    # @return Generator of data sets. Empty CSV cells are skipped, so
+    #  defaults are used for them.
+    def _read_inventory(self):
+        path = self._get_inventory_path()
+        with open_file(path) as f:
+            if self._get_inventory_format() == "csv":
+                for row in csv.DictReader(f):
+                    yield {key: value for key, value in row.items()
+                           if key is not None and value not in (None, "")}
+                return
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data_set = json.loads(line)
+                except ValueError as err:
+                    raise AutomationLibraryError(
+                        "CONFIG_ERROR", "invalid JSON in inventory",
+                        path=path, line=number, error=str(err)
+                    )
+                if not isinstance(data_set, dict):
+                    raise AutomationLibraryError(
+                        "CONFIG_ERROR", "data set should be JSON object",
+                        path=path, line=number
+                    )
+                yield data_set
+
+    ## Get raw data sets (without defaults and constants).
+    # @param self Pointer to object.
+    # @return Generator of dictionaries.
+    def iter_data_sets(self):
+        source = self.data_sets
+        if isinstance(source, list):
+            yield from source
+        elif "matrix" in source:
+            keys = list(source["matrix"].keys())
+            for values in itertools.product(*source["matrix"].values()):
+                yield dict(zip(keys, values))
+        else:
+            yield from self._read_inventory()
+
+    ## Get number of data sets. Inventory file is read for this.
+    # @param self Pointer to object.
+    # @return Number of data sets.
+    def count_data_sets(self):
+        source = self.data_sets
+        if isinstance(source, list):
+            return len(source)
+        if "matrix" in source:
+            return functools.reduce(
+                lambda x, y: x * len(y), source["matrix"].values(), 1
+            )
+        return sum(1 for _ in self._read_inventory())
+
+    ## Get lists of args for agent.py. Data sets are generated and completed
+    #  with defaults and constants lazily, when next command is requested.
+    # @param self Pointer to object.
+    # @return Generator of lists with args (each list is same format as for
     #  subprocess.Popen)
     def get_agent_commands(self):
-        result = list()
-        for data_set in self.data_sets:
-            result.append(
-                [self.python, self.agent_path, self.command] + \
-                ["--{}={}".format(key, value) for key, value in \
-                 data_set.items()]
+        for data_set in self.iter_data_sets():
+            data_set = dict(data_set)
+            data_set.update(self.constants)
+            for key, value in self.defaults.items():
+                data_set.setdefault(key, value)
+            global_logger.debug(message="Data set", data_set=data_set)
+            yield [self.python, self.agent_path, self.command] + \
+                  ["--{}={}".format(key, value) for key, value in \
+                   data_set.items()]
+
+    ## Get failure budget of run.
+    # @param self Pointer to object.
+    # @return Maximum number of failed data sets, which doesn't stop run, or
+    #  None, if number of failures is unlimited. If both max-failures and
+    #  max-failure-percent are set, the smaller budget is used.
+    def get_failure_budget(self):
+        budgets = []
+        if self.max_failures is not None:
+            budgets.append(self.max_failures)
+        if self.max_failure_percent is not None:
+            budgets.append(
+                int(self.count_data_sets() * self.max_failure_percent // 100)
             )
-        return result
+        return min(budgets) if budgets else None
 
 
-## Constructor for "!join" tag in YAML. For parameters explanation see the
-#  PyYAML documentation.
-# @param loader
-# @param node
-# @return builded node.
-def join(loader, node):
-    seq = loader.construct_sequence(node)
-    return ''.join([str(i) for i in seq])
+## Get key of agent's run in duration history.
+# @param args Command line of agent.
+# @return Tuple (command, digest of data set).
+def get_task_key(args):
+    return args[2], scenario_digest(args[3:])
 
 
-## Constructor for "!getvalue" tag in YAML. For parameters explanation see the
-#  PyYAML documentation.
-# @param loader
-# @param node
-# @return builded node.
-def getvalue(loader, node):
-    seq = loader.construct_sequence(node)
-    var = seq[0]
-    for key in seq[1:]:
-        var = var[key]
-    return var
+## Order commands longest-expected-first. Commands are read by chunks of
+#  SCHEDULE_WINDOW, so data sets are still generated lazily.
+# @param commands Iterable of tuples (index of data set, command line of
+#  agent).
+# @param history DurationHistory object.
+# @return Generator of tuples (index of data set, command line of agent).
+def order_commands(commands, history):
+    def estimate(item):
+        return history.estimate(*get_task_key(item[1]), HISTORY_MODE)
 
+    commands = iter(commands)
+    while True:
+        chunk = list(itertools.islice(commands, SCHEDULE_WINDOW))
+        if not chunk:
+            return
+        yield from order_longest_first(chunk, estimate)
 
-# add custom constructors to YAML loader
-yaml.add_constructor('!join', join)
-yaml.add_constructor('!getvalue', getvalue)
+
+## Kill process and its children.
+# @param pid PID of process.
+def kill_process_tree(pid):
+    if detect_actual_os_type() == "Windows":
+        from lib.win_utils import kill_process_tree as f
+    else:
+        from lib.linux_utils import kill_process_tree as f
+    f(pid)
 
 
-## Check, is subprocess.Popen process finished.
-# @param process subprocess.Popen object.
-# @return True if finished, False otherwise.
-def check_process_finished(process):
-            process.poll()
-            return process.returncode is not None
+## Class, which represents agent, started by AgentPool.
+class AgentTask:
+
+    ## Constructor. Starts agent.
+    # @param self Pointer to object.
+    # @param index Index of data set.
+    # @param args Command line of agent.
+    # @param log_path Path to log file, where agent's output is written.
+    def __init__(self, index, args, log_path):
+        self.index = index
+        self.log_path = log_path
+        self.start = time.monotonic()
+        self.log = open(log_path, "wb")
+        self.proc = zygote.popen_script(args, stdout=sp.PIPE, stderr=sp.PIPE)
+        # not finished lines of output streams
+        self.partial = {"stdout": b"", "stderr": b""}
+        self.streams = {}
+        for name in ("stdout", "stderr"):
+            stream = getattr(self.proc, name)
+            os.set_blocking(stream.fileno(), False)
+            self.streams[stream.fileno()] = (name, stream)
+
+    ## Write chunk of output to log file and tag its complete lines in group
+    #  log.
+    # @param self Pointer to object.
+    # @param name Name of stream.
+    # @param data Chunk of output. Empty chunk flushes not finished line.
+    def write_output(self, name, data):
+        self.log.write(data)
+        lines = (self.partial[name] + data).split(b"\n")
+        if data:
+            self.partial[name] = lines.pop()
+        else:
+            self.partial[name] = b""
+        for line in lines:
+            if line:
+                global_logger.info(
+                    message="task output", data_set=self.index, stream=name,
+                    line=line.decode("utf-8", errors="replace").rstrip("\r")
+                )
+
+    ## Close output streams and log file.
+    # @param self Pointer to object.
+    def close(self):
+        for name, stream in self.streams.values():
+            stream.close()
+        self.streams = {}
+        self.log.close()
+
+
+## Class, which runs agents with bounded concurrency. Output of all agents is
+#  drained concurrently in one thread through selectors, written to log files
+#  of data sets and tagged in group log. Exits of agents are reported by
+#  process reaper, so next agent is started immediately.
+class AgentPool:
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param commands Iterable of tuples (index of data set, command line of
+    #  agent). It is consumed lazily, when free slot appears.
+    # @param max_parallel Maximum number of concurrently running agents, 0
+    #  means unlimited.
+    # @param logs_folder Folder, where log files of data sets are created.
+    # @param max_failures Maximum number of failed agents. When it is
+    #  exceeded, new agents are not started, but running ones are waited for.
+    #  None means unlimited.
+    # @param history DurationHistory object, where durations of successful
+    #  agents are recorded, or None.
+    def __init__(self, commands, max_parallel, logs_folder,
+                 max_failures=None, history=None):
+        self.commands = iter(commands)
+        self.max_parallel = max_parallel
+        self.logs_folder = logs_folder
+        self.max_failures = max_failures
+        self.history = history
+        self.results = {}
+        self.failures = 0
+        self.budget_exceeded = False
+        self.timed_out = False
+        self._running = {}
+        self._exited = queue.SimpleQueue()
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    ## Start next agent.
+    # @param self Pointer to object.
+    # @param index Index of data set.
+    # @param args Command line of agent.
+    def _start(self, index, args):
+        task = AgentTask(index, args, os.path.join(
+            self.logs_folder, "data_set_{}.log".format(index)
+        ))
+        global_logger.info(message="task started", data_set=index,
+                           task_pid=task.proc.pid, log=task.log_path)
+        self._running[index] = task
+        for fd in task.streams:
+            self._selector.register(fd, selectors.EVENT_READ, task)
+        future = reaper.get_reaper().watch(task.proc)
+        future.add_done_callback(lambda future: self._on_exit(task))
+
+    ## Handle agent's exit. Called from reaper thread.
+    # @param self Pointer to object.
+    # @param task AgentTask object.
+    def _on_exit(self, task):
+        self._exited.put(task)
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    ## Read available output of agent.
+    # @param self Pointer to object.
+    # @param task AgentTask object.
+    # @param fd File descriptor of output stream.
+    def _read(self, task, fd):
+        name = task.streams[fd][0]
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except BlockingIOError:
+                return
+            if not data:
+                self._selector.unregister(fd)
+                task.write_output(name, b"")
+                return
+            task.write_output(name, data)
+
+    ## Drain rest of output of exited agent and store its result. Output
+    #  streams are not waited for EOF, because agent's children can keep them
+    #  open.
+    # @param self Pointer to object.
+    # @param task AgentTask object.
+    def _finish(self, task):
+        for fd, (name, stream) in task.streams.items():
+            if fd in self._selector.get_map():
+                self._read(task, fd)
+                if fd in self._selector.get_map():
+                    self._selector.unregister(fd)
+                    task.write_output(name, b"")
+        task.close()
+        del self._running[task.index]
+        self.results[task.index] = task.proc.returncode
+        if task.proc.returncode == 0 and self.history is not None:
+            self.history.record(*get_task_key(task.proc.args), HISTORY_MODE,
+                                time.monotonic() - task.start)
+        if task.proc.returncode != 0:
+            self.failures += 1
+            if self.max_failures is not None \
+               and self.failures > self.max_failures \
+               and not self.budget_exceeded:
+                self.budget_exceeded = True
+                global_logger.warning(
+                    message="Failure budget exceeded, new tasks are not "
+                    "started", failures=self.failures,
+                    max_failures=self.max_failures
+                )
+        global_logger.info(message="task result", data_set=task.index,
+                           task_pid=task.proc.pid,
+                           returncode=task.proc.returncode,
+                           args=task.proc.args)
+
+    ## Run agents.
+    # @param self Pointer to object.
+    # @param timeout Time in seconds, after which running agents are killed
+    #  and not started ones are skipped.
+    # @return Dictionary, which maps index of data set to return code of its
+    #  agent.
+    def run(self, timeout):
+        deadline = time.monotonic() + timeout
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and not self.budget_exceeded \
+                      and (not self.max_parallel or
+                           len(self._running) < self.max_parallel):
+                    try:
+                        index, args = next(self.commands)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    self._start(index, args)
+                if (exhausted or self.budget_exceeded) \
+                   and not self._running:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timed_out = True
+                    break
+                for key, events in self._selector.select(remaining):
+                    if key.data is None:
+                        try:
+                            while self._wake_r.recv(4096):
+                                pass
+                        except OSError:
+                            pass
+                    else:
+                        self._read(key.data, key.fd)
+                while not self._exited.empty():
+                    self._finish(self._exited.get())
+        finally:
+            # kill agents, which are still running, and all their children
+            for task in list(self._running.values()):
+                kill_process_tree(task.proc.pid)
+                try:
+                    task.proc.wait(1)
+                except sp.TimeoutExpired:
+                    pass
+                self._finish(task)
+            self._selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
+        return self.results
+
+
+## Class, which runs data sets in rolling waves. Optional canary wave is run
+#  first and any failure in it stops run. Other waves contain batch-size data
+#  sets each and are started one after another, when all agents of previous
+#  wave finished. Failures of all waves are counted against failure budget:
+#  when it is exceeded, new agents are not started, running ones are waited
+#  for and queued data sets are cancelled.
+class RollingRun:
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param cfg GroupRunConfiguration object.
+    # @param logs_folder Folder, where log files of data sets are created.
+    # @param history DurationHistory object or None. If it is set, durations
+    #  of agents are recorded and, when max-parallel limits number of agents,
+    #  data sets of every wave except canary are started
+    #  longest-expected-first.
+    def __init__(self, cfg, logs_folder, history=None):
+        self.cfg = cfg
+        self.logs_folder = logs_folder
+        self.history = history
+        self.results = {}
+        self.cancelled = []
+        self.failures = 0
+        self.budget_exceeded = False
+        self.timed_out = False
+
+    ## Get sizes of waves.
+    # @param self Pointer to object.
+    # @return Generator of tuples (name of wave, size of wave or None, if wave
+    #  contains all remaining data sets, failure budget of wave or None).
+    def _waves(self):
+        budget = self.cfg.get_failure_budget()
+        if self.cfg.canary:
+            yield "canary", self.cfg.canary, 0
+        number = 1
+        while True:
+            wave_budget = None if budget is None \
+                          else max(budget - self.failures, 0)
+            yield str(number), self.cfg.batch_size or None, wave_budget
+            number += 1
+
+    ## Run waves.
+    # @param self Pointer to object.
+    # @return Dictionary, which maps index of data set to return code of its
+    #  agent. Cancelled data sets are not included.
+    def run(self):
+        deadline = time.monotonic() + self.cfg.timeout
+        commands = enumerate(self.cfg.get_agent_commands())
+        for name, size, budget in self._waves():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timed_out = True
+                break
+            wave_commands = itertools.islice(commands, size)
+            # canary wave contains first data sets, so it is not reordered
+            if self.history is not None and self.cfg.max_parallel \
+               and name != "canary":
+                wave_commands = order_commands(wave_commands, self.history)
+            pool = AgentPool(wave_commands, self.cfg.max_parallel,
+                             self.logs_folder, budget, self.history)
+            global_logger.info(message="wave started", wave=name,
+                               max_failures=budget)
+            results = pool.run(remaining)
+            # no data sets left
+            if not results and not pool.timed_out:
+                break
+            self.results.update(results)
+            self.failures += pool.failures
+            global_logger.info(message="wave finished", wave=name,
+                               tasks=len(results), failures=pool.failures)
+            if pool.timed_out:
+                self.timed_out = True
+                break
+            if pool.budget_exceeded:
+                self.budget_exceeded = True
+                break
+        # data sets, which were not started, are cancelled
+        for index, args in commands:
+            self.cancelled.append(index)
+            global_logger.info(message="task cancelled", data_set=index)
+        return self.results
 
 
 ## Run group task.
@@ -125,41 +590,37 @@ def run_group():
     res = 1
     try:
         # create configuration object
-        cfg = GroupRunConfiguration(sys.argv[1], bootstrap.parse_cmd_args())
-        # processes pool
-        proc_pool = list()
-        # fill processes pool
-        for cmd_args in cfg.get_agent_commands():
-            proc_pool.append(sp.Popen(cmd_args, stdout=sp.PIPE, stderr=sp.PIPE))
-        # wait until all processes finished
-        step = 3
-        counter = 0
-        while (not reduce(lambda x, y: x and check_process_finished(y),
-                         proc_pool, True)) and counter < cfg.timeout:
-            time.sleep(step)
-            counter += step
-        # print result
-        results = list()
-        for proc in proc_pool:
-            # try to communicate with process, and if fails, kill process
-            # and all its children
-            try:
-                stdout, stderr = proc.communicate(timeout=1)
-            except sp.TimeoutExpired:
-                if detect_actual_os_type() == "Windows":
-                    from lib.win_utils import kill_process_tree
-                else:
-                    from lib.linux_utils import kill_process_tree
-                kill_process_tree(proc.pid)
-                # stdout, stderr = proc.communicate()
-            global_logger.info(message="task result", task_pid=proc.pid,
-                               returncode=proc.returncode, args=proc.args)
-            results.append(proc.returncode)
-        # if counter exceeded timeout, raise an error
-        if counter >= cfg.timeout:
+        parsed_args = bootstrap.parse_cmd_args()
+        cfg = GroupRunConfiguration(sys.argv[1], parsed_args)
+        # agents are forked from zygote, unless disabled
+        zygote.USE_ZYGOTE = not ("disable-zygote" in parsed_args[1]
+                                 and parsed_args[1]["disable-zygote"])
+        # output of each data set is written to its own log file
+        logs_folder = os.path.join(
+            gv.PID_PATH, "script_logs", "group_run_{}_{}".format(
+                datetime.now().strftime("%y%m%d_%H%M%S"), os.getpid()
+            )
+        )
+        os.makedirs(logs_folder, exist_ok=True)
+        history = None
+        if not ("disable-duration-history" in parsed_args[1]
+                and parsed_args[1]["disable-duration-history"]):
+            history = DurationHistory()
+        rolling_run = RollingRun(cfg, logs_folder, history)
+        results = rolling_run.run()
+        # if timeout exceeded, raise an error
+        if rolling_run.timed_out:
             raise AutomationLibraryError("TIMEOUT_ERROR")
+        # if failure budget exceeded, raise an error
+        if rolling_run.budget_exceeded:
+            raise AutomationLibraryError(
+                "CMD_RESULT_ERROR",
+                additional_message="failure budget exceeded, {} data sets "
+                "failed, {} cancelled".format(rolling_run.failures,
+                                              len(rolling_run.cancelled))
+            )
         # if result contain non-zero code, raise an error
-        if set(results) != set([0]):
+        if set(results.values()) - set([0]):
             raise AutomationLibraryError(
                 "CMD_RESULT_ERROR",
                 additional_message="one of the tasks returned non-zero code"
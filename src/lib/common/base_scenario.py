@@ -12,6 +12,14 @@ from .config import *
 
 
 class BaseScenario:
+    ## Schema of parameters, common for all scenarios.
+    COMMON_SCHEMA = ConfigSchema([
+        ["test-mode", bool],
+        ["time-limit", int],
+        ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
+        ["standalone", bool],
+    ])
+
     # these methods should not be redefined in inherited classes without
     # strong reason
 
@@ -39,15 +47,7 @@ class BaseScenario:
     # @param self Pointer to object.
     # @exception AutomationLibraryError("OPTION_NOT_FOUND")
     def validate_config(self):
-        # first piece of data
-        validate_data = [
-            # common parameters
-            ["test-mode", bool],
-            ["time-limit", int],
-            ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
-            ["standalone", bool],
-        ]
-        self.config.validate(validate_data)
+        self.config.validate(self.COMMON_SCHEMA)
         self._validate_specific_data()
 
     ## Execute tests.
@@ -83,13 +83,16 @@ class BaseScenario:
     ## Wrapper, which handles configuration creation, creation of current class
     #  object and execution it main execute method.
     # @param Cls Scenario class.
-    def execute_wrapper(Cls):
+    # @param argv Command line arguments (like sys.argv). If None, sys.argv
+    #  used.
+    def execute_wrapper(Cls, argv=None):
+        argv = sys.argv if argv is None else argv
         res = 1
         # execute scenario
         try:
-            data = read_yaml(sys.argv[1])
+            data = read_yaml(argv[1])
             config = ScenarioConfiguration(data)
-            cmd_args = bootstrap.parse_cmd_args(sys.argv[2:])
+            cmd_args = bootstrap.parse_cmd_args(argv[2:])
             config.add_cmd_args(cmd_args[1], True)
             if "composite-scenario-name" in config:
                 global_logger.info(
@@ -1,16 +1,20 @@
 # coding: utf-8
 
 import re
-
-from .logger import *
+import sys
 
 # Compare current version of Python interpreter against minimal required
-if sys.version_info < (3, 4, 3):
+# (asyncio.run(), contextvars, queue.SimpleQueue, os.register_at_fork() and
+# time.perf_counter_ns() are used). It is checked before logger is imported,
+# because logger already uses them
+if sys.version_info < (3, 7):
     raise Exception(
         "Incompatible version of Python interpreter. "
-        "Minimum required version: 3.4.3"
+        "Minimum required version: 3.7"
     )
 
+from .logger import *
+
 import threading
 import datetime
 import platform
@@ -68,6 +72,7 @@ def detect_console_encoding():
 
 from .logger import *
 from .errors import *
+from . import tracing
 from ..utils.cvt import str_to_bool
 
 
@@ -77,9 +82,18 @@ gv.ENCODING = detect_console_encoding()
 
 ## Default function for second argument in parse_cmd_args.
 def set_debug_values(args):
+    if "log-format" in args and args["log-format"] not in LOG_FORMATS:
+        raise AutomationLibraryError("ARGS_ERROR", "unknown log format",
+                                     current_value=args["log-format"],
+                                     valid_values=LOG_FORMATS)
+    # debug values, environment and trace context are process-wide, so
+    # in-process scenario keeps values of composite runner, which executes it
+    if gv.is_scenario_state_bound():
+        return
     for key, value in args.items():
         if key.lower() in ["debug", "collapse-traceback", "print-begin",
-                              "print-uuid", "print-function", "escape-strings"]:
+                              "print-uuid", "print-function", "escape-strings",
+                              "log-value-limit", "trace"]:
             try:
                 setattr(gv, key.upper().replace("-", "_"),
                         value)
@@ -87,6 +101,13 @@ def set_debug_values(args):
                 raise AutomationLibraryError("ARGS_ERROR",
                                              "This arg should be True or False",
                                              key=key, current_value=value)
+    if "log-format" in args:
+        gv.LOG_FORMAT = args["log-format"]
+        # python processes, started by this one, write logs in the same format
+        os.environ[LOG_FORMAT_ENV] = gv.LOG_FORMAT
+    # spans of scenario are written to trace of composite runner
+    if "traceparent" in args:
+        tracing.start_trace(args["traceparent"])
 
 
 ## Parse input command line arguments (from sys.argv) an return tuple with
@@ -150,6 +171,62 @@ def get_log_filename(script_name, pid, log_folder, timestamp=None):
         )
 
 
+## Get result code of scenario, which called sys.exit().
+#
+# @param err SystemExit object.
+# @return Integer code: code of SystemExit, 0 if it is None, or code of
+#  UNKNOWN error if it is not integer (error is logged).
+def get_exit_code(err):
+    if err.code is None:
+        return 0
+    if isinstance(err.code, int):
+        return err.code
+    err = AutomationLibraryError("UNKNOWN", err)
+    global_logger.error(
+        str(err), state="error",
+    )
+    return err.num_code
+
+
+## Execute scenario in current thread of current process, for example as a
+#  step of composite scenario. Unlike main(), it doesn't create PID file and
+#  log file, doesn't control time-limit and doesn't terminate process. Scenario
+#  state (global_vars.TEST_MODE and global_vars.CONFIG) is bound to current
+#  thread for the time of execution, so few scenarios can be executed
+#  concurrently.
+#
+# @param func Function, which represent scenario. It should accept list of
+#  command line arguments (like sys.argv) and return integer code.
+# @param script_name Name of script, used in log records.
+# @param argv Command line arguments for scenario.
+# @return Integer code of scenario.
+def execute_in_process(func, script_name, argv):
+    with gv.bind_scenario_state():
+        op_uuid = global_logger.start_operation()
+        try:
+            res = func(argv)
+        except KeyboardInterrupt:
+            raise
+        except SystemExit as err:
+            # scenario called sys.exit(), which shouldn't stop runner
+            res = get_exit_code(err)
+        except BaseException as err:
+            if not isinstance(err, AutomationLibraryError):
+                err = AutomationLibraryError("UNKNOWN", err)
+            global_logger.error(
+                str(err), state="error",
+            )
+            res = err.num_code
+        _time = global_logger.finish_operation(op_uuid)
+        global_logger.info(
+            message="Scenario execution finished",
+            duration=int(_time.microseconds * 10**-3 + _time.seconds * 10**3),
+            scenario_name=script_name,
+            code=res
+        )
+    return res
+
+
 ## Execute scenario.
 #
 # @param func Function, which represent scenario.
@@ -199,7 +276,8 @@ def main(func, script_name, script_args=(), script_kwargs={}):
         except:
             global_logger.warning(message="Couldn't remove pid file",
                                   pid_filename=pid_filename)
-        # set return code and exit
+        # set return code and exit, records in queue are lost after _exit()
+        global_logger.flush()
         os._exit(res)
 
     op_uuid = global_logger.start_operation()
@@ -231,6 +309,7 @@ def main(func, script_name, script_args=(), script_kwargs={}):
                            code=err.num_code)
         os.remove(os.path.join(gv.PID_PATH,
                                "AutomationLibrary_{}.pid".format(os.getpid())))
+        global_logger.flush()
         os._exit(err.num_code)
     # setting time-limit
     thread.join(gv.CONFIG["time-limit"])
@@ -249,4 +328,5 @@ def main(func, script_name, script_args=(), script_kwargs={}):
                            code=err.num_code)
         os.remove(os.path.join(gv.PID_PATH,
                                "AutomationLibrary_{}.pid".format(os.getpid())))
+        global_logger.flush()
         os._exit(err.num_code)
@@ -272,13 +272,62 @@ def update_data_with_placeholders(src, dst):
             return dst
 
 
+## Function, which return iterator over complex nested data types with paths
+#  of leaves.
+# @param data Data, over which iterate occurs.
+# @param path Path of data (tuple of keys and indexes).
+# @return Iterator over tuples (path of leaf, value of leaf).
+def iter_leaf_paths(data, path=()):
+    if isinstance(data, dict):
+        iterable = data.items()
+    elif isinstance(data, list):
+        iterable = enumerate(data)
+    else:
+        yield path, data
+        return
+    for key, value in iterable:
+        yield from iter_leaf_paths(value, path + (key, ))
+
+
+## Resolve placeholder by following chain of placeholders in source data,
+#  until value or placeholder, which cannot be resolved further, is found.
+#  Result is the same, as update_data_with_placeholders() gives for leaf.
+# @param src Where should values be taken (source).
+# @param placeholder Placeholder object.
+# @return Value or Placeholder object.
+# @exception AutomationLibraryError("CONFIG_ERROR") Placeholders form a cycle.
+def resolve_placeholder(src, placeholder):
+    value = placeholder
+    chain = [str(value)]
+    while True:
+        # dangle Placeholder objects are allowed
+        try:
+            src_value = get_value_by_path(src, value.key)
+        except Exception:
+            return value
+        new_value = value.type(src_value)
+        try:
+            new_value = Placeholder(new_value)
+        except (TypeError, ValueError):
+            return new_value
+        if new_value == value:
+            return value
+        if str(new_value) in chain:
+            raise AutomationLibraryError(
+                "CONFIG_ERROR", "placeholders form a cycle",
+                chain=" -> ".join(chain + [str(new_value)])
+            )
+        chain.append(str(new_value))
+        value = new_value
+
+
 ## Class, which represent configuration value description. Instances of
 #  this class used in *Scenario.validate_config() methods.
 class ConfigValueType:
     def __init__(self, key_path, type_checker, type_builder=None,
                  valid_values=None, default_allowed=False, default_value=None):
         self.key_path = key_path
-        self.keys = key_path.split("/")
+        self.keys = key_path.strip("/ ").split("/")
         self.type_checker = type_checker
         # if type_builder not provided, assume that type_checker can also act as
         # builder
@@ -287,19 +336,21 @@ class ConfigValueType:
         self.default_value = self.type_builder(default_value) if default_value \
                              else None
         self.valid_values = valid_values
+        # kinds of checkers are resolved once, so validate() only calls them
+        if is_function(type_checker):
+            self._check_type = type_checker
+        else:
+            self._check_type = lambda value: isinstance(value, type_checker)
+        if not valid_values:
+            self._check_value = lambda value: True
+        elif is_function(valid_values):
+            self._check_value = valid_values
+        else:
+            self._check_value = lambda value: value in valid_values
 
     ## Compare type with type_checker and valid_values.
     def validate(self, value):
-        correct_type = self.type_checker(value) if \
-                       is_function(self.type_checker) else \
-                       isinstance(value, self.type_checker)
-        if self.valid_values:
-            if is_function(self.valid_values):
-                return correct_type, self.valid_values(value)
-            else:
-                return correct_type, value in self.valid_values
-        else:
-            return correct_type, True
+        return self._check_type(value), self._check_value(value)
 
     ## Try to convert value via type_builder. If fails, return value.
     def try_convert(self, value):
@@ -318,6 +369,37 @@ class ConfigValueType:
         return self.default_value
 
 
+## Class, which represents compiled list of rows for
+#  ScenarioConfiguration.validate(). Rows are compiled to ConfigValueType
+#  objects once, so schema, stored in class attribute, is compiled once per
+#  scenario class.
+class ConfigSchema:
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param rows Iterable of rows (lists of ConfigValueType constructor
+    #  arguments) or ConfigValueType objects.
+    def __init__(self, rows=()):
+        self.rows = tuple(
+            row if isinstance(row, ConfigValueType) else ConfigValueType(*row)
+            for row in rows
+        )
+
+    ## Build schema, which contains rows of both schemas.
+    # @param self Pointer to object.
+    # @param other ConfigSchema object or list of rows.
+    # @return ConfigSchema object.
+    def __add__(self, other):
+        if not isinstance(other, ConfigSchema):
+            other = ConfigSchema(other)
+        return ConfigSchema(self.rows + other.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
 ## Class, which represent scenario configuration.
 class ScenarioConfiguration:
     def __init__(self, yaml_data):
@@ -356,23 +438,185 @@ class ScenarioConfiguration:
             self.rollback_scenario = None
         self.scenario_context["os-type"] = detect_actual_os_type()
         self.scenario_context["arch"] = 64 if is_64bit_arch() else 32
-
-
-    def update_inner_data(self):
-        # first: update scenario_context itself
-        self.scenario_context = update_data_with_placeholders(
-            self.scenario_context, self.scenario_context
-        )
-        # second: update rollback-scenario, if presented
+        # index of placeholders: placeholders are resolved all at once by
+        # first update_inner_data() call, after that setting of key resolves
+        # only placeholders, which depend on it
+        self._resolved = False
+        self._build_index()
+        # key path -> (ConfigValueType, value), which passed validation, so
+        # overlapping schemas don't check same value twice
+        self._validated = {}
+        # check, that placeholders of scenario context don't form a cycle
+        for location in list(self._placeholders):
+            if location[0] == "context":
+                try:
+                    resolve_placeholder(self.scenario_context,
+                                        self._get_leaf(location))
+                except AutomationLibraryError as err:
+                    if err.str_code == "CONFIG_ERROR":
+                        raise
+                # errors of conversion are raised, when placeholder is
+                # resolved
+                except Exception:
+                    pass
+
+    ## Get roots of data, which contain placeholders.
+    # @param self Pointer to object.
+    # @return Dictionary, which maps name of root to data.
+    def _get_roots(self):
+        roots = {"context": self.scenario_context}
         if isinstance(self.rollback_scenario, dict):
-            self.rollback_scenario = update_data_with_placeholders(
-                self.scenario_context, self.rollback_scenario
-            )
-        # third: update composite scenario data
+            roots["rollback"] = self.rollback_scenario
         if isinstance(self.composite_scenario_data, list):
-            self.composite_scenario_data = update_data_with_placeholders(
-                self.scenario_context, self.composite_scenario_data
-            )
+            roots["composite"] = self.composite_scenario_data
+        return roots
+
+    ## Get container of leaf and key of leaf in it.
+    # @param self Pointer to object.
+    # @param location Tuple (name of root, path of leaf).
+    # @return Tuple (container, key).
+    def _get_leaf_container(self, location):
+        obj = self._get_roots()[location[0]]
+        for key in location[1][:-1]:
+            obj = obj[key]
+        return obj, location[1][-1]
+
+    ## Get value of leaf.
+    # @param self Pointer to object.
+    # @param location Tuple (name of root, path of leaf).
+    # @return Value.
+    def _get_leaf(self, location):
+        obj, key = self._get_leaf_container(location)
+        return obj[key]
+
+    ## Add placeholder to index.
+    # @param self Pointer to object.
+    # @param location Tuple (name of root, path of leaf).
+    # @param placeholder Placeholder object.
+    def _register(self, location, placeholder):
+        self._placeholders[location] = placeholder.key
+        self._dependents.setdefault(placeholder.key.split("/")[0], {}) \
+            .setdefault(placeholder.key, set()).add(location)
+
+    ## Remove placeholder from index.
+    # @param self Pointer to object.
+    # @param location Tuple (name of root, path of leaf).
+    def _unregister(self, location):
+        key = self._placeholders.pop(location, None)
+        if key is None:
+            return
+        bucket = self._dependents[key.split("/")[0]]
+        bucket[key].discard(location)
+        if not bucket[key]:
+            del bucket[key]
+
+    ## Replace strings, which contain placeholders, with Placeholder objects
+    #  in data and add them to index.
+    # @param self Pointer to object.
+    # @param root Name of root.
+    # @param data Data.
+    # @param path Path of data in root.
+    # @return List of locations of added placeholders.
+    def _register_data(self, root, data, path):
+        locations = []
+        for leaf_path, value in iter_leaf_paths(data, path):
+            if isinstance(value, str):
+                try:
+                    value = Placeholder(value)
+                except ValueError:
+                    continue
+                obj, key = self._get_leaf_container((root, leaf_path))
+                obj[key] = value
+            if isinstance(value, Placeholder):
+                self._register((root, leaf_path), value)
+                locations.append((root, leaf_path))
+        return locations
+
+    ## Build index of placeholders: map from placeholder's key to locations of
+    #  leaves, which reference it.
+    # @param self Pointer to object.
+    def _build_index(self):
+        self._placeholders = {}
+        self._dependents = {}
+        for root, data in self._get_roots().items():
+            self._register_data(root, data, ())
+
+    ## Get locations of placeholders, which depend on key.
+    # @param self Pointer to object.
+    # @param key Key path.
+    # @return Set of locations.
+    def _get_dependents(self, key):
+        result = set()
+        for placeholder_key, locations in self._dependents.get(
+                key.split("/")[0], {}).items():
+            if placeholder_key == key \
+               or placeholder_key.startswith(key + "/") \
+               or key.startswith(placeholder_key + "/"):
+                result |= locations
+        return result
+
+    ## Resolve placeholders at locations. Placeholders of scenario context
+    #  are resolved first, and all of them are resolved before any is set,
+    #  so placeholder, which references other placeholder, follows its chain
+    #  (and takes its type), like in update_data_with_placeholders().
+    # @param self Pointer to object.
+    # @param locations Iterable of locations.
+    def _resolve(self, locations):
+        locations = list(locations)
+        for context in [True, False]:
+            # placeholder could be removed by previous changes
+            values = [(location, resolve_placeholder(self.scenario_context,
+                                                     self._get_leaf(location)))
+                      for location in locations
+                      if (location[0] == "context") == context
+                      and location in self._placeholders]
+            for location, value in values:
+                obj, key = self._get_leaf_container(location)
+                obj[key] = value
+                self._unregister(location)
+                if isinstance(value, Placeholder):
+                    self._register(location, value)
+
+    ## Set value in scenario context and update index.
+    # @param self Pointer to object.
+    # @param key Key path.
+    # @param value Value.
+    # @return Set of locations of placeholders, which should be resolved:
+    #  placeholders, which depend on key, and placeholders of value.
+    def _set_value(self, key, value):
+        key = key.strip("/ ")
+        path = tuple(key.split("/"))
+        # remove placeholders of replaced data from index
+        try:
+            old_value = get_value_by_path(self.scenario_context, key)
+        except Exception:
+            pass
+        else:
+            for leaf_path, leaf in iter_leaf_paths(old_value, path):
+                if isinstance(leaf, Placeholder):
+                    self._unregister(("context", leaf_path))
+        set_value_by_path(self.scenario_context, key, value)
+        locations = self._get_dependents(key)
+        locations.update(self._register_data("context", value, path))
+        return locations
+
+    ## Resolve placeholders after changes of scenario context. Before the
+    #  first resolution all placeholders are resolved.
+    # @param self Pointer to object.
+    # @param locations Locations of placeholders, which should be resolved.
+    def _update_dependents(self, locations):
+        if self._resolved:
+            self._resolve(locations)
+        else:
+            self.update_inner_data()
+
+    ## Resolve all placeholders. Index is rebuilt, so this method should be
+    #  called, if data was changed directly.
+    # @param self Pointer to object.
+    def update_inner_data(self):
+        self._build_index()
+        self._resolve(list(self._placeholders))
+        self._resolved = True
 
     def __getitem__(self, key):
         item = get_value_by_path(self.scenario_context, key)
@@ -381,8 +625,7 @@ class ScenarioConfiguration:
         return item
 
     def __setitem__(self, key, value):
-        set_value_by_path(self.scenario_context, key, value)
-        self.update_inner_data()
+        self._update_dependents(self._set_value(key, value))
 
     def __contains__(self, key):
         return check_contains_by_path(self.scenario_context, key)
@@ -393,9 +636,10 @@ class ScenarioConfiguration:
                 if ext_key not in cmd_args.keys():
                     raise AutomationLibraryError("OPTION_NOT_FOUND",
                                                  key=ext_key)
+        locations = set()
         for key, value in cmd_args.items():
-            set_value_by_path(self.scenario_context, key, value)
-        self.update_inner_data()
+            locations |= self._set_value(key, value)
+        self._update_dependents(locations)
 
     def __repr__(self):
         return "Scenario context: {}\nRollback scenario: {}\nComposite scenario: {}\n" \
@@ -405,49 +649,83 @@ class ScenarioConfiguration:
     def __str__(self):
         return "Configuration: {}".format(self.scenario_context)
 
+    ## Validate configuration in one pass: values of incorrect type are
+    #  converted with type_builder, and all errors are collected before
+    #  raising. Rows, which already passed validation for the same value, are
+    #  skipped.
+    # @param self Pointer to object.
+    # @param validate_data ConfigSchema object or list of rows.
+    # @exception AutomationLibraryError("OPTION_NOT_FOUND") Single key not
+    #  found.
+    # @exception AutomationLibraryError("ARGS_ERROR") Single value has
+    #  incorrect type or value, or several errors found (they are listed in
+    #  errors).
     def validate(self, validate_data):
-        # for each row in validate_data perform check
-        for row in validate_data:
-            # first build ConfigValueType
-            obj = ConfigValueType(*row)
-            try:
-                result = obj.validate(self[obj.key_path])
-            # if KeyError, raise an error
-            except KeyError:
-                raise AutomationLibraryError("OPTION_NOT_FOUND",
-                                             key=obj.key_path)
-            # if first value of result is False (ie incorrect type), try to
-            # convert value and perform check again
-            if result[0] == False:
-                self[obj.key_path] = obj.try_convert(self[obj.key_path])
-            result = obj.validate(self[obj.key_path])
-            # if first value of result is False (ie incorrect type), then
-            # raise ARGS_ERROR with about incorrect type
-            if result[0] == False:
-                raise AutomationLibraryError(
-                    "ARGS_ERROR",
-                    "argument have incorrect type",
-                    key=obj.key_path,
-                    current_type=type(self[obj.key_path]).__name__,
-                    expected_type=obj.type_checker.__name__
+        if not isinstance(validate_data, ConfigSchema):
+            validate_data = ConfigSchema(validate_data)
+        errors = []
+        for row in validate_data.rows:
+            error = self._validate_row(row)
+            if error is not None:
+                errors.append(error)
+        if len(errors) == 1:
+            raise errors[0]
+        if errors:
+            raise AutomationLibraryError(
+                "ARGS_ERROR", "configuration has {} errors".format(len(errors)),
+                errors=[
+                    dict(code=err.str_code,
+                         message=err.description.format(*err.args),
+                         **err.kwargs)
+                    for err in errors
+                ]
+            )
+
+    ## Validate value of one row.
+    # @param self Pointer to object.
+    # @param row ConfigValueType object.
+    # @return AutomationLibraryError object or None, if value is correct.
+    def _validate_row(self, row):
+        try:
+            value = get_value_by_path(self.scenario_context, row.keys)
+        except KeyError:
+            return AutomationLibraryError("OPTION_NOT_FOUND", key=row.key_path)
+        if isinstance(value, Placeholder):
+            value = str(value)
+        validated = self._validated.get(row.key_path)
+        if validated is not None and validated[0] is row \
+           and validated[1] is value:
+            return None
+        correct_type, correct_value = row.validate(value)
+        # if type is incorrect, try to convert value and perform check again
+        if not correct_type:
+            converted = row.try_convert(value)
+            if converted is not value:
+                self[row.key_path] = converted
+                value = self[row.key_path]
+                correct_type, correct_value = row.validate(value)
+        if not correct_type:
+            return AutomationLibraryError(
+                "ARGS_ERROR", "argument have incorrect type",
+                key=row.key_path, current_type=type(value).__name__,
+                expected_type=row.type_checker.__name__
+            )
+        # Since valid values can be checked with function, add them to error
+        # message only if it is not function. If it is function, all notices
+        # about valid values should be printed inside that function.
+        if not correct_value:
+            if is_function(row.valid_values):
+                return AutomationLibraryError(
+                    "ARGS_ERROR", "argument have incorrect value",
+                    key=row.key_path, current_value=value
                 )
-            # if second value of result is False (ie incorrect value), raise
-            # error with "incorrect value". Since valid values can be
-            # checked with function, add them to error message only if it is
-            # not function. If it is function, all notices about valid values
-            # should be printed inside that function.
-            if result[1] == False:
-                if is_function(obj.valid_values):
-                    raise AutomationLibraryError(
-                        "ARGS_ERROR", "argument have incorrect value",
-                        key=obj.key_path, current_value=self[obj.key_path]
-                    )
-                else:
-                    raise AutomationLibraryError(
-                        "ARGS_ERROR", "argument have incorrect value",
-                        key=obj.key_path, current_value=self[obj.key_path],
-                        valid_values=obj.valid_values
-                    )
+            return AutomationLibraryError(
+                "ARGS_ERROR", "argument have incorrect value",
+                key=row.key_path, current_value=value,
+                valid_values=row.valid_values
+            )
+        self._validated[row.key_path] = (row, value)
+        return None
 
     def is_complete(self):
         for obj, key, val in iter_leaves(self.scenario_context):
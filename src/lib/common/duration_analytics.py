@@ -0,0 +1,288 @@
+# coding: utf-8
+
+import array
+import datetime as dt
+import json
+import math
+import re
+
+from .log_index import LogIndex, TIME_FORMAT
+
+## NumPy is optional: without it columns are processed by pure Python code.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+## Percentiles, which are computed for every group.
+PERCENTILES = [50, 95, 99]
+## Default number of latest runs, which are compared with earlier runs to
+#  detect regression.
+DEFAULT_WINDOW = 10
+## Default ratio of medians (latest runs / earlier runs), from which change is
+#  reported as regression.
+DEFAULT_THRESHOLD = 1.2
+## Messages of records, which carry duration of scenario or step.
+SCENARIO_FINISHED = "Scenario execution finished"
+STEP_RESULT = "Step result"
+
+## Header of text record: level, time and duration.
+_HEADER_RE = re.compile(
+    "^\\[([A-Z]+)\\] (\\d{4}-\\d{2}-\\d{2} \\d{2}:\\d{2}:\\d{2}\\.\\d{3})-(\\d+),"
+)
+## Value of text record. Value ends at first unescaped comma.
+_VALUE_RE = re.compile("(?:^|,)([a-zA-Z0-9_]+)=((?:[^,\\\\]|\\\\.)*)", re.S)
+
+
+## Parse record of log file (text or JSON lines format).
+# @param text Text of record.
+# @return Tuple (time string, duration in ms, dictionary of values) or None,
+#  if text is not a log record.
+def parse_record(text):
+    if text.startswith("{"):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or "raw" in data:
+            return None
+        return (data.get("time"), int(data.get("duration") or 0),
+                data.get("values") or {})
+    match = _HEADER_RE.match(text)
+    if match is None:
+        return None
+    values = {}
+    for value in _VALUE_RE.finditer(text, match.end() - 1):
+        values.setdefault(value.group(1), value.group(2))
+    return match.group(2), int(match.group(3)), values
+
+
+## Get duration sample from log record.
+# @param scenario Scenario, which wrote log file.
+# @param values Dictionary of values of record.
+# @param duration Duration in ms from record.
+# @return Tuple (scenario, step, code) or None, if record doesn't carry
+#  duration. Step is "" for duration of whole scenario.
+def get_sample_key(scenario, values, duration):
+    message = values.get("message")
+    if message == SCENARIO_FINISHED:
+        return values.get("scenario_name", scenario), "", values.get("code")
+    if message == STEP_RESULT:
+        return scenario, values.get("step", ""), values.get("result")
+    # end of span (LogFunc, Span): operation is named by message or function
+    if duration > 0 and (message or values.get("function")):
+        return scenario, message or values["function"], None
+    return None
+
+
+## Table of duration samples, stored in columns (array.array objects):
+#  timestamp (seconds since epoch), scenario and step (indexes in lists of
+#  names), duration (ms) and code (result code, -1 if unknown). Columns are
+#  processed by NumPy, if it is available.
+class DurationTable:
+
+    ## Constructor. Creates empty table.
+    # @param self Pointer to object.
+    def __init__(self):
+        self.timestamp = array.array("d")
+        self.scenario = array.array("l")
+        self.step = array.array("l")
+        self.duration = array.array("d")
+        self.code = array.array("l")
+        self.scenarios = []
+        self.steps = []
+        self._scenario_ids = {}
+        self._step_ids = {}
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    ## Add sample.
+    # @param self Pointer to object.
+    # @param timestamp datetime.datetime object or seconds since epoch.
+    # @param scenario Name of scenario.
+    # @param step Name of step ("" for whole scenario).
+    # @param duration Duration in ms.
+    # @param code Result code or None.
+    def append(self, timestamp, scenario, step, duration, code=None):
+        if isinstance(timestamp, dt.datetime):
+            timestamp = timestamp.timestamp()
+        self.timestamp.append(timestamp)
+        self.scenario.append(self._get_id(scenario, self.scenarios,
+                                          self._scenario_ids))
+        self.step.append(self._get_id(step, self.steps, self._step_ids))
+        self.duration.append(duration)
+        try:
+            self.code.append(int(code))
+        except (TypeError, ValueError):
+            self.code.append(-1)
+
+    ## Get index of name, adding it to list, if necessary.
+    @staticmethod
+    def _get_id(name, names, ids):
+        name = str(name)
+        index = ids.get(name)
+        if index is None:
+            index = ids[name] = len(names)
+            names.append(name)
+        return index
+
+    ## Add samples from log files of folder. Log index of folder (see
+    #  lib::common::log_index) is updated and used to select records.
+    # @param self Pointer to object.
+    # @param folder Folder with log files.
+    # @param since datetime.datetime object or None.
+    # @param until datetime.datetime object or None.
+    # @return Number of added samples.
+    def load_logs(self, folder, since=None, until=None):
+        count = len(self)
+        with LogIndex(folder) as index:
+            index.update()
+            records = index.query(level="INFO", since=since, until=until)
+        for record in records:
+            parsed = parse_record(record["text"])
+            if parsed is None or parsed[0] is None:
+                continue
+            time, duration, values = parsed
+            key = get_sample_key(record["scenario"], values, duration)
+            if key is None:
+                continue
+            self.append(dt.datetime.strptime(time, TIME_FORMAT),
+                        key[0], key[1], duration, key[2])
+        return len(self) - count
+
+    ## Group samples by scenario and step.
+    # @param self Pointer to object.
+    # @return List of tuples (scenario, step, durations, timestamps), where
+    #  samples of group are sorted by time. Durations and timestamps are
+    #  NumPy arrays or lists.
+    def groups(self):
+        if not len(self):
+            return []
+        if numpy is not None:
+            scenario = numpy.frombuffer(self.scenario, dtype=numpy.dtype("l"))
+            step = numpy.frombuffer(self.step, dtype=numpy.dtype("l"))
+            timestamp = numpy.frombuffer(self.timestamp)
+            duration = numpy.frombuffer(self.duration)
+            key = scenario * len(self.steps) + step
+            order = numpy.lexsort((timestamp, key))
+            key = key[order]
+            bounds = numpy.flatnonzero(numpy.diff(key)) + 1
+            return [(self.scenarios[scenario[indexes[0]]],
+                     self.steps[step[indexes[0]]],
+                     duration[indexes], timestamp[indexes])
+                    for indexes in numpy.split(order, bounds)]
+        groups = {}
+        for i in range(len(self)):
+            groups.setdefault((self.scenario[i], self.step[i]), []).append(i)
+        result = []
+        for (scenario, step), indexes in sorted(groups.items()):
+            indexes.sort(key=lambda i: self.timestamp[i])
+            result.append((self.scenarios[scenario], self.steps[step],
+                           [self.duration[i] for i in indexes],
+                           [self.timestamp[i] for i in indexes]))
+        return result
+
+    ## Compute statistics of every scenario and step.
+    # @param self Pointer to object.
+    # @param window Number of latest runs, which are compared with earlier
+    #  runs.
+    # @param threshold Ratio of medians, from which change is regression.
+    # @return List of dictionaries (see get_group_stats()), sorted by
+    #  scenario and step.
+    def stats(self, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD):
+        result = [get_group_stats(scenario, step, durations, timestamps,
+                                  window, threshold)
+                  for scenario, step, durations, timestamps in self.groups()]
+        result.sort(key=lambda stats: (stats["scenario"], stats["step"]))
+        return result
+
+
+## Compute percentiles (with linear interpolation, like numpy.percentile()).
+# @param values List or NumPy array.
+# @param percentiles List of percentiles (0-100).
+# @return List of floats.
+def percentiles(values, percentiles=PERCENTILES):
+    if numpy is not None:
+        return [float(value) for value in numpy.percentile(values,
+                                                           percentiles)]
+    values = sorted(values)
+    result = []
+    for percentile in percentiles:
+        position = (len(values) - 1) * percentile / 100
+        low = math.floor(position)
+        high = min(low + 1, len(values) - 1)
+        result.append(values[low]
+                      + (values[high] - values[low]) * (position - low))
+    return result
+
+
+## Compute slope of least squares line.
+# @param x List or NumPy array.
+# @param y List or NumPy array.
+# @return Slope (change of y per unit of x) or 0, if x doesn't change.
+def slope(x, y):
+    if numpy is not None:
+        x = x - x.mean()
+        variance = float(numpy.dot(x, x))
+        return float(numpy.dot(x, y - y.mean())) / variance if variance \
+            else 0.0
+    mean_x = sum(x) / len(x)
+    mean_y = sum(y) / len(y)
+    variance = sum((value - mean_x) ** 2 for value in x)
+    if not variance:
+        return 0.0
+    return sum((a - mean_x) * (b - mean_y) for a, b in zip(x, y)) / variance
+
+
+## Compute statistics of group of samples.
+# @param scenario Name of scenario.
+# @param step Name of step.
+# @param durations Durations (ms), sorted by time.
+# @param timestamps Timestamps (seconds since epoch), sorted.
+# @param window Number of latest runs, which are compared with earlier runs.
+# @param threshold Ratio of medians, from which change is regression.
+# @return Dictionary with "scenario", "step", "count", "p50", "p95", "p99",
+#  "trend" (change of duration, ms per day), "recent" and "baseline" (medians
+#  of latest runs and of earlier ones, None if there are not enough runs),
+#  "change" (ratio of them) and "regression" (True or False).
+def get_group_stats(scenario, step, durations, timestamps, window, threshold):
+    stats = {"scenario": scenario, "step": step, "count": len(durations),
+             "last": dt.datetime.fromtimestamp(timestamps[-1])
+                     .strftime(TIME_FORMAT)[:-3]}
+    for percentile, value in zip(PERCENTILES, percentiles(durations)):
+        stats["p{}".format(percentile)] = round(value, 1)
+    stats["trend"] = round(slope(timestamps, durations) * 86400, 1)
+    stats["recent"] = stats["baseline"] = stats["change"] = None
+    stats["regression"] = False
+    if len(durations) > window:
+        stats["recent"] = percentiles(durations[-window:], [50])[0]
+        stats["baseline"] = percentiles(durations[:-window], [50])[0]
+        if stats["baseline"] > 0:
+            stats["change"] = round(stats["recent"] / stats["baseline"], 2)
+            stats["regression"] = stats["change"] >= threshold
+    return stats
+
+
+## Columns of table report: (title, key of statistics).
+TABLE_COLUMNS = [("scenario", "scenario"), ("step", "step"),
+                 ("count", "count"), ("p50, ms", "p50"), ("p95, ms", "p95"),
+                 ("p99, ms", "p99"), ("trend, ms/day", "trend"),
+                 ("change", "change"), ("last run", "last"), ("", "flag")]
+
+
+## Format statistics as text table.
+# @param stats List of dictionaries (see DurationTable.stats()).
+# @return String.
+def format_table(stats):
+    rows = [[title for title, _ in TABLE_COLUMNS]]
+    for item in stats:
+        item = dict(item, flag="REGRESSION" if item["regression"] else "")
+        rows.append(["" if item[key] is None else str(item[key])
+                     for _, key in TABLE_COLUMNS])
+    widths = [max(len(row[i]) for row in rows)
+              for i in range(len(TABLE_COLUMNS))]
+    return "\n".join("  ".join(value.ljust(width) for value, width
+                               in zip(row, widths)).rstrip()
+                     for row in rows)
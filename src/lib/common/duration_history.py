@@ -0,0 +1,162 @@
+# coding: utf-8
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from . import global_vars as gv
+from .logger import global_logger
+
+
+## Name of history database (relative to PID_PATH).
+DURATION_HISTORY_FILE = "step_durations.sqlite"
+## Number of latest durations, which are kept for every step.
+HISTORY_SIZE = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS durations (
+    command TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    duration REAL NOT NULL,
+    finished REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS durations_step
+    ON durations (command, digest, mode, finished);
+CREATE INDEX IF NOT EXISTS durations_command ON durations (command, mode);
+"""
+
+
+## Get path to history database.
+# @return Path.
+def get_duration_history_path():
+    return os.path.join(gv.PID_PATH, DURATION_HISTORY_FILE)
+
+
+## Calculate digest of scenario data of step. Steps with the same command and
+#  digest are expected to take the same time.
+# @param data Dictionary with scenario data (any JSON-serializable object).
+# @return Hex string.
+def scenario_digest(data):
+    return hashlib.sha256(json.dumps(
+        data, sort_keys=True, default=str
+    ).encode("utf-8")).hexdigest()[:16]
+
+
+## Compute median.
+# @param values Not empty list of numbers.
+# @return Median.
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+## Sort items longest-expected-first. Items without estimate go first: they
+#  can be long, and starting them early doesn't delay known long items much.
+#  Order of items with equal estimates is kept.
+# @param items List of items.
+# @param estimate Function, which returns expected duration of item or None.
+# @return New list.
+def order_longest_first(items, estimate):
+    keyed = [(estimate(item), item) for item in items]
+    keyed.sort(key=lambda pair: (pair[0] is not None, -(pair[0] or 0)))
+    return [item for _, item in keyed]
+
+
+## Class, which represents history of step durations, stored in SQLite
+#  database. Durations are keyed by command, digest of scenario data and mode
+#  ("test", "real" or "agent" for whole runs of agent by group runner).
+#  Database is shared by all processes, only HISTORY_SIZE latest durations of
+#  every step are kept.
+class DurationHistory:
+
+    ## Constructor. Opens (and creates, if necessary) database.
+    # @param self Pointer to object.
+    # @param path Path to database. If None, get_duration_history_path()
+    #  used.
+    def __init__(self, path=None):
+        self.path = get_duration_history_path() if path is None else path
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                    exist_ok=True)
+        self._lock = threading.Lock()
+        self._cache = {}
+        # concurrent runners write to the same database
+        self._conn = sqlite3.connect(self.path, timeout=30,
+                                     check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    ## Close database.
+    # @param self Pointer to object.
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    ## Record duration of successfully finished step. Errors are logged and
+    #  ignored: history is only used for estimates.
+    # @param self Pointer to object.
+    # @param command Command of step.
+    # @param digest Digest of scenario data (see scenario_digest()).
+    # @param mode Mode of execution.
+    # @param duration Duration in seconds.
+    def record(self, command, digest, mode, duration):
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        "INSERT INTO durations VALUES (?, ?, ?, ?, ?)",
+                        (command, digest, mode, duration, time.time())
+                    )
+                    self._conn.execute(
+                        "DELETE FROM durations WHERE rowid IN (SELECT rowid "
+                        "FROM durations WHERE command = ? AND digest = ? AND "
+                        "mode = ? ORDER BY finished DESC LIMIT -1 OFFSET ?)",
+                        (command, digest, mode, HISTORY_SIZE)
+                    )
+                    self._conn.execute("COMMIT")
+                except:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._cache.pop((command, digest, mode), None)
+        except sqlite3.Error as err:
+            global_logger.debug(message="Cannot record step duration",
+                                command=command, error=str(err))
+
+    ## Get expected duration of step: median of its latest durations. If step
+    #  with this scenario data was never executed, median of latest durations
+    #  of command with any data is used. Estimates are cached by object.
+    # @param self Pointer to object.
+    # @param command Command of step.
+    # @param digest Digest of scenario data (see scenario_digest()).
+    # @param mode Mode of execution.
+    # @return Duration in seconds or None, if command was never executed.
+    def estimate(self, command, digest, mode):
+        key = (command, digest, mode)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            try:
+                values = [row[0] for row in self._conn.execute(
+                    "SELECT duration FROM durations WHERE command = ? AND "
+                    "digest = ? AND mode = ?", key
+                )]
+                if not values:
+                    values = [row[0] for row in self._conn.execute(
+                        "SELECT duration FROM durations WHERE command = ? "
+                        "AND mode = ? ORDER BY finished DESC LIMIT ?",
+                        (command, mode, HISTORY_SIZE)
+                    )]
+            except sqlite3.Error as err:
+                global_logger.debug(message="Cannot read step durations",
+                                    command=command, error=str(err))
+                values = []
+            self._cache[key] = median(values) if values else None
+            return self._cache[key]
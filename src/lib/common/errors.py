@@ -12,7 +12,7 @@ error_table = [
     (4, "TIMEOUT_ERROR", "Timeout expired"),
     (5, "INTERRUPTED", "Interrupted"),
     (6, "PYTHON_INCOMPATIBLE_VERSION", "Incompatible version of Python"
-     " interpreter. Minimum required: 3.4.3,value={}"),
+     " interpreter. Minimum required: 3.7,value={}"),
     (7, "ARGS_ERROR", "Arguments error: {}"),
     (8, "CMD_RESULT_ERROR", "External utility returned non-successful code"),
     (9, "ROLLBACK_ERROR", "Error occurred on rollback scenario"),
@@ -1,10 +1,10 @@
+import sys
+import threading
+import types
+
+
 ## Path to .pid file.
 PID_PATH = "./"
-## Is test-mode set. By default it is True, for security. It should be changed
-#  ASAP, while configuration loads.
-TEST_MODE = True
-## global common::config::Configuration object.
-CONFIG = dict({ "timeout": 100 })
 ## Should debug messages be printed.
 DEBUG = False
 ## Should multi line string in log be collapsed.
@@ -19,6 +19,94 @@ PRINT_UUID = False
 PRINT_BEGIN = False
 ## Escape key values in log records.
 ESCAPE_STRINGS = False
+## Maximum length of value in log record, longer values are truncated. If 0,
+#  values are not truncated.
+LOG_VALUE_LIMIT = 64 * 1024
+## Format of log files: "text" or "jsonl" (see lib::common::logger).
+LOG_FORMAT = "text"
+## Should composite runner write spans of run to trace folder (see
+#  lib::common::tracing).
+TRACE = False
 ## Langs, avaliable in platform.
 LANGS = ["az", "en", "bg", "hu", "vi", "ka", "zh", "lv", "lt", "de", "pl", "ro",
          "ru", "tr", "uk", "fr"]
+
+
+## Class, which holds state of scenario execution: TEST_MODE and CONFIG
+#  variables. By default all threads share process-wide state, but thread can
+#  bind its own state (see bind_scenario_state()), which allows to execute few
+#  scenarios concurrently in one interpreter.
+class ScenarioState:
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param test_mode Is test-mode set. By default it is True, for security. It
+    #  should be changed ASAP, while configuration loads.
+    # @param config Global common::config::Configuration object.
+    def __init__(self, test_mode=True, config=None):
+        self.test_mode = test_mode
+        self.config = config if config is not None else dict({"timeout": 100})
+
+
+## Process-wide scenario state.
+_process_state = ScenarioState()
+## Thread-local storage for bound scenario states.
+_local_state = threading.local()
+
+
+## Get scenario state of current thread.
+# @return ScenarioState object.
+def get_scenario_state():
+    state = getattr(_local_state, "state", None)
+    return state if state is not None else _process_state
+
+
+## Check whether scenario state is bound to current thread, i.e. scenario is
+#  executed in-process (see bootstrap.execute_in_process()).
+# @return True or False.
+def is_scenario_state_bound():
+    return getattr(_local_state, "state", None) is not None
+
+
+## Context manager, which binds scenario state to current thread.
+class bind_scenario_state:
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param state ScenarioState object. If None, new one will be created.
+    def __init__(self, state=None):
+        self.state = state if state is not None else ScenarioState()
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_local_state, "state", None)
+        _local_state.state = self.state
+        return self.state
+
+    def __exit__(self, *args):
+        _local_state.state = self._previous
+
+
+## Module class, which redirects TEST_MODE and CONFIG variables to scenario
+#  state of current thread.
+class _GlobalVarsModule(types.ModuleType):
+
+    @property
+    def TEST_MODE(self):
+        return get_scenario_state().test_mode
+
+    @TEST_MODE.setter
+    def TEST_MODE(self, value):
+        get_scenario_state().test_mode = value
+
+    @property
+    def CONFIG(self):
+        return get_scenario_state().config
+
+    @CONFIG.setter
+    def CONFIG(self, value):
+        get_scenario_state().config = value
+
+
+# TEST_MODE and CONFIG of this module are properties of _GlobalVarsModule
+sys.modules[__name__].__class__ = _GlobalVarsModule
@@ -0,0 +1,208 @@
+# coding: utf-8
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from . import global_vars as gv
+
+
+## Name of queue database (relative to PID_PATH).
+JOB_QUEUE_FILE = "agent_jobs.sqlite"
+## States of job. Job is finished, if its state is one of FINISHED_STATES.
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+FINISHED_STATES = (DONE, FAILED, CANCELLED, INTERRUPTED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command TEXT NOT NULL,
+    args TEXT NOT NULL,
+    host TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result INTEGER,
+    log_path TEXT,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+"""
+_FIELDS = ["id", "command", "args", "host", "state", "result", "log_path",
+           "submitted", "started", "finished"]
+
+
+## Get path to queue database.
+# @return Path.
+def get_job_queue_path():
+    return os.path.join(gv.PID_PATH, JOB_QUEUE_FILE)
+
+
+## Class, which represents persistent queue of agent jobs, stored in SQLite
+#  database. Queue survives restarts of agent daemon: queued jobs are executed
+#  after restart, and jobs, which were running, when daemon stopped, are
+#  marked as interrupted.
+class JobQueue:
+
+    ## Constructor. Opens (and creates, if necessary) database.
+    # @param self Pointer to object.
+    # @param path Path to database. If None, get_job_queue_path() used.
+    def __init__(self, path=None):
+        self.path = get_job_queue_path() if path is None else path
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                    exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    ## Convert database row to dictionary.
+    # @param row Tuple of values of _FIELDS.
+    # @return Dictionary or None, if row is None.
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(zip(_FIELDS, row))
+        job["args"] = json.loads(job["args"])
+        return job
+
+    ## Add job to queue.
+    # @param self Pointer to object.
+    # @param command Command name.
+    # @param args Dictionary with command line named arguments.
+    # @param host Host, on which job operates. Number of concurrent jobs is
+    #  limited per host.
+    # @return Id of job.
+    def submit(self, command, args, host):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (command, args, host, state, submitted) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (command, json.dumps(args), host, QUEUED, time.time())
+            )
+            return cursor.lastrowid
+
+    ## Get job.
+    # @param self Pointer to object.
+    # @param job_id Id of job.
+    # @return Dictionary with job's fields or None, if job not found.
+    def get(self, job_id):
+        with self._lock:
+            return self._to_dict(self._conn.execute(
+                "SELECT {} FROM jobs WHERE id = ?".format(", ".join(_FIELDS)),
+                (job_id, )
+            ).fetchone())
+
+    ## List jobs.
+    # @param self Pointer to object.
+    # @param state If not None, only jobs in this state are listed.
+    # @param limit Maximum number of jobs. Latest jobs are returned.
+    # @return List of dictionaries.
+    def list(self, state=None, limit=100):
+        query = "SELECT {} FROM jobs".format(", ".join(_FIELDS))
+        params = ()
+        if state is not None:
+            query += " WHERE state = ?"
+            params = (state, )
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            return [self._to_dict(row) for row
+                    in self._conn.execute(query, params + (limit, ))]
+
+    ## Take queued jobs, which can be started without exceeding limits, and
+    #  mark them as running. Jobs are taken in order of submission, but job
+    #  of busy host doesn't block jobs of other hosts.
+    # @param self Pointer to object.
+    # @param slots Maximum number of jobs to take.
+    # @param host_limit Maximum number of running jobs per host.
+    # @return List of dictionaries.
+    def claim(self, slots, host_limit):
+        if slots <= 0:
+            return []
+        with self._lock:
+            running = dict(self._conn.execute(
+                "SELECT host, COUNT(*) FROM jobs WHERE state = ? "
+                "GROUP BY host", (RUNNING, )
+            ).fetchall())
+            claimed = []
+            for row in self._conn.execute(
+                    "SELECT {} FROM jobs WHERE state = ? ORDER BY id".format(
+                        ", ".join(_FIELDS)
+                    ), (QUEUED, )).fetchall():
+                job = self._to_dict(row)
+                if running.get(job["host"], 0) >= host_limit:
+                    continue
+                running[job["host"]] = running.get(job["host"], 0) + 1
+                claimed.append(job)
+                if len(claimed) >= slots:
+                    break
+            now = time.time()
+            for job in claimed:
+                job["state"], job["started"] = RUNNING, now
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, started = ? WHERE id = ?",
+                    (RUNNING, now, job["id"])
+                )
+            return claimed
+
+    ## Set path to log of job.
+    # @param self Pointer to object.
+    # @param job_id Id of job.
+    # @param log_path Path.
+    def set_log_path(self, job_id, log_path):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET log_path = ? WHERE id = ?",
+                               (log_path, job_id))
+
+    ## Mark job as finished.
+    # @param self Pointer to object.
+    # @param job_id Id of job.
+    # @param state One of FINISHED_STATES.
+    # @param result Result code or None.
+    def finish(self, job_id, state, result=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, finished = ? "
+                "WHERE id = ?", (state, result, time.time(), job_id)
+            )
+
+    ## Cancel queued job.
+    # @param self Pointer to object.
+    # @param job_id Id of job.
+    # @return True, if job was queued and is cancelled now, False otherwise.
+    def cancel_queued(self, job_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, finished = ? "
+                "WHERE id = ? AND state = ?",
+                (CANCELLED, time.time(), job_id, QUEUED)
+            )
+            return cursor.rowcount > 0
+
+    ## Mark jobs, which are running according to database, as interrupted.
+    #  Called on daemon start, because such jobs were running, when previous
+    #  daemon stopped.
+    # @param self Pointer to object.
+    # @return Number of interrupted jobs.
+    def interrupt_running(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, finished = ? WHERE state = ?",
+                (INTERRUPTED, time.time(), RUNNING)
+            )
+            return cursor.rowcount
+
+    ## Close database.
+    # @param self Pointer to object.
+    def close(self):
+        with self._lock:
+            self._conn.close()
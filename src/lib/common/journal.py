@@ -0,0 +1,197 @@
+# coding: utf-8
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from . import global_vars as gv
+from .logger import global_logger
+
+
+## Folder (relative to PID_PATH), where journals are stored.
+JOURNAL_FOLDER = "journal"
+## Maximum time in seconds, between writing record and syncing it to disk.
+FSYNC_INTERVAL = 1.0
+## Maximum age in seconds of journals of failed runs. Older journals are
+#  removed, when new run starts. Journals of successful runs are removed
+#  immediately.
+JOURNAL_MAX_AGE = 7 * 24 * 3600
+
+
+## Generate new run id.
+# @return String.
+def new_run_id():
+    return "{}-{}".format(datetime.now().strftime("%y%m%d%H%M%S"),
+                          uuid.uuid4().hex[:8])
+
+
+## Get path to journal of run.
+# @param run_id Run id.
+# @return Path.
+def get_journal_path(run_id):
+    return os.path.join(gv.PID_PATH, JOURNAL_FOLDER, run_id + ".jsonl")
+
+
+## Remove journals, which were not modified for max_age seconds. Errors are
+#  logged and ignored.
+# @param max_age Maximum age in seconds.
+# @return Number of removed journals.
+def remove_old_journals(max_age=JOURNAL_MAX_AGE):
+    folder = os.path.join(gv.PID_PATH, JOURNAL_FOLDER)
+    count = 0
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return 0
+    min_mtime = time.time() - max_age
+    for entry in entries:
+        if not entry.name.endswith(".jsonl"):
+            continue
+        try:
+            if entry.stat().st_mtime < min_mtime:
+                os.remove(entry.path)
+                count += 1
+        except OSError as err:
+            global_logger.debug(message="Cannot remove old journal",
+                                path=entry.path, error=str(err))
+    return count
+
+
+## Class, which represents append-only journal of run. Each record is JSON
+#  object on separate line. Records are written to OS immediately, but synced
+#  to disk by background thread not more often than once per FSYNC_INTERVAL,
+#  so journal doesn't slow down execution.
+class Journal:
+
+    ## Constructor. Opens journal for appending and reads existing records.
+    # @param self Pointer to object.
+    # @param run_id Run id.
+    # @param path Path to journal. If None, get_journal_path() used.
+    def __init__(self, run_id, path=None):
+        self.run_id = run_id
+        self.path = get_journal_path(run_id) if path is None else path
+        self.records = Journal.read(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)),
+                    exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # serializes fsync() and close(), so records can be written while
+        # journal is synced
+        self._sync_lock = threading.Lock()
+        self._dirty = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._sync_main, daemon=True)
+        self._thread.start()
+
+    ## Read records of journal. Last line is ignored, if it is incomplete
+    #  (process was killed while writing it).
+    # @param path Path to journal.
+    # @return List of dictionaries.
+    @staticmethod
+    def read(path):
+        records = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        global_logger.warning(
+                            message="Corrupted record in journal skipped",
+                            path=path
+                        )
+        except FileNotFoundError:
+            pass
+        return records
+
+    ## Append record.
+    # @param self Pointer to object.
+    # @param event Event name.
+    # @param kwargs Fields of record.
+    def record(self, event, **kwargs):
+        data = {"time": time.time(), "event": event}
+        data.update(kwargs)
+        line = json.dumps(data, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._closed:
+                return
+            self.records.append(data)
+            self._file.write(line)
+            self._file.flush()
+            if not self._dirty:
+                self._dirty = True
+                self._cond.notify()
+
+    ## Main function of thread, which syncs journal to disk.
+    # @param self Pointer to object.
+    def _sync_main(self):
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            # give other records chance to join this sync
+            time.sleep(FSYNC_INTERVAL)
+            self.sync()
+
+    ## Sync written records to disk immediately.
+    # @param self Pointer to object.
+    def sync(self):
+        with self._sync_lock:
+            with self._lock:
+                if self._closed or not self._dirty:
+                    return
+                self._dirty = False
+                fd = self._file.fileno()
+            os.fsync(fd)
+
+    ## Sync and close journal.
+    # @param self Pointer to object.
+    def close(self):
+        with self._sync_lock:
+            with self._lock:
+                if self._closed:
+                    return
+                self._closed = True
+                self._cond.notify()
+                os.fsync(self._file.fileno())
+                self._file.close()
+
+    ## Close and remove journal (run finished successfully and won't be
+    #  resumed).
+    # @param self Pointer to object.
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    ## Find first record with event.
+    # @param self Pointer to object.
+    # @param event Event name.
+    # @return Dictionary or None.
+    def find(self, event):
+        for record in self.records:
+            if record["event"] == event:
+                return record
+        return None
+
+    ## Find last record with event and fields.
+    # @param self Pointer to object.
+    # @param event Event name.
+    # @param fields Values of fields, which record should have.
+    # @return Index of record or None, if not found.
+    def last_index(self, event, **fields):
+        for index in range(len(self.records) - 1, -1, -1):
+            record = self.records[index]
+            if record["event"] == event and all(
+                    record.get(key) == value for key, value in fields.items()
+            ):
+                return index
+        return None
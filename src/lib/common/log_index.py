@@ -0,0 +1,323 @@
+# coding: utf-8
+
+import datetime as dt
+import json
+import os
+import re
+import sqlite3
+
+
+## Name of index database, which is stored in folder of logs.
+LOG_INDEX_FILE = ".log_index.sqlite"
+## Format of time in log records (and in index).
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+## Values of records, which are indexed: name of value -> name of column.
+INDEXED_VALUES = {"pid": "pid", "uuid": "uuid", "state": "state",
+                  "str_code": "code"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    scenario TEXT NOT NULL,
+    ino INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    last_record INTEGER
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    time TEXT,
+    level TEXT,
+    pid INTEGER,
+    uuid TEXT,
+    state TEXT,
+    code TEXT
+);
+CREATE INDEX IF NOT EXISTS files_scenario ON files (scenario);
+CREATE INDEX IF NOT EXISTS records_time ON records (time);
+CREATE INDEX IF NOT EXISTS records_level ON records (level, time);
+CREATE INDEX IF NOT EXISTS records_file ON records (file, offset);
+CREATE INDEX IF NOT EXISTS records_pid ON records (pid);
+CREATE INDEX IF NOT EXISTS records_uuid ON records (uuid);
+CREATE INDEX IF NOT EXISTS records_code ON records (code);
+"""
+_FIELDS = ["path", "scenario", "time", "level", "pid", "uuid", "state",
+           "code"]
+
+## Log file name: <scenario>_<%y%m%d>_<%H%M%S>_<pid>.log (see
+#  bootstrap.get_log_filename()).
+_FILENAME_RE = re.compile("^(.+)_\\d{6}_\\d{6}_\\d+\\.log$")
+## Header of text record: level, time and duration.
+_HEADER_RE = re.compile(
+    "^\\[([A-Z]+)\\] (\\d{4}-\\d{2}-\\d{2} \\d{2}:\\d{2}:\\d{2}\\.\\d{3})-\\d+,"
+)
+## Indexed value of text record. Value ends at first unescaped comma.
+_VALUE_RE = re.compile("(?:^|,)({})=((?:[^,\\\\]|\\\\.)*)".format(
+    "|".join(INDEXED_VALUES)
+), re.S)
+
+
+## Get scenario (name of script), which wrote log file.
+# @param path Path to log file.
+# @return Name of scenario or name of file without extension, if it is not
+#  built by bootstrap.get_log_filename().
+def get_log_scenario(path):
+    name = os.path.basename(path)
+    match = _FILENAME_RE.match(name)
+    return match.group(1) if match is not None else os.path.splitext(name)[0]
+
+
+## Parse time from log record or from user input.
+# @param value String like "2016-10-17 12:00:00.000", "2016-10-17T12:00",
+#  "2016-10-17" or relative time like "7d", "12h", "30m" (before now).
+# @return datetime.datetime object.
+# @exception ValueError Value cannot be parsed.
+def parse_time(value):
+    value = str(value).strip()
+    match = re.match("^(\\d+)([dhms])$", value)
+    if match is not None:
+        unit = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds"}
+        return dt.datetime.now() - dt.timedelta(
+            **{unit[match.group(2)]: int(match.group(1))}
+        )
+    value = value.replace("T", " ")
+    for time_format in [TIME_FORMAT, "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+                        "%Y-%m-%d"]:
+        try:
+            return dt.datetime.strptime(value, time_format)
+        except ValueError:
+            pass
+    raise ValueError("invalid time: {}".format(value))
+
+
+## Format time as in index.
+# @param value datetime.datetime object.
+# @return String.
+def format_time(value):
+    return value.strftime(TIME_FORMAT)[:-3]
+
+
+## Parse indexed values from first line of record. Both text and JSON lines
+#  formats are supported.
+# @param line Decoded line.
+# @return Dictionary with columns of index or None, if line doesn't begin
+#  record (it continues previous one).
+def parse_record_line(line):
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or "level" not in data:
+            return None
+        record = {"time": data.get("time"), "level": data["level"],
+                  "pid": data.get("pid")}
+        values = data.get("values") or {}
+        for key, column in INDEXED_VALUES.items():
+            if key in values and column not in record:
+                record[column] = values[key]
+        # errors are logged as string (str(AutomationLibraryError))
+        for arg in data.get("args") or []:
+            for match in _VALUE_RE.finditer(str(arg)):
+                record.setdefault(INDEXED_VALUES[match.group(1)],
+                                  match.group(2))
+        return record
+    match = _HEADER_RE.match(line)
+    if match is None:
+        return None
+    record = {"level": match.group(1), "time": match.group(2)}
+    for match in _VALUE_RE.finditer(line, match.end() - 1):
+        record.setdefault(INDEXED_VALUES[match.group(1)], match.group(2))
+    return record
+
+
+## Class, which represents index of log files of one folder. Index is stored
+#  in SQLite database in the same folder and is updated incrementally: only
+#  data, appended to log files since previous update, is read. Records are
+#  read from log files by offset, so index keeps only indexed values.
+class LogIndex:
+
+    ## Constructor. Opens (and creates, if necessary) index.
+    # @param self Pointer to object.
+    # @param folder Folder with log files.
+    # @param path Path to index database. If None, LOG_INDEX_FILE in folder
+    #  used.
+    def __init__(self, folder, path=None):
+        self.folder = folder
+        self.path = os.path.join(folder, LOG_INDEX_FILE) if path is None \
+            else path
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    ## Close database.
+    # @param self Pointer to object.
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    ## Index data, which was appended to log files since previous update.
+    #  Files, which were removed, are removed from index; files, which were
+    #  truncated or replaced, are indexed again.
+    # @param self Pointer to object.
+    # @return Number of new records.
+    def update(self):
+        known = {row[0]: row for row in self._conn.execute(
+            "SELECT path, id, ino, offset, last_record FROM files"
+        )}
+        count = 0
+        for entry in sorted(os.scandir(self.folder), key=lambda e: e.name):
+            if not entry.name.endswith(".log") or not entry.is_file():
+                continue
+            known_file = known.pop(entry.name, None)
+            with self._conn:
+                count += self._update_file(entry, known_file)
+        with self._conn:
+            for _, file_id, _, _, _ in known.values():
+                self._remove_file(file_id)
+        return count
+
+    ## Remove file and its records from index.
+    # @param self Pointer to object.
+    # @param file_id Id of file.
+    def _remove_file(self, file_id):
+        self._conn.execute("DELETE FROM records WHERE file = ?", (file_id, ))
+        self._conn.execute("DELETE FROM files WHERE id = ?", (file_id, ))
+
+    ## Index new data of file.
+    # @param self Pointer to object.
+    # @param entry os.DirEntry object of file.
+    # @param known_file Row (path, id, ino, offset, last record id) of index
+    #  or None, if file was not indexed.
+    # @return Number of new records.
+    def _update_file(self, entry, known_file):
+        stat = entry.stat()
+        if known_file is not None and (known_file[2] != stat.st_ino
+                                       or known_file[3] > stat.st_size):
+            self._remove_file(known_file[1])
+            known_file = None
+        if known_file is None:
+            file_id = self._conn.execute(
+                "INSERT INTO files (path, scenario, ino, offset) "
+                "VALUES (?, ?, ?, 0)",
+                (entry.name, get_log_scenario(entry.name), stat.st_ino)
+            ).lastrowid
+            offset, last_record = 0, None
+        else:
+            _, file_id, _, offset, last_record = known_file
+        if offset == stat.st_size:
+            return 0
+        with open(entry.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(stat.st_size - offset)
+        # only complete lines are indexed, the rest is indexed on next update
+        end = data.rfind(b"\n") + 1
+        count = 0
+        position = 0
+        while position < end:
+            line_end = data.index(b"\n", position) + 1
+            record = parse_record_line(
+                data[position:line_end].decode("utf-8", errors="replace")
+                .rstrip("\r\n")
+            )
+            if record is not None:
+                last_record = self._conn.execute(
+                    "INSERT INTO records (file, offset, length, time, level, "
+                    "pid, uuid, state, code) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (file_id, offset + position, line_end - position,
+                     record.get("time"), record.get("level"),
+                     record.get("pid"), record.get("uuid"),
+                     record.get("state"), record.get("code"))
+                ).lastrowid
+                count += 1
+            elif last_record is not None:
+                # multi-line record (traceback) or raw text
+                self._conn.execute(
+                    "UPDATE records SET length = length + ? WHERE id = ?",
+                    (line_end - position, last_record)
+                )
+            position = line_end
+        self._conn.execute(
+            "UPDATE files SET offset = ?, last_record = ? WHERE id = ?",
+            (offset + end, last_record, file_id)
+        )
+        return count
+
+    ## Find records.
+    # @param self Pointer to object.
+    # @param level Level or list of levels.
+    # @param scenario Name of scenario (see get_log_scenario()).
+    # @param since datetime.datetime object: only records, which were logged
+    #  at this time or later, are returned.
+    # @param until datetime.datetime object: only records, which were logged
+    #  before this time, are returned.
+    # @param pid PID of process, which logged record.
+    # @param uuid UUID of operation.
+    # @param state Value of "state" key.
+    # @param code String code of error.
+    # @param limit Maximum number of records or None.
+    # @param text If True, text of records is read from log files.
+    # @return List of dictionaries with indexed values ("path", "scenario",
+    #  "time", "level", "pid", "uuid", "state", "code") and "text", sorted by
+    #  time.
+    def query(self, level=None, scenario=None, since=None, until=None,
+              pid=None, uuid=None, state=None, code=None, limit=None,
+              text=True):
+        conditions = []
+        params = []
+        if level is not None:
+            levels = [level] if isinstance(level, str) else list(level)
+            conditions.append("records.level IN ({})".format(
+                ", ".join("?" * len(levels))
+            ))
+            params += [item.upper() for item in levels]
+        if since is not None:
+            conditions.append("records.time >= ?")
+            params.append(format_time(since))
+        if until is not None:
+            conditions.append("records.time < ?")
+            params.append(format_time(until))
+        for column, value in [("files.scenario", scenario),
+                              ("records.pid", pid), ("records.uuid", uuid),
+                              ("records.state", state),
+                              ("records.code", code)]:
+            if value is not None:
+                conditions.append("{} = ?".format(column))
+                params.append(value)
+        query = "SELECT files.path, files.scenario, records.time, " \
+                "records.level, records.pid, records.uuid, records.state, " \
+                "records.code, records.offset, records.length FROM records " \
+                "JOIN files ON files.id = records.file"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY records.time, records.file, records.offset"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        result = []
+        files = {}
+        try:
+            for row in self._conn.execute(query, params):
+                record = dict(zip(_FIELDS, row))
+                if text:
+                    f = files.get(record["path"])
+                    if f is None:
+                        f = open(os.path.join(self.folder, record["path"]),
+                                 "rb")
+                        files[record["path"]] = f
+                    f.seek(row[-2])
+                    record["text"] = f.read(row[-1]).decode(
+                        "utf-8", errors="replace"
+                    ).rstrip("\n")
+                result.append(record)
+        finally:
+            for f in files.values():
+                f.close()
+        return result
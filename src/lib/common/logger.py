@@ -1,26 +1,242 @@
 # coding: utf-8
 
+import atexit
+import contextvars
 import datetime as dt
-import inspect
+import functools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
 import sys
+import threading
+import time
 import uuid
 import re
+import weakref
 
 
 from . import global_vars as gv
 from .errors import AutomationLibraryError
 
 
+## Should records be written by background thread. If False, records are
+#  written synchronously by thread, which logs them.
+ASYNC_LOGGING = True
+## Records of this level and higher are written synchronously: logging call
+#  returns, when record is flushed to all outputs.
+SYNC_LEVEL = logging.ERROR
+## Formats of log files: "text" (comma separated key=value pairs) or "jsonl"
+#  (one JSON object per line). Stdout is always written as text.
+LOG_FORMATS = ["text", "jsonl"]
+## Environment variable, through which format of log files is passed to child
+#  processes.
+LOG_FORMAT_ENV = "AUTOMATION_LOG_FORMAT"
+if os.environ.get(LOG_FORMAT_ENV) in LOG_FORMATS:
+    gv.LOG_FORMAT = os.environ[LOG_FORMAT_ENV]
+
+
+## Request, which is put to queue by Logger.flush(): writer thread flushes
+#  outputs and sets event.
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+## Formatter of log records. Records, logged with extra {"raw": True}, are
+#  printed as is.
+class _LogFormatter(logging.Formatter):
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param fmt Format of text records.
+    # @param datefmt Format of time.
+    # @param file_output If True, records are written in format from
+    #  gv.LOG_FORMAT, else always as text.
+    def __init__(self, fmt, datefmt, file_output=False):
+        super().__init__(fmt=fmt, datefmt=datefmt)
+        self.file_output = file_output
+
+    def format(self, record):
+        if self.file_output and gv.LOG_FORMAT == "jsonl":
+            return self.format_json(record)
+        if getattr(record, "raw", False):
+            return record.getMessage()
+        return super().format(record)
+
+    ## Format record as JSON object. Values are written as strings (truncated
+    #  like in text records), so records of both formats are parsed the same
+    #  way.
+    # @param self Pointer to object.
+    # @param record logging.LogRecord object.
+    # @return String.
+    def format_json(self, record):
+        data = {
+            "level": record.levelname,
+            "time": "{}.{:03d}".format(self.formatTime(record, self.datefmt),
+                                       int(record.msecs)),
+        }
+        message = record.msg
+        if getattr(record, "raw", False):
+            data["raw"] = record.getMessage()
+        elif isinstance(message, _LogMessage):
+            data["duration"] = getattr(record, "duration", 0)
+            data["pid"] = message.pid
+            data["test_mode"] = message.test_mode
+            data["values"] = {key: truncate_log_value(value)
+                              for key, value in message.kwargs.items()}
+            if message.args:
+                data["args"] = [truncate_log_value(arg)
+                                for arg in message.args]
+        else:
+            data["duration"] = getattr(record, "duration", 0)
+            data["values"] = {"message": record.getMessage()}
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+## Handler of output (file or stream), which is used by writer thread. It
+#  doesn't flush stream after every record: writer thread flushes outputs,
+#  when queue becomes empty.
+class _OutputHandler(logging.StreamHandler):
+    def flush(self):
+        pass
+
+    ## Flush underlying stream.
+    # @param self Pointer to object.
+    def flush_stream(self):
+        logging.StreamHandler.flush(self)
+
+
+## Handler, which puts records to queue. Records are put as is: message is
+#  already formatted by Logger, and writer thread formats the rest.
+class _QueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue, listener):
+        super().__init__(log_queue)
+        self.listener = listener
+
+    def prepare(self, record):
+        return record
+
+    def emit(self, record):
+        # no outputs are written by writer thread
+        if not self.listener.handlers:
+            return
+        self.listener.ensure_started()
+        self.enqueue(record)
+
+
+## Writer thread of log. It writes records in batches: outputs are flushed,
+#  when queue becomes empty or flush is requested.
+class _LogListener(logging.handlers.QueueListener):
+    def __init__(self, log_queue):
+        super().__init__(log_queue, respect_handler_level=True)
+        self._start_lock = threading.Lock()
+
+    ## Start writer thread, if it is not started.
+    # @param self Pointer to object.
+    def ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self.start()
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+        self.flush_outputs()
+
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            self.flush_outputs()
+            return self.queue.get()
+
+    def handle(self, record):
+        if isinstance(record, _FlushRequest):
+            self.flush_outputs()
+            record.done.set()
+        else:
+            super().handle(record)
+
+    ## Flush all outputs.
+    # @param self Pointer to object.
+    def flush_outputs(self):
+        for handler in self.handlers:
+            try:
+                handler.flush_stream()
+            except Exception:
+                pass
+
+    ## Forget queue and writer thread of parent process. Called in child
+    #  after fork: records of parent are written by parent.
+    # @param self Pointer to object.
+    # @param log_queue New queue.
+    def reset(self, log_queue):
+        self.queue = log_queue
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+
+## Types of values, which are kept as is, until record is written. Values of
+#  other types are converted to strings, when they are logged: they can be
+#  changed later, and their __str__() is not expected to be thread-safe.
+_IMMUTABLE_TYPES = (str, bytes, int, float, type(None))
+
+
+## Value, which is already converted to string (and truncated) by _LogMessage.
+class _RenderedValue(str):
+    __slots__ = ()
+
+
+## Convert value to string, if it can be changed before record is written.
+# @param value Logged value.
+# @return Value itself or _RenderedValue object.
+def _capture_log_value(value):
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return _RenderedValue(truncate_log_value(value))
+
+
+## Message of log record. It keeps logged values and is rendered with
+#  Logger.make_log_string(), when record is written, so strings and bytes of
+#  records, which are not written, are never decoded or escaped. Values of
+#  other types are converted to strings by thread, which logs them (after
+#  level of record is checked), so record shows values at time of call.
+class _LogMessage:
+    __slots__ = ("pid", "test_mode", "args", "kwargs", "_text")
+
+    def __init__(self, args, kwargs):
+        self.pid = os.getpid()
+        # test mode can be bound to thread, so it is saved now
+        self.test_mode = gv.TEST_MODE
+        self.args = [_capture_log_value(arg) for arg in args]
+        self.kwargs = {key: _capture_log_value(value)
+                       for key, value in kwargs.items()}
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = Logger.make_log_string(self.args, self.kwargs,
+                                                self.pid, self.test_mode)
+        return self._text
+
+
 ## Class, which implement logging. It is singleton.
 class Logger:
     __instance = None
     ## Underlying logging.Logger object, used as main logger object.
     __standard_logger = None
-    ## Underlying logging.Logger object, used when we needs to print raw data to
-    # log.
-    __standard_raw_logger = None
+    ## Queue of records, handler, which puts records to it, and writer thread,
+    #  which writes them to outputs.
+    __queue = None
+    __queue_handler = None
+    __listener = None
+    ## Minimum level, accepted by outputs. Records of lower levels are
+    #  dropped before they are built.
+    __min_level = logging.CRITICAL + 1
     __tracked_operations = dict()
     __log_streams = list()
     __log_files = list()
@@ -38,20 +254,47 @@ class Logger:
                 "1cPlatformUpdateLogger"
             )
             Logger.__standard_logger.setLevel("DEBUG")
-            # create logger object for printing raw strings
-            Logger.__standard_raw_logger = logging.getLogger(
-                "1cPlatformUpdateLoggerRaw"
-            )
-            Logger.__standard_raw_logger.setLevel("DEBUG")
+            Logger.__queue = queue.SimpleQueue()
+            Logger.__listener = _LogListener(Logger.__queue)
+            Logger.__queue_handler = _QueueHandler(Logger.__queue,
+                                                   Logger.__listener)
+            Logger.__standard_logger.addHandler(Logger.__queue_handler)
+            atexit.register(Logger.__listener.stop)
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(before=Logger.__instance.flush,
+                                    after_in_child=Logger.__after_fork)
         return Logger.__instance
 
+    ## Reset queue in child process after fork.
+    @staticmethod
+    def __after_fork():
+        Logger.__queue = queue.SimpleQueue()
+        Logger.__queue_handler.queue = Logger.__queue
+        Logger.__listener.reset(Logger.__queue)
+
+    ## Wait, until all logged records are written and flushed.
+    # @param self Pointer to object.
+    def flush(self):
+        listener = Logger.__listener
+        if listener._thread is None:
+            return
+        request = _FlushRequest()
+        Logger.__queue.put(request)
+        request.done.wait()
+
+    ## Flush records of synchronous level.
+    # @param self Pointer to object.
+    # @param level Level of logged record.
+    def __sync(self, level):
+        if level >= SYNC_LEVEL:
+            self.flush()
+
     ## Begin of tracking operation time.
     # @param self Pointer to object.
     # @return UUID of tracking operation.
     def start_operation(self):
         operation_uuid = uuid.uuid4()
-        time_stamp = dt.datetime.now()
-        Logger.__tracked_operations[operation_uuid] = time_stamp
+        Logger.__tracked_operations[operation_uuid] = time.perf_counter_ns()
         return operation_uuid
 
 
@@ -60,9 +303,10 @@ class Logger:
     # @param operation_uuid UUID of tracking operation.
     # @return Time of operation as datetime.timedelta.
     def finish_operation(self, operation_uuid):
-        delta = dt.datetime.now() - Logger.__tracked_operations[operation_uuid]
-        del Logger.__tracked_operations[operation_uuid]
-        return delta
+        start = Logger.__tracked_operations.pop(operation_uuid)
+        return dt.timedelta(
+            microseconds=(time.perf_counter_ns() - start) // 1000
+        )
 
     def __getattr__(self, name):
         return getattr(self.__standard_logger, name)
@@ -71,36 +315,46 @@ class Logger:
     # @param self Pointer to object.
     # @param text Text to print.
     def print_raw_text(self, text):
-        if Logger.__disabled:
+        if Logger.__disabled or logging.INFO < Logger.__min_level:
             return
         self.debug(message="Multiprocessing log begin")
-        Logger.__standard_raw_logger.info(
-            text.strip("\r\n\ "),
+        Logger.__standard_logger.info(
+            text.strip("\r\n\ "), extra={"raw": True, "duration": 0}
         )
         self.debug(message="Multiprocessing log end")
 
     ## Make log string from values.
     # @param cmd_args List or tuple of values.
     # @param kwargs Dictionary of values and keys.
+    # @param pid PID of process, which logged values. If None, PID of current
+    #  process is used.
+    # @param test_mode Value of test mode, when values were logged. If None,
+    #  current value is used.
     # @return String with values.
     @staticmethod
-    def make_log_string(cmd_args, kwargs):
+    def make_log_string(cmd_args, kwargs, pid=None, test_mode=None):
         def escape_string(s):
             if gv.ESCAPE_STRINGS:
                 return escape_log_string(s)
             else:
                 return s
 
-        text = "pid={},test_mode={}".format(os.getpid(),
-                                            gv.TEST_MODE)
+        text = "pid={},test_mode={}".format(
+            os.getpid() if pid is None else pid,
+            gv.TEST_MODE if test_mode is None else test_mode
+        )
         # string all args
         args = cmd_args
-        args = [escape_string(str(arg).replace("\\\\", "\\")) for arg in args]
+        args = [escape_string(truncate_log_value(arg).replace("\\\\", "\\"))
+                for arg in args]
         # join all values into one string.
         text = ",".join([text, ] + list(
             # make strings from key-value pairs of kwargs
             ["{}={}".format(
-                key, escape_string(str(value).replace("\\\\", "\\"))
+                key,
+                escape_string(
+                    truncate_log_value(value).replace("\\\\", "\\")
+                )
             ) for key, value in kwargs.items()]
         ) + args)
         # replace double backward-slashes with single backward slash
@@ -113,77 +367,94 @@ class Logger:
         else:
             return text
 
-    ## Log a record on INFO level.
+    ## Log a record, if at least one output accepts its level. Message is
+    #  rendered, when record is written.
     # @param self Pointer to object.
-    # @param *args Positional arguments.
-    # @param **kwargs Named arguments.
-    def info(self, *args, **kwargs):
-        if Logger.__disabled:
-            return
+    # @param level Level of record.
+    # @param args Positional arguments.
+    # @param kwargs Named arguments.
+    def __log(self, level, args, kwargs):
         # set duration to 0 if not supplied
         if "duration" not in kwargs:
             duration = 0
         else:
             duration = kwargs["duration"]
             del kwargs["duration"]
-        # calling info method of Logger.__standard_logger
-        return Logger.__standard_logger.info(Logger.make_log_string(args,
-                                                                    kwargs),
-                                             extra={"duration": duration})
+        # record is built directly: location of call is not printed, so
+        # logging.Logger.findCaller() is not needed
+        logger = Logger.__standard_logger
+        logger.handle(logger.makeRecord(
+            logger.name, level, "(unknown file)", 0,
+            _LogMessage(args, kwargs), None, None,
+            extra={"duration": duration}
+        ))
+        self.__sync(level)
+
+    ## Log a record on INFO level.
+    # @param self Pointer to object.
+    # @param *args Positional arguments.
+    # @param **kwargs Named arguments.
+    def info(self, *args, **kwargs):
+        if Logger.__disabled or logging.INFO < Logger.__min_level:
+            return
+        self.__log(logging.INFO, args, kwargs)
 
     ## Log a record on WARNING level.
     # @param self Pointer to object.
     # @param *args Positional arguments.
     # @param **kwargs Named arguments.
     def warning(self, *args, **kwargs):
-        if Logger.__disabled:
+        if Logger.__disabled or logging.WARNING < Logger.__min_level:
             return
-        if "duration" not in kwargs:
-            duration = 0
-        else:
-            duration = kwargs["duration"]
-            del kwargs["duration"]
-        # calling warning method of Logger.__standard_logger
-        return Logger.__standard_logger.warning(Logger.make_log_string(args,
-                                                                       kwargs),
-                                                extra={"duration": duration})
+        self.__log(logging.WARNING, args, kwargs)
 
     ## Log a record on ERROR level.
     # @param self Pointer to object.
     # @param *args Positional arguments.
     # @param **kwargs Named arguments.
     def error(self, *args, **kwargs):
-        if Logger.__disabled:
+        if Logger.__disabled or logging.ERROR < Logger.__min_level:
             return
-        if "duration" not in kwargs:
-            duration = 0
-        else:
-            duration = kwargs["duration"]
-            del kwargs["duration"]
-        # calling error method of Logger.__standard_logger
-        return Logger.__standard_logger.error(Logger.make_log_string(args,
-                                                                     kwargs),
-                                              extra={"duration": duration})
+        self.__log(logging.ERROR, args, kwargs)
 
     ## Log a record on DEBUG level.
     # @param self Pointer to object.
     # @param *args Positional arguments.
     # @param **kwargs Named arguments.
     def debug(self, *args, **kwargs):
-        if Logger.__disabled:
+        # if global DEBUG is False or no output accepts debug records, return
+        # immediately
+        if Logger.__disabled or not gv.DEBUG \
+           or logging.DEBUG < Logger.__min_level:
             return
-        # if global DEBUG is False, return immediately
-        if not gv.DEBUG:
-            return
-        if "duration" not in kwargs:
-            duration = 0
+        self.__log(logging.DEBUG, args, kwargs)
+
+    ## Add output to logger. If ASYNC_LOGGING is set, output is used by
+    #  writer thread.
+    # @param stream Stream object.
+    # @param level Minimum log level.
+    # @param filter_level If True, then ONLY level records will be logged.
+    def __add_output(self, stream, level, filter_level, file_output=False):
+        if ASYNC_LOGGING:
+            handler = _OutputHandler(stream)
         else:
-            duration = kwargs["duration"]
-            del kwargs["duration"]
-        # calling debug method of Logger.__standard_logger
-        return Logger.__standard_logger.debug(Logger.make_log_string(args,
-                                                                     kwargs),
-                                              extra={"duration": duration})
+            handler = logging.StreamHandler(stream)
+        handler.setFormatter(_LogFormatter(
+            fmt=Logger.__fmt,
+            datefmt=Logger.__datefmt,
+            file_output=file_output,
+        ))
+        # set filter if necessary
+        if filter_level is True:
+            handler.addFilter(
+                lambda record: 1 if record.levelname == level else 0
+            )
+        handler.setLevel(level)
+        Logger.__min_level = min(Logger.__min_level, handler.level)
+        if ASYNC_LOGGING:
+            Logger.__listener.handlers += (handler, )
+        else:
+            Logger.__standard_logger.addHandler(handler)
 
     ## Add file handler to logger.
     # @param path Path to file.
@@ -194,34 +465,9 @@ class Logger:
         if path in Logger.__log_files:
             return
         Logger.__log_files.append(path)
-        # creating new handler
-        stream_handler = logging.StreamHandler(open(path, "a"))
-        # set formatter
-        stream_handler.setFormatter(logging.Formatter(
-            fmt=Logger.__fmt,
-            datefmt=Logger.__datefmt,
-        ))
-        # set filter if necessary
-        if filter_level is True:
-            stream_handler.addFilter(
-                lambda record, level: 1 if record.levelname == level else 0
-            )
-        # setting level
-        stream_handler.setLevel(level)
-        # add handler to __standard_logger
-        Logger.__standard_logger.addHandler(stream_handler)
-        # set handler for raw logger
-        stream_raw_handler = logging.StreamHandler(open(path, "a"))
-        stream_raw_handler.setFormatter(logging.Formatter(
-            fmt="%(message)s",
-            datefmt=Logger.__datefmt,
-        ))
-        if filter_level is True:
-            stream_raw_handler.addFilter(
-                lambda record, level: 1 if record.levelname == level else 0
-            )
-        stream_raw_handler.setLevel(level)
-        Logger.__standard_raw_logger.addHandler(stream_raw_handler)
+        # one buffered stream per file, it is flushed by writer thread
+        self.__add_output(open(path, "a", buffering=64 * 1024), level,
+                          filter_level, file_output=True)
 
     ## Add stream handler to logger.
     # @param stream_obj Stream object.
@@ -231,30 +477,7 @@ class Logger:
         if stream_obj in Logger.__log_streams:
             return
         Logger.__log_streams.append(stream_obj)
-        stream_handler = logging.StreamHandler(Logger.__log_streams[-1])
-        stream_handler.setFormatter(logging.Formatter(
-            fmt=Logger.__fmt,
-            datefmt=Logger.__datefmt,
-        ))
-        if filter_level is True:
-            stream_handler.addFilter(
-                lambda record, level: 1 if record.levelname == level else 0
-            )
-        stream_handler.setLevel(level)
-        Logger.__standard_logger.addHandler(stream_handler)
-        # set handler for raw logger
-        stream_raw_handler = logging.StreamHandler(Logger.__log_streams[-1])
-        stream_raw_handler.setFormatter(logging.Formatter(
-            fmt="%(message)s",
-            datefmt=Logger.__datefmt,
-        ))
-        if filter_level is True:
-            stream_raw_handler.addFilter(
-                lambda record, level: 1 if record.levelname == level else 0
-            )
-        stream_raw_handler.setLevel(level)
-        Logger.__standard_raw_logger.addHandler(stream_raw_handler)
-
+        self.__add_output(stream_obj, level, filter_level)
 
     ## This method return tuple (list_of_stream_objects, list_of_file_paths).
     # @param Pointer to object.
@@ -275,8 +498,19 @@ class Logger:
     ## Remove all handlers from logger.
     # @param self Pointer to object.
     def remove_outputs(self):
-        Logger.__standard_logger.handlers = []
-        Logger.__standard_raw_logger.handlers = []
+        self.flush()
+        # files are opened by logger, so they are closed
+        for handler in Logger.__listener.handlers \
+                + tuple(Logger.__standard_logger.handlers):
+            if getattr(handler, "stream", None) is not None \
+               and handler.stream not in Logger.__log_streams:
+                handler.close()
+                handler.stream.close()
+        Logger.__log_streams.clear()
+        Logger.__log_files.clear()
+        Logger.__listener.handlers = ()
+        Logger.__standard_logger.handlers = [Logger.__queue_handler]
+        Logger.__min_level = logging.CRITICAL + 1
 
     @staticmethod
     def disable():
@@ -292,19 +526,45 @@ global_logger = Logger()
 global_logger.add_stream_handler(sys.stdout)
 
 
-## Class, which can measure time and log it on createion and destruction.
-class LogFunc:
+## Innermost active span of current thread or asyncio task (weak reference,
+#  so LogFunc objects can be destroyed and finished) or None.
+_current_span = contextvars.ContextVar("current_span", default=None)
+## Functions, which are called with every finished span (see
+#  lib::common::tracing).
+SPAN_LISTENERS = []
+
+
+## Get innermost active span of current thread or asyncio task.
+# @return Span object or None.
+def get_current_span():
+    ref = _current_span.get()
+    span = ref() if ref is not None else None
+    # span can be finished in other context (for example, LogFunc destroyed
+    # by other task)
+    while span is not None and span.duration_ns is not None:
+        span = span.parent
+    return span
+
+
+## Class, which measures duration of operation and logs it on finish. Span
+#  can be used as context manager or as decorator (then every call is a new
+#  span). Spans, started inside other span of the same thread or asyncio
+#  task, are its children.
+class Span:
 
     ## Constructor.
     # @param self Pointer to object.
     # @param print_begin Enable or disable printing beginning of operation.
     #  Default value is equal to global_vars.PRINT_BEGIN.
-    # @param print_uuid Enable or disable printing UUID of operation.
-    #  Default value is equal to global_vars.PRINT_UUID.
+    # @param print_uuid Enable or disable printing UUID of operation (and
+    #  UUID of parent operation). Default value is equal to
+    #  global_vars.PRINT_UUID.
     # @param print_function Enable or disable printing function name.
     #  Default value is equal to global_vars.PRINT_FUNCTION.
+    # @param kwargs Values, which are printed in records of span.
     def __init__(self, print_begin=None, print_uuid=None,
                  print_function=None, **kwargs):
+        self._print_args = (print_begin, print_uuid, print_function)
         # setting print_* variables
         self.print_begin = print_begin if print_begin is not None \
                            else gv.PRINT_BEGIN
@@ -312,37 +572,160 @@ class LogFunc:
                            else gv.PRINT_UUID
         self.print_function = print_function if print_function is not None \
                            else gv.PRINT_FUNCTION
-        # save kwargs
         self.kwargs = kwargs
-        # save operation UUID
-        self.op_uuid = global_logger.start_operation()
-        # if print_{uuid, function} is True, then save corresponded value to
-        # kwargs
+        self.span_id = None
+        self.parent = None
+        self.function = None
+        self.start_ns = None
+        self.start_time_ns = None
+        self.duration_ns = None
+        self._uuid = None
+
+    ## UUID of operation. It is generated on first access.
+    @property
+    def uuid(self):
+        if self._uuid is None:
+            self._uuid = uuid.uuid4()
+        return self._uuid
+
+    ## Build values of log record.
+    # @param self Pointer to object.
+    # @return Dictionary.
+    def _get_values(self):
+        values = dict(self.kwargs)
         if self.print_uuid:
-            self.kwargs["uuid"] = self.op_uuid
+            values["uuid"] = self.uuid
+            if self.parent is not None:
+                values["parent_uuid"] = self.parent.uuid
         if self.print_function:
-            self.kwargs["function"] = inspect.stack()[1][3] \
-                                      if len(inspect.stack()) > 2 \
-                                      else inspect.stack()[0][3]
-        # if print_begin is set, record beginning of operation
+            values["function"] = self.function
+        return values
+
+    ## Name of operation: logged message or name of function.
+    @property
+    def name(self):
+        return str(self.kwargs.get("message") or self.function
+                   or type(self).__name__)
+
+    ## Start span.
+    # @param self Pointer to object.
+    # @param function Name of function, which executes operation.
+    def _start(self, function):
+        self.span_id = "{:016x}".format(random.getrandbits(64))
+        self.parent = get_current_span()
+        self.function = function
+        _current_span.set(weakref.ref(self))
+        self._log_begin()
+        self.start_time_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+
+    ## Finish span and log its duration. Span is finished only once.
+    # @param self Pointer to object.
+    def finish(self):
+        if self.start_ns is None or self.duration_ns is not None:
+            return
+        self.duration_ns = time.perf_counter_ns() - self.start_ns
+        if get_current_span() is self:
+            _current_span.set(weakref.ref(self.parent)
+                              if self.parent is not None else None)
+        self._log_end()
+        for listener in SPAN_LISTENERS:
+            listener(self)
+
+    ## Log beginning of operation, if print_begin is set.
+    # @param self Pointer to object.
+    def _log_begin(self):
         if self.print_begin:
-            global_logger.info(state="begin", **self.kwargs)
+            global_logger.info(state="begin", **self._get_values())
 
-    ## Destructor.
+    ## Log duration of operation.
     # @param self Pointer to object.
-    def __del__(self):
-        time = global_logger.finish_operation(self.op_uuid)
+    def _log_end(self):
+        duration = self.duration_ns // 10**6
         if self.print_begin:
-            global_logger.info(
-                duration=int(time.microseconds * 10**-3 + time.seconds * 10**3),
-                state="end",
-                **self.kwargs
-            )
+            global_logger.info(duration=duration, state="end",
+                               **self._get_values())
         else:
-            global_logger.info(
-                duration=int(time.microseconds * 10**-3 + time.seconds * 10**3),
-                **self.kwargs
-            )
+            global_logger.info(duration=duration, **self._get_values())
+
+    ## Create span with the same parameters (used by decorator).
+    # @param self Pointer to object.
+    # @return Span object.
+    def _copy(self):
+        return Span(*self._print_args, **self.kwargs)
+
+    def __enter__(self):
+        self._start(sys._getframe(1).f_code.co_name
+                    if self.print_function else None)
+        return self
+
+    def __exit__(self, *args):
+        self.finish()
+
+    ## Decorate function: every call of it is executed in new span.
+    # @param self Pointer to object.
+    # @param func Function.
+    # @return Wrapper.
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            span = self._copy()
+            span._start(func.__name__)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                span.finish()
+        return wrapper
+
+
+## Class, which can measure time and log it on creation and destruction. It is
+#  kept for compatibility, Span should be used instead.
+class LogFunc(Span):
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param print_begin Enable or disable printing beginning of operation.
+    #  Default value is equal to global_vars.PRINT_BEGIN.
+    # @param print_uuid Enable or disable printing UUID of operation.
+    #  Default value is equal to global_vars.PRINT_UUID.
+    # @param print_function Enable or disable printing function name.
+    #  Default value is equal to global_vars.PRINT_FUNCTION.
+    def __init__(self, print_begin=None, print_uuid=None,
+                 print_function=None, **kwargs):
+        super().__init__(print_begin, print_uuid, print_function, **kwargs)
+        self._start(sys._getframe(1).f_code.co_name
+                    if self.print_function else None)
+
+    ## UUID of operation.
+    @property
+    def op_uuid(self):
+        return self.uuid
+
+    ## Destructor.
+    # @param self Pointer to object.
+    def __del__(self):
+        self.finish()
+
+
+## Convert value to string for log record. Strings, which are longer than
+#  global_vars.LOG_VALUE_LIMIT, are truncated. Strings and bytes are cut
+#  before conversion, so large outputs of commands are not copied.
+# @param value Value.
+# @return String.
+def truncate_log_value(value):
+    limit = gv.LOG_VALUE_LIMIT
+    if isinstance(value, _RenderedValue):
+        # already truncated, when it was logged
+        return value
+    if not limit:
+        return str(value)
+    if isinstance(value, (str, bytes, bytearray)) and len(value) > limit:
+        return "{}...<truncated, length={}>".format(str(value[:limit]),
+                                                   len(value))
+    text = str(value)
+    if len(text) > limit:
+        return "{}...<truncated, length={}>".format(text[:limit], len(text))
+    return text
 
 
 def escape_log_string(string):
@@ -354,15 +737,7 @@ def escape_log_string(string):
 
 
 def unescape_log_string(string):
-    result = ""
-    it = range(0, len(string)).__iter__()
-    for i in it:
-        if string[i] != "\\":
-            result += string[i]
-            continue
-        result += string[i+1]
-        consume(it, 1)
-    return result
+    return re.sub("\\\\(.)", "\\1", string, flags=re.S)
 
 
 def parse_log_record(record):
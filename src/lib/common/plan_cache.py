@@ -0,0 +1,112 @@
+# coding: utf-8
+
+import hashlib
+import json
+import os
+import platform
+import tempfile
+
+from . import global_vars as gv
+from .logger import global_logger
+
+
+## Version of plan format. Plans, compiled with other version, are ignored.
+PLAN_FORMAT_VERSION = 3
+## Folder (relative to PID_PATH), where compiled plans are stored.
+PLAN_CACHE_FOLDER = "plan_cache"
+
+
+## Calculate hash of file content.
+# @param path Path to file.
+# @return Hex digest or None, if file cannot be read.
+def file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+## Build key of plan. Key depends on format version, dictionary path, command
+#  line arguments and host (configurations are resolved with host's os-type and
+#  arch), but not on content of files. Content is checked on load.
+# @param dictionary_path Path to command dictionary.
+# @param args Command line arguments (any JSON-serializable object).
+# @return Hex string.
+def plan_key(dictionary_path, args):
+    data = json.dumps(
+        [PLAN_FORMAT_VERSION, os.path.realpath(dictionary_path), args,
+         platform.node(), platform.system(), platform.machine()],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+## Class, which stores compiled plans on disk. Each plan stored in separate
+#  JSON file together with hashes of files, which were read during
+#  compilation. Plan is valid only while all these files are unchanged.
+class PlanCache:
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param folder Folder with cached plans. If None, PLAN_CACHE_FOLDER in
+    #  PID_PATH used.
+    def __init__(self, folder=None):
+        self.folder = os.path.join(gv.PID_PATH, PLAN_CACHE_FOLDER) \
+                      if folder is None else folder
+
+    ## Get path to file with plan.
+    # @param self Pointer to object.
+    # @param key Plan key (see plan_key()).
+    # @return Path.
+    def _path(self, key):
+        return os.path.join(self.folder, key + ".json")
+
+    ## Load plan.
+    # @param self Pointer to object.
+    # @param key Plan key (see plan_key()).
+    # @return Plan or None, if plan not found or outdated.
+    def load(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) \
+           or data.get("version") != PLAN_FORMAT_VERSION:
+            return None
+        for path, digest in data["files"].items():
+            if file_digest(path) != digest:
+                global_logger.debug(message="Cached plan is outdated",
+                                    key=key, changed_file=path)
+                return None
+        return data["plan"]
+
+    ## Store plan. Errors are logged and ignored, because cache is only an
+    #  optimization.
+    # @param self Pointer to object.
+    # @param key Plan key (see plan_key()).
+    # @param plan Plan (JSON-serializable object).
+    # @param files List of files, which were read during compilation.
+    def store(self, key, plan, files):
+        data = {
+            "version": PLAN_FORMAT_VERSION,
+            "files": {os.path.realpath(path): file_digest(path)
+                      for path in files},
+            "plan": plan,
+        }
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            # write to temporary file and rename it, so concurrent runners
+            # never read partially written plan
+            fd, temp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"), default=str)
+                os.replace(temp_path, self._path(key))
+            except:
+                os.remove(temp_path)
+                raise
+        except (OSError, TypeError, ValueError) as err:
+            global_logger.warning(message="Cannot store compiled plan",
+                                  key=key, error=str(err))
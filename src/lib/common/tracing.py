@@ -0,0 +1,270 @@
+# coding: utf-8
+
+import json
+import os
+import re
+import sys
+import threading
+
+from . import global_vars as gv
+from .errors import AutomationLibraryError
+from .logger import Span, SPAN_LISTENERS, get_current_span
+
+
+## Environment variable, through which trace context is passed to child
+#  processes, which are not started by composite runner.
+TRACE_ENV = "AUTOMATION_TRACEPARENT"
+## Folder (relative to PID_PATH), which contains folders of traces. Every
+#  process of trace writes its spans to <trace id>/<pid>.jsonl file.
+TRACE_FOLDER = "traces"
+## Name of service in exported OTLP data.
+SERVICE_NAME = "automation"
+
+_TRACEPARENT_RE = re.compile("^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+## Trace of current process: dictionary with trace id, id of remote parent
+#  span and folder, or None, if process doesn't write spans.
+_trace = None
+## File descriptor of spans file and PID of process, which opened it.
+_fd = None
+_fd_pid = None
+_lock = threading.Lock()
+
+
+## Parse trace context in W3C traceparent format.
+# @param value String "00-<trace id>-<parent span id>-<flags>".
+# @return Tuple (trace id, parent span id) or None, if value is invalid.
+def parse_traceparent(value):
+    match = _TRACEPARENT_RE.match(str(value).strip().lower())
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+## Build trace context in W3C traceparent format.
+# @param trace_id Trace id (32 hex digits).
+# @param span_id Parent span id (16 hex digits).
+# @return String.
+def format_traceparent(trace_id, span_id):
+    return "00-{}-{}-01".format(trace_id, span_id)
+
+
+## Get folder of trace.
+# @param trace_id Trace id.
+# @return Path.
+def get_trace_folder(trace_id):
+    return os.path.join(gv.PID_PATH, TRACE_FOLDER, trace_id)
+
+
+## Check, does current process write spans.
+# @return True or False.
+def is_tracing():
+    return _trace is not None
+
+
+## Get id of trace of current process.
+# @return Trace id or None.
+def get_trace_id():
+    return _trace["trace-id"] if _trace is not None else None
+
+
+## Start writing spans of current process. Process joins trace from context
+#  (or from TRACE_ENV environment variable, if context is None), or starts
+#  new trace, if there is no context. If process already writes spans of the
+#  same trace, nothing is changed: scenarios, executed in process of composite
+#  runner, already have their parents.
+# @param traceparent Trace context or None.
+# @return Trace id.
+def start_trace(traceparent=None):
+    global _trace
+    if traceparent is None:
+        traceparent = os.environ.get(TRACE_ENV, "")
+    context = parse_traceparent(traceparent)
+    with _lock:
+        if _trace is not None \
+           and (context is None or context[0] == _trace["trace-id"]):
+            return _trace["trace-id"]
+        if context is None:
+            context = (os.urandom(16).hex(), None)
+        _trace = {
+            "trace-id": context[0],
+            "parent-id": context[1],
+            "folder": get_trace_folder(context[0]),
+        }
+        if _record_span not in SPAN_LISTENERS:
+            SPAN_LISTENERS.append(_record_span)
+    # python processes, started by this one, join the same trace
+    traceparent = get_traceparent()
+    if traceparent is not None:
+        os.environ[TRACE_ENV] = traceparent
+    return context[0]
+
+
+## Get trace context for child process: its spans become children of current
+#  span.
+# @return String in traceparent format or None, if process doesn't write
+#  spans.
+def get_traceparent():
+    trace = _trace
+    if trace is None:
+        return None
+    span = get_current_span()
+    parent_id = span.span_id if span is not None else trace["parent-id"]
+    if parent_id is None:
+        return None
+    return format_traceparent(trace["trace-id"], parent_id)
+
+
+## Write finished span to spans file of process.
+# @param span Span object.
+def _record_span(span):
+    global _fd, _fd_pid
+    trace = _trace
+    if trace is None:
+        return
+    record = {
+        "name": span.name,
+        "span": span.span_id,
+        "parent": span.parent.span_id if span.parent is not None \
+                  else trace["parent-id"],
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "start": span.start_time_ns,
+        "duration": span.duration_ns,
+        "attributes": {key: str(value) for key, value in span.kwargs.items()
+                       if key != "message"},
+    }
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    try:
+        with _lock:
+            # forked process writes to its own file
+            if _fd is None or _fd_pid != os.getpid():
+                os.makedirs(trace["folder"], exist_ok=True)
+                _fd = os.open(
+                    os.path.join(trace["folder"],
+                                 "{}.jsonl".format(os.getpid())),
+                    os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+                )
+                _fd_pid = os.getpid()
+                os.write(_fd, (json.dumps({
+                    "process": os.path.basename(sys.argv[0]) or "python",
+                    "pid": os.getpid(),
+                }) + "\n").encode("utf-8"))
+            # one write per span, so records are complete even after
+            # os._exit()
+            os.write(_fd, line)
+    except OSError:
+        pass
+
+
+## Span, which is only written to trace: it doesn't print log records.
+class TraceSpan(Span):
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param name Name of operation.
+    # @param attributes Values, which are written with span.
+    def __init__(self, name, **attributes):
+        super().__init__(False, False, False, **attributes)
+        self.operation = name
+
+    @property
+    def name(self):
+        return self.operation
+
+    def _log_begin(self):
+        pass
+
+    def _log_end(self):
+        pass
+
+    def _copy(self):
+        return TraceSpan(self.operation, **self.kwargs)
+
+
+## Read spans of trace.
+# @param trace Trace id or path to folder of trace.
+# @return Tuple (dictionary, which maps PID to name of process, list of span
+#  dictionaries sorted by start time).
+# @exception AutomationLibraryError("ARGS_ERROR") Trace not found.
+def load_trace(trace):
+    folder = trace if os.path.isdir(trace) else get_trace_folder(trace)
+    if not os.path.isdir(folder):
+        raise AutomationLibraryError("ARGS_ERROR", "trace not found",
+                                     trace=trace, folder=folder)
+    processes = {}
+    spans = []
+    for entry in sorted(os.listdir(folder)):
+        if not entry.endswith(".jsonl"):
+            continue
+        with open(os.path.join(folder, entry), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # last line of killed process can be incomplete
+                    continue
+                if "process" in record:
+                    processes[record["pid"]] = record["process"]
+                else:
+                    spans.append(record)
+    spans.sort(key=lambda span: span["start"])
+    return processes, spans
+
+
+## Convert trace to Chrome trace event format (chrome://tracing, Perfetto).
+# @param processes Dictionary, which maps PID to name of process.
+# @param spans List of span dictionaries.
+# @return JSON-serializable dictionary.
+def to_chrome_trace(processes, spans):
+    events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+               "args": {"name": "{} ({})".format(name, pid)}}
+              for pid, name in sorted(processes.items())]
+    for span in spans:
+        args = dict(span["attributes"])
+        args["span"] = span["span"]
+        if span["parent"] is not None:
+            args["parent"] = span["parent"]
+        events.append({
+            "name": span["name"], "cat": "span", "ph": "X",
+            "ts": span["start"] / 1000, "dur": span["duration"] / 1000,
+            "pid": span["pid"], "tid": span["tid"], "args": args,
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+## Convert trace to OTLP JSON (ExportTraceServiceRequest).
+# @param trace_id Trace id.
+# @param processes Dictionary, which maps PID to name of process.
+# @param spans List of span dictionaries.
+# @return JSON-serializable dictionary.
+def to_otlp_json(trace_id, processes, spans):
+    def attribute(key, value):
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    by_pid = {}
+    for span in spans:
+        otlp_span = {
+            "traceId": trace_id,
+            "spanId": span["span"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(span["start"]),
+            "endTimeUnixNano": str(span["start"] + span["duration"]),
+            "attributes": [attribute(key, value) for key, value
+                           in sorted(span["attributes"].items())]
+                          + [attribute("thread.id", span["tid"])],
+        }
+        if span["parent"] is not None:
+            otlp_span["parentSpanId"] = span["parent"]
+        by_pid.setdefault(span["pid"], []).append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            attribute("service.name", SERVICE_NAME),
+            attribute("process.pid", pid),
+            attribute("process.executable.name", processes.get(pid, "")),
+        ]},
+        "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": pid_spans}],
+    } for pid, pid_spans in sorted(by_pid.items())]}
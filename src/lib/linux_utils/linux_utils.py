@@ -9,6 +9,7 @@ from ..common import global_vars as gv
 from ..common.errors import AutomationLibraryError
 from ..common.logger import global_logger, LogFunc
 from ..utils.cmd import run_cmd
+from .process_group import kill_step_process
 
 
 ## Copy web server extension to specified path
@@ -72,9 +73,13 @@ def get_all_child_procs(parent_pid):
     return pids
 
 
-## Kill process and its children.
+## Kill process and its children. Trees of step processes, started by
+#  process_group.popen_step() or zygote, are killed via their cgroup and
+#  process group, other processes' children are searched recursively.
 # @param Process PID.
 def kill_process_tree(pid):
+    if kill_step_process(pid):
+        return
     pids = [pid, ] + get_all_child_procs(pid)
     run_cmd("kill -9 {}".format(" ".join([str(pid) for pid in pids])),
             shell=True)
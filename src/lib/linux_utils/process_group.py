@@ -0,0 +1,233 @@
+# coding: utf-8
+
+import atexit
+import ctypes
+import errno
+import functools
+import itertools
+import os
+import signal
+import subprocess as sp
+import threading
+
+from ..common.logger import global_logger
+
+
+## Should step processes be placed in transient cgroups, if cgroup v2 is
+#  available and writable. Otherwise only process groups are used.
+USE_CGROUPS = True
+## prctl() option, which sets signal, sent to process, when its parent dies.
+PR_SET_PDEATHSIG = 1
+
+## Registered step processes: PID -> path of cgroup or None.
+_PROCESSES = {}
+## Cgroups of killed steps, which were still populated, when killed.
+_STALE_CGROUPS = []
+_LOCK = threading.Lock()
+_COUNTER = itertools.count()
+
+try:
+    _prctl = ctypes.CDLL(None, use_errno=True).prctl
+except (OSError, AttributeError):
+    _prctl = None
+
+
+## Find directory of cgroup v2, which contains current process.
+# @return Path or None, if cgroup v2 is not mounted.
+@functools.lru_cache(maxsize=None)
+def get_own_cgroup():
+    mount_point = None
+    try:
+        with open("/proc/self/mounts") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == "cgroup2":
+                    mount_point = fields[1]
+                    break
+        if mount_point is None:
+            return None
+        with open("/proc/self/cgroup") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return os.path.join(mount_point,
+                                        line[3:].strip().lstrip("/"))
+    except OSError:
+        pass
+    return None
+
+
+## Create transient cgroup for step process.
+# @return Path of cgroup or None, if cgroups are disabled or not available.
+def create_step_cgroup():
+    _remove_stale_cgroups()
+    parent = get_own_cgroup() if USE_CGROUPS else None
+    if parent is None:
+        return None
+    path = os.path.join(parent, "automation_step_{}_{}".format(
+        os.getpid(), next(_COUNTER)
+    ))
+    try:
+        os.mkdir(path)
+    except OSError as err:
+        global_logger.debug(message="Cannot create cgroup for step, process "
+                            "group will be used", path=path, error=str(err))
+        return None
+    return path
+
+
+## Move process to cgroup. Errors are ignored: process group is still used
+#  for killing.
+# @param pid PID of process (0 for current process).
+# @param cgroup Path of cgroup or None.
+def move_to_cgroup(pid, cgroup):
+    if cgroup is None:
+        return
+    try:
+        fd = os.open(os.path.join(cgroup, "cgroup.procs"), os.O_WRONLY)
+        try:
+            os.write(fd, str(pid).encode("ascii"))
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+## Prepare worker, forked from zygote: make it leader of new session (and
+#  process group), set SIGKILL as its parent death signal and move it to
+#  cgroup. Called in child after fork, so it is safe only in single-threaded
+#  parent like zygote; popen_step() doesn't use it. Note, that parent death
+#  signal is sent, when thread, which started child, exits, so child should
+#  be started by thread, which waits for it.
+# @param cgroup Path of cgroup or None.
+def setup_child(cgroup=None):
+    try:
+        os.setsid()
+    except OSError:
+        # already session leader
+        pass
+    if _prctl is not None:
+        _prctl(PR_SET_PDEATHSIG, signal.SIGKILL, 0, 0, 0)
+    move_to_cgroup(0, cgroup)
+
+
+## Remember step process, so kill_step_process() can kill its tree.
+# @param pid PID of process, prepared by setup_child().
+# @param cgroup Path of cgroup or None.
+def register_step_process(pid, cgroup=None):
+    with _LOCK:
+        _PROCESSES[pid] = cgroup
+
+
+## Start step process in its own session and, if available, cgroup. Runners
+#  are multithreaded, so no Python code is executed in child before exec:
+#  process is moved to cgroup by parent after spawn (children, forked before
+#  that, are still killed via process group).
+# @param args Command line.
+# @param kwargs Other arguments of subprocess.Popen.
+# @return subprocess.Popen object.
+def popen_step(args, **kwargs):
+    cgroup = create_step_cgroup()
+    try:
+        proc = sp.Popen(args, start_new_session=True, **kwargs)
+    except BaseException:
+        _remove_cgroup(cgroup)
+        raise
+    move_to_cgroup(proc.pid, cgroup)
+    register_step_process(proc.pid, cgroup)
+    return proc
+
+
+## Kill tree of step process, registered by register_step_process(), with
+#  one cgroup.kill write (or killing every process of cgroup, if kernel
+#  doesn't support it) and one killpg() call.
+# @param pid PID of step process.
+# @return False, if process is not registered, True otherwise.
+def kill_step_process(pid):
+    with _LOCK:
+        if pid not in _PROCESSES:
+            return False
+        cgroup = _PROCESSES[pid]
+    if cgroup is not None:
+        _kill_cgroup(cgroup)
+    group_exists = True
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        group_exists = False
+    except PermissionError:
+        pass
+    # process can be forgotten, when its cgroup is removed (it is possible
+    # only after all processes of cgroup exited) or its group is empty
+    if cgroup is not None:
+        finished = _remove_cgroup(cgroup)
+        if not finished:
+            with _LOCK:
+                if cgroup not in _STALE_CGROUPS:
+                    _STALE_CGROUPS.append(cgroup)
+    else:
+        finished = not group_exists
+    if finished:
+        with _LOCK:
+            if _PROCESSES.get(pid) == cgroup:
+                del _PROCESSES[pid]
+    return True
+
+
+## Kill all processes of cgroup.
+# @param cgroup Path of cgroup.
+def _kill_cgroup(cgroup):
+    try:
+        with open(os.path.join(cgroup, "cgroup.kill"), "w") as f:
+            f.write("1")
+        return
+    except FileNotFoundError:
+        pass
+    except OSError as err:
+        global_logger.debug(message="Cannot write cgroup.kill",
+                            path=cgroup, error=str(err))
+    # kernel older than 5.14: kill processes one by one, until cgroup is
+    # empty or only new forks appear
+    for _ in range(10):
+        try:
+            with open(os.path.join(cgroup, "cgroup.procs")) as f:
+                pids = [int(pid) for pid in f.read().split()]
+        except OSError:
+            return
+        if not pids:
+            return
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+
+## Remove cgroup.
+# @param cgroup Path of cgroup or None.
+# @return True, if cgroup removed or doesn't exist, False, if it is still
+#  populated.
+def _remove_cgroup(cgroup):
+    if cgroup is None:
+        return True
+    try:
+        os.rmdir(cgroup)
+    except FileNotFoundError:
+        pass
+    except OSError as err:
+        if err.errno == errno.EBUSY:
+            return False
+        global_logger.debug(message="Cannot remove cgroup", path=cgroup,
+                            error=str(err))
+    return True
+
+
+## Remove cgroups of killed steps, which processes already exited.
+@atexit.register
+def _remove_stale_cgroups():
+    with _LOCK:
+        stale = list(_STALE_CGROUPS)
+    for cgroup in stale:
+        if _remove_cgroup(cgroup):
+            with _LOCK:
+                if cgroup in _STALE_CGROUPS:
+                    _STALE_CGROUPS.remove(cgroup)
@@ -8,6 +8,7 @@ from ...common.errors import AutomationLibraryError
 from ...common.logger import global_logger, LogFunc
 from ...utils import PlatformVersion, try_open_file
 from ...utils.cmd import run_cmd
+from ...utils.host_facts import get_host_fact, invalidate_host_facts
 
 ARCHIVE64_DISTR_NAME = "rpm64.tar.gz"
 ARCHIVE32_DISTR_NAME = "rpm.tar.gz"
@@ -57,10 +58,12 @@ def install_package(path, simulate=False, force=True):
         res = run_cmd("rpm -Uvh --nodeps {} {} {}".format(forces, simulate_str,
                                                           path),
                       shell=True)
+        if not simulate:
+            invalidate_host_facts()
         global_logger.info("package installation",
                            returncode=res.returncode,
-                           stdout=res.stdout.decode(gv.ENCODING),
-                           stderr=res.stderr.decode(gv.ENCODING)
+                           stdout=res.stdout,
+                           stderr=res.stderr
                            )
     except sp.TimeoutExpired as err:
         raise AutomationLibraryError("TIMEOUT_ERROR")
@@ -83,6 +86,8 @@ def uninstall_package(name, simulate=False, force=True):
         res = run_cmd("rpm -evh --nodeps {} {} {}".format(forces, simulate_str,
                                                           name),
                       shell=True)
+        if not simulate:
+            invalidate_host_facts()
     except sp.TimeoutExpired as err:
         raise AutomationLibraryError("TIMEOUT_ERROR")
     else:
@@ -104,6 +109,8 @@ def uninstall_packages(packages, simulate=False, force=True):
         res = run_cmd("rpm --evh --nodeps {} {} {}".format(forces, simulate_str,
                                                            packages_str),
                       shell=True)
+        if not simulate:
+            invalidate_host_facts()
     except sp.TimeoutExpired as err:
         raise AutomationLibraryError("TIMEOUT_ERROR")
     else:
@@ -165,9 +172,17 @@ def get_installed_platform_version(config):
     return PlatformVersion(find_package_installed(package_name))
 
 
-## Return list of installed 1C:Enterprise Platform packages.
+## Return list of installed 1C:Enterprise Platform packages. List is taken
+#  from host facts, so package manager is queried only after changes.
 # @return List of dicts.
 def get_installed_platform_packages():
+    return get_host_fact("platform-packages")
+
+
+## Query package manager for list of installed 1C:Enterprise Platform
+#  packages.
+# @return List of dicts.
+def query_installed_platform_packages():
     # query all installed 1c-enterprise* packages
     res = run_cmd(
         "rpm -qa --queryformat \"%{n}\\t%{arch}\\t%{v}-%{release}\\t\\n\" "
@@ -200,6 +215,8 @@ def uninstall_packages(packages, simulate=False):
         res = run_cmd("rpm -evh --nodeps {} {}".format(simulate_str,
                                                           packages_str),
                       shell=True)
+        if not simulate:
+            invalidate_host_facts()
     except sp.TimeoutExpired as err:
         raise AutomationLibraryError("TIMEOUT_ERROR")
     else:
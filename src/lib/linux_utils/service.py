@@ -23,9 +23,11 @@ RAS_DEFAULT_PORT = 1545
 
 SERVICES_DIR = ["/etc/systemd/system", ]
 
+# path is based on location of this module instead of sys.argv[0], because
+# module can be imported before script starts (see lib.utils.zygote)
 SCRIPT_BLANK_PATH = os.path.abspath(
     os.path.join(
-        os.path.dirname(sys.argv[0]), ".."
+        os.path.dirname(os.path.abspath(__file__)), "..", ".."
     )
 )
 
@@ -597,4 +599,4 @@ def can_create_1c_cluster_service(name, port=CLUSTER_DEFAULT_PORT,
         and not reduce(
             lambda acc, x: is_port_used_by_1c_services(x) or acc,
             dyn_range, False
-        ) \
+        )
@@ -10,7 +10,55 @@ from .utils import *
 SERVICE_CONTROL_DELAY = 10
 
 
+## Check web server, which is controlled on Windows.
+# @param server Name of web server.
+# @return True or False.
+def is_windows_web_server(server):
+    if server.lower() not in ["apache", "iis"]:
+        global_logger.error(message="Incorrect web server. For Windows "
+                            "allowed web servers is 'apache' and 'iis'")
+        return False
+    return True
+
+
+## Check web server, which is controlled on Linux.
+# @param server Name of web server.
+# @return True or False.
+def is_linux_web_server(server):
+    if server.lower() not in ["apache"]:
+        global_logger.error(message="Incorrect web server. For Linux "
+                            "allowed web servers is 'apache'")
+        return False
+    return True
+
+
 class PlatformCtlScenario:
+    ## Schema of common parameters.
+    SCHEMA = ConfigSchema([
+        ["server-role", str, str, ["all", "app", "web"]],
+        ["test-mode", bool],
+        # ["try-count", int],
+        # ["timeout", int],
+        ["time-limit", int],
+        ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
+    ])
+    ## Schema of parameters, required if services are stopped.
+    STOP_SCHEMA = ConfigSchema([
+        ["dumps-folder", StrPathExpanded],
+    ])
+    ## Schema of parameters, required if app server is controlled.
+    APP_SCHEMA = ConfigSchema([
+        ["service-1c/name", str],
+        ["ras/name", str],
+    ])
+    ## Schemas of parameters, required if web server is controlled.
+    WINDOWS_WEB_SCHEMA = ConfigSchema([
+        ["web-server", str, str, is_windows_web_server],
+    ])
+    LINUX_WEB_SCHEMA = ConfigSchema([
+        ["web-server", str, str, is_linux_web_server],
+    ])
+
     ## Constructor.
     # @param self Pointer to object.
     # @param config lib::common::config::Configuration object.
@@ -53,43 +101,16 @@ class PlatformCtlScenario:
     # @param self Pointer to object.
     # @exception AutomationLibraryError("OPTION_NOT_FOUND")
     def validate_config(self):
-
-        def validate_web_servers(server):
-            if self.config["os-type"] == "Windows" and \
-               self.config["web-server"].lower() not in ["apache", "iis"]:
-                global_logger.error(message="Incorrect web server. For Windows "
-                                    "allowed web servers is 'apache' and 'iis'")
-                return False
-            elif self.config["os-type"] in ["Linux-deb", "Linux-rpm"] and \
-                 self.config["web-server"].lower() not in ["apache"]:
-                global_logger.error(message="Incorrect web server. For Linux "
-                                    "allowed web servers is 'apache'")
-                return False
-            return True
-
-        # build validate data
-        validate_data = [
-            ["server-role", str, str, ["all", "app", "web"]],
-            ["test-mode", bool],
-            # ["try-count", int],
-            # ["timeout", int],
-            ["time-limit", int],
-            ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
-        ]
+        schema = self.SCHEMA
         if self.action != "start":
-            validate_data += [
-                ["dumps-folder", StrPathExpanded],
-            ]
+            schema += self.STOP_SCHEMA
         if self.config["server-role"] in ["app", "all"]:
-            validate_data += [
-                ["service-1c/name", str],
-                ["ras/name", str],
-            ]
+            schema += self.APP_SCHEMA
         if self.config["server-role"] in ["web", "all"]:
-            validate_data += [
-                ["web-server", str, str, validate_web_servers],
-            ]
-        self.config.validate(validate_data)
+            schema += self.WINDOWS_WEB_SCHEMA \
+                      if self.config["os-type"] == "Windows" \
+                      else self.LINUX_WEB_SCHEMA
+        self.config.validate(schema)
 
     def _connect_services(self):
         for service in self.services:
@@ -3,6 +3,7 @@
 import subprocess as sp
 
 from ..common.logger import *
+from ..common.tracing import TraceSpan
 
 
 ## Class, which represent completed process.
@@ -41,6 +42,13 @@ class CompletedProcess:
 # @return CompletedProcess object.
 # @exception TimeoutExpired
 def run_cmd(args, shell=False, timeout=None):
+    # process is shown in trace of run (see lib::common::tracing)
+    with TraceSpan("run_cmd", args=args):
+        return _run_cmd(args, shell, timeout)
+
+
+## Implementation of run_cmd().
+def _run_cmd(args, shell, timeout):
     with sp.Popen(args, stdout=sp.PIPE, stderr=sp.PIPE, shell=shell) as process:
         global_logger.debug(args=process.args, pid=process.pid)
         try:
@@ -60,6 +68,8 @@ def run_cmd(args, shell=False, timeout=None):
             process.wait()
             raise
         retcode = process.poll()
-        cp = CompletedProcess(process.args, retcode, stdout, stderr)
-        global_logger.debug(cp)
-        return cp
+        # output is already logged above, CompletedProcess is not logged:
+        # its repr() would copy whole output
+        global_logger.debug(message="Process finished", args=process.args,
+                            pid=process.pid, returncode=retcode)
+        return CompletedProcess(process.args, retcode, stdout, stderr)
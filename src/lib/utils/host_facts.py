@@ -0,0 +1,248 @@
+# coding: utf-8
+
+import json
+import os
+import platform
+import tempfile
+import threading
+
+from .cmd import run_cmd
+from ..common import global_vars as gv
+from ..common.errors import AutomationLibraryError
+from ..common.logger import global_logger
+
+
+## Environment variable, through which host facts are passed to child
+#  processes.
+HOST_FACTS_ENV = "AUTOMATION_HOST_FACTS"
+## File (relative to PID_PATH), where host facts are stored for other
+#  processes. Facts from file (and from environment) are used only if they
+#  were gathered after last boot.
+HOST_FACTS_FILE = "host_facts.json"
+## Path to boot id on Linux.
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+## Package databases: platform packages fact is valid, while modification time
+#  of database is unchanged.
+PACKAGE_DATABASES = {
+    "Linux-deb": "/var/lib/dpkg/status",
+    "Linux-rpm": "/var/lib/rpm",
+}
+
+## Facts of current process, None until first access.
+_facts = None
+_lock = threading.RLock()
+
+
+## Get id of current boot.
+# @return String or None, if it is not available.
+def get_boot_id():
+    try:
+        with open(BOOT_ID_PATH) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+## Detect OS type.
+# @return one of values: "Windows", "Linux-deb", "Linux-rpm".
+# @exception AutomationLibraryError("UNKNOWN", "OS not supported")
+def probe_os_type():
+    os_str = platform.system()
+    if os_str not in ["Windows", "Linux"]:
+        raise AutomationLibraryError("UNKNOWN", "OS not supported")
+
+    if os_str == "Linux":
+        linux_type = "deb" if run_cmd("dpkg --version", shell=True) \
+            .returncode == 0 else "rpm"
+        return os_str + "-" + linux_type
+    else:
+        return os_str
+
+
+## Detect architecture.
+# @return 64 or 32.
+# @exception AutomationLibraryError("NO_ARCHITECTURE")
+def probe_arch():
+    bit32id = ["32bit", "x86"]
+    bit64id = ["64bit", "x86_64", "AMD64"]
+    bit_ids = bit32id + bit64id
+
+    # trying to retrieve platform architecture in different ways
+    res = platform.machine()
+    if res not in bit_ids:
+        res = platform.processor()
+    else:
+        return 64 if res in bit64id else 32
+    if res not in bit_ids:
+        res = platform.architecture()
+    else:
+        return 64 if res in bit64id else 32
+    for i in res:
+        if i in bit_ids:
+            return 64 if i in bit64id else 32
+    raise AutomationLibraryError("NO_ARCHITECTURE")
+
+
+## Detect, is systemd used as init system.
+# @return True or False.
+def probe_systemd():
+    return os.path.isdir("/run/systemd/system")
+
+
+## Get list of installed 1C:Enterprise Platform packages.
+# @param os_type OS type.
+# @return List of dicts (see query_installed_platform_packages() of deb and
+#  rpm modules) or None, if OS doesn't use package manager.
+def probe_platform_packages(os_type):
+    if os_type == "Linux-deb":
+        from ..linux_utils import deb as pm_module
+    elif os_type == "Linux-rpm":
+        from ..linux_utils import rpm as pm_module
+    else:
+        return None
+    return pm_module.query_installed_platform_packages()
+
+
+## Functions, which gather facts, which cannot change until reboot.
+PROBES = {
+    "os-type": probe_os_type,
+    "arch": probe_arch,
+    "systemd": probe_systemd,
+}
+
+
+## Get stamp of package database.
+# @param os_type OS type.
+# @return Modification time of database (of newest file, if database is
+#  folder) or None.
+def get_package_database_stamp(os_type):
+    path = PACKAGE_DATABASES.get(os_type)
+    if path is None:
+        return None
+    try:
+        stamp = os.stat(path).st_mtime_ns
+        if os.path.isdir(path):
+            for entry in os.scandir(path):
+                stamp = max(stamp, entry.stat().st_mtime_ns)
+        return stamp
+    except OSError:
+        return None
+
+
+## Read facts from environment or file.
+# @param boot_id Id of current boot.
+# @return Dictionary.
+def _load_facts(boot_id):
+    sources = [lambda: os.environ[HOST_FACTS_ENV]]
+    # without boot id it is unknown, when file was written
+    if boot_id is not None:
+        def read_file():
+            with open(os.path.join(gv.PID_PATH, HOST_FACTS_FILE),
+                      encoding="utf-8") as f:
+                return f.read()
+        sources.append(read_file)
+    for source in sources:
+        try:
+            facts = json.loads(source())
+        except (KeyError, OSError, ValueError):
+            continue
+        if isinstance(facts, dict) and facts.get("boot-id") == boot_id:
+            return facts
+    return {"boot-id": boot_id}
+
+
+## Pass facts to child processes through environment and store them in file.
+#  Errors are logged and ignored, because facts can be gathered again.
+# @param facts Dictionary.
+def _save_facts(facts):
+    data = json.dumps(facts, separators=(",", ":"))
+    os.environ[HOST_FACTS_ENV] = data
+    if facts["boot-id"] is None:
+        return
+    try:
+        os.makedirs(gv.PID_PATH, exist_ok=True)
+        # write to temporary file and rename it, so concurrent processes
+        # never read partially written file
+        fd, temp_path = tempfile.mkstemp(dir=gv.PID_PATH, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, os.path.join(gv.PID_PATH, HOST_FACTS_FILE))
+        except:
+            os.remove(temp_path)
+            raise
+    except OSError as err:
+        global_logger.debug(message="Cannot store host facts",
+                            error=str(err))
+
+
+## Get platform packages fact. Packages are queried again, if package database
+#  changed since they were gathered.
+# @param facts Dictionary.
+# @return List of dicts or None.
+def _get_platform_packages(facts):
+    os_type = _get_fact(facts, "os-type")
+    stamp = get_package_database_stamp(os_type)
+    cached = facts.get("platform-packages")
+    if cached is None or cached["stamp"] != stamp or stamp is None:
+        # package could be already queried by other process
+        cached = _load_facts(facts["boot-id"]).get("platform-packages")
+        if cached is None or cached["stamp"] != stamp or stamp is None:
+            cached = {"stamp": stamp,
+                      "packages": probe_platform_packages(os_type)}
+            facts["platform-packages"] = cached
+            _save_facts(facts)
+        else:
+            facts["platform-packages"] = cached
+    if cached["packages"] is None:
+        return None
+    return [dict(package) for package in cached["packages"]]
+
+
+## Get fact, gathering it, if necessary.
+# @param facts Dictionary.
+# @param name Name of fact.
+# @return Value.
+def _get_fact(facts, name):
+    if name not in facts:
+        facts[name] = PROBES[name]()
+        _save_facts(facts)
+    return facts[name]
+
+
+## Get fact about host. Facts are gathered once per boot: they are memoized in
+#  process and passed to child processes through environment variable and
+#  file in PID_PATH.
+# @param name Name of fact: "os-type", "arch" (64 or 32), "systemd" (True or
+#  False) or "platform-packages" (list of installed platform packages or
+#  None on Windows).
+# @return Value.
+# @exception AutomationLibraryError(*) Fact cannot be gathered.
+def get_host_fact(name):
+    global _facts
+    with _lock:
+        if _facts is None:
+            _facts = _load_facts(get_boot_id())
+        if name == "platform-packages":
+            return _get_platform_packages(_facts)
+        return _get_fact(_facts, name)
+
+
+## Get all facts about host except platform packages.
+# @return Dictionary.
+def get_host_facts():
+    return {name: get_host_fact(name) for name in PROBES}
+
+
+## Forget facts, so they are gathered again on next access. Should be called
+#  after packages are installed or removed.
+# @param names Names of facts. By default only platform packages are
+#  forgotten.
+def invalidate_host_facts(names=("platform-packages", )):
+    global _facts
+    with _lock:
+        if _facts is None:
+            _facts = _load_facts(get_boot_id())
+        for name in names:
+            _facts.pop(name, None)
+        _save_facts(_facts)
@@ -0,0 +1,214 @@
+# coding: utf-8
+
+import concurrent.futures
+import heapq
+import itertools
+import os
+import selectors
+import signal
+import socket
+import threading
+import time
+
+from ..common.logger import global_logger
+
+
+## Interval (in seconds) of polling children, which exit cannot be waited via
+#  file descriptor, when SIGCHLD is not available.
+POLL_INTERVAL = 0.1
+
+
+## Get file descriptor, which becomes readable, when process exits.
+# @param proc subprocess.Popen or ZygoteProcess object.
+# @return Tuple (file descriptor or None, should descriptor be closed by
+#  caller).
+def open_exit_fd(proc):
+    # zygote workers provide multiprocessing sentinel
+    sentinel = getattr(proc, "sentinel", None)
+    if sentinel is not None:
+        return sentinel, False
+    if hasattr(os, "pidfd_open"):
+        try:
+            return os.pidfd_open(proc.pid), True
+        except OSError:
+            pass
+    return None, False
+
+
+## Class, which represents watched process.
+class _Watch:
+
+    ## Constructor.
+    # @param self Pointer to object.
+    # @param proc subprocess.Popen or ZygoteProcess object.
+    # @param on_timeout Callable, which accepts proc, or None.
+    def __init__(self, proc, on_timeout):
+        self.proc = proc
+        self.on_timeout = on_timeout
+        self.future = concurrent.futures.Future()
+        self.fd, self.own_fd = open_exit_fd(proc)
+        self.done = False
+
+
+## Class, which waits for all child processes in one thread. Exits are
+#  detected via pidfd (or sentinel of zygote workers) and selectors. If it is
+#  not available, children are polled on SIGCHLD or, if signal cannot be
+#  handled, every POLL_INTERVAL. Time limits of all children are kept in one
+#  heap of monotonic deadlines.
+class ProcessReaper:
+
+    ## Constructor. SIGCHLD handler installed only if it is needed and
+    #  constructor called from main thread.
+    # @param self Pointer to object.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._heap = []
+        self._counter = itertools.count()
+        # watches, added by other threads, but not registered yet
+        self._new = []
+        # watches without exit descriptor
+        self._polled = set()
+        self._sigchld = False
+        if not hasattr(os, "pidfd_open") and hasattr(signal, "SIGCHLD") \
+           and threading.current_thread() is threading.main_thread():
+            self._install_sigchld_handler()
+        self._thread = threading.Thread(target=self._main, daemon=True)
+        self._thread.start()
+
+    ## Install SIGCHLD handler, which wakes up reaper thread.
+    # @param self Pointer to object.
+    def _install_sigchld_handler(self):
+        previous = signal.getsignal(signal.SIGCHLD)
+
+        def handler(signum, frame):
+            self._wakeup()
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGCHLD, handler)
+        self._sigchld = True
+
+    ## Wake up reaper thread.
+    # @param self Pointer to object.
+    def _wakeup(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            # socket buffer full, thread will wake up anyway
+            pass
+
+    ## Start watching process.
+    # @param self Pointer to object.
+    # @param proc subprocess.Popen or ZygoteProcess object.
+    # @param time_limit Time limit in seconds or None.
+    # @param on_timeout Callable, which accepts proc. Called from reaper
+    #  thread, if process still running, when time limit expires. It should
+    #  kill process and shouldn't block.
+    # @return concurrent.futures.Future, which result is return code of
+    #  process.
+    def watch(self, proc, time_limit=None, on_timeout=None):
+        watch = _Watch(proc, on_timeout)
+        with self._lock:
+            self._new.append(watch)
+            if time_limit is not None and on_timeout is not None:
+                heapq.heappush(self._heap,
+                               (time.monotonic() + time_limit,
+                                next(self._counter), watch))
+        self._wakeup()
+        return watch.future
+
+    ## Check, is process finished, and complete its future.
+    # @param self Pointer to object.
+    # @param watch _Watch object.
+    def _check(self, watch):
+        if watch.done:
+            return
+        returncode = watch.proc.poll()
+        if returncode is None:
+            return
+        watch.done = True
+        if watch.fd is not None:
+            self._selector.unregister(watch.fd)
+            if watch.own_fd:
+                os.close(watch.fd)
+        else:
+            self._polled.discard(watch)
+        watch.future.set_result(returncode)
+
+    ## Calculate, how long thread can sleep.
+    # @param self Pointer to object.
+    # @return Timeout in seconds or None.
+    def _get_timeout(self):
+        timeout = None
+        with self._lock:
+            while self._heap and self._heap[0][2].done:
+                heapq.heappop(self._heap)
+            if self._heap:
+                timeout = max(self._heap[0][0] - time.monotonic(), 0)
+        if self._polled and not self._sigchld:
+            timeout = POLL_INTERVAL if timeout is None \
+                      else min(timeout, POLL_INTERVAL)
+        return timeout
+
+    ## Main function of reaper thread.
+    # @param self Pointer to object.
+    def _main(self):
+        while True:
+            with self._lock:
+                new, self._new = self._new, []
+            for watch in new:
+                if watch.fd is not None:
+                    self._selector.register(watch.fd, selectors.EVENT_READ,
+                                            watch)
+                else:
+                    self._polled.add(watch)
+                self._check(watch)
+            for key, events in self._selector.select(self._get_timeout()):
+                if key.data is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                else:
+                    self._check(key.data)
+            for watch in list(self._polled):
+                self._check(watch)
+            # fire expired deadlines
+            expired = []
+            now = time.monotonic()
+            with self._lock:
+                while self._heap and self._heap[0][0] <= now:
+                    watch = heapq.heappop(self._heap)[2]
+                    if not watch.done:
+                        expired.append(watch)
+            for watch in expired:
+                try:
+                    watch.on_timeout(watch.proc)
+                except Exception as err:
+                    global_logger.warning(
+                        message="Error in process time-limit handler",
+                        pid=watch.proc.pid, error=str(err)
+                    )
+
+
+## Reaper, shared by all steps of process, and lock, which guards it.
+_REAPER = None
+_REAPER_LOCK = threading.Lock()
+
+
+## Get reaper, shared by all steps of process. It is created on first call,
+#  so runners should call it from main thread before starting steps, then
+#  SIGCHLD can be used, if pidfd is not available.
+# @return ProcessReaper object.
+def get_reaper():
+    global _REAPER
+    with _REAPER_LOCK:
+        if _REAPER is None:
+            _REAPER = ProcessReaper()
+        return _REAPER
@@ -2,10 +2,14 @@
 
 import hashlib
 import io
+import marshal
 import os
+import pickle
 import platform
 import re
 import shutil
+import tempfile
+import threading
 import yaml
 import sys
 from distutils.dir_util import copy_tree, remove_tree
@@ -15,6 +19,7 @@ import collections
 
 
 from .cmd import run_cmd
+from . import host_facts
 from ..common import global_vars as gv
 from ..common.errors import AutomationLibraryError
 from ..common.logger import global_logger, LogFunc
@@ -125,25 +130,7 @@ def static_var(name, initial_value=None):
 # @exception AutomationLibraryError("NO_ARCHITECTURE") Raised if cannot detect
 #  platform architecture.
 def is_64bit_arch():
-    bit32id = ["32bit", "x86"]
-    bit64id = ["64bit", "x86_64", "AMD64"]
-    bit_ids = bit32id + bit64id
-
-    # trying to retrieve platform architecture in different ways
-    res = platform.machine()
-    if res not in bit_ids:
-        res = platform.processor()
-    else:
-        return res in bit64id
-    if res not in bit_ids:
-        res = platform.architecture()
-    else:
-        return res in bit64id
-    for i in res:
-        if i in bit_ids:
-            res = i
-            return res in bit64id
-    raise AutomationLibraryError("NO_ARCHITECTURE")
+    return host_facts.get_host_fact("arch") == 64
 
 
 ## Try to open file and convert exceptions to AutomationLibraryError.
@@ -197,18 +184,93 @@ def open_file(path, mode="r", encoding="utf-8"):
         return f
 
 
-## Open and read YAML file.
-# @param path Path to YAML file.
-# @return Content of YAML file.
+## Loader, which is used by read_yaml(): libyaml based one, if PyYAML is
+#  built with it, pure Python one otherwise.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+## Should parsed YAML files be cached: in memory of process and on disk, in
+#  YAML_CACHE_FOLDER (relative to PID_PATH), so child processes can reuse
+#  files, parsed by parent.
+USE_YAML_CACHE = True
+## Maximum number of files, cached in memory.
+YAML_CACHE_SIZE = 128
+## Folder (relative to PID_PATH), where parsed YAML files are stored. Files
+#  are stored in marshal format, which can hold only plain data (unlike
+#  pickle, loading it doesn't execute code), and are read only if folder is
+#  owned by current user and not writable by others.
+YAML_CACHE_FOLDER = "yaml_cache"
+## Version of cache format. Increase it, when constructors change.
+YAML_CACHE_VERSION = 2
+
+## In-memory cache: (real path, mtime, size) -> tuple (function, which loads
+#  data, serialized data). Data, which cannot be marshalled (for example,
+#  dates), is pickled and is not stored on disk.
+_yaml_cache = collections.OrderedDict()
+_yaml_cache_lock = threading.Lock()
+
+
+## Constructor for "!join" tag in YAML: concatenate string representations of
+#  elements of sequence. For parameters explanation see the PyYAML
+#  documentation.
+# @param loader
+# @param node
+# @return builded node.
+def yaml_join(loader, node):
+    seq = loader.construct_sequence(node, deep=True)
+    return "".join([str(i) for i in seq])
+
+
+## Constructor for "!getvalue" tag in YAML: get value from data (usually
+#  anchor), which is first element of sequence, by keys, which are other
+#  elements. Nodes are traversed instead of constructed data, because anchored
+#  mappings and sequences are not filled yet, when this constructor is called.
+#  For parameters explanation see the PyYAML documentation.
+# @param loader
+# @param node
+# @return builded node.
+def yaml_getvalue(loader, node):
+    var = node.value[0]
+    for key_node in node.value[1:]:
+        key = loader.construct_object(key_node, deep=True)
+        if isinstance(var, yaml.MappingNode):
+            loader.flatten_mapping(var)
+            for item_key, item_value in var.value:
+                if loader.construct_object(item_key, deep=True) == key:
+                    var = item_value
+                    break
+            else:
+                raise yaml.constructor.ConstructorError(
+                    None, None, "key {!r} not found".format(key),
+                    key_node.start_mark
+                )
+        elif isinstance(var, yaml.SequenceNode) and isinstance(key, int) \
+             and -len(var.value) <= key < len(var.value):
+            var = var.value[key]
+        else:
+            raise yaml.constructor.ConstructorError(
+                None, None, "cannot get {!r} from node".format(key),
+                key_node.start_mark
+            )
+    return loader.construct_object(var, deep=True)
+
+
+# add custom constructors to YAML loaders
+for _loader in set([yaml.SafeLoader, YAML_LOADER]):
+    _loader.add_constructor("!join", yaml_join)
+    _loader.add_constructor("!getvalue", yaml_getvalue)
+
+
+## Parse YAML.
+# @param stream File or content of YAML file.
+# @param path Path to YAML file (for error messages).
+# @return Parsed data.
 # @exception AutomationLibraryError("YAML_PROBLEM_MARK") Incorrect syntax.
 # @exception AutomationLibraryError("YAML_COMMON_ERROR") Unknown error while
 #  processing YAML file.
-def read_yaml(path):
+def parse_yaml(stream, path):
     try:
-        f = open_file(path, encoding="utf-8")
-        data = yaml.load(f)
+        return yaml.load(stream, Loader=YAML_LOADER)
     except yaml.YAMLError as err:
-        if hasattr(err, "problem_mark"):
+        if hasattr(err, "problem_mark") and err.problem_mark is not None:
             mark = err.problem_mark
             raise AutomationLibraryError("YAML_PROBLEM_MARK",
                                          mark.line + 1, mark.column + 1,
@@ -216,7 +278,133 @@ def read_yaml(path):
         else:
             raise AutomationLibraryError("YAML_COMMON_ERROR",
                                          str(err), path)
-    f.close()
+
+
+## Get path to file of on-disk YAML cache.
+# @param digest Hash of content of YAML file.
+# @return Path.
+def _get_yaml_cache_path(digest):
+    return os.path.join(gv.PID_PATH, YAML_CACHE_FOLDER, digest + ".marshal")
+
+
+## Check, that on-disk YAML cache can be trusted: folder is owned by current
+#  user and other users cannot write to it.
+# @param folder Path to folder.
+# @return True or False.
+def _is_yaml_cache_folder_safe(folder):
+    try:
+        stat = os.stat(folder)
+    except OSError:
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+## Load data from on-disk YAML cache.
+# @param digest Hash of content of YAML file.
+# @return Marshalled data or None, if not found or folder is not safe.
+def _load_yaml_cache_file(digest):
+    path = _get_yaml_cache_path(digest)
+    if not _is_yaml_cache_folder_safe(os.path.dirname(path)):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+## Store data in on-disk YAML cache. Errors are logged and ignored, because
+#  cache is only an optimization.
+# @param digest Hash of content of YAML file.
+# @param blob Marshalled data.
+def _store_yaml_cache_file(digest, blob):
+    path = _get_yaml_cache_path(digest)
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        if not _is_yaml_cache_folder_safe(os.path.dirname(path)):
+            global_logger.debug(message="YAML cache folder is not safe, "
+                                "parsed file is not stored",
+                                folder=os.path.dirname(path))
+            return
+        # write to temporary file and rename it, so concurrent processes
+        # never read partially written file
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                         suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(temp_path, path)
+        except:
+            os.remove(temp_path)
+            raise
+    except OSError as err:
+        global_logger.debug(message="Cannot store parsed YAML file",
+                            path=path, error=str(err))
+
+
+## Serialize parsed data for in-memory cache.
+# @param data Parsed data.
+# @return Tuple (function, which loads data, serialized data).
+def _dump_yaml_data(data):
+    try:
+        return marshal.loads, marshal.dumps(data)
+    except ValueError:
+        # data, created by process itself, can be safely pickled
+        return pickle.loads, pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+
+## Open and read YAML file. Parsed files are cached in memory (file is not
+#  read again, while its mtime and size are unchanged) and on disk (file is
+#  not parsed again, while its content is unchanged). Each call returns new
+#  copy of data, so it can be changed by caller.
+# @param path Path to YAML file.
+# @return Content of YAML file.
+# @exception AutomationLibraryError("YAML_PROBLEM_MARK") Incorrect syntax.
+# @exception AutomationLibraryError("YAML_COMMON_ERROR") Unknown error while
+#  processing YAML file.
+def read_yaml(path):
+    if not USE_YAML_CACHE:
+        with open_file(path, encoding="utf-8") as f:
+            return parse_yaml(f, path)
+    try:
+        stat = os.stat(path)
+        key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        key = None
+    with _yaml_cache_lock:
+        entry = _yaml_cache.get(key)
+        if entry is not None:
+            _yaml_cache.move_to_end(key)
+    if entry is not None:
+        return entry[0](entry[1])
+    with open_file(path, mode="rb", encoding=None) as f:
+        content = f.read()
+    digest = hashlib.sha256(
+        "{}:{}:".format(YAML_CACHE_VERSION, YAML_LOADER.__name__)
+        .encode("utf-8") + content
+    ).hexdigest()
+    data = None
+    blob = _load_yaml_cache_file(digest)
+    if blob is not None:
+        try:
+            data = marshal.loads(blob)
+            entry = (marshal.loads, blob)
+        except (EOFError, ValueError, TypeError):
+            global_logger.debug(message="Parsed YAML file in cache is "
+                                "damaged", path=path, digest=digest)
+    if entry is None:
+        data = parse_yaml(content, path)
+        entry = _dump_yaml_data(data)
+        # damaged file is overwritten too
+        if entry[0] is marshal.loads:
+            _store_yaml_cache_file(digest, entry[1])
+    if key is not None:
+        with _yaml_cache_lock:
+            _yaml_cache[key] = entry
+            while len(_yaml_cache) > YAML_CACHE_SIZE:
+                _yaml_cache.popitem(last=False)
     return data
 
 
@@ -224,16 +412,7 @@ def read_yaml(path):
 # @return one of values: "Windows", "Linux-deb", "Linux-rpm".
 # @exception AutomationLibraryError("UNKNOWN", "OS not supported")
 def detect_actual_os_type():
-    os_str = platform.system()
-    if os_str not in ["Windows", "Linux"]:
-        raise AutomationLibraryError("UNKNOWN", "OS not supported")
-
-    if os_str == "Linux":
-        linux_type = "deb" if run_cmd("dpkg --version", shell=True) \
-            .returncode == 0 else "rpm"
-        return os_str + "-" + linux_type
-    else:
-        return os_str
+    return host_facts.get_host_fact("os-type")
 
 
 # .exe for SFX RAR doesn't included cuz it also could be just executable
@@ -0,0 +1,241 @@
+# coding: utf-8
+
+import multiprocessing
+import os
+import platform
+import runpy
+import subprocess as sp
+import sys
+import threading
+import traceback
+
+from ..common.logger import global_logger
+
+if platform.system() == "Linux":
+    from ..linux_utils import process_group
+else:
+    process_group = None
+
+
+## Modules, which are imported by zygote process before forking workers.
+#  Modules, which cannot be imported on current OS, are silently skipped.
+ZYGOTE_PRELOAD = [
+    "yaml",
+    "lib.common.bootstrap",
+    "lib.common.config",
+    "lib.common.base_scenario",
+    "lib.utils",
+    "lib.platform_ctl",
+    "lib.linux_utils",
+    "lib.linux_utils.service",
+    "lib.linux_utils.platform_updater",
+]
+## Is zygote supported on current OS (it requires fork()).
+ZYGOTE_SUPPORTED = "forkserver" in multiprocessing.get_all_start_methods()
+## Should popen_script() use zygote. Runners set it from command line.
+USE_ZYGOTE = ZYGOTE_SUPPORTED
+
+
+## Get multiprocessing context, which forks workers from zygote.
+# @return multiprocessing context.
+def _get_context():
+    from multiprocessing import forkserver
+    forkserver.set_forkserver_preload(ZYGOTE_PRELOAD)
+    return multiprocessing.get_context("forkserver")
+
+
+## Start zygote process in advance, so its imports run concurrently with
+#  caller's work. Does nothing, if zygote is not supported or disabled.
+def warm_up_zygote():
+    if not (USE_ZYGOTE and ZYGOTE_SUPPORTED):
+        return
+    from multiprocessing import forkserver
+    _get_context()
+    thread = threading.Thread(target=forkserver.ensure_running, daemon=True)
+    thread.start()
+
+
+## Main function of worker, forked from zygote. Make worker look like freshly
+#  started interpreter, which executes script, and exit with script's code.
+# @param args Command line ([python, script, args...]).
+# @param cwd Working directory.
+# @param env Environment variables.
+# @param stdout multiprocessing.Connection, which replaces standard output, or
+#  None.
+# @param stderr multiprocessing.Connection, which replaces standard error
+#  output, or None.
+# @param cgroup Path of step's cgroup or None.
+def _worker_main(args, cwd, env, stdout, stderr, cgroup=None):
+    code = 1
+    try:
+        if process_group is not None:
+            process_group.setup_child(cgroup)
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(env)
+        for conn, fd in ((stdout, 1), (stderr, 2)):
+            if conn is not None:
+                os.dup2(conn.fileno(), fd)
+                conn.close()
+        sys.argv = list(args[1:])
+        sys.path[0] = os.path.dirname(os.path.abspath(args[1]))
+        try:
+            runpy.run_path(args[1], run_name="__main__")
+            code = 0
+        except SystemExit as err:
+            if err.code is None:
+                code = 0
+            elif isinstance(err.code, int):
+                code = err.code
+            else:
+                print(err.code, file=sys.stderr)
+                code = 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            global_logger.flush()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+## Class, which represents script, executed in worker forked from zygote. Its
+#  interface mimics subprocess.Popen: pid, returncode, poll(), wait(),
+#  communicate(), kill() and terminate() behave the same way.
+class ZygoteProcess:
+
+    ## Constructor. Starts worker.
+    # @param self Pointer to object.
+    # @param args Command line ([python, script, args...]).
+    # @param stdout None (inherit) or subprocess.PIPE.
+    # @param stderr None (inherit) or subprocess.PIPE.
+    def __init__(self, args, stdout=None, stderr=None):
+        self.args = args
+        self.returncode = None
+        self.stdout = None
+        self.stderr = None
+        self._readers = []
+        self._output = {}
+        context = _get_context()
+        child_pipes = []
+        for name, mode in (("stdout", stdout), ("stderr", stderr)):
+            if mode == sp.PIPE:
+                reader, writer = context.Pipe(duplex=False)
+                setattr(self, name, os.fdopen(os.dup(reader.fileno()), "rb"))
+                reader.close()
+                child_pipes.append(writer)
+            elif mode is None:
+                child_pipes.append(None)
+            else:
+                raise ValueError("only None and PIPE supported by zygote")
+        cgroup = process_group.create_step_cgroup() \
+                 if process_group is not None else None
+        self._process = context.Process(
+            target=_worker_main,
+            args=(list(args), os.getcwd(), dict(os.environ)) \
+                 + tuple(child_pipes) + (cgroup, )
+        )
+        self._process.start()
+        if process_group is not None:
+            process_group.register_step_process(self._process.pid, cgroup)
+        # parent doesn't need write ends of pipes
+        for pipe in child_pipes:
+            if pipe is not None:
+                pipe.close()
+        self.pid = self._process.pid
+        global_logger.debug(message="Process forked from zygote",
+                            args=self.args, pid=self.pid)
+
+    ## File descriptor, which become ready, when worker finishes.
+    # @param self Pointer to object.
+    @property
+    def sentinel(self):
+        return self._process.sentinel
+
+    ## Check, is worker finished.
+    # @param self Pointer to object.
+    # @return Return code or None, if worker still running.
+    def poll(self):
+        if self.returncode is None and not self._process.is_alive():
+            self.returncode = self._process.exitcode
+        return self.returncode
+
+    ## Wait until worker finishes.
+    # @param self Pointer to object.
+    # @param timeout Timeout in seconds.
+    # @return Return code.
+    # @exception subprocess.TimeoutExpired
+    def wait(self, timeout=None):
+        self._process.join(timeout)
+        if self.poll() is None:
+            raise sp.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    ## Read output pipes until EOF and wait until worker finishes.
+    # @param self Pointer to object.
+    # @param input Not supported, should be None.
+    # @param timeout Timeout in seconds.
+    # @return Tuple (stdout, stderr).
+    # @exception subprocess.TimeoutExpired
+    def communicate(self, input=None, timeout=None):
+        if input is not None:
+            raise ValueError("input is not supported by zygote")
+        if not self._readers:
+            for name in ("stdout", "stderr"):
+                stream = getattr(self, name)
+                if stream is None:
+                    continue
+                thread = threading.Thread(target=self._read_stream,
+                                          args=(name, stream), daemon=True)
+                thread.start()
+                self._readers.append(thread)
+        for thread in self._readers:
+            thread.join(timeout)
+            if thread.is_alive():
+                raise sp.TimeoutExpired(self.args, timeout)
+        self.wait(timeout)
+        return self._output.get("stdout"), self._output.get("stderr")
+
+    ## Read stream until EOF and store data.
+    # @param self Pointer to object.
+    # @param name Name of stream ("stdout" or "stderr").
+    # @param stream File object.
+    def _read_stream(self, name, stream):
+        self._output[name] = stream.read()
+        stream.close()
+
+    ## Kill worker with SIGKILL.
+    # @param self Pointer to object.
+    def kill(self):
+        if self.poll() is None:
+            self._process.kill()
+
+    ## Terminate worker with SIGTERM.
+    # @param self Pointer to object.
+    def terminate(self):
+        if self.poll() is None:
+            self._process.terminate()
+
+
+## Start Python script as child process. If zygote enabled and supported,
+#  script is executed in worker forked from zygote, otherwise
+#  subprocess.Popen used. On Linux script is started in its own session and,
+#  if available, cgroup, so kill_process_tree() kills its tree at once.
+# @param args Command line ([python, script, args...]).
+# @param stdout None (inherit) or subprocess.PIPE.
+# @param stderr None (inherit) or subprocess.PIPE.
+# @return subprocess.Popen or ZygoteProcess object.
+def popen_script(args, stdout=None, stderr=None):
+    if USE_ZYGOTE and ZYGOTE_SUPPORTED and args[0] == sys.executable:
+        try:
+            return ZygoteProcess(args, stdout, stderr)
+        except Exception as err:
+            global_logger.warning(
+                message="Cannot fork process from zygote, falling back to "
+                "subprocess", error=str(err)
+            )
+    if process_group is not None:
+        return process_group.popen_step(args, stdout=stdout, stderr=stderr)
+    return sp.Popen(args, stdout=stdout, stderr=stderr)
@@ -702,4 +702,4 @@ def can_create_1c_cluster_service(name, port=CLUSTER_DEFAULT_PORT,
         and not reduce(
             lambda acc, x: is_port_used_by_1c_services(x) or acc,
             dyn_range, False
-        ) \
+        )
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+# coding: utf-8
+import sys
+import json
+
+
+from lib.common import bootstrap
+from lib.common import log_index
+from lib.common.errors import *
+from lib.common.logger import *
+
+
+## Default folder of logs (see bootstrap.main()).
+DEFAULT_LOG_FOLDER = "script_logs"
+## Filters, which are passed to LogIndex.query() as is.
+FILTERS = ["scenario", "uuid", "state", "code"]
+
+
+## Find records in log files (of both text and JSON lines formats). Index of
+#  folder is updated before query, so only new data of log files is read.
+#  Usage: log_query.py [folder] [--level=ERROR,CRITICAL] [--scenario=name]
+#  [--since=7d|2016-10-17] [--until=...] [--pid=N] [--uuid=...] [--state=...]
+#  [--code=...] [--limit=N] [--json]
+#  Example (all errors of scenario for last week):
+#  log_query.py --level=ERROR --scenario=platform_update --since=7d
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
+# @return Result code.
+def log_query_main(argv=None):
+    argv = sys.argv if argv is None else argv
+    try:
+        cmd_args = bootstrap.parse_cmd_args(argv[1:])
+        if len(cmd_args[0]) > 1:
+            raise AutomationLibraryError(
+                "ARGS_ERROR", "only one folder should be passed"
+            )
+        folder = str(cmd_args[0][0]) if cmd_args[0] else DEFAULT_LOG_FOLDER
+        if not os.path.isdir(folder):
+            raise AutomationLibraryError("ARGS_ERROR", "folder not found",
+                                         folder=folder)
+        named_args = cmd_args[1]
+        query = {key: str(named_args[key]) for key in FILTERS
+                 if key in named_args}
+        try:
+            for key in ["since", "until"]:
+                if key in named_args:
+                    query[key] = log_index.parse_time(named_args[key])
+            for key in ["pid", "limit"]:
+                if key in named_args:
+                    query[key] = int(named_args[key])
+        except ValueError as err:
+            raise AutomationLibraryError("ARGS_ERROR", str(err))
+        if "level" in named_args:
+            query["level"] = str(named_args["level"]).split(",")
+        with log_index.LogIndex(folder) as index:
+            index.update()
+            records = index.query(**query)
+        for record in records:
+            if named_args.get("json", False):
+                print(json.dumps(record, ensure_ascii=False))
+            else:
+                print("{}: {}".format(record["path"], record["text"]))
+    except AutomationLibraryError as err:
+        global_logger.error(str(err), state="error")
+        return err.num_code
+    except Exception as err:
+        err = AutomationLibraryError("UNKNOWN", err)
+        global_logger.error(str(err), state="error")
+        return err.num_code
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(log_query_main())
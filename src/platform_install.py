@@ -11,37 +11,45 @@ from lib.utils.const import ALL, SERVER, WEB_EXTENSION, CLIENT
 
 
 class PlatformInstallScenario(BaseScenario):
+    ## Schema of specific parameters.
+    SCHEMA = ConfigSchema([
+        ["version", PlatformVersion],
+        ["distr-folder",  StrPathExpanded],
+        ["download-tmp-folder", StrPathExpanded],
+        ["platform-modules", create_typed_list_checker(str),
+         create_str_list_separate_builder(","),
+         create_list_content_checker([ALL, SERVER, WEB_EXTENSION, CLIENT])],
+    ])
+    ## Schema of parameters, specific for Windows.
+    WINDOWS_SCHEMA = ConfigSchema([
+        ["setup-folder", StrPathExpanded],
+    ])
+    ## Schemas of web extension parameters.
+    WINDOWS_WEB_EXTENSION_SCHEMA = ConfigSchema([
+        ["web-extension/path", StrPathExpanded],
+        ["web-extension/web-server", str, str,
+         ["IIS", "apache2.0", "apache2.2", "apache2.4"]],
+    ])
+    LINUX_WEB_EXTENSION_SCHEMA = ConfigSchema([
+        ["web-extension/path", StrPathExpanded],
+        ["web-extension/web-server", str, str,
+         ["apache2.0", "apache2.2", "apache2.4"]],
+    ])
 
     def _validate_specific_data(self):
-        validate_data = [
-            ["version", PlatformVersion],
-            ["distr-folder",  StrPathExpanded],
-            ["download-tmp-folder", StrPathExpanded],
-            ["platform-modules", create_typed_list_checker(str),
-             create_str_list_separate_builder(","),
-             create_list_content_checker([ALL, SERVER, WEB_EXTENSION, CLIENT])],
-        ]
+        schema = self.SCHEMA
         if self.config["os-type"] == "Windows":
-            validate_data.append(["setup-folder", StrPathExpanded])
+            schema += self.WINDOWS_SCHEMA
         else:
             self.config["setup-folder"] = ""
-        self.config.validate(validate_data)
+        self.config.validate(schema)
         if not set(self.config["platform-modules"]) \
            .isdisjoint(set([WEB_EXTENSION, ALL])):
-            validate_data = [
-                ["web-extension/path", StrPathExpanded],
-            ]
-            if self.config["os-type"] == "Windows":
-                validate_data.append([
-                    "web-extension/web-server", str, str,
-                    ["IIS", "apache2.0", "apache2.2", "apache2.4"]
-                ])
-            else:
-                validate_data.append([
-                    "web-extension/web-server", str, str,
-                    ["apache2.0", "apache2.2", "apache2.4"]
-                ])
-            self.config.validate(validate_data)
+            self.config.validate(
+                self.WINDOWS_WEB_EXTENSION_SCHEMA
+                if self.config["os-type"] == "Windows" else
+                self.LINUX_WEB_EXTENSION_SCHEMA
+            )
 
     def _after_init(self):
         self.config["distr-folder"] = os.path.join(
@@ -163,6 +171,10 @@ class PlatformInstallScenario(BaseScenario):
             self.platform_installer.copy_web_library2()
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = PlatformInstallScenario.execute_wrapper
+
+
 if __name__ == "__main__":
     bootstrap.main(PlatformInstallScenario.execute_wrapper,
                    os.path.basename(__file__)[0:-3])
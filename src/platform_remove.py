@@ -11,16 +11,22 @@ from lib.crossplatform_utils import *
 
 
 class PlatformRemoveScenario(BaseScenario):
+    ## Schema of specific parameters.
+    SCHEMA = ConfigSchema([
+        ["version", PlatformVersion],
+    ])
+    ## Schema of parameters, specific for Windows.
+    WINDOWS_SCHEMA = ConfigSchema([
+        ["setup-folder", StrPathExpanded],
+    ])
 
     def _validate_specific_data(self):
-        validate_data = [
-            ["version", PlatformVersion],
-        ]
+        schema = self.SCHEMA
         if self.config["os-type"] == "Windows":
-            validate_data.append(["setup-folder", StrPathExpanded])
+            schema += self.WINDOWS_SCHEMA
         else:
             self.config["setup-folder"] = ""
-        self.config.validate(validate_data)
+        self.config.validate(schema)
         # logic check
         if self.config["os-type"] == "Windows":
             if self.config["version"] == "" \
@@ -66,6 +72,10 @@ class PlatformRemoveScenario(BaseScenario):
         self.platform_remover.uninstall_old()
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = PlatformRemoveScenario.execute_wrapper
+
+
 if __name__ == "__main__":
     bootstrap.main(PlatformRemoveScenario.execute_wrapper,
                    os.path.basename(__file__)[0:-3])
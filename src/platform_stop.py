@@ -10,14 +10,16 @@ from lib.utils import *
 
 
 ## Wrapper for scenario execution.
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
 # @return Last error code (0 if no errors occurred).
-def platform_stop_scenario():
+def platform_stop_scenario(argv=None):
+    argv = sys.argv if argv is None else argv
     res = 1
     # execute scenario
     try:
-        data = read_yaml(sys.argv[1])
+        data = read_yaml(argv[1])
         config = ScenarioConfiguration(data)
-        cmd_args = bootstrap.parse_cmd_args(sys.argv[2:])
+        cmd_args = bootstrap.parse_cmd_args(argv[2:])
         config.add_cmd_args(cmd_args[1], True)
         bootstrap.set_debug_values(cmd_args[1])
         if "composite-scenario-name" in config:
@@ -51,6 +53,10 @@ def platform_stop_scenario():
     return res
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = platform_stop_scenario
+
+
 if __name__ == "__main__":
     bootstrap.main(platform_stop_scenario,
                    os.path.basename(__file__)[0:-3])
@@ -11,6 +11,39 @@ from lib.utils import *
 
 
 class PlatformUpdateScenario:
+    ## Schema of common options.
+    SCHEMA = ConfigSchema([
+        # ["server-role", str, str, ["all", "app", "web"]],
+        ["platform-modules", create_typed_list_checker(str),
+         create_str_list_separate_builder(","),
+         create_list_content_checker(["all", "app", "web", "client"])],
+        ["test-mode", bool],
+        # ["try-count", int],
+        # ["timeout", int],
+        ["time-limit", int],
+        ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
+        ["clean-snccntx", bool],
+        ["clean-pfl", bool],
+        ["cluster-folder", StrPathExpanded],
+        ["distr-folder", StrPathExpanded],
+        ["download-tmp-folder", StrPathExpanded],
+        ["standalone", bool]
+    ])
+    ## Schema of options, required if app server is updated.
+    APP_SCHEMA = ConfigSchema([
+        ["service-1c/name", str],
+        ["service-1c/login", str],
+        ["ras/name", str],
+        ["ras/login", str],
+        ["ras/port", int],
+        ["ras/path", StrPathExpanded],
+    ])
+    ## Schema of options, required if app server is updated on Windows.
+    WINDOWS_APP_SCHEMA = ConfigSchema([
+        ["service-1c/password", str],
+        ["ras/password", str],
+    ])
+
     ## Constructor.
     # @param self Pointer to object.
     # @param config lib::common::config::Configuration object.
@@ -69,41 +102,14 @@ class PlatformUpdateScenario:
     # @exception AutomationLibraryError("OLD_VERSION_DOESNT_MATCH")
     # @exception AutomationLibraryError("OPTION_NOT_FOUND")
     def validate_config(self):
-        validate_data = [
-            # ["server-role", str, str, ["all", "app", "web"]],
-            ["platform-modules", create_typed_list_checker(str),
-             create_str_list_separate_builder(","),
-             create_list_content_checker(["all", "app", "web", "client"])],
-            ["test-mode", bool],
-            # ["try-count", int],
-            # ["timeout", int],
-            ["time-limit", int],
-            ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
-            ["clean-snccntx", bool],
-            ["clean-pfl", bool],
-            ["cluster-folder", StrPathExpanded],
-            ["distr-folder", StrPathExpanded],
-            ["download-tmp-folder", StrPathExpanded],
-            ["standalone", bool]
-        ]
-        self.config.validate(validate_data)
+        self.config.validate(self.SCHEMA)
         # ie if app or all in platform-modules
         if not set(self.config["platform-modules"])\
            .isdisjoint(set(["app", "all"])):
-            validate_data += [
-                ["service-1c/name", str],
-                ["service-1c/login", str],
-                ["ras/name", str],
-                ["ras/login", str],
-                ["ras/port", int],
-                ["ras/path", StrPathExpanded],
-            ]
+            schema = self.APP_SCHEMA
             if self.config["os-type"] == "Windows":
-                validate_data += [
-                    ["service-1c/password", str],
-                    ["ras/password", str],
-                ]
-        self.config.validate(validate_data)
+                schema += self.WINDOWS_APP_SCHEMA
+            self.config.validate(schema)
 
     ## Copy files from source do destination. It is internally have retries.
     # @param self Pointer to object.
@@ -300,14 +306,16 @@ class PlatformUpdateScenario:
 
 
 ## Wrapper for scenario execution.
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
 # @return Last error code (0 if no errors occurred).
-def platform_update_scenario():
+def platform_update_scenario(argv=None):
+    argv = sys.argv if argv is None else argv
     res = 1
     # execute scenario
     try:
-        data = read_yaml(sys.argv[1])
+        data = read_yaml(argv[1])
         config = ScenarioConfiguration(data)
-        cmd_args = bootstrap.parse_cmd_args(sys.argv[2:])
+        cmd_args = bootstrap.parse_cmd_args(argv[2:])
         config.add_cmd_args(cmd_args[1], True)
         if "composite-scenario-name" in config:
             global_logger.info(
@@ -342,6 +350,10 @@ def platform_update_scenario():
     return res
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = platform_update_scenario
+
+
 if __name__ == "__main__":
     bootstrap.main(platform_update_scenario,
                    os.path.basename(__file__)[0:-3])
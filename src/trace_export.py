@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+# coding: utf-8
+import sys
+import os
+import json
+
+
+from lib.common import bootstrap
+from lib.common import tracing
+from lib.common.errors import *
+from lib.common.logger import *
+
+
+## Export formats: name -> (function, which builds data, default extension).
+FORMATS = {
+    "chrome": (lambda trace_id, processes, spans:
+               tracing.to_chrome_trace(processes, spans), ".chrome.json"),
+    "otlp": (tracing.to_otlp_json, ".otlp.json"),
+}
+
+
+## Merge spans, written by all processes of run, into one file, which can be
+#  opened in trace viewer (chrome://tracing, Perfetto) or sent to OTLP
+#  collector.
+#  Usage: trace_export.py <trace id or folder> [--format=chrome|otlp]
+#  [--output=path]
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
+# @return Result code.
+def trace_export_main(argv=None):
+    argv = sys.argv if argv is None else argv
+    try:
+        cmd_args = bootstrap.parse_cmd_args(argv[1:])
+        if len(cmd_args[0]) != 1:
+            raise AutomationLibraryError(
+                "ARGS_ERROR", "trace id or folder should be passed"
+            )
+        trace = str(cmd_args[0][0])
+        export_format = cmd_args[1].get("format", "chrome")
+        if export_format not in FORMATS:
+            raise AutomationLibraryError("ARGS_ERROR", "unknown format",
+                                         format=export_format,
+                                         valid_values=list(FORMATS))
+        build, extension = FORMATS[export_format]
+        processes, spans = tracing.load_trace(trace)
+        trace_id = os.path.basename(os.path.normpath(trace))
+        output = cmd_args[1].get("output", trace_id + extension)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(build(trace_id, processes, spans), f)
+        global_logger.info(message="Trace exported", output=output,
+                           format=export_format, spans=len(spans),
+                           processes=len(processes))
+    except AutomationLibraryError as err:
+        global_logger.error(str(err), state="error")
+        return err.num_code
+    except Exception as err:
+        err = AutomationLibraryError("UNKNOWN", err)
+        global_logger.error(str(err), state="error")
+        return err.num_code
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(trace_export_main())
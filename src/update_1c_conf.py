@@ -13,6 +13,21 @@ from lib.utils.cmd import *
 
 
 class Update1CConfScenario:
+    ## Schema of parameters.
+    SCHEMA = ConfigSchema([
+        ["test-mode", bool],
+        # ["try-count", int],
+        # ["timeout", int],
+        ["time-limit", int],
+        ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
+        ["srvr", str],
+        ["ib", str],
+        ["cf-name", str],
+        # ["backup-folder", StrPathExpanded],
+        ["distr-folder", StrPathExpanded],
+        ["lang", str, str, gv.LANGS],
+    ])
+
     ## Constructor.
     # @param self Pointer to object.
     # @param config lib::common::config::Configuration object or path
@@ -42,20 +57,7 @@ class Update1CConfScenario:
     # @exception AutomationLibraryError("OLD_VERSION_DOESNT_MATCH")
     # @exception AutomationLibraryError("OPTION_NOT_FOUND")
     def validate_config(self):
-        validate_data = [
-            ["test-mode", bool],
-            # ["try-count", int],
-            # ["timeout", int],
-            ["time-limit", int],
-            ["os-type", str, str, ["Windows", "Linux-deb", "Linux-rpm"]],
-            ["srvr", str],
-            ["ib", str],
-            ["cf-name", str],
-            # ["backup-folder", StrPathExpanded],
-            ["distr-folder", StrPathExpanded],
-            ["lang", str, str, gv.LANGS],
-        ]
-        self.config.validate(validate_data)
+        self.config.validate(self.SCHEMA)
 
     def prepare(self):
         l = LogFunc(message="preparing to update 1C configuration")
@@ -136,14 +138,16 @@ class Update1CConfScenario:
 
 
 ## Wrapper for scenario execution.
+# @param argv Command line arguments (like sys.argv). If None, sys.argv used.
 # @return Last error code (0 if no errors occurred).
-def update_1c_conf_scenario():
+def update_1c_conf_scenario(argv=None):
+    argv = sys.argv if argv is None else argv
     res = 1
     # execute scenario
     try:
-        data = read_yaml(sys.argv[1])
+        data = read_yaml(argv[1])
         config = ScenarioConfiguration(data)
-        cmd_args = bootstrap.parse_cmd_args(sys.argv[2:])
+        cmd_args = bootstrap.parse_cmd_args(argv[2:])
         config.add_cmd_args(cmd_args[1], True)
         bootstrap.set_debug_values(cmd_args[1])
         if "composite-scenario-name" in config:
@@ -197,6 +201,10 @@ def update_1c_conf_scenario():
     return res
 
 
+## Entry point for in-process execution (see composite_runner).
+scenario_main = update_1c_conf_scenario
+
+
 if __name__ == "__main__":
     bootstrap.main(update_1c_conf_scenario,
                    os.path.basename(__file__)[0:-3])
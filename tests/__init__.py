@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "src"))
+
+
+from lib.common import global_vars as gv
+
+## Files, which tested code keeps in PID_PATH (host facts, caches, journals,
+#  duration history), are written to temporary folder instead of working
+#  directory. Folder is removed, when tests finish.
+PID_PATH = tempfile.TemporaryDirectory(prefix="automation_tests_")
+gv.PID_PATH = PID_PATH.name
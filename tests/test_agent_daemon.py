@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+import json
+import socket
+import tempfile
+import threading
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_PATH, "..", "src"))
+
+
+from agent import *
+
+global_logger.disable()
+
+
+class TestAgentDaemon(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pid_path = gv.PID_PATH
+        gv.PID_PATH = self.folder.name
+        config_path = os.path.join(self.folder.name, "config.yaml")
+        with open(config_path, "w") as f:
+            f.write("{}\n")
+        self.dictionary_path = os.path.join(self.folder.name,
+                                            "dictionary.yaml")
+        with open(self.dictionary_path, "w") as f:
+            json.dump({"test-step": {
+                "script-name": os.path.join(BASE_PATH, "test_data",
+                                            "simple_step.py"),
+                "config-name": config_path,
+            }}, f)
+        self.daemon = AgentDaemon(self.dictionary_path)
+        self.messages = []
+
+    def tearDown(self):
+        self.daemon.stop()
+        gv.PID_PATH = self.pid_path
+        self.folder.cleanup()
+
+    def request(self, **request):
+        self.messages = []
+        self.daemon.handle_request(request, self.messages.append)
+        return self.messages[-1]
+
+    def test_submit_status_list(self):
+        job_id = self.request(op="submit", command="test-step",
+                              args={"host": "db1"})["job"]
+        job = self.request(op="status", job=job_id)["job"]
+        self.assertEqual(job["state"], job_queue.QUEUED)
+        self.assertEqual(job["host"], "db1")
+        self.assertEqual(job["args"], {"host": "db1"})
+        jobs = self.request(op="list", state=job_queue.QUEUED)["jobs"]
+        self.assertEqual([job["id"] for job in jobs], [job_id])
+
+    def test_invalid_requests(self):
+        for request in [{}, {"op": "unknown"},
+                        {"op": "submit", "command": "unknown"},
+                        {"op": "submit", "command": "test-step", "args": []},
+                        {"op": "status", "job": 100}]:
+            with self.assertRaises(AutomationLibraryError):
+                self.daemon.handle_request(request, self.messages.append)
+
+    def test_cancel_queued(self):
+        job_id = self.request(op="submit", command="test-step")["job"]
+        self.assertTrue(self.request(op="cancel", job=job_id)["cancelled"])
+        self.assertFalse(self.request(op="cancel", job=job_id)["cancelled"])
+        self.assertEqual(self.request(op="status", job=job_id)["job"]["state"],
+                         job_queue.CANCELLED)
+
+    def test_logs(self):
+        job_id = self.request(op="submit", command="test-step")["job"]
+        log_path = os.path.join(self.folder.name, "job.log")
+        with open(log_path, "w") as f:
+            f.write("line 1\nline 2\n")
+        self.daemon.queue.set_log_path(job_id, log_path)
+        self.request(op="logs", job=job_id, offset=7)
+        self.assertEqual(self.messages[0]["data"], "line 2\n")
+        self.assertEqual(self.messages[-1], {"ok": True, "end": True,
+                                             "state": job_queue.QUEUED,
+                                             "offset": 14})
+
+    @unittest.skipUnless(hasattr(socketserver, "ThreadingUnixStreamServer"),
+                         "Unix sockets are not supported")
+    def test_socket_protocol(self):
+        socket_path = os.path.join(self.folder.name, "test.sock")
+        server = socketserver.ThreadingUnixStreamServer(socket_path,
+                                                        JobRequestHandler)
+        server.daemon_threads = True
+        server.agent_daemon = self.daemon
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with socket.socket(socket.AF_UNIX) as client:
+                client.connect(socket_path)
+                f = client.makefile("rwb")
+                for request in [{"op": "submit", "command": "test-step"},
+                                {"op": "unknown"}]:
+                    f.write((json.dumps(request) + "\n").encode("utf-8"))
+                f.flush()
+                self.assertEqual(json.loads(f.readline().decode("utf-8")),
+                                 {"ok": True, "job": 1})
+                answer = json.loads(f.readline().decode("utf-8"))
+                self.assertFalse(answer["ok"])
+                self.assertIn("Unknown operation", answer["error"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @unittest.skipIf(fcntl is None, "fcntl is not supported")
+    def test_second_daemon_refused(self):
+        self.daemon.start()
+        job_id = self.daemon.queue.submit("test-step", {}, "localhost")
+        # job is running according to database, so started daemon would
+        # interrupt it
+        self.daemon.queue.claim(1, 1)
+        other = AgentDaemon(self.dictionary_path)
+        with self.assertRaises(AutomationLibraryError) as cm:
+            other.start()
+        self.assertEqual(cm.exception.str_code, "SERVICE_ERROR")
+        other.queue.close()
+        self.assertEqual(self.daemon.queue.get(job_id)["state"],
+                         job_queue.RUNNING)
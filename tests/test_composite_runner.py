@@ -2,12 +2,14 @@ import unittest
 import sys
 import os
 import yaml
+import tempfile
 
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(BASE_PATH, "..", "src"))
 
 
 from composite_runner import *
+import composite_runner
 
 global_logger.disable()
 
@@ -78,3 +80,218 @@ class TestCompositeStep(unittest.TestCase):
                          "--command-string=test-step --arg1=value1 --arg2=2",
                          "--rollback=disable"]
         self.assertCountEqual(step.build_cmd_args(), validate_data)
+
+
+class TestDagStage(unittest.TestCase):
+    def test_sort_nodes(self):
+        needs = {"a": [], "b": ["c"], "c": ["a"], "d": []}
+        self.assertEqual(DagStage.sort_nodes(["a", "b", "c", "d"], needs),
+                         ["a", "d", "c", "b"])
+
+    def test_sort_nodes_cycle(self):
+        needs = {"a": ["b"], "b": ["a"]}
+        with self.assertRaises(AutomationLibraryError):
+            DagStage.sort_nodes(["a", "b"], needs)
+
+    def test_sort_nodes_unknown_dependency(self):
+        needs = {"a": ["b"]}
+        with self.assertRaises(AutomationLibraryError):
+            DagStage.sort_nodes(["a"], needs)
+
+
+class TestDurationEstimate(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.folder = tempfile.TemporaryDirectory()
+        self.history = DurationHistory(os.path.join(self.folder.name,
+                                                    "durations.sqlite"))
+        for command, duration in [("a", 10), ("b", 30), ("c", 25)]:
+            self.history.record(command, scenario_digest({}), "real",
+                                duration)
+        self.previous = composite_runner.HISTORY
+        composite_runner.HISTORY = self.history
+
+    def tearDown(self):
+        composite_runner.HISTORY = self.previous
+        self.history.close()
+        self.folder.cleanup()
+
+    def primitive(self, command):
+        return {"type": "primitive", "name": command, "command": command,
+                "cmd-args": {}}
+
+    def test_order_longest_first(self):
+        estimates = {"a": 1, "b": 3, "c": None, "d": 3}
+        self.assertEqual(order_longest_first(list("abcd"), estimates.get),
+                         ["c", "b", "d", "a"])
+
+    def test_estimate_parallel(self):
+        plan = {"type": "parallel", "max-workers": 2, "branches": [
+            self.primitive(command) for command in "abc"
+        ]}
+        # b on first worker, c and a on second one
+        self.assertEqual(estimate_plan(plan, "real"),
+                         (35, [("c", 25), ("a", 10)], 0))
+        plan["max-workers"] = 1
+        self.assertEqual(estimate_plan(plan, "real")[0], 65)
+
+    def test_estimate_dag(self):
+        plan = {"type": "dag", "max-parallel": 0, "nodes": [
+            {"name": "a", "needs": [], "stage": self.primitive("a")},
+            {"name": "b", "needs": [], "stage": self.primitive("b")},
+            {"name": "c", "needs": ["a"], "stage": self.primitive("c")},
+            {"name": "d", "needs": ["b"], "stage": self.primitive("d")},
+        ]}
+        self.assertEqual(estimate_plan(plan, "real"),
+                         (35, [("a", 10), ("c", 25)], 1))
+
+
+class TestResources(unittest.TestCase):
+    def setUp(self):
+        self.use_zygote = zygote.USE_ZYGOTE
+        zygote.USE_ZYGOTE = False
+        RESOURCES.set_limits({})
+
+    def tearDown(self):
+        zygote.USE_ZYGOTE = self.use_zygote
+
+    def step(self, name, resources):
+        return {"type": "step", "rollback": None, "forward": {
+            "type": "primitive", "name": name, "command": name,
+            "script": os.path.join(BASE_PATH, "test_data", "simple_step.py"),
+            "config": "", "isolated": False, "resources": resources,
+            "cmd-args": {}, "time-limit": 10, "timeout": 0, "try-count": 1,
+        }}
+
+    def run_plan(self, plan):
+        stage = stage_from_plan(plan)
+        stage.set_stage_id("scenario")
+
+        async def run():
+            executor = stage.execute(False)
+            await executor.join(20)
+            await executor.kill()
+            return executor.result
+
+        return asyncio.run(run())
+
+    def test_duplicate_names(self):
+        pool = ResourcePool({"dpkg": 2})
+        self.assertTrue(pool.try_acquire(["dpkg", "dpkg"]))
+        self.assertTrue(pool.try_acquire(["dpkg"]))
+        self.assertFalse(pool.try_acquire(["dpkg"]))
+        pool.release(["dpkg", "dpkg"])
+        self.assertTrue(pool.try_acquire(["dpkg"]))
+
+    def test_nested_resources(self):
+        # steps request tokens, which are held for them by parallel stage
+        plan = {"type": "sequence", "interruptable": [False], "steps": [{
+            "type": "parallel", "max-workers": 0, "resources": ["dpkg"],
+            "branches": [{
+                "type": "sequence", "interruptable": [False],
+                "steps": [self.step("step-{}".format(i), ["dpkg", "dpkg"])],
+            } for i in range(2)],
+        }]}
+        self.assertEqual(self.run_plan(plan), 0)
+        # all tokens are released
+        self.assertTrue(RESOURCES.try_acquire(["dpkg"]))
+        RESOURCES.release(["dpkg"])
+
+
+class TestInProcess(unittest.TestCase):
+    def test_system_exit(self):
+        def scenario(code):
+            sys.exit(code)
+
+        self.assertEqual(bootstrap.execute_in_process(scenario, "test", None),
+                         0)
+        self.assertEqual(bootstrap.execute_in_process(scenario, "test", 3), 3)
+        self.assertEqual(
+            bootstrap.execute_in_process(scenario, "test", "failed"),
+            AutomationLibraryError("UNKNOWN", Exception()).num_code
+        )
+
+    def test_system_exit_async(self):
+        @handle_automation_library_errors_async
+        async def stage(code):
+            sys.exit(code)
+
+        self.assertEqual(asyncio.run(stage(4)), 4)
+
+    def test_debug_values_not_changed(self):
+        debug = gv.DEBUG
+        log_format = os.environ.get(LOG_FORMAT_ENV)
+
+        def scenario(argv):
+            bootstrap.set_debug_values({"debug": not debug,
+                                        "log-format": "jsonl"})
+            return 0
+
+        self.assertEqual(bootstrap.execute_in_process(scenario, "test", []),
+                         0)
+        self.assertEqual(gv.DEBUG, debug)
+        self.assertEqual(gv.LOG_FORMAT, "text")
+        self.assertEqual(os.environ.get(LOG_FORMAT_ENV), log_format)
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pid_path = gv.PID_PATH
+        gv.PID_PATH = self.folder.name
+        self.argv = sys.argv
+        self.use_zygote = zygote.USE_ZYGOTE
+        zygote.USE_ZYGOTE = False
+
+    def tearDown(self):
+        composite_runner.JOURNAL = None
+        zygote.USE_ZYGOTE = self.use_zygote
+        sys.argv = self.argv
+        gv.PID_PATH = self.pid_path
+        self.folder.cleanup()
+
+    def test_resume_other_command(self):
+        journal = Journal("run")
+        journal.record("run", command="platform-update", plan={})
+        journal.close()
+        sys.argv = ["composite_runner.py", "platform-restart", "--resume=run",
+                    "--disable-zygote"]
+        self.assertEqual(composite_runner_main(),
+                         AutomationLibraryError("ARGS_ERROR").num_code)
+        # journal is kept for resuming with right command
+        self.assertEqual(len(Journal.read(journal.path)), 1)
+
+    def run_journaled(self, script):
+        plan = {"composite": False, "rollback": None, "test-mode": False,
+                "resource-limits": {}, "forward": {
+                    "type": "primitive", "name": "step", "command": "step",
+                    "script": os.path.join(BASE_PATH, "test_data", script),
+                    "config": "", "isolated": False, "resources": [],
+                    "cmd-args": {}, "time-limit": 10, "timeout": 0,
+                    "try-count": 1,
+                }}
+        composite_runner.JOURNAL = Journal("run")
+        res = execute_journaled_plan(
+            "step", ([], {"disable-duration-history": True}), plan
+        )
+        return res, os.path.exists(composite_runner.JOURNAL.path)
+
+    def test_successful_run_journal_removed(self):
+        self.assertEqual(self.run_journaled("simple_step.py"), (0, False))
+
+    def test_failed_run_journal_kept(self):
+        res, exists = self.run_journaled("simple_step_with_exception.py")
+        self.assertNotEqual(res, 0)
+        self.assertTrue(exists)
+
+
+class TestPlanFiles(unittest.TestCase):
+    def test_get_plan_files(self):
+        plan = {"composite": True, "main": {"type": "sequence", "steps": [
+            {"type": "step", "forward": {"type": "primitive",
+                                         "config": "a.yaml"},
+             "rollback": {"type": "primitive", "config": "b.yaml"}},
+            {"type": "primitive", "config": "c.yaml"},
+        ]}}
+        self.assertEqual(list(get_plan_files(plan)),
+                         ["a.yaml", "b.yaml", "c.yaml"])
@@ -0,0 +1,221 @@
+import unittest
+import sys
+import os
+import tempfile
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_PATH, "..", "src"))
+
+
+from group_runner import *
+
+global_logger.disable()
+
+## Agent stub: prints start and end time and exits with code from arguments.
+AGENT_STUB = """import sys, time
+args = dict(arg[2:].split("=", 1) for arg in sys.argv[2:])
+print("start", time.monotonic(), flush=True)
+time.sleep(float(args.get("sleep", 0)))
+print("end", time.monotonic())
+sys.exit(int(args.get("code", 0)))
+"""
+
+
+class FakeConfiguration:
+    def __init__(self, agent_path, data_sets, max_parallel=0, batch_size=0,
+                 canary=0, max_failures=None, timeout=60):
+        self.agent_path = agent_path
+        self.data_sets = data_sets
+        self.max_parallel = max_parallel
+        self.batch_size = batch_size
+        self.canary = canary
+        self.max_failures = max_failures
+        self.timeout = timeout
+
+    def get_agent_commands(self):
+        for data_set in self.data_sets:
+            yield [sys.executable, self.agent_path, "test-step"] \
+                  + ["--{}={}".format(key, value)
+                     for key, value in data_set.items()]
+
+    def get_failure_budget(self):
+        return self.max_failures
+
+
+class GroupRunnerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.agent_path = os.path.join(self.folder.name, "agent.py")
+        with open(self.agent_path, "w") as f:
+            f.write(AGENT_STUB)
+        self.logs_folder = os.path.join(self.folder.name, "logs")
+        os.makedirs(self.logs_folder)
+        self.use_zygote = zygote.USE_ZYGOTE
+        zygote.USE_ZYGOTE = False
+
+    def tearDown(self):
+        zygote.USE_ZYGOTE = self.use_zygote
+        self.folder.cleanup()
+
+    def config(self, data_sets, **kwargs):
+        return FakeConfiguration(self.agent_path, data_sets, **kwargs)
+
+    def commands(self, data_sets):
+        return enumerate(self.config(data_sets).get_agent_commands())
+
+    def read_log(self, index):
+        path = os.path.join(self.logs_folder, "data_set_{}.log".format(index))
+        with open(path) as f:
+            return dict(line.split() for line in f)
+
+
+class TestAgentPool(GroupRunnerTestCase):
+    def test_max_parallel(self):
+        pool = AgentPool(self.commands([{"sleep": 0.3}] * 4), 2,
+                         self.logs_folder)
+        self.assertEqual(pool.run(60), {0: 0, 1: 0, 2: 0, 3: 0})
+        spans = [self.read_log(index) for index in range(4)]
+        for span in spans:
+            running = sum(1 for other in spans
+                          if other["start"] <= span["start"] < other["end"])
+            self.assertLessEqual(running, 2)
+
+    def test_failure_budget(self):
+        pool = AgentPool(self.commands([{"code": 1}, {"code": 2}, {}, {}]), 1,
+                         self.logs_folder, max_failures=1)
+        self.assertEqual(pool.run(60), {0: 1, 1: 2})
+        self.assertEqual(pool.failures, 2)
+        self.assertTrue(pool.budget_exceeded)
+
+    def test_timeout(self):
+        pool = AgentPool(self.commands([{"sleep": 60}, {"sleep": 60}]), 1,
+                         self.logs_folder)
+        start = time.monotonic()
+        results = pool.run(0.5)
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertTrue(pool.timed_out)
+        # running agent is killed, queued one is not started
+        self.assertEqual(list(results), [0])
+        self.assertNotEqual(results[0], 0)
+
+    def test_history(self):
+        history = DurationHistory(os.path.join(self.folder.name,
+                                               "history.sqlite"))
+        commands = list(self.commands([{"code": 0}, {"code": 1}]))
+        AgentPool(commands, 0, self.logs_folder, history=history).run(60)
+        self.assertIsNotNone(history.estimate(*get_task_key(commands[0][1]),
+                                              HISTORY_MODE))
+        # only successful agents are recorded
+        history._cache.clear()
+        self.assertEqual(
+            len(list(history._conn.execute("SELECT * FROM durations"))), 1
+        )
+        history.close()
+
+
+class TestRollingRun(GroupRunnerTestCase):
+    def test_waves(self):
+        run = RollingRun(self.config([{}] * 5, batch_size=2),
+                         self.logs_folder)
+        self.assertEqual(run.run(), {index: 0 for index in range(5)})
+        self.assertEqual(run.cancelled, [])
+        self.assertFalse(run.budget_exceeded)
+
+    def test_canary_failure(self):
+        run = RollingRun(self.config([{"code": 1}, {}, {}, {}], canary=1,
+                                     max_failures=10), self.logs_folder)
+        self.assertEqual(run.run(), {0: 1})
+        self.assertTrue(run.budget_exceeded)
+        self.assertEqual(run.cancelled, [1, 2, 3])
+
+    def test_budget_across_waves(self):
+        run = RollingRun(self.config(
+            [{"code": 1}, {}, {"code": 1}, {}, {}, {}], batch_size=2,
+            max_parallel=1, max_failures=1
+        ), self.logs_folder)
+        # budget of second wave is used by first failure, so its second data
+        # set is not started
+        self.assertEqual(run.run(), {0: 1, 1: 0, 2: 1})
+        self.assertEqual(run.failures, 2)
+        self.assertTrue(run.budget_exceeded)
+        self.assertEqual(run.cancelled, [3, 4, 5])
+
+    def test_timeout(self):
+        run = RollingRun(self.config([{"sleep": 60}, {}, {}], batch_size=1,
+                                     timeout=0.5), self.logs_folder)
+        run.run()
+        self.assertTrue(run.timed_out)
+        self.assertEqual(run.cancelled, [1, 2])
+
+
+class TestDataSets(GroupRunnerTestCase):
+    def config_file(self, data_sets, **values):
+        data = {"version": 1, "command-type": "test-step", "test-mode": True,
+                "try-count": 1, "timeout": 60, "time-limit": 60,
+                "scenario-meta-data": {"defaults": {"a": "default"}},
+                "scenario-data-sets": data_sets}
+        data.update(values)
+        path = os.path.join(self.folder.name, "group.yaml")
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return GroupRunConfiguration(path)
+
+    def inventory(self, name, text):
+        with open(os.path.join(self.folder.name, name), "w") as f:
+            f.write(text)
+
+    def test_list(self):
+        cfg = self.config_file([{"a": 1}, {"b": 2}])
+        self.assertEqual(list(cfg.iter_data_sets()), [{"a": 1}, {"b": 2}])
+        self.assertEqual(cfg.count_data_sets(), 2)
+
+    def test_matrix(self):
+        cfg = self.config_file({"matrix": {"a": [1, 2], "b": ["x", "y", "z"]}})
+        self.assertEqual(cfg.count_data_sets(), 6)
+        data_sets = cfg.iter_data_sets()
+        self.assertEqual(next(data_sets), {"a": 1, "b": "x"})
+        self.assertEqual(len(list(data_sets)), 5)
+
+    def test_csv_inventory(self):
+        self.inventory("hosts.csv", "host,a\ndb1,\ndb2,2\n")
+        cfg = self.config_file({"inventory": "hosts.csv"})
+        # empty cells are skipped, so defaults are used
+        self.assertEqual(list(cfg.iter_data_sets()),
+                         [{"host": "db1"}, {"host": "db2", "a": "2"}])
+        self.assertEqual(cfg.count_data_sets(), 2)
+
+    def test_jsonl_inventory(self):
+        self.inventory("hosts.txt", '{"host": "db1"}\n\n{"host": "db2"}\n')
+        cfg = self.config_file({"inventory": "hosts.txt", "format": "jsonl"})
+        self.assertEqual(list(cfg.iter_data_sets()),
+                         [{"host": "db1"}, {"host": "db2"}])
+        for text in ['{"host": \n', '["db1"]\n']:
+            self.inventory("hosts.txt", text)
+            with self.assertRaises(AutomationLibraryError):
+                list(cfg.iter_data_sets())
+
+    def test_invalid_source(self):
+        for source in [{"matrix": {"a": 1}}, {"inventory": "hosts.xml"},
+                       "hosts"]:
+            with self.assertRaises(AutomationLibraryError):
+                self.config_file(source)
+
+    def test_agent_commands(self):
+        cfg = self.config_file({"matrix": {"b": [1, 2]}})
+        commands = cfg.get_agent_commands()
+        args = next(commands)
+        self.assertEqual(args[2], "test-step")
+        self.assertIn("--b=1", args)
+        self.assertIn("--a=default", args)
+        self.assertIn("--time-limit=60", args)
+        self.assertEqual(len(list(commands)), 1)
+
+    def test_failure_budget(self):
+        cfg = self.config_file([{}] * 10, **{"max-failures": 3})
+        self.assertEqual(cfg.get_failure_budget(), 3)
+        cfg = self.config_file([{}] * 10, **{"max-failures": 3,
+                                             "max-failure-percent": 25})
+        self.assertEqual(cfg.get_failure_budget(), 2)
+        self.assertIsNone(self.config_file([{}]).get_failure_budget())
+        with self.assertRaises(AutomationLibraryError):
+            self.config_file([{}], **{"max-failure-percent": 101})
@@ -0,0 +1,73 @@
+import sys
+import os
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common.config import *
+
+global_logger.disable()
+
+
+## Build configuration data with `count` external keys, `count` keys of
+#  scenario context, which reference them, and `count` composite steps.
+def build_data(count):
+    defaults = {}
+    for i in range(count):
+        defaults["ext-{}".format(i)] = "<ext-{}>".format(i)
+        defaults["key-{}".format(i)] = "<ext-{}>".format(i)
+    scenario = [
+        {"command": "step", "name": "step-{}".format(i),
+         "value": "<key-{}>".format(i), "host": "<ext-{}>".format(i),
+         "args": ["<key-{}>".format(i), "<ext-{}>".format((i + 1) % count)]}
+        for i in range(count)
+    ]
+    return {
+        "version": "8.3.10.2466", "external-values": [],
+        "default-values": defaults, "scenario": scenario,
+        "rollback": {"command": "rollback", "value": "<key-0>"},
+    }
+
+
+## Resolve all placeholders with update_data_with_placeholders(), like
+#  ScenarioConfiguration did on every assignment before placeholders index.
+def full_update(sc):
+    sc.scenario_context = update_data_with_placeholders(
+        sc.scenario_context, sc.scenario_context
+    )
+    sc.rollback_scenario = update_data_with_placeholders(
+        sc.scenario_context, sc.rollback_scenario
+    )
+    sc.composite_scenario_data = update_data_with_placeholders(
+        sc.scenario_context, sc.composite_scenario_data
+    )
+
+
+## Set every external key one by one (like validate() does) and return time.
+def run(count, incremental):
+    sc = ScenarioConfiguration(build_data(count))
+    start = time.perf_counter()
+    for i in range(count):
+        if incremental:
+            sc["ext-{}".format(i)] = str(i)
+        else:
+            set_value_by_path(sc.scenario_context, "ext-{}".format(i), str(i))
+            full_update(sc)
+    duration = time.perf_counter() - start
+    assert sc.composite_scenario_data[-1]["host"] == str(count - 1)
+    assert sc.composite_scenario_data[-1]["args"] == [str(count - 1), "0"]
+    return duration
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [250, 500, 1000]
+    print("{:>8} {:>12} {:>12} {:>8}".format("keys", "full, s",
+                                             "indexed, s", "speedup"))
+    for count in counts:
+        full = run(count, False)
+        indexed = run(count, True)
+        print("{:>8} {:>12.3f} {:>12.3f} {:>8.0f}".format(
+            count, full, indexed, full / indexed
+        ))
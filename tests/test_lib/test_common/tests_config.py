@@ -270,5 +270,150 @@ class TestScenarioConfiguration(unittest.TestCase):
             sc.validate(validate_data)
 
 
+class TestPlaceholdersIndex(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            "version": "8.3.10.2466",
+            "external-values": ["usr", "pwd"],
+            "default-values": {
+                "usr": "<usr>", "pwd": "<pwd>", "clstr-login": "<usr>",
+                "port": "<int:srvr/port>", "srvr": {"port": "1541"},
+            },
+            "scenario": [
+                {"command": "a", "login": "<clstr-login>",
+                 "args": ["<pwd>", "<int:port>"]},
+                {"command": "b", "name": "<name>"},
+            ],
+            "rollback": {"command": "c", "login": "<clstr-login>"},
+        }
+
+    def test_resolve_placeholder(self):
+        src = {"a": "1", "b": Placeholder("<a>"), "c": Placeholder("<c>"),
+               "d": Placeholder("<e>"), "e": Placeholder("<d>")}
+        self.assertEqual(resolve_placeholder(src, Placeholder("<int:a>")), 1)
+        self.assertEqual(resolve_placeholder(src, Placeholder("<b>")), "1")
+        self.assertEqual(resolve_placeholder(src, Placeholder("<c>")),
+                         Placeholder("<c>"))
+        self.assertEqual(resolve_placeholder(src, Placeholder("<x>")),
+                         Placeholder("<x>"))
+        with self.assertRaises(AutomationLibraryError):
+            resolve_placeholder(src, Placeholder("<d>"))
+
+    def test_set_updates_dependents(self):
+        sc = ScenarioConfiguration(self.data)
+        sc["usr"] = "USER"
+        self.assertEqual(sc["clstr-login"], "USER")
+        self.assertEqual(sc["port"], 1541)
+        self.assertEqual(sc.composite_scenario_data[0]["login"], "USER")
+        self.assertEqual(sc.composite_scenario_data[0]["args"],
+                         [Placeholder("<pwd>"), 1541])
+        self.assertEqual(sc.rollback_scenario["login"], "USER")
+        sc.add_cmd_args({"pwd": "PASSWORD", "name": "<usr>"})
+        self.assertEqual(sc.composite_scenario_data[0]["args"][0],
+                         "PASSWORD")
+        self.assertEqual(sc.composite_scenario_data[1]["name"], "USER")
+        # resolved placeholders are not changed anymore
+        sc["usr"] = "OTHER"
+        self.assertEqual(sc["clstr-login"], "USER")
+
+    def test_set_nested_value(self):
+        self.data["default-values"]["host"] = "<srvr/host>"
+        self.data["scenario"][1]["host"] = "<srvr/host>"
+        sc = ScenarioConfiguration(self.data)
+        sc["usr"] = "USER"
+        self.assertEqual(sc["host"], "<str:srvr/host>")
+        sc["srvr"] = {"host": "<pwd>"}
+        self.assertEqual(sc["host"], "<str:pwd>")
+        sc["pwd"] = "PASSWORD"
+        self.assertEqual(sc["host"], "PASSWORD")
+        self.assertEqual(sc["srvr/host"], "PASSWORD")
+        self.assertEqual(sc.composite_scenario_data[1]["host"], "PASSWORD")
+
+    def test_chained_typed_placeholders(self):
+        context = {"c": "9", "a": "<int:c>", "b": "<a>"}
+        self.data["default-values"] = dict(context)
+        sc = ScenarioConfiguration(self.data)
+        sc["c"] = "9"
+        # untyped placeholder takes value of placeholder, which it references
+        self.assertEqual(sc["a"], 9)
+        self.assertEqual(sc["b"], 9)
+        expected = update_data_with_placeholders(context, context)
+        self.assertEqual({key: sc[key] for key in context}, expected)
+        # chain is resolved incrementally, when its key is set
+        self.data["default-values"] = {"a": "<int:c>", "b": "<a>",
+                                       "usr": "<usr>"}
+        sc = ScenarioConfiguration(self.data)
+        sc["usr"] = "USER"
+        self.assertEqual(sc["b"], "<int:c>")
+        sc["c"] = "10"
+        self.assertEqual((sc["a"], sc["b"]), (10, 10))
+
+    def test_cycles(self):
+        self.data["default-values"]["usr"] = "<clstr-login>"
+        with self.assertRaises(AutomationLibraryError):
+            ScenarioConfiguration(self.data)
+        self.data["default-values"]["usr"] = "<usr>"
+        self.data["default-values"]["x"] = "<y>"
+        sc = ScenarioConfiguration(self.data)
+        with self.assertRaises(AutomationLibraryError):
+            sc["y"] = "<x>"
+
+
+class TestConfigSchema(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            "version": "8.3.10.2466",
+            "external-values": [],
+            "default-values": {
+                "port": "1541", "name": "<host>", "host": "srv",
+                "mode": "fast", "srvr": {"port": 1540},
+            },
+        }
+        self.schema = ConfigSchema([
+            ["port", int],
+            ["name", str],
+            ["mode", str, str, ["fast", "slow"]],
+            ["srvr/port", int],
+        ])
+
+    def test_validate_schema(self):
+        sc = ScenarioConfiguration(self.data)
+        sc.validate(self.schema)
+        self.assertEqual(sc["port"], 1541)
+        self.assertEqual(sc["name"], "srv")
+        # overlapping schema: only new rows are checked
+        sc.validate(self.schema + [["host", str]])
+        self.assertEqual(len(self.schema + [["host", str]]), 5)
+
+    def test_all_errors(self):
+        self.data["default-values"]["port"] = "port"
+        self.data["default-values"]["mode"] = "medium"
+        del self.data["default-values"]["srvr"]
+        sc = ScenarioConfiguration(self.data)
+        with self.assertRaises(AutomationLibraryError) as cm:
+            sc.validate(self.schema)
+        self.assertEqual(cm.exception.str_code, "ARGS_ERROR")
+        self.assertEqual(
+            [(err["code"], err["key"]) for err in cm.exception.kwargs["errors"]],
+            [("ARGS_ERROR", "port"), ("ARGS_ERROR", "mode"),
+             ("OPTION_NOT_FOUND", "srvr/port")]
+        )
+
+    def test_single_error(self):
+        del self.data["default-values"]["mode"]
+        sc = ScenarioConfiguration(self.data)
+        with self.assertRaises(AutomationLibraryError) as cm:
+            sc.validate(self.schema)
+        self.assertEqual(cm.exception.str_code, "OPTION_NOT_FOUND")
+        self.assertEqual(cm.exception.kwargs["key"], "mode")
+
+    def test_changed_value_validated_again(self):
+        sc = ScenarioConfiguration(self.data)
+        sc.validate(self.schema)
+        sc["mode"] = "medium"
+        with self.assertRaises(AutomationLibraryError):
+            sc.validate(self.schema)
+
+
 if __name__ == '__main__':
     unittest.main()
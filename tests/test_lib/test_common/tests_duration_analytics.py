@@ -0,0 +1,229 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import datetime as dt
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common import duration_analytics
+from lib.common.duration_analytics import *
+from lib.common.logger import *
+
+global_logger.disable()
+
+## Start of samples of tests.
+START = dt.datetime(2024, 1, 1, 12, 0, 0)
+
+
+## Build table: durations of scenario "deploy" (steps "", "copy") and
+#  scenario "check", one run per day. Latest runs of "copy" are slower.
+def build_table():
+    table = DurationTable()
+    for day in range(30):
+        time = START + dt.timedelta(days=day)
+        table.append(time, "deploy", "", 1000 + day % 3, 0)
+        table.append(time, "deploy", "copy", 200 if day < 20 else 300, None)
+        table.append(time, "check", "", 50 + day, "1")
+    return table
+
+
+## Run test method with pure Python implementation, even if NumPy is
+#  installed.
+def without_numpy(func):
+    def wrapper(self):
+        module_numpy = duration_analytics.numpy
+        duration_analytics.numpy = None
+        try:
+            func(self)
+        finally:
+            duration_analytics.numpy = module_numpy
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+class TestFunctions(unittest.TestCase):
+    @without_numpy
+    def test_percentiles(self):
+        self.assertEqual(percentiles([5, 1, 4, 2, 3], [0, 50, 100]),
+                         [1, 3, 5])
+        self.assertEqual(percentiles([1, 2, 3, 4], [50, 95]), [2.5, 3.85])
+        self.assertEqual(percentiles([7], [50, 99]), [7, 7])
+
+    @without_numpy
+    def test_slope(self):
+        self.assertEqual(slope([0, 1, 2, 3], [1, 3, 5, 7]), 2.0)
+        self.assertEqual(slope([0, 1, 2], [5, 5, 5]), 0.0)
+        self.assertEqual(slope([1, 1, 1], [1, 2, 3]), 0.0)
+
+    def test_parse_text_record(self):
+        self.assertEqual(parse_record(
+            "[INFO] 2024-01-01 12:00:00.000-1500,message=Step result,"
+            "step=copy\\, files,result=0"
+        ), ("2024-01-01 12:00:00.000", 1500,
+            {"message": "Step result", "step": "copy\\, files",
+             "result": "0"}))
+        self.assertIsNone(parse_record("Traceback:"))
+
+    def test_parse_json_record(self):
+        self.assertEqual(parse_record(json.dumps({
+            "level": "INFO", "time": "2024-01-01 12:00:00.000",
+            "duration": 20, "values": {"message": "copy"},
+        })), ("2024-01-01 12:00:00.000", 20, {"message": "copy"}))
+        self.assertEqual(parse_record('{"time": null}'), (None, 0, {}))
+        self.assertIsNone(parse_record('{"raw": "text"}'))
+        self.assertIsNone(parse_record("{not json"))
+
+    def test_get_sample_key(self):
+        self.assertEqual(get_sample_key("file", {
+            "message": SCENARIO_FINISHED, "scenario_name": "deploy",
+            "code": "0",
+        }, 100), ("deploy", "", "0"))
+        self.assertEqual(get_sample_key("deploy", {
+            "message": STEP_RESULT, "step": "copy", "result": "4",
+        }, 100), ("deploy", "copy", "4"))
+        self.assertEqual(get_sample_key("deploy", {"function": "copy"}, 10),
+                         ("deploy", "copy", None))
+        self.assertEqual(get_sample_key("deploy", {"message": "span"}, 10),
+                         ("deploy", "span", None))
+        self.assertIsNone(get_sample_key("deploy", {"message": "text"}, 0))
+        self.assertIsNone(get_sample_key("deploy", {}, 10))
+
+
+class TestDurationTable(unittest.TestCase):
+    def check_groups(self):
+        table = DurationTable()
+        self.assertEqual(table.groups(), [])
+        table.append(START + dt.timedelta(seconds=2), "b", "", 3)
+        table.append(START, "a", "x", 1)
+        table.append(START + dt.timedelta(seconds=1), "b", "", 2)
+        table.append(START.timestamp(), "b", "", 1)
+        table.append(START, "a", "", 5, "bad")
+        self.assertEqual(len(table), 5)
+        self.assertEqual(list(table.code), [-1, -1, -1, -1, -1])
+        groups = [(scenario, step, list(durations), list(timestamps))
+                  for scenario, step, durations, timestamps in table.groups()]
+        start = START.timestamp()
+        # groups are ordered by first appearance of scenario and step
+        self.assertEqual(groups, [
+            ("b", "", [1, 2, 3], [start, start + 1, start + 2]),
+            ("a", "", [5], [start]),
+            ("a", "x", [1], [start]),
+        ])
+
+    def check_stats(self):
+        stats = {(item["scenario"], item["step"]): item
+                 for item in build_table().stats()}
+        self.assertEqual(len(stats), 3)
+        copy = stats["deploy", "copy"]
+        self.assertEqual(copy["count"], 30)
+        self.assertEqual(copy["p50"], 200)
+        self.assertEqual(copy["p99"], 300)
+        self.assertEqual((copy["recent"], copy["baseline"], copy["change"]),
+                         (300, 200, 1.5))
+        self.assertTrue(copy["regression"])
+        self.assertGreater(copy["trend"], 0)
+        self.assertEqual(copy["last"], "2024-01-30 12:00:00.000")
+        deploy = stats["deploy", ""]
+        self.assertFalse(deploy["regression"])
+        self.assertEqual(deploy["change"], 1.0)
+        self.assertAlmostEqual(stats["check", ""]["trend"], 1.0)
+        # there are not enough runs to compare
+        few = build_table().stats(window=30)
+        self.assertTrue(all(item["change"] is None and not item["regression"]
+                            for item in few))
+        # higher threshold
+        self.assertFalse(any(item["regression"]
+                             for item in build_table().stats(threshold=2)))
+
+    @without_numpy
+    def test_groups(self):
+        self.check_groups()
+
+    @without_numpy
+    def test_stats(self):
+        self.check_stats()
+
+    @unittest.skipIf(duration_analytics.numpy is None, "NumPy is not installed")
+    def test_groups_numpy(self):
+        self.check_groups()
+
+    @unittest.skipIf(duration_analytics.numpy is None, "NumPy is not installed")
+    def test_stats_numpy(self):
+        self.check_stats()
+
+    @unittest.skipIf(duration_analytics.numpy is None, "NumPy is not installed")
+    def test_numpy_matches_python(self):
+        table = build_table()
+        table.append(START, "deploy", "copy", 250)
+        result = table.stats(window=5)
+        without_numpy(lambda self: result.append(table.stats(window=5)))(self)
+        expected = result.pop()
+        self.assertEqual(len(result), len(expected))
+        for item, expected_item in zip(result, expected):
+            for key, value in expected_item.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(item[key], value, places=6)
+                else:
+                    self.assertEqual(item[key], value)
+
+    def test_format_table(self):
+        text = format_table(build_table().stats())
+        lines = text.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("scenario"))
+        self.assertIn("p50, ms", lines[0])
+        copy = [line for line in lines if "copy" in line][0]
+        self.assertTrue(copy.endswith("REGRESSION"))
+        self.assertTrue(all(line == line.rstrip() for line in lines))
+        # columns are aligned
+        self.assertEqual(len(set(line.index("p50, ms") if i == 0
+                                 else None for i, line in enumerate(lines))),
+                         2)
+        self.assertEqual(format_table([]).splitlines()[0], lines[0])
+
+
+class TestLoadLogs(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_load_logs(self):
+        with open(os.path.join(self.folder.name,
+                               "deploy_240101_120000_1.log"), "w") as f:
+            f.write("[INFO] 2024-01-01 12:00:00.000-0,message=start\n")
+            f.write("[INFO] 2024-01-01 12:00:01.000-300,"
+                    "message=Step result,step=copy,result=0\n")
+            f.write("[ERROR] 2024-01-01 12:00:02.000-50,message=failed\n")
+            f.write("[INFO] 2024-01-02 12:00:03.000-1200,"
+                    "message=Scenario execution finished,"
+                    "scenario_name=deploy,code=0\n")
+        with open(os.path.join(self.folder.name,
+                               "check_240101_120000_2.log"), "w") as f:
+            f.write(json.dumps({
+                "level": "INFO", "time": "2024-01-01 12:00:05.000",
+                "duration": 40, "values": {"function": "ping"},
+            }) + "\n")
+        table = DurationTable()
+        self.assertEqual(table.load_logs(self.folder.name), 3)
+        samples = sorted(
+            (table.scenarios[table.scenario[i]], table.steps[table.step[i]],
+             table.duration[i], table.code[i]) for i in range(len(table))
+        )
+        self.assertEqual(samples, [("check", "ping", 40, -1),
+                                   ("deploy", "", 1200, 0),
+                                   ("deploy", "copy", 300, 0)])
+        table = DurationTable()
+        self.assertEqual(table.load_logs(self.folder.name,
+                                         since=dt.datetime(2024, 1, 2)), 1)
+        self.assertEqual(table.load_logs(self.folder.name,
+                                         until=dt.datetime(2024, 1, 2)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
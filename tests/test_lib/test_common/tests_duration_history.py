@@ -0,0 +1,126 @@
+import unittest
+import sys
+import os
+import itertools
+import sqlite3
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common import duration_history
+from lib.common.duration_history import *
+from lib.common.logger import global_logger
+
+global_logger.disable()
+
+
+## Clock, which returns increasing times, so order of records is known.
+class FakeTime:
+    def __init__(self):
+        self.counter = itertools.count(1000)
+
+    def time(self):
+        return float(next(self.counter))
+
+
+class TestFunctions(unittest.TestCase):
+    def test_median(self):
+        self.assertEqual(median([3, 1, 2]), 2)
+        self.assertEqual(median([4, 1, 3, 2]), 2.5)
+        self.assertEqual(median([7]), 7)
+
+    def test_scenario_digest(self):
+        self.assertEqual(scenario_digest({"a": 1, "b": [1, 2]}),
+                         scenario_digest({"b": [1, 2], "a": 1}))
+        self.assertNotEqual(scenario_digest({"a": 1}),
+                            scenario_digest({"a": 2}))
+        self.assertEqual(len(scenario_digest({})), 16)
+
+    def test_order_longest_first(self):
+        estimates = {"a": 1, "b": None, "c": 5, "d": 1, "e": None}
+        self.assertEqual(order_longest_first(list("abcde"), estimates.get),
+                         ["b", "e", "c", "a", "d"])
+
+
+class TestDurationHistory(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.time = duration_history.time
+        duration_history.time = FakeTime()
+        self.path = os.path.join(self.folder.name, "history.sqlite")
+        self.history = DurationHistory(self.path)
+
+    def tearDown(self):
+        self.history.close()
+        duration_history.time = self.time
+        self.folder.cleanup()
+
+    def rows(self, command, digest, mode):
+        with sqlite3.connect(self.path) as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT duration FROM durations WHERE command = ? AND "
+                "digest = ? AND mode = ? ORDER BY finished", (command, digest,
+                                                              mode)
+            )]
+
+    def test_trimmed_to_history_size(self):
+        for duration in range(HISTORY_SIZE + 5):
+            self.history.record("install", "d1", "real", duration)
+        self.history.record("install", "d1", "test", 100)
+        # only latest durations of step are kept
+        self.assertEqual(self.rows("install", "d1", "real"),
+                         list(range(5, HISTORY_SIZE + 5)))
+        self.assertEqual(self.rows("install", "d1", "test"), [100])
+        self.assertEqual(self.history.estimate("install", "d1", "real"),
+                         median(range(5, HISTORY_SIZE + 5)))
+        self.assertEqual(self.history.estimate("install", "d1", "test"), 100)
+
+    def test_fallback_to_command(self):
+        for duration in [10, 20, 30]:
+            self.history.record("install", "d1", "real", duration)
+        self.history.record("install", "d2", "real", 100)
+        self.history.record("remove", "d3", "real", 1)
+        # unseen digest: latest durations of command with any data
+        self.assertEqual(self.history.estimate("install", "d3", "real"), 25)
+        self.assertEqual(self.history.estimate("install", "d2", "real"), 100)
+        self.assertIsNone(self.history.estimate("install", "d3", "test"))
+        self.assertIsNone(self.history.estimate("update", "d1", "real"))
+
+    def test_fallback_uses_latest_durations(self):
+        for duration in range(HISTORY_SIZE):
+            self.history.record("install", "d{}".format(duration), "real",
+                                1000)
+        for duration in range(HISTORY_SIZE):
+            self.history.record("install", "d{}".format(duration), "real",
+                                duration)
+        self.assertEqual(self.history.estimate("install", "new", "real"),
+                         median(range(HISTORY_SIZE)))
+
+    def test_cache(self):
+        self.history.record("install", "d1", "real", 10)
+        self.assertEqual(self.history.estimate("install", "d1", "real"), 10)
+        # record of other object is not seen, until step is recorded by
+        # this object
+        other = DurationHistory(self.path)
+        try:
+            other.record("install", "d1", "real", 20)
+            self.assertEqual(self.history.estimate("install", "d1", "real"),
+                             10)
+            self.history.record("install", "d1", "real", 30)
+            self.assertEqual(self.history.estimate("install", "d1", "real"),
+                             20)
+            self.assertEqual(other.estimate("install", "d1", "real"), 20)
+        finally:
+            other.close()
+
+    def test_shared_database(self):
+        self.history.record("install", "d1", "real", 10)
+        self.history.close()
+        self.history = DurationHistory(self.path)
+        self.assertEqual(self.history.estimate("install", "d1", "real"), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common.job_queue import *
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.folder.name, "jobs.sqlite"))
+
+    def tearDown(self):
+        self.queue.close()
+        self.folder.cleanup()
+
+    def claim_ids(self, slots, host_limit):
+        return [job["id"] for job in self.queue.claim(slots, host_limit)]
+
+    def test_submit_get(self):
+        job_id = self.queue.submit("test-step", {"host": "db1", "n": 1},
+                                   "db1")
+        job = self.queue.get(job_id)
+        self.assertEqual(job["command"], "test-step")
+        self.assertEqual(job["args"], {"host": "db1", "n": 1})
+        self.assertEqual(job["state"], QUEUED)
+        self.assertIsNone(self.queue.get(job_id + 1))
+
+    def test_claim_host_limit(self):
+        ids = [self.queue.submit("test-step", {}, host)
+               for host in ["db1", "db1", "db2", "db1"]]
+        # second job of db1 doesn't block job of db2
+        self.assertEqual(self.claim_ids(10, 1), [ids[0], ids[2]])
+        self.assertEqual(self.claim_ids(10, 1), [])
+        self.queue.finish(ids[0], DONE, 0)
+        self.assertEqual(self.claim_ids(10, 1), [ids[1]])
+        self.assertEqual(self.queue.get(ids[1])["state"], RUNNING)
+
+    def test_claim_slots(self):
+        ids = [self.queue.submit("test-step", {}, "db{}".format(i))
+               for i in range(3)]
+        self.assertEqual(self.claim_ids(0, 1), [])
+        self.assertEqual(self.claim_ids(2, 1), ids[:2])
+        self.assertEqual(self.claim_ids(2, 1), ids[2:])
+
+    def test_cancel_queued(self):
+        first = self.queue.submit("test-step", {}, "db1")
+        second = self.queue.submit("test-step", {}, "db1")
+        self.claim_ids(1, 1)
+        # running job is not cancelled by queue
+        self.assertFalse(self.queue.cancel_queued(first))
+        self.assertTrue(self.queue.cancel_queued(second))
+        self.assertFalse(self.queue.cancel_queued(second))
+        self.assertEqual(self.queue.get(second)["state"], CANCELLED)
+        self.assertEqual([job["id"] for job in self.queue.list(QUEUED)], [])
+
+    def test_interrupt_running(self):
+        ids = [self.queue.submit("test-step", {}, "db{}".format(i))
+               for i in range(3)]
+        self.claim_ids(2, 1)
+        self.queue.finish(ids[0], FAILED, 1)
+        # queue is reopened by new daemon
+        self.queue.close()
+        self.queue = JobQueue(os.path.join(self.folder.name, "jobs.sqlite"))
+        self.assertEqual(self.queue.interrupt_running(), 1)
+        self.assertEqual([self.queue.get(job_id)["state"] for job_id in ids],
+                         [FAILED, INTERRUPTED, QUEUED])
+        self.assertEqual(self.claim_ids(10, 1), [ids[2]])
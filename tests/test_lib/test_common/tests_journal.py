@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+import time
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common import global_vars as gv
+from lib.common.journal import *
+
+global_logger.disable()
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pid_path = gv.PID_PATH
+        gv.PID_PATH = self.folder.name
+
+    def tearDown(self):
+        gv.PID_PATH = self.pid_path
+        self.folder.cleanup()
+
+    def test_record_read(self):
+        journal = Journal("run")
+        journal.record("run", command="test")
+        journal.record("start", stage="a")
+        journal.close()
+        with open(journal.path, "a") as f:
+            f.write('{"event": "fin')
+        journal = Journal("run")
+        self.assertEqual(journal.find("run")["command"], "test")
+        self.assertEqual(journal.last_index("start", stage="a"), 1)
+        self.assertIsNone(journal.last_index("start", stage="b"))
+        journal.close()
+
+    def test_remove(self):
+        journal = Journal("run")
+        journal.record("run", command="test")
+        journal.remove()
+        self.assertFalse(os.path.exists(journal.path))
+
+    def test_remove_old_journals(self):
+        for run_id in ["old", "new"]:
+            Journal(run_id).close()
+        old = time.time() - JOURNAL_MAX_AGE - 60
+        os.utime(get_journal_path("old"), (old, old))
+        self.assertEqual(remove_old_journals(), 1)
+        self.assertFalse(os.path.exists(get_journal_path("old")))
+        self.assertTrue(os.path.exists(get_journal_path("new")))
+        gv.PID_PATH = os.path.join(self.folder.name, "missing")
+        self.assertEqual(remove_old_journals(), 0)
@@ -0,0 +1,201 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import datetime as dt
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common.log_index import *
+from lib.common.logger import *
+
+global_logger.disable()
+
+
+## Build text log record.
+def text_record(level, time, **values):
+    return "[{}] 2024-01-01 {}-0,{}\n".format(level, time, ",".join(
+        "{}={}".format(key, value) for key, value in values.items()
+    ))
+
+
+class TestParse(unittest.TestCase):
+    def test_get_log_scenario(self):
+        self.assertEqual(get_log_scenario("/tmp/my_script_240101_120000_42.log"),
+                         "my_script")
+        self.assertEqual(get_log_scenario("other.log"), "other")
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time("2024-01-01 12:00:00.500"),
+                         dt.datetime(2024, 1, 1, 12, 0, 0, 500000))
+        self.assertEqual(parse_time("2024-01-01T12:30"),
+                         dt.datetime(2024, 1, 1, 12, 30))
+        self.assertEqual(parse_time("2024-01-01"), dt.datetime(2024, 1, 1))
+        delta = dt.datetime.now() - parse_time("2h")
+        self.assertAlmostEqual(delta.total_seconds(), 7200, delta=60)
+        with self.assertRaises(ValueError):
+            parse_time("yesterday")
+
+    def test_parse_text_line(self):
+        record = parse_record_line(text_record(
+            "ERROR", "12:00:00.000", pid=42, message="a\\,b",
+            str_code="TIMEOUT_ERROR", state="error"
+        ).rstrip("\n"))
+        self.assertEqual(record, {"level": "ERROR",
+                                  "time": "2024-01-01 12:00:00.000",
+                                  "pid": "42", "code": "TIMEOUT_ERROR",
+                                  "state": "error"})
+        self.assertIsNone(parse_record_line("Traceback (most recent call):"))
+
+    def test_parse_json_line(self):
+        record = parse_record_line(json.dumps({
+            "level": "ERROR", "time": "2024-01-01 12:00:00.000", "pid": 42,
+            "values": {"uuid": "u1"},
+            "args": ["code=4,str_code=TIMEOUT_ERROR,message=Timeout expired"],
+        }))
+        self.assertEqual(record, {"level": "ERROR",
+                                  "time": "2024-01-01 12:00:00.000",
+                                  "pid": 42, "uuid": "u1",
+                                  "code": "TIMEOUT_ERROR"})
+        self.assertIsNone(parse_record_line("{not json"))
+        self.assertIsNone(parse_record_line("[1, 2]"))
+
+
+class TestLogIndex(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.index = LogIndex(self.folder.name)
+
+    def tearDown(self):
+        self.index.close()
+        self.folder.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.folder.name, name)
+
+    def append(self, name, data):
+        with open(self.path(name), "a") as f:
+            f.write(data)
+
+    def texts(self, **kwargs):
+        return [record["text"] for record in self.index.query(**kwargs)]
+
+    def test_incremental(self):
+        name = "script_240101_120000_1.log"
+        self.append(name, text_record("INFO", "12:00:00.000", message="a"))
+        self.assertEqual(self.index.update(), 1)
+        self.assertEqual(self.index.update(), 0)
+        self.append(name, text_record("INFO", "12:00:01.000", message="b"))
+        self.assertEqual(self.index.update(), 1)
+        self.assertEqual(self.texts(), [
+            "[INFO] 2024-01-01 12:00:00.000-0,message=a",
+            "[INFO] 2024-01-01 12:00:01.000-0,message=b",
+        ])
+        # index is kept between instances
+        self.index.close()
+        self.index = LogIndex(self.folder.name)
+        self.assertEqual(self.index.update(), 0)
+        self.assertEqual(len(self.index.query()), 2)
+
+    def test_partial_line(self):
+        name = "script.log"
+        line = text_record("INFO", "12:00:00.000", message="complete")
+        self.append(name, line[:20])
+        self.assertEqual(self.index.update(), 0)
+        self.append(name, line[20:])
+        self.assertEqual(self.index.update(), 1)
+        self.assertEqual(self.texts(), [line.rstrip("\n")])
+
+    def test_multi_line_record(self):
+        name = "script.log"
+        self.append(name, "raw text before first record\n")
+        self.append(name, text_record("ERROR", "12:00:00.000", message="fail"))
+        self.append(name, "Traceback:\n  line 1\n")
+        self.assertEqual(self.index.update(), 1)
+        self.append(name, "  line 2\n")
+        self.append(name, text_record("INFO", "12:00:01.000", message="next"))
+        self.assertEqual(self.index.update(), 1)
+        self.assertEqual(self.texts(), [
+            "[ERROR] 2024-01-01 12:00:00.000-0,message=fail\n"
+            "Traceback:\n  line 1\n  line 2",
+            "[INFO] 2024-01-01 12:00:01.000-0,message=next",
+        ])
+
+    def test_truncated(self):
+        name = "script.log"
+        self.append(name, text_record("INFO", "12:00:00.000", message="a"))
+        self.append(name, text_record("INFO", "12:00:01.000", message="b"))
+        self.index.update()
+        with open(self.path(name), "w") as f:
+            f.write(text_record("INFO", "12:00:02.000", message="c"))
+        self.assertEqual(self.index.update(), 1)
+        self.assertEqual(self.texts(),
+                         ["[INFO] 2024-01-01 12:00:02.000-0,message=c"])
+
+    def test_replaced(self):
+        name = "script.log"
+        self.append(name, text_record("INFO", "12:00:00.000", message="a"))
+        self.index.update()
+        # rotated file is replaced by new one, which is already larger
+        new_path = self.path("new.tmp")
+        with open(new_path, "w") as f:
+            f.write(text_record("INFO", "12:00:01.000", message="b"))
+            f.write(text_record("INFO", "12:00:02.000", message="c"))
+        os.replace(new_path, self.path(name))
+        self.assertEqual(self.index.update(), 2)
+        self.assertEqual(self.texts(), [
+            "[INFO] 2024-01-01 12:00:01.000-0,message=b",
+            "[INFO] 2024-01-01 12:00:02.000-0,message=c",
+        ])
+
+    def test_removed(self):
+        self.append("a.log", text_record("INFO", "12:00:00.000", message="a"))
+        self.append("b.log", text_record("INFO", "12:00:01.000", message="b"))
+        self.append("other.txt", text_record("INFO", "12:00:02.000"))
+        self.assertEqual(self.index.update(), 2)
+        os.remove(self.path("a.log"))
+        self.assertEqual(self.index.update(), 0)
+        self.assertEqual([record["path"] for record in self.index.query()],
+                         ["b.log"])
+
+    def test_query(self):
+        self.append("first_240101_120000_1.log",
+                    text_record("INFO", "12:00:00.000", pid=1, uuid="u1",
+                                state="begin")
+                    + text_record("ERROR", "12:00:02.000", pid=1,
+                                  str_code="TIMEOUT_ERROR"))
+        self.append("second_240101_120000_2.log", json.dumps({
+            "level": "WARNING", "time": "2024-01-01 12:00:01.000", "pid": 2,
+            "values": {"uuid": "u2"},
+        }) + "\n")
+        self.index.update()
+        times = lambda **kwargs: [record["time"] for record
+                                  in self.index.query(text=False, **kwargs)]
+        self.assertEqual(times(), ["2024-01-01 12:00:00.000",
+                                   "2024-01-01 12:00:01.000",
+                                   "2024-01-01 12:00:02.000"])
+        self.assertEqual(times(level="error"), ["2024-01-01 12:00:02.000"])
+        self.assertEqual(times(level=["INFO", "WARNING"]),
+                         ["2024-01-01 12:00:00.000",
+                          "2024-01-01 12:00:01.000"])
+        self.assertEqual(times(scenario="second"), ["2024-01-01 12:00:01.000"])
+        self.assertEqual(times(pid=1, state="begin"),
+                         ["2024-01-01 12:00:00.000"])
+        self.assertEqual(times(uuid="u2"), ["2024-01-01 12:00:01.000"])
+        self.assertEqual(times(code="TIMEOUT_ERROR"),
+                         ["2024-01-01 12:00:02.000"])
+        self.assertEqual(times(since=dt.datetime(2024, 1, 1, 12, 0, 1),
+                               until=dt.datetime(2024, 1, 1, 12, 0, 2)),
+                         ["2024-01-01 12:00:01.000"])
+        self.assertEqual(times(limit=1), ["2024-01-01 12:00:00.000"])
+        record = self.index.query(uuid="u2")[0]
+        self.assertEqual(record["scenario"], "second")
+        self.assertEqual(json.loads(record["text"])["values"], {"uuid": "u2"})
+        self.assertNotIn("text", self.index.query(text=False)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
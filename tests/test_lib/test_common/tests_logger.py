@@ -0,0 +1,275 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common import global_vars as gv
+from lib.common.logger import *
+
+
+## Value, which counts conversions to string.
+class CountedValue:
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "counted"
+
+
+class LoggerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "test.log")
+        streams, files = global_logger.get_outputs()
+        self.outputs = (list(streams), list(files))
+        global_logger.remove_outputs()
+        global_logger.add_file_handler(self.path)
+        global_logger.enable()
+
+    def tearDown(self):
+        global_logger.disable()
+        global_logger.remove_outputs()
+        global_logger.set_outputs(*self.outputs)
+        self.folder.cleanup()
+
+    def read_lines(self):
+        with open(self.path) as f:
+            return f.read().splitlines()
+
+
+class TestLoggerQueue(LoggerTestCase):
+    def test_background_writer(self):
+        def log(thread):
+            for i in range(50):
+                global_logger.info(message="record", thread=thread, i=i)
+
+        threads = [threading.Thread(target=log, args=(n, )) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        global_logger.flush()
+        lines = self.read_lines()
+        self.assertEqual(len(lines), 200)
+        # records of every thread are written in order
+        for n in range(4):
+            self.assertEqual(
+                [line for line in lines if ",thread={},".format(n) in line],
+                [line for i in range(50) for line in lines
+                 if line.endswith(",thread={},i={}".format(n, i))]
+            )
+
+    def test_error_written_synchronously(self):
+        global_logger.info(message="before")
+        global_logger.error(message="failed")
+        lines = self.read_lines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith("[ERROR]"))
+
+    def test_values_captured_when_logged(self):
+        value = [1]
+        global_logger.info(message="record", value=value)
+        value.append(2)
+        global_logger.flush()
+        self.assertTrue(self.read_lines()[0].endswith(",value=[1]"))
+
+    def test_dropped_records_not_rendered(self):
+        value = CountedValue()
+        debug = gv.DEBUG
+        gv.DEBUG = False
+        try:
+            global_logger.debug(message="record", value=value)
+        finally:
+            gv.DEBUG = debug
+        global_logger.remove_outputs()
+        global_logger.add_file_handler(self.path, level="WARNING")
+        global_logger.info(message="record", value=value)
+        global_logger.warning(message="record", value=value)
+        global_logger.flush()
+        self.assertEqual(value.count, 1)
+        self.assertEqual(len(self.read_lines()), 1)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "fork is not supported")
+    def test_fork(self):
+        global_logger.info(message="parent")
+        pid = os.fork()
+        if pid == 0:
+            try:
+                global_logger.info(message="child")
+                global_logger.flush()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        global_logger.flush()
+        lines = self.read_lines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("message=parent", lines[0])
+        self.assertIn("message=child", lines[1])
+        self.assertIn("pid={},".format(pid), lines[1])
+
+
+class TestSpan(LoggerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.spans = []
+        SPAN_LISTENERS.append(self.spans.append)
+
+    def tearDown(self):
+        SPAN_LISTENERS.remove(self.spans.append)
+        super().tearDown()
+
+    def records(self):
+        global_logger.flush()
+        return [{"values": dict(value.split("=", 1)
+                                for value in line.split(",")[1:])}
+                for line in self.read_lines()]
+
+    def test_nested(self):
+        with Span(message="outer") as outer:
+            self.assertIs(get_current_span(), outer)
+            with Span(message="inner") as inner:
+                self.assertIs(inner.parent, outer)
+            self.assertIs(get_current_span(), outer)
+        self.assertIsNone(get_current_span())
+        self.assertEqual([span.name for span in self.spans],
+                         ["inner", "outer"])
+        self.assertGreaterEqual(outer.duration_ns, inner.duration_ns)
+        self.assertEqual([record["values"]["message"]
+                          for record in self.records()], ["inner", "outer"])
+
+    def test_finish_once(self):
+        span = Span(message="span")
+        with span:
+            span.finish()
+        self.assertEqual(len(self.spans), 1)
+        self.assertEqual(len(self.records()), 1)
+
+    def test_print_begin_uuid(self):
+        with Span(print_begin=True, print_uuid=True, message="outer") as outer:
+            with Span(print_uuid=True, message="inner"):
+                pass
+        records = self.records()
+        self.assertEqual([record["values"].get("state")
+                          for record in records], ["begin", None, "end"])
+        self.assertEqual(records[1]["values"]["parent_uuid"], str(outer.uuid))
+        self.assertEqual(records[2]["values"]["uuid"], str(outer.uuid))
+
+    def test_decorator(self):
+        @Span(print_function=True)
+        def operation(value):
+            self.assertIsNotNone(get_current_span())
+            return value
+
+        self.assertEqual(operation(1), 1)
+        self.assertEqual(operation(2), 2)
+        self.assertEqual(len(self.spans), 2)
+        self.assertIsNot(self.spans[0], self.spans[1])
+        self.assertEqual(self.spans[0].name, "operation")
+        self.assertEqual(self.records()[0]["values"]["function"], "operation")
+
+    def test_log_func(self):
+        def operation():
+            l = LogFunc(print_function=True, print_uuid=True)
+            self.assertIs(get_current_span(), l)
+            return l.op_uuid
+
+        op_uuid = operation()
+        # LogFunc is finished, when it is destroyed
+        self.assertEqual([span.name for span in self.spans], ["operation"])
+        self.assertIsNone(get_current_span())
+        self.assertEqual(self.records()[0]["values"]["uuid"], str(op_uuid))
+
+    def test_asyncio_tasks(self):
+        async def task(name):
+            with Span(message=name) as span:
+                await asyncio.sleep(0.01)
+                self.assertIs(get_current_span(), span)
+                return span.parent
+
+        async def main():
+            with Span(message="main") as span:
+                parents = await asyncio.gather(task("a"), task("b"))
+            return span, parents
+
+        import asyncio
+        span, parents = asyncio.run(main())
+        self.assertEqual(parents, [span, span])
+
+
+## Value, which can be changed after it is logged.
+class ChangedValue:
+    def __init__(self):
+        self.value = "before"
+
+    def __str__(self):
+        return self.value
+
+
+class TestLogValues(LoggerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.limit = gv.LOG_VALUE_LIMIT
+
+    def tearDown(self):
+        gv.LOG_VALUE_LIMIT = self.limit
+        super().tearDown()
+
+    def values(self):
+        global_logger.flush()
+        return [line.split(",", 3)[3] for line in self.read_lines()]
+
+    def test_truncate_log_value(self):
+        gv.LOG_VALUE_LIMIT = 4
+        self.assertEqual(truncate_log_value("abcd"), "abcd")
+        self.assertEqual(truncate_log_value("abcdef"),
+                         "abcd...<truncated, length=6>")
+        self.assertEqual(truncate_log_value(b"abcdef"),
+                         "b'abcd'...<truncated, length=6>")
+        self.assertEqual(truncate_log_value(123456),
+                         "1234...<truncated, length=6>")
+        gv.LOG_VALUE_LIMIT = 0
+        self.assertEqual(truncate_log_value("abcdef"), "abcdef")
+        self.assertEqual(truncate_log_value(b"abcdef"), "b'abcdef'")
+
+    def test_values_truncated_in_records(self):
+        gv.LOG_VALUE_LIMIT = 4
+        value = ChangedValue()
+        global_logger.info(text="abcdef", data=b"abcdef", value=value)
+        gv.LOG_VALUE_LIMIT = 0
+        global_logger.info(text="abcdef", data=b"abcdef", value=value)
+        self.assertEqual(self.values(), [
+            "text=abcd...<truncated, length=6>,"
+            "data=b'abcd'...<truncated, length=6>,"
+            "value=befo...<truncated, length=6>",
+            "text=abcdef,data=b'abcdef',value=before",
+        ])
+
+    def test_objects_rendered_when_logged(self):
+        value = ChangedValue()
+        global_logger.info(value=value)
+        value.value = "after"
+        global_logger.info(value=value)
+        self.assertEqual(self.values(), ["value=before", "value=after"])
+
+    def test_log_value_limit_arg(self):
+        from lib.common import bootstrap
+        bootstrap.set_debug_values(
+            bootstrap.parse_cmd_args(["--log-value-limit=10"])[1]
+        )
+        self.assertEqual(gv.LOG_VALUE_LIMIT, 10)
+        global_logger.info(text="a" * 20)
+        bootstrap.set_debug_values(
+            bootstrap.parse_cmd_args(["--log-value-limit=0"])[1]
+        )
+        self.assertFalse(gv.LOG_VALUE_LIMIT)
+        global_logger.info(text="a" * 20)
+        self.assertEqual(self.values(), [
+            "text=" + "a" * 10 + "...<truncated, length=20>",
+            "text=" + "a" * 20,
+        ])
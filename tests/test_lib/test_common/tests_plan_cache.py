@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common import plan_cache
+from lib.common.plan_cache import *
+from lib.common.logger import global_logger
+
+global_logger.disable()
+
+
+class TestPlanCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = PlanCache(os.path.join(self.folder.name, "cache"))
+        self.config = os.path.join(self.folder.name, "config.yaml")
+        self.write(self.config, "a: 1\n")
+        self.plan = {"type": "primitive", "name": "step",
+                     "config": self.config}
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_key(self):
+        key = plan_key("dictionary.yaml", [["cmd"], {"a": 1, "b": 2}])
+        self.assertEqual(key, plan_key("./dictionary.yaml",
+                                       [["cmd"], {"b": 2, "a": 1}]))
+        self.assertNotEqual(key, plan_key("dictionary.yaml",
+                                          [["cmd"], {"a": 1, "b": 3}]))
+        self.assertNotEqual(key, plan_key("other.yaml",
+                                          [["cmd"], {"a": 1, "b": 2}]))
+
+    def test_store_load(self):
+        self.assertIsNone(self.cache.load("key"))
+        self.cache.store("key", self.plan, [self.config])
+        self.assertEqual(self.cache.load("key"), self.plan)
+        # no temporary files are left
+        self.assertEqual(os.listdir(self.cache.folder), ["key.json"])
+
+    def test_changed_file(self):
+        self.cache.store("key", self.plan, [self.config])
+        self.write(self.config, "a: 2\n")
+        self.assertIsNone(self.cache.load("key"))
+        self.cache.store("key", self.plan, [self.config])
+        os.remove(self.config)
+        self.assertIsNone(self.cache.load("key"))
+
+    def test_other_version(self):
+        self.cache.store("key", self.plan, [self.config])
+        version = plan_cache.PLAN_FORMAT_VERSION
+        plan_cache.PLAN_FORMAT_VERSION = version + 1
+        try:
+            self.assertIsNone(self.cache.load("key"))
+        finally:
+            plan_cache.PLAN_FORMAT_VERSION = version
+
+    def test_damaged_file(self):
+        os.makedirs(self.cache.folder)
+        for text in ["{", "[]"]:
+            self.write(os.path.join(self.cache.folder, "key.json"), text)
+            self.assertIsNone(self.cache.load("key"))
+
+    def test_store_error(self):
+        # plan, which cannot be stored, is ignored
+        self.write(os.path.join(self.folder.name, "file"), "")
+        PlanCache(os.path.join(self.folder.name, "file")).store(
+            "key", self.plan, [self.config]
+        )
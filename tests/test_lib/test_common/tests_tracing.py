@@ -0,0 +1,208 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.common import global_vars as gv
+from lib.common import tracing
+from lib.common.errors import AutomationLibraryError
+from lib.common.logger import *
+from trace_export import trace_export_main
+
+global_logger.disable()
+
+
+class TracingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pid_path = gv.PID_PATH
+        gv.PID_PATH = self.folder.name
+        self.environ = os.environ.pop(tracing.TRACE_ENV, None)
+        self.reset()
+
+    def tearDown(self):
+        self.reset()
+        os.environ.pop(tracing.TRACE_ENV, None)
+        if self.environ is not None:
+            os.environ[tracing.TRACE_ENV] = self.environ
+        gv.PID_PATH = self.pid_path
+        self.folder.cleanup()
+
+    ## Forget trace of process, so every test starts new one.
+    def reset(self):
+        if tracing._fd is not None:
+            os.close(tracing._fd)
+        tracing._fd = None
+        tracing._fd_pid = None
+        tracing._trace = None
+        if tracing._record_span in SPAN_LISTENERS:
+            SPAN_LISTENERS.remove(tracing._record_span)
+
+
+class TestTraceContext(TracingTestCase):
+    def test_parse_traceparent(self):
+        trace_id, span_id = "ab" * 16, "cd" * 8
+        value = tracing.format_traceparent(trace_id, span_id)
+        self.assertEqual(tracing.parse_traceparent(value), (trace_id, span_id))
+        self.assertEqual(tracing.parse_traceparent(" " + value.upper()),
+                         (trace_id, span_id))
+        self.assertIsNone(tracing.parse_traceparent(""))
+        self.assertIsNone(tracing.parse_traceparent("00-ab-cd-01"))
+        self.assertIsNone(tracing.parse_traceparent(None))
+
+    def test_start_new_trace(self):
+        self.assertFalse(tracing.is_tracing())
+        self.assertIsNone(tracing.get_traceparent())
+        trace_id = tracing.start_trace()
+        self.assertTrue(tracing.is_tracing())
+        self.assertEqual(tracing.get_trace_id(), trace_id)
+        self.assertEqual(len(trace_id), 32)
+        # root span has no parent, so children have no context yet
+        self.assertIsNone(tracing.get_traceparent())
+        with tracing.TraceSpan("step") as span:
+            self.assertEqual(tracing.get_traceparent(),
+                             tracing.format_traceparent(trace_id,
+                                                        span.span_id))
+
+    def test_join_trace(self):
+        trace_id, parent_id = "12" * 16, "34" * 8
+        os.environ[tracing.TRACE_ENV] = tracing.format_traceparent(
+            trace_id, parent_id
+        )
+        self.assertEqual(tracing.start_trace(), trace_id)
+        self.assertEqual(tracing.get_traceparent(),
+                         tracing.format_traceparent(trace_id, parent_id))
+        # the same trace is not restarted, so spans keep their parents
+        self.assertEqual(tracing.start_trace(
+            tracing.format_traceparent(trace_id, "56" * 8)
+        ), trace_id)
+        self.assertEqual(tracing.get_traceparent(),
+                         tracing.format_traceparent(trace_id, parent_id))
+        self.assertEqual(SPAN_LISTENERS.count(tracing._record_span), 1)
+
+
+class TestTraceFiles(TracingTestCase):
+    def test_spans_written(self):
+        trace_id = tracing.start_trace()
+        with tracing.TraceSpan("outer", step="first") as outer:
+            with tracing.TraceSpan("inner") as inner:
+                pass
+        processes, spans = tracing.load_trace(trace_id)
+        self.assertEqual(list(processes), [os.getpid()])
+        self.assertEqual([span["name"] for span in spans], ["outer", "inner"])
+        self.assertEqual(spans[0]["span"], outer.span_id)
+        self.assertIsNone(spans[0]["parent"])
+        self.assertEqual(spans[0]["attributes"], {"step": "first"})
+        self.assertEqual(spans[1]["parent"], outer.span_id)
+        self.assertEqual(spans[1]["duration"], inner.duration_ns)
+        # trace can be loaded by folder too
+        self.assertEqual(tracing.load_trace(tracing.get_trace_folder(trace_id)),
+                         (processes, spans))
+
+    def test_spans_not_written_without_trace(self):
+        with tracing.TraceSpan("span"):
+            pass
+        self.assertFalse(os.path.exists(
+            os.path.join(gv.PID_PATH, tracing.TRACE_FOLDER)
+        ))
+
+    def test_incomplete_line_skipped(self):
+        trace_id = tracing.start_trace()
+        with tracing.TraceSpan("span"):
+            pass
+        path = os.path.join(tracing.get_trace_folder(trace_id),
+                            "{}.jsonl".format(os.getpid()))
+        with open(path, "a") as f:
+            f.write('{"name": "killed", "sp')
+        _, spans = tracing.load_trace(trace_id)
+        self.assertEqual([span["name"] for span in spans], ["span"])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "fork is not supported")
+    def test_fork(self):
+        trace_id = tracing.start_trace()
+        with tracing.TraceSpan("parent") as parent:
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    with tracing.TraceSpan("child"):
+                        pass
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+        processes, spans = tracing.load_trace(trace_id)
+        self.assertEqual(sorted(processes), sorted([os.getpid(), pid]))
+        child = [span for span in spans if span["name"] == "child"][0]
+        self.assertEqual(child["pid"], pid)
+        self.assertEqual(child["parent"], parent.span_id)
+
+    def test_trace_not_found(self):
+        with self.assertRaises(AutomationLibraryError) as cm:
+            tracing.load_trace("0" * 32)
+        self.assertEqual(cm.exception.str_code, "ARGS_ERROR")
+
+
+class TestTraceExport(TracingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.trace_id = tracing.start_trace()
+        with tracing.TraceSpan("outer", step="first") as self.outer:
+            with tracing.TraceSpan("inner"):
+                pass
+
+    def export(self, *args):
+        output = os.path.join(self.folder.name, "export.json")
+        res = trace_export_main(["trace_export.py", self.trace_id,
+                                 "--output=" + output] + list(args))
+        self.assertEqual(res, 0)
+        with open(output) as f:
+            return json.load(f)
+
+    def test_chrome(self):
+        data = self.export()
+        events = data["traceEvents"]
+        self.assertEqual(events[0]["ph"], "M")
+        self.assertEqual(events[0]["pid"], os.getpid())
+        spans = events[1:]
+        self.assertEqual([event["name"] for event in spans],
+                         ["outer", "inner"])
+        self.assertEqual(spans[0]["args"],
+                         {"step": "first", "span": self.outer.span_id})
+        self.assertEqual(spans[1]["args"]["parent"], self.outer.span_id)
+        self.assertLessEqual(spans[0]["ts"], spans[1]["ts"])
+        self.assertGreaterEqual(spans[0]["dur"], spans[1]["dur"])
+
+    def test_otlp(self):
+        data = self.export("--format=otlp")
+        self.assertEqual(len(data["resourceSpans"]), 1)
+        resource = data["resourceSpans"][0]
+        self.assertIn({"key": "process.pid",
+                       "value": {"intValue": str(os.getpid())}},
+                      resource["resource"]["attributes"])
+        spans = resource["scopeSpans"][0]["spans"]
+        self.assertEqual([span["name"] for span in spans], ["outer", "inner"])
+        self.assertTrue(all(span["traceId"] == self.trace_id
+                            for span in spans))
+        self.assertNotIn("parentSpanId", spans[0])
+        self.assertEqual(spans[1]["parentSpanId"], self.outer.span_id)
+        self.assertIn({"key": "step", "value": {"stringValue": "first"}},
+                      spans[0]["attributes"])
+        self.assertGreaterEqual(int(spans[0]["endTimeUnixNano"]),
+                                int(spans[1]["endTimeUnixNano"]))
+
+    def test_errors(self):
+        self.assertEqual(trace_export_main(["trace_export.py"]),
+                         AutomationLibraryError("ARGS_ERROR").num_code)
+        self.assertEqual(trace_export_main(["trace_export.py", self.trace_id,
+                                            "--format=unknown"]),
+                         AutomationLibraryError("ARGS_ERROR").num_code)
+        self.assertEqual(trace_export_main(["trace_export.py", "0" * 32]),
+                         AutomationLibraryError("ARGS_ERROR").num_code)
+
+
+if __name__ == '__main__':
+    unittest.main()
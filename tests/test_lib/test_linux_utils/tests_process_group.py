@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+import platform
+import time
+import subprocess as sp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+if platform.system() == "Linux":
+    from lib.linux_utils import process_group
+    from lib.common.logger import global_logger
+    global_logger.disable()
+
+
+## Check, is process alive (zombies are dead).
+def is_alive(pid):
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@unittest.skipUnless(platform.system() == "Linux", "Linux only")
+class TestProcessGroup(unittest.TestCase):
+    def setUp(self):
+        self.use_cgroups = process_group.USE_CGROUPS
+
+    def tearDown(self):
+        process_group.USE_CGROUPS = self.use_cgroups
+
+    def start_tree(self):
+        # step starts grandchild, which outlives it, unless tree is killed
+        proc = process_group.popen_step(
+            ["sh", "-c", "sleep 60 & echo $!; wait"], stdout=sp.PIPE
+        )
+        grandchild = int(proc.stdout.readline())
+        proc.stdout.close()
+        return proc, grandchild
+
+    def check_kill(self):
+        proc, grandchild = self.start_tree()
+        self.assertEqual(os.getsid(proc.pid), proc.pid)
+        self.assertEqual(os.getpgid(grandchild), proc.pid)
+        self.assertTrue(process_group.kill_step_process(proc.pid))
+        self.assertEqual(proc.wait(10), -9)
+        deadline = time.monotonic() + 10
+        while is_alive(grandchild) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(is_alive(grandchild))
+
+    def test_kill_process_group(self):
+        process_group.USE_CGROUPS = False
+        self.check_kill()
+
+    def test_kill_cgroup(self):
+        cgroup = process_group.create_step_cgroup()
+        if cgroup is None:
+            self.skipTest("cgroup v2 is not available")
+        process_group._remove_cgroup(cgroup)
+        process_group.USE_CGROUPS = True
+        self.check_kill()
+
+    def test_moved_to_cgroup(self):
+        cgroup = process_group.create_step_cgroup()
+        if cgroup is None:
+            self.skipTest("cgroup v2 is not available")
+        process_group._remove_cgroup(cgroup)
+        proc, _ = self.start_tree()
+        try:
+            cgroup = process_group._PROCESSES[proc.pid]
+            with open(os.path.join(cgroup, "cgroup.procs")) as f:
+                self.assertIn(str(proc.pid), f.read().split())
+        finally:
+            process_group.kill_step_process(proc.pid)
+            proc.wait(10)
+
+    def test_unknown_process(self):
+        self.assertFalse(process_group.kill_step_process(os.getpid()))
@@ -0,0 +1,198 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.utils import host_facts
+from lib.common import global_vars as gv
+from lib.common.logger import global_logger
+
+global_logger.disable()
+
+
+class TestHostFacts(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pid_path = gv.PID_PATH
+        gv.PID_PATH = os.path.join(self.folder.name, "pid")
+        self.environ = os.environ.pop(host_facts.HOST_FACTS_ENV, None)
+        self.saved = (host_facts.BOOT_ID_PATH, dict(host_facts.PROBES),
+                      dict(host_facts.PACKAGE_DATABASES),
+                      host_facts.probe_platform_packages)
+        host_facts.BOOT_ID_PATH = os.path.join(self.folder.name, "boot_id")
+        self.set_boot_id("boot-1")
+        # package database of stubbed OS
+        self.database = os.path.join(self.folder.name, "status")
+        with open(self.database, "w") as f:
+            f.write("")
+        host_facts.PACKAGE_DATABASES["Linux-deb"] = self.database
+        self.calls = []
+        self.packages = [{"name": "1c-enterprise-server", "version": "1"}]
+        for name, value in [("os-type", "Linux-deb"), ("arch", 64),
+                            ("systemd", True)]:
+            host_facts.PROBES[name] = self.probe(name, value)
+        host_facts.probe_platform_packages = self.probe_packages
+        host_facts._facts = None
+
+    def tearDown(self):
+        host_facts._facts = None
+        host_facts.BOOT_ID_PATH = self.saved[0]
+        host_facts.PROBES.clear()
+        host_facts.PROBES.update(self.saved[1])
+        host_facts.PACKAGE_DATABASES.clear()
+        host_facts.PACKAGE_DATABASES.update(self.saved[2])
+        host_facts.probe_platform_packages = self.saved[3]
+        os.environ.pop(host_facts.HOST_FACTS_ENV, None)
+        if self.environ is not None:
+            os.environ[host_facts.HOST_FACTS_ENV] = self.environ
+        gv.PID_PATH = self.pid_path
+        self.folder.cleanup()
+
+    def probe(self, name, value):
+        def probe():
+            self.calls.append(name)
+            return value
+        return probe
+
+    def probe_packages(self, os_type):
+        self.calls.append("platform-packages")
+        return [dict(package) for package in self.packages]
+
+    def set_boot_id(self, boot_id):
+        with open(host_facts.BOOT_ID_PATH, "w") as f:
+            f.write(boot_id + "\n")
+
+    ## Simulate start of new process: facts of process are forgotten, and
+    #  environment is inherited or not.
+    def new_process(self, inherit_environment=False):
+        host_facts._facts = None
+        if not inherit_environment:
+            os.environ.pop(host_facts.HOST_FACTS_ENV, None)
+
+    def read_file(self):
+        with open(os.path.join(gv.PID_PATH, host_facts.HOST_FACTS_FILE)) as f:
+            return json.load(f)
+
+    def touch_database(self, delta):
+        stat = os.stat(self.database)
+        os.utime(self.database, ns=(stat.st_atime_ns,
+                                    stat.st_mtime_ns + delta))
+
+    def test_gathered_once(self):
+        self.assertEqual(host_facts.get_host_facts(),
+                         {"os-type": "Linux-deb", "arch": 64,
+                          "systemd": True})
+        self.assertEqual(host_facts.get_host_fact("arch"), 64)
+        self.assertEqual(sorted(self.calls), ["arch", "os-type", "systemd"])
+        expected = {"boot-id": "boot-1", "os-type": "Linux-deb", "arch": 64,
+                    "systemd": True}
+        self.assertEqual(self.read_file(), expected)
+        self.assertEqual(
+            json.loads(os.environ[host_facts.HOST_FACTS_ENV]), expected
+        )
+
+    def test_read_from_file(self):
+        host_facts.get_host_facts()
+        self.calls.clear()
+        self.new_process()
+        self.assertEqual(host_facts.get_host_fact("os-type"), "Linux-deb")
+        self.assertEqual(self.calls, [])
+        # facts of previous boot are gathered again
+        self.set_boot_id("boot-2")
+        self.new_process()
+        self.assertEqual(host_facts.get_host_fact("os-type"), "Linux-deb")
+        self.assertEqual(self.calls, ["os-type"])
+        self.assertEqual(self.read_file(),
+                         {"boot-id": "boot-2", "os-type": "Linux-deb"})
+
+    def test_read_from_environment(self):
+        os.environ[host_facts.HOST_FACTS_ENV] = json.dumps(
+            {"boot-id": "boot-1", "os-type": "Windows"}
+        )
+        self.assertEqual(host_facts.get_host_fact("os-type"), "Windows")
+        self.assertEqual(self.calls, [])
+        # environment of previous boot is ignored
+        os.environ[host_facts.HOST_FACTS_ENV] = json.dumps(
+            {"boot-id": "boot-0", "os-type": "Windows"}
+        )
+        self.new_process(inherit_environment=True)
+        self.assertEqual(host_facts.get_host_fact("os-type"), "Linux-deb")
+        self.assertEqual(self.calls, ["os-type"])
+        # child process inherits facts
+        self.new_process(inherit_environment=True)
+        os.remove(os.path.join(gv.PID_PATH, host_facts.HOST_FACTS_FILE))
+        self.assertEqual(host_facts.get_host_fact("os-type"), "Linux-deb")
+        self.assertEqual(self.calls, ["os-type"])
+
+    def test_without_boot_id(self):
+        os.remove(host_facts.BOOT_ID_PATH)
+        self.assertIsNone(host_facts.get_boot_id())
+        self.assertEqual(host_facts.get_host_fact("arch"), 64)
+        # file can be stale, so it is not written, but environment is used
+        self.assertFalse(os.path.exists(
+            os.path.join(gv.PID_PATH, host_facts.HOST_FACTS_FILE)
+        ))
+        self.new_process(inherit_environment=True)
+        self.assertEqual(host_facts.get_host_fact("arch"), 64)
+        self.assertEqual(self.calls, ["arch"])
+
+    def test_platform_packages(self):
+        packages = host_facts.get_host_fact("platform-packages")
+        self.assertEqual(packages, self.packages)
+        # copies are returned
+        packages[0]["version"] = "changed"
+        self.assertEqual(host_facts.get_host_fact("platform-packages"),
+                         self.packages)
+        self.assertEqual(self.calls, ["os-type", "platform-packages"])
+        # other process uses packages from file
+        self.new_process()
+        self.assertEqual(host_facts.get_host_fact("platform-packages"),
+                         self.packages)
+        self.assertEqual(self.calls, ["os-type", "platform-packages"])
+        # package database changed
+        self.packages.append({"name": "1c-enterprise-ws", "version": "1"})
+        self.touch_database(10**9)
+        self.assertEqual(host_facts.get_host_fact("platform-packages"),
+                         self.packages)
+        self.assertEqual(self.calls, ["os-type", "platform-packages",
+                                      "platform-packages"])
+        self.assertEqual(self.read_file()["platform-packages"]["packages"],
+                         self.packages)
+
+    def test_platform_packages_without_database(self):
+        os.remove(self.database)
+        host_facts.get_host_fact("platform-packages")
+        host_facts.get_host_fact("platform-packages")
+        # without stamp changes cannot be detected
+        self.assertEqual(self.calls.count("platform-packages"), 2)
+
+    def test_invalidate(self):
+        host_facts.get_host_facts()
+        host_facts.get_host_fact("platform-packages")
+        self.calls.clear()
+        host_facts.invalidate_host_facts()
+        self.assertNotIn("platform-packages", self.read_file())
+        self.assertNotIn("platform-packages", json.loads(
+            os.environ[host_facts.HOST_FACTS_ENV]
+        ))
+        # packages are queried again, even if database stamp is the same
+        self.assertEqual(host_facts.get_host_fact("platform-packages"),
+                         self.packages)
+        self.assertEqual(host_facts.get_host_fact("arch"), 64)
+        self.assertEqual(self.calls, ["platform-packages"])
+        # invalidation is seen by other processes
+        host_facts.invalidate_host_facts(["arch", "platform-packages"])
+        self.new_process()
+        self.calls.clear()
+        self.assertEqual(host_facts.get_host_fact("arch"), 64)
+        self.assertEqual(host_facts.get_host_fact("os-type"), "Linux-deb")
+        self.assertEqual(self.calls, ["arch"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import signal
+import subprocess as sp
+import time
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.utils import reaper
+from lib.common.logger import global_logger
+
+global_logger.disable()
+
+
+def sleep_process(seconds):
+    return sp.Popen([sys.executable, "-c",
+                     "import time; time.sleep({})".format(seconds)])
+
+
+def exit_process(code):
+    return sp.Popen([sys.executable, "-c",
+                     "import sys; sys.exit({})".format(code)])
+
+
+def kill(proc):
+    proc.kill()
+
+
+@unittest.skipUnless(os.name == "posix", "POSIX only")
+class TestReaper(unittest.TestCase):
+    def setUp(self):
+        self.reaper = reaper.ProcessReaper()
+
+    def check_exit_codes(self):
+        procs = [exit_process(code) for code in range(5)]
+        futures = [self.reaper.watch(proc) for proc in procs]
+        self.assertEqual([future.result(10) for future in futures],
+                         list(range(5)))
+
+    def test_exit_codes(self):
+        self.check_exit_codes()
+
+    def test_time_limit(self):
+        on_timeout = mock.Mock(side_effect=kill)
+        slow = sleep_process(60)
+        fast = exit_process(0)
+        slow_future = self.reaper.watch(slow, 0.2, on_timeout)
+        fast_future = self.reaper.watch(fast, 5, on_timeout)
+        start = time.monotonic()
+        self.assertEqual(slow_future.result(10), -signal.SIGKILL)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(fast_future.result(10), 0)
+        on_timeout.assert_called_once_with(slow)
+
+    def test_time_limit_handler_error(self):
+        def on_timeout(proc):
+            proc.kill()
+            raise RuntimeError("handler failed")
+
+        proc = sleep_process(60)
+        future = self.reaper.watch(proc, 0.1, on_timeout)
+        self.assertEqual(future.result(10), -signal.SIGKILL)
+        # reaper thread keeps working
+        self.check_exit_codes()
+
+    def test_polling_fallback(self):
+        # pidfd is not available (old kernel), processes are polled
+        with mock.patch.object(reaper.os, "pidfd_open", create=True,
+                               side_effect=OSError):
+            self.check_exit_codes()
+            proc = sleep_process(60)
+            future = self.reaper.watch(proc, 0.1, kill)
+            self.assertEqual(future.result(10), -signal.SIGKILL)
+        self.assertEqual(self.reaper._polled, set())
+
+    def test_sigchld_fallback(self):
+        previous = signal.getsignal(signal.SIGCHLD)
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open is not None:
+            del os.pidfd_open
+        try:
+            self.reaper = reaper.ProcessReaper()
+            self.assertTrue(self.reaper._sigchld)
+            self.check_exit_codes()
+        finally:
+            if pidfd_open is not None:
+                os.pidfd_open = pidfd_open
+            signal.signal(signal.SIGCHLD, previous)
+
+    def test_shared_reaper(self):
+        self.assertIs(reaper.get_reaper(), reaper.get_reaper())
@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import marshal
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.utils import utils
+from lib.common import global_vars as gv
+from lib.common.logger import global_logger
+
+global_logger.disable()
+
+
+class TestYamlCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.pid_path = gv.PID_PATH
+        gv.PID_PATH = self.folder.name
+        self.path = os.path.join(self.folder.name, "config.yml")
+        with open(self.path, "w") as f:
+            f.write("a: 1\nb: [x, y]\n")
+        utils._yaml_cache.clear()
+
+    def tearDown(self):
+        gv.PID_PATH = self.pid_path
+        utils._yaml_cache.clear()
+        self.folder.cleanup()
+
+    def cache_files(self):
+        folder = os.path.join(self.folder.name, utils.YAML_CACHE_FOLDER)
+        if not os.path.isdir(folder):
+            return []
+        return [os.path.join(folder, name) for name in os.listdir(folder)]
+
+    def test_stored_as_marshal(self):
+        self.assertEqual(utils.read_yaml(self.path), {"a": 1, "b": ["x", "y"]})
+        files = self.cache_files()
+        self.assertEqual(len(files), 1)
+        with open(files[0], "rb") as f:
+            self.assertEqual(marshal.loads(f.read()),
+                             {"a": 1, "b": ["x", "y"]})
+        folder = os.path.dirname(files[0])
+        self.assertEqual(os.stat(folder).st_mode & 0o777, 0o700)
+        # each call returns new copy
+        data = utils.read_yaml(self.path)
+        data["a"] = 2
+        self.assertEqual(utils.read_yaml(self.path)["a"], 1)
+
+    def test_damaged_entry_rewritten(self):
+        utils.read_yaml(self.path)
+        path = self.cache_files()[0]
+        with open(path, "wb") as f:
+            f.write(b"\xff damaged")
+        utils._yaml_cache.clear()
+        self.assertEqual(utils.read_yaml(self.path)["a"], 1)
+        with open(path, "rb") as f:
+            self.assertEqual(marshal.loads(f.read())["a"], 1)
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "POSIX only")
+    def test_unsafe_folder_ignored(self):
+        utils.read_yaml(self.path)
+        path = self.cache_files()[0]
+        with open(path, "wb") as f:
+            f.write(marshal.dumps({"a": "planted"}))
+        os.chmod(os.path.dirname(path), 0o777)
+        utils._yaml_cache.clear()
+        self.assertEqual(utils.read_yaml(self.path)["a"], 1)
+
+    def test_dates_not_stored(self):
+        with open(self.path, "w") as f:
+            f.write("date: 2016-10-17\n")
+        self.assertEqual(str(utils.read_yaml(self.path)["date"]),
+                         "2016-10-17")
+        self.assertEqual(self.cache_files(), [])
+        self.assertEqual(str(utils.read_yaml(self.path)["date"]),
+                         "2016-10-17")
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import subprocess as sp
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                             "..", "..", "src"))
+
+
+from lib.utils import zygote
+from lib.common.logger import global_logger
+
+global_logger.disable()
+
+
+@unittest.skipUnless(zygote.ZYGOTE_SUPPORTED, "zygote is not supported")
+class TestZygote(unittest.TestCase):
+    def setUp(self):
+        self.use_zygote = zygote.USE_ZYGOTE
+        zygote.USE_ZYGOTE = True
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        zygote.USE_ZYGOTE = self.use_zygote
+        self.folder.cleanup()
+
+    def script(self, text):
+        path = os.path.join(self.folder.name, "script.py")
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def run_script(self, text, *args):
+        proc = zygote.popen_script([sys.executable, self.script(text)]
+                                   + list(args), stdout=sp.PIPE,
+                                   stderr=sp.PIPE)
+        self.assertIsInstance(proc, zygote.ZygoteProcess)
+        stdout, stderr = proc.communicate(timeout=30)
+        return proc.returncode, stdout.decode(), stderr.decode()
+
+    def test_args_and_output(self):
+        code, stdout, _ = self.run_script(
+            "import os, sys\n"
+            "print(__name__, sys.argv[1:], os.getcwd())\n"
+            "print(os.path.basename(sys.path[0]))\n"
+            "sys.exit(3)\n", "--a=1", "b"
+        )
+        self.assertEqual(code, 3)
+        self.assertEqual(stdout.splitlines(), [
+            "__main__ ['--a=1', 'b'] {}".format(os.getcwd()),
+            os.path.basename(self.folder.name),
+        ])
+
+    def test_environment(self):
+        os.environ["ZYGOTE_TEST"] = "value"
+        try:
+            _, stdout, _ = self.run_script(
+                "import os\nprint(os.environ.get('ZYGOTE_TEST'))\n"
+            )
+        finally:
+            del os.environ["ZYGOTE_TEST"]
+        self.assertEqual(stdout, "value\n")
+
+    def test_exit_codes(self):
+        self.assertEqual(self.run_script("pass\n")[0], 0)
+        self.assertEqual(self.run_script("import sys\nsys.exit()\n")[0], 0)
+        code, _, stderr = self.run_script("import sys\nsys.exit('failed')\n")
+        self.assertEqual((code, stderr), (1, "failed\n"))
+        code, _, stderr = self.run_script("raise ValueError('broken')\n")
+        self.assertEqual(code, 1)
+        self.assertIn("ValueError: broken", stderr)
+
+    def test_kill(self):
+        proc = zygote.popen_script([sys.executable, self.script(
+            "import time\ntime.sleep(60)\n"
+        )])
+        self.assertIsNone(proc.poll())
+        with self.assertRaises(sp.TimeoutExpired):
+            proc.wait(0.1)
+        start = time.monotonic()
+        proc.kill()
+        self.assertEqual(proc.wait(10), -9)
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_fallback(self):
+        # only Python scripts are forked from zygote
+        proc = zygote.popen_script(["sh", "-c", "exit 2"])
+        self.assertNotIsInstance(proc, zygote.ZygoteProcess)
+        self.assertEqual(proc.wait(10), 2)
+        zygote.USE_ZYGOTE = False
+        proc = zygote.popen_script([sys.executable, self.script("pass\n")])
+        self.assertNotIsInstance(proc, zygote.ZygoteProcess)
+        self.assertEqual(proc.wait(10), 0)